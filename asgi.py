@@ -0,0 +1,55 @@
+# asgi.py
+"""
+Entrada de producción: la app en varios procesos worker detrás de un puerto.
+
+    python asgi.py                                   # WEB_WORKERS procesos en PORT
+    uvicorn asgi:app --workers 4 --host 0.0.0.0 --port 8550
+
+``main.py`` (``ft.app``) sigue siendo la entrada de desarrollo: un proceso,
+un GIL para todas las sesiones.
+
+  • Afinidad (sticky): cada sesión Flet es un único websocket, es decir una
+    conexión TCP que vive de principio a fin en el worker que la aceptó;
+    sus eventos, hilos y ``page.session`` nunca cambian de proceso. Detrás
+    de un balanceador con varias máquinas hay que activar afinidad por IP
+    o cookie para que la reconexión llegue a la misma máquina.
+  • Estado compartido: las cachés de referencias, perfiles y dashboard usan
+    el almacén SQLite común (services/shared_store.py, ``SHARED_CACHE=1``).
+    Si una reconexión cae en otro worker, ``restore()`` reconstruye la
+    sesión con los tokens del navegador y el perfil sale de ese almacén.
+  • ``FLET_SECRET_KEY`` firma las URLs de subida y debe ser la misma en
+    todos los workers (la subida puede llegar a otro proceso). Si no está
+    definida, ``python asgi.py`` genera una y la hereda a sus workers.
+  • ``METRICS=1`` expone ``/metrics`` (utils/instrumentation.py); cada
+    scrape lo responde un worker y las series llevan su ``pid``.
+"""
+import os
+import secrets
+
+# antes de importar servicios: las cachés leen esto al crearse
+os.environ.setdefault("SHARED_CACHE", "1")
+if __name__ == "__main__":
+    os.environ.setdefault("FLET_SECRET_KEY", secrets.token_urlsafe(32))
+
+import flet.fastapi as flet_fastapi
+
+from config import UPLOAD_DIR
+from main import main
+from utils.instrumentation import asgi_metrics
+
+HOST    = os.getenv("HOST", "0.0.0.0")
+PORT    = int(os.getenv("PORT", "8550"))
+WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 2)))
+
+# /metrics (formato Prometheus) delante de la app si METRICS=1
+app = asgi_metrics(flet_fastapi.app(
+    main,
+    upload_dir=str(UPLOAD_DIR),
+    secret_key=os.getenv("FLET_SECRET_KEY"),
+))
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("asgi:app", host=HOST, port=PORT, workers=WORKERS, log_level="warning")
@@ -1,8 +1,13 @@
 # auth/login_page.py
+import asyncio
 import logging
 import flet as ft
 from auth.session import sign_in
+from auth.tokens import get_token_manager
+from config import get_client
+from services.async_repo import run_blocking
 from utils.alerts import show_snackbar
+from utils.loading import busy
 
 logger = logging.getLogger(__name__)
 
@@ -11,30 +16,41 @@ def login_page(page: ft.Page):
     # Cambiado a correo directo
     email_field = ft.TextField(label="Correo (e-mail)")
     password = ft.TextField(label="Contraseña", password=True, can_reveal_password=True)
+    spinner = ft.ProgressRing(width=20, height=20, visible=False)
 
-    def on_login(e):
+    async def on_login(e):
         if not email_field.value or not password.value:
             show_snackbar(page, "Completa todos los campos", "warning")
             return
 
-        logger.info(f"Intentando login para: {email_field.value}")
-        result = sign_in(email_field.value, password.value)
+        logger.info("Intentando login para: %s", email_field.value)
+        try:
+            with busy(btn_login, email_field, password, indicator=spinner):
+                result = await run_blocking(
+                    page, sign_in, get_client(page), email_field.value, password.value
+                )
+        except asyncio.CancelledError:
+            logger.info("Login cancelado por navegación")
+            return
 
         if result["success"]:
             user = result["user"]
             session = result["session"]
 
-            page.client_storage.set("access_token", session.access_token)
-            page.client_storage.set("refresh_token", session.refresh_token)
+            await page.client_storage.set_async("access_token", session.access_token)
+            await page.client_storage.set_async("refresh_token", session.refresh_token)
+            get_token_manager(page).track(session)      # refresco antes del exp
             page.session.set("user_data", user)
 
-            logger.info(f"Usuario autenticado: {user['nombre_usuario']}")
+            logger.info("Usuario autenticado: %s", user["nombre_usuario"])
             show_snackbar(page, f"Bienvenido {user['nombre_usuario']}", "success")
             page.go("/home")
         else:
-            logger.warning(f"Login fallido: {result['error']}")
+            logger.warning("Login fallido: %s", result["error"])
             show_snackbar(page, f"❌ {result['error']}", "error")
 
+    btn_login = ft.ElevatedButton("Ingresar", on_click=on_login)
+
     # ----- Vista ----------------------------------------------------------
     return ft.View(
         route="/",
@@ -59,7 +75,10 @@ def login_page(page: ft.Page):
                             ft.Text("Iniciar sesión", size=24, weight=ft.FontWeight.BOLD),
                             email_field,
                             password,
-                            ft.ElevatedButton("Ingresar", on_click=on_login),
+                            ft.Row(
+                                [btn_login, spinner],
+                                alignment=ft.MainAxisAlignment.CENTER,
+                            ),
                             ft.TextButton(
                                 "¿No tienes cuenta? Regístrate",
                                 on_click=lambda e: page.go("/register"),
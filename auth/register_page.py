@@ -1,28 +1,40 @@
+import asyncio
 import logging
 import flet as ft
-from auth.session import sign_up
+from auth.session import invalidate_profile, sign_up
+from services.async_repo import run_blocking
 from utils.alerts import show_snackbar
-from config import supabase
+from utils.loading import busy
+from utils.updates import Debouncer, batch_updates, mark_dirty
+from config import get_client
 
 logger = logging.getLogger(__name__)
 
+VALIDATE_DELAY = 0.25          # s sin teclear antes de validar el formulario
+
 
 def register_page(page: ft.Page):
+    client = get_client(page)      # auth propia de esta sesión
+
+    # Cada tecla sólo reprograma la validación; se ejecuta al dejar de teclear
+    async def on_typing(_):
+        validate_debounced()
+
     # ── Campos -----------------------------------------------------------------
-    email = ft.TextField(label="Correo", on_change=lambda e: validate_ui())
-    nombre_usuario = ft.TextField(label="Nombre de usuario", on_change=lambda e: validate_ui())
-    codigo_vendedor = ft.TextField(label="Código de vendedor", on_change=lambda e: validate_ui())
+    email = ft.TextField(label="Correo", on_change=on_typing)
+    nombre_usuario = ft.TextField(label="Nombre de usuario", on_change=on_typing)
+    codigo_vendedor = ft.TextField(label="Código de vendedor", on_change=on_typing)
     password = ft.TextField(label="Contraseña", password=True, can_reveal_password=True,
-                            on_change=lambda e: validate_ui())
+                            on_change=on_typing)
     confirm = ft.TextField(label="Confirmar contraseña", password=True, can_reveal_password=True,
-                           on_change=lambda e: validate_ui())
+                           on_change=on_typing)
 
-    btn_enviar    = ft.ElevatedButton("Enviar correo de verificación", on_click=lambda e: on_send_email(),
-                                      disabled=True)
-    btn_validar   = ft.ElevatedButton("Validar correo", on_click=lambda e: on_validate_email(),
-                                      disabled=True)
-    btn_registrar = ft.ElevatedButton("Registrar perfil", on_click=lambda e: on_register_profile(),
-                                      disabled=True)
+    # on_click se asigna más abajo: los handlers son async y Flet sólo
+    # los espera si recibe la corrutina directamente (no una lambda)
+    btn_enviar    = ft.ElevatedButton("Enviar correo de verificación", disabled=True)
+    btn_validar   = ft.ElevatedButton("Validar correo", disabled=True)
+    btn_registrar = ft.ElevatedButton("Registrar perfil", disabled=True)
+    spinner       = ft.ProgressRing(width=20, height=20, visible=False)
 
     # Guardaremos aquí el UID después de validar
     validated_user_id = {"id": None}
@@ -31,34 +43,56 @@ def register_page(page: ft.Page):
     def validate_ui():
         filled = all(f.value.strip() for f in [email, nombre_usuario, codigo_vendedor, password, confirm])
         same_pw = password.value == confirm.value
-        btn_enviar.disabled = not (filled and same_pw)
-        if confirm.value and not same_pw:
-            show_snackbar(page, "Las contraseñas no coinciden", "warning")
-        page.update()
+        enviar_disabled = not (filled and same_pw)
+        with batch_updates(page):
+            if btn_enviar.disabled != enviar_disabled:
+                btn_enviar.disabled = enviar_disabled
+                mark_dirty(btn_enviar)
+            if confirm.value and not same_pw:
+                show_snackbar(page, "Las contraseñas no coinciden", "warning")
+
+    validate_debounced = Debouncer(page, VALIDATE_DELAY, validate_ui)
 
     # ── Paso 1: sign_up --------------------------------------------------------
-    def on_send_email():
+    async def on_send_email(e):
         logger.info("[REGISTER] Enviando correo de verificación")
-        res = sign_up(email.value, password.value, nombre_usuario.value, codigo_vendedor.value)
+        try:
+            with busy(btn_enviar, indicator=spinner):
+                res = await run_blocking(
+                    page, sign_up, client,
+                    email.value, password.value, nombre_usuario.value, codigo_vendedor.value,
+                )
+        except asyncio.CancelledError:
+            return
 
         if res["success"]:
-            show_snackbar(page, "📧 Revisa tu correo y confírmalo.", "info")
-            btn_enviar.disabled = True
-            btn_validar.disabled = False
-            page.update()
+            with batch_updates(page):
+                show_snackbar(page, "📧 Revisa tu correo y confírmalo.", "info")
+                btn_enviar.disabled = True
+                btn_validar.disabled = False
+                mark_dirty(btn_enviar, btn_validar)
         else:
             show_snackbar(page, f"❌ {res['error']}", "error")
 
     # ── Paso 2: validar correo -------------------------------------------------
-    def on_validate_email():
+    def _login_and_set_session():
+        login_res = client.auth.sign_in_with_password(
+            {"email": email.value, "password": password.value}
+        )
+        if login_res.session:
+            client.auth.set_session(login_res.session.access_token, login_res.session.refresh_token)
+        return login_res
+
+    async def on_validate_email(e):
         logger.info("[REGISTER] Intentando login para validar correo")
         try:
-            login_res = supabase.auth.sign_in_with_password(
-                {"email": email.value, "password": password.value}
-            )
+            with busy(btn_validar, indicator=spinner):
+                login_res = await run_blocking(page, _login_and_set_session)
+        except asyncio.CancelledError:
+            return
         except Exception as exc:
             msg = str(exc)
-            logger.warning(f"Validación falló: {msg}")
+            logger.warning("Validación falló: %s", msg)
             if "Email not confirmed" in msg:
                 show_snackbar(page, "⚠️ Aún no confirmas el correo.", "warning")
             else:
@@ -71,30 +105,43 @@ def register_page(page: ft.Page):
 
         # Sesión válida  → guardamos UID y habilitamos Registrar perfil
         validated_user_id["id"] = login_res.user.id
-        supabase.auth.set_session(login_res.session.access_token, login_res.session.refresh_token)
-        show_snackbar(page, "✅ Correo confirmado. Ahora puedes registrar tu perfil.", "success")
-        btn_validar.disabled = True
-        btn_registrar.disabled = False
-        page.update()
+        with batch_updates(page):
+            show_snackbar(page, "✅ Correo confirmado. Ahora puedes registrar tu perfil.", "success")
+            btn_validar.disabled = True
+            btn_registrar.disabled = False
+            mark_dirty(btn_validar, btn_registrar)
 
     # ── Paso 3: insertar fila en usuarios -------------------------------------
-    def on_register_profile():
+    def _insert_profile():
+        client.table("usuarios").insert(
+            {
+                "auth_uid": validated_user_id["id"],
+                "email": email.value,
+                "nombre_usuario": nombre_usuario.value,
+                "codigo_vendedor": codigo_vendedor.value,
+                "rol": "vendedor",
+            }
+        ).execute()
+        invalidate_profile(validated_user_id["id"])
+
+    async def on_register_profile(e):
         logger.info("[REGISTER] Creando fila en public.usuarios")
         try:
-            supabase.table("usuarios").insert(
-                {
-                    "auth_uid": validated_user_id["id"],
-                    "email": email.value,
-                    "nombre_usuario": nombre_usuario.value,
-                    "codigo_vendedor": codigo_vendedor.value,
-                    "rol": "vendedor",
-                }
-            ).execute()
-            show_snackbar(page, "✅ Perfil creado. Inicia sesión.", "success")
-            page.go("/")
+            with busy(btn_registrar, indicator=spinner):
+                await run_blocking(page, _insert_profile)
+        except asyncio.CancelledError:
+            return
         except Exception as exc:
-            logger.error(f"INSERT falló: {exc}")
+            logger.error("INSERT falló: %s", exc)
             show_snackbar(page, f"❌ {exc}", "error")
+            return
+
+        show_snackbar(page, "✅ Perfil creado. Inicia sesión.", "success")
+        page.go("/")
+
+    btn_enviar.on_click    = on_send_email
+    btn_validar.on_click   = on_validate_email
+    btn_registrar.on_click = on_register_profile
 
     # ── Render -----------------------------------------------------------------
     validate_ui()  # Estado inicial botones
@@ -125,6 +172,7 @@ def register_page(page: ft.Page):
                             btn_enviar,
                             btn_validar,
                             btn_registrar,
+                            spinner,
                             ft.TextButton("Volver al login", on_click=lambda e: page.go("/")),
                         ],
                         spacing=15,
@@ -1,54 +1,66 @@
 # auth/session.py
 import logging
-from config import supabase
+from typing import Optional
+
+from supabase import Client
+
+from services import referencias
 
 logger = logging.getLogger(__name__)
 
+# Columnas de public.usuarios que usa la app (perfil en page.session)
+COLUMNAS_PERFIL = ("auth_uid", "email", "nombre_usuario", "codigo_vendedor", "rol")
+
+
+# ────────────────────────────────────────────────────────────────
+# PERFIL (public.usuarios)
+# ────────────────────────────────────────────────────────────────
+def get_profile(client: Client, uid: str) -> dict:
+    """
+    Perfil del usuario autenticado en ``client``. La RPC ``perfil_usuario``
+    (migrations/007) lo obtiene o lo crea en un solo round-trip; después
+    queda en la caché de referencias ("usuarios", por ``auth_uid``) y los
+    restores no vuelven a consultarlo.
+    """
+    def load() -> dict:
+        row = client.rpc("perfil_usuario").execute().data
+        return {c: row.get(c) for c in COLUMNAS_PERFIL}
+
+    return referencias.get_or_load(client, "usuarios", uid, load)
+
+
+def invalidate_profile(uid: Optional[str] = None):
+    """Descarta el perfil en caché (p. ej. tras editar public.usuarios)."""
+    referencias.invalidate("usuarios", uid)
+
 
 # ────────────────────────────────────────────────────────────────
 # LOGIN
 # ────────────────────────────────────────────────────────────────
-def sign_in(email: str, password: str):
+def sign_in(client: Client, email: str, password: str):
     """
-    Autentica directamente con el correo.
-    Si la fila en public.usuarios no existe aún, la crea (UPSERT).
+    Autentica directamente con el correo sobre el cliente de la sesión.
+    Si la fila en public.usuarios no existe aún, la RPC del perfil la crea.
     """
     email = email.strip().lower()
-    logger.info(f"Login con correo: {email}")
+    logger.info("Login con correo: %s", email)
 
     # 1. Autenticación vía Supabase Auth
     try:
-        res = supabase.auth.sign_in_with_password({"email": email, "password": password})
+        res = client.auth.sign_in_with_password({"email": email, "password": password})
     except Exception as exc:
-        logger.error(f"Auth error: {exc}")
+        logger.error("Auth error: %s", exc)
         return {"success": False, "error": "Credenciales inválidas o e-mail sin confirmar"}
 
     if not res.session:
         return {"success": False, "error": "Credenciales inválidas o e-mail sin confirmar"}
 
-    uid = res.user.id
-
-    # 2. Obtener o crear la fila de usuarios
-    user_row = (
-        supabase.table("usuarios")
-        .select("*")
-        .eq("auth_uid", uid)
-        .single()
-        .execute()
-        .data
-    )
-
-    if not user_row:
-        logger.info("Primera vez: insertando fila usuarios")
-        user_row = {
-            "auth_uid": uid,
-            "email": email,
-            "nombre_usuario": email.split("@")[0],
-            "codigo_vendedor": "",
-            "rol": "vendedor",
-        }
-        # UPSERT evita duplicados si la fila ya existe
-        supabase.table("usuarios").upsert(user_row, on_conflict="auth_uid").execute()
+    # 2. Obtener o crear la fila de usuarios (una RPC, o caché)
+    try:
+        user_row = get_profile(client, res.user.id)
+    except Exception as exc:
+        logger.error("Perfil no disponible: %s", exc)
+        return {"success": False, "error": "No se pudo cargar el perfil del usuario"}
 
     logger.info("Sesión iniciada correctamente")
     return {"success": True, "user": user_row, "session": res.session}
@@ -57,14 +69,14 @@ def sign_in(email: str, password: str):
 # ────────────────────────────────────────────────────────────────
 # SIGN-UP  (sin cambios: requiere confirmar e-mail)
 # ────────────────────────────────────────────────────────────────
-def sign_up(email: str, password: str, nombre_usuario: str, codigo_vendedor: str):
+def sign_up(client: Client, email: str, password: str, nombre_usuario: str, codigo_vendedor: str):
     """
     Registra en Auth y envía correo de confirmación.
     La fila en usuarios se creará tras el primer login confirmado.
     """
     try:
-        logger.info(f"Registrando: {email}")
-        res = supabase.auth.sign_up({"email": email, "password": password})
+        logger.info("Registrando: %s", email)
+        res = client.auth.sign_up({"email": email, "password": password})
 
         if res.user:
             return {"success": True, "pending": True}
@@ -75,3 +87,14 @@ def sign_up(email: str, password: str, nombre_usuario: str, codigo_vendedor: str
         if "User already registered" in str(exc):
             return {"success": False, "error": "Usuario ya registrado"}
         return {"success": False, "error": str(exc)}
+
+
+# ────────────────────────────────────────────────────────────────
+# CERRAR SESIÓN  (la restauración vive en auth.tokens)
+# ────────────────────────────────────────────────────────────────
+def sign_out(client: Client):
+    """Cierra la sesión en Supabase Auth; los errores sólo se registran."""
+    try:
+        client.auth.sign_out()
+    except Exception as exc:
+        logger.warning("sign_out: %s", exc)
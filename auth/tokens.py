@@ -0,0 +1,384 @@
+# auth/tokens.py
+"""
+Manejo de los JWT de cada sesión Flet sin round-trips en el arranque.
+
+  • Al reconectar, el access token guardado se decodifica localmente: si
+    le queda vigencia, la sesión se instala en el cliente sin llamar a Auth.
+  • Un temporizador del event loop refresca el token en segundo plano
+    ``REFRESH_MARGIN`` segundos antes de que venza y guarda los nuevos
+    tokens en ``client_storage``.
+  • Los refrescos concurrentes de una misma sesión se fusionan: el primero
+    llama a Auth y el resto espera ese mismo resultado.
+  • Los trabajos en segundo plano (services/trabajos.py) usan un cliente
+    propio con una copia de la sesión de la página. Cada refresh token
+    sirve una sola vez, así que la página y sus trabajos refrescan por una
+    misma ``_Cadena``: quien llega tarde adopta los tokens ya rotados. Al
+    cerrar sesión la revocación en Auth espera a que termine el último
+    trabajo que usa esa sesión. La cadena vive mientras viva algún cliente
+    que la use (cada cliente la referencia; el registro es débil).
+
+Con ``SUPABASE_JWT_SECRET`` la firma se verifica localmente (PyJWT). Sin él,
+los claims sólo se decodifican y no son confiables: el token se valida
+contra Auth antes de usar su ``sub`` (perfil, rol, navegación).
+"""
+import asyncio
+import base64
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Optional
+
+import flet as ft
+from supabase import Client
+from supabase_auth.types import Session, User
+
+from auth.session import sign_out
+from config import create_session_client, get_client
+from services.async_repo import submit_background
+
+logger = logging.getLogger(__name__)
+
+REFRESH_MARGIN = int(os.getenv("TOKEN_REFRESH_MARGIN", "120"))   # s antes del exp
+JWT_SECRET     = os.getenv("SUPABASE_JWT_SECRET")
+MANAGER_KEY    = "token_manager"
+
+try:
+    import jwt as pyjwt
+except ImportError:
+    # PyJWT es opcional: sin él no hay verificación local de firma
+    pyjwt = None
+
+
+class TokenInvalido(Exception):
+    pass
+
+
+# ────────────────────────────────────────────────────────────────
+# DECODIFICACIÓN LOCAL
+# ────────────────────────────────────────────────────────────────
+def verifica_localmente() -> bool:
+    return bool(JWT_SECRET and pyjwt)
+
+
+def decode_claims(token: str) -> dict:
+    """
+    Claims del JWT. Verifica la firma sólo si hay secreto y PyJWT; si no,
+    el resultado no debe usarse para autorizar nada hasta ``verify``.
+    """
+    if verifica_localmente():
+        try:
+            return pyjwt.decode(
+                token, JWT_SECRET, algorithms=["HS256"],
+                audience="authenticated", options={"verify_exp": False},
+            )
+        except pyjwt.PyJWTError as exc:
+            raise TokenInvalido(str(exc)) from exc
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError) as exc:
+        raise TokenInvalido("JWT mal formado") from exc
+
+
+def seconds_left(claims: dict) -> float:
+    return float(claims.get("exp", 0)) - time.time()
+
+
+def _session_from_claims(access_token: str, refresh_token: str, claims: dict) -> Session:
+    emitido = datetime.fromtimestamp(claims.get("iat", time.time()), tz=timezone.utc)
+    user = User(
+        id=claims["sub"],
+        aud=claims.get("aud", "authenticated"),
+        role=claims.get("role"),
+        email=claims.get("email"),
+        phone=claims.get("phone"),
+        app_metadata=claims.get("app_metadata") or {},
+        user_metadata=claims.get("user_metadata") or {},
+        created_at=emitido,
+    )
+    expires_at = int(claims["exp"])
+    return Session(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        token_type="bearer",
+        expires_at=expires_at,
+        expires_in=max(expires_at - int(time.time()), 0),
+        user=user,
+    )
+
+
+def install_session(client: Client, session: Session):
+    """
+    Instala ``session`` en el cliente sin red. El evento TOKEN_REFRESHED hace
+    que el cliente Supabase actualice el header Authorization de PostgREST.
+    """
+    client.auth._save_session(session)
+    client.auth._notify_all_subscribers("TOKEN_REFRESHED", session)
+
+
+def sesion_de(client: Client) -> Optional[Session]:
+    """Sesión instalada en ``client`` (en memoria: persist_session=False), sin red."""
+    return getattr(getattr(client, "auth", None), "_in_memory_session", None)
+
+
+# ────────────────────────────────────────────────────────────────
+# CADENA DE REFRESCO (página + trabajos de la misma sesión de Auth)
+# ────────────────────────────────────────────────────────────────
+class _Cadena:
+    def __init__(self, session: Session):
+        self.session = session                  # último par de tokens emitido
+        self.clientes = weakref.WeakSet()       # clientes vivos que la usan
+        self.cerrada = False                    # la página cerró sesión
+        self.lock = threading.Lock()
+
+    def unir(self, client: Client):
+        """Con ``cadena.lock`` tomado. El cliente mantiene viva la cadena."""
+        self.clientes.add(client)
+        client._cadena_tokens = self
+
+
+# débil: una sesión que se cierra sin logout desaparece con sus clientes
+_cadenas: weakref.WeakValueDictionary[str, _Cadena] = weakref.WeakValueDictionary()
+_cadenas_lock = threading.Lock()
+
+
+def _clave_cadena(session: Session) -> str:
+    """``session_id`` de Auth (estable entre refrescos); si falta, el usuario."""
+    try:
+        payload = session.access_token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        claims = {}
+    return claims.get("session_id") or session.user.id
+
+
+def _cadena(session: Session) -> _Cadena:
+    with _cadenas_lock:
+        clave = _clave_cadena(session)
+        cadena = _cadenas.get(clave)
+        if cadena is None:
+            cadena = _cadenas[clave] = _Cadena(session)
+        return cadena
+
+
+def unir(client: Client, session: Session):
+    """Registra que ``client`` usa ``session`` (para refrescar y para el logout diferido)."""
+    cadena = _cadena(session)
+    with cadena.lock:
+        if (session.expires_at or 0) > (cadena.session.expires_at or 0):
+            cadena.session = session
+        cadena.unir(client)
+
+
+def refrescar(client: Client, session: Session) -> Session:
+    """
+    Refresca ``session`` en ``client``. Si otro cliente de la misma cadena
+    ya rotó ese refresh token, se instala el par vigente sin llamar a Auth.
+    """
+    cadena = _cadena(session)
+    with cadena.lock:
+        if cadena.session.refresh_token != session.refresh_token:
+            nueva = cadena.session
+            install_session(client, nueva)
+        else:
+            nueva = client.auth.refresh_session(session.refresh_token).session
+            if nueva is None:
+                raise TokenInvalido("Auth no devolvió sesión")
+            cadena.session = nueva
+        cadena.unir(client)
+    return nueva
+
+
+def cliente_trabajo(client: Client) -> Client:
+    """
+    Cliente propio para un trabajo en segundo plano, con la sesión vigente de
+    ``client`` y unido a su cadena: el logout de la página no lo desconecta.
+    Sin sesión instalada (p. ej. un cliente de pruebas) se usa ``client``.
+    """
+    session = sesion_de(client)
+    if session is None:
+        return client
+    propio = create_session_client()
+    cadena = _cadena(session)
+    with cadena.lock:
+        vigente = cadena.session if (cadena.session.expires_at or 0) >= (session.expires_at or 0) else session
+        cadena.unir(propio)
+    install_session(propio, vigente)
+    return propio
+
+
+def renovar(client: Client, margen: float = REFRESH_MARGIN):
+    """Refresca la sesión de un cliente de trabajo si vence en menos de ``margen`` s."""
+    session = sesion_de(client)
+    if session is not None and (session.expires_at or 0) - time.time() <= margen:
+        refrescar(client, session)
+
+
+def soltar(client: Client):
+    """
+    ``client`` deja de usar su sesión (terminó el trabajo o se cerró la
+    página). Si la página ya cerró sesión y era el último, se revoca en Auth.
+    """
+    session = sesion_de(client)
+    if session is None:
+        return
+    cadena = _cadena(session)
+    with cadena.lock:
+        cadena.clientes.discard(client)
+        revocar = cadena.cerrada and not cadena.clientes
+    if revocar:
+        with _cadenas_lock:
+            _cadenas.pop(_clave_cadena(session), None)
+        sign_out(client)
+
+
+def cerrar_sesion(client: Client):
+    """
+    Logout de la página: con trabajos aún en curso sobre esta sesión sólo se
+    marca la cadena y la revocación la hace el último (``soltar``).
+    """
+    session = sesion_de(client)
+    if session is None:
+        sign_out(client)
+        return
+    cadena = _cadena(session)
+    with cadena.lock:
+        cadena.cerrada = True
+    soltar(client)
+
+
+# ────────────────────────────────────────────────────────────────
+# GESTOR POR SESIÓN
+# ────────────────────────────────────────────────────────────────
+class TokenManager:
+    def __init__(self, page: ft.Page, client: Client):
+        self.page = page
+        self.client = client
+        self.session: Optional[Session] = None
+        self.verified = False
+        self._lock = threading.Lock()
+        self._inflight: Optional[Future] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.refreshes = 0
+
+    # ── Restaurar ---------------------------------------------------------
+    def restore(self, access_token: str, refresh_token: str) -> Optional[Session]:
+        """
+        Instala los tokens guardados si el access token sigue vigente.
+        Devuelve None si hay que refrescar primero. Lanza TokenInvalido.
+        """
+        claims = decode_claims(access_token)
+        if "sub" not in claims or "exp" not in claims:
+            raise TokenInvalido("JWT sin sub/exp")
+        session = _session_from_claims(access_token, refresh_token, claims)
+        if seconds_left(claims) <= REFRESH_MARGIN:
+            self.session = session              # sólo para usar su refresh token
+            return None
+        install_session(self.client, session)
+        self.verified = verifica_localmente()
+        self.track(session)
+        return session
+
+    def verify(self) -> bool:
+        """
+        Valida el access token contra Auth (cuando no hay verificación local)
+        y que pertenezca al ``sub`` decodificado. Lanza TokenInvalido.
+        """
+        if self.session is None:
+            return False
+        res = self.client.auth.get_user(self.session.access_token)
+        if res is None or res.user is None or res.user.id != self.session.user.id:
+            raise TokenInvalido("Auth no reconoce el token")
+        self.verified = True
+        return True
+
+    # ── Refresco ----------------------------------------------------------
+    def refresh(self, refresh_token: Optional[str] = None) -> Session:
+        """Refresca en Auth; llamadas simultáneas comparten un solo request."""
+        with self._lock:
+            inflight = self._inflight
+            owner = inflight is None
+            if owner:
+                inflight = self._inflight = Future()
+        if not owner:
+            return inflight.result()
+
+        try:
+            if self.session is not None and refresh_token in (None, self.session.refresh_token):
+                session = refrescar(self.client, self.session)   # compartida con sus trabajos
+            else:
+                session = self.client.auth.refresh_session(refresh_token).session
+                if session is None:
+                    raise TokenInvalido("Auth no devolvió sesión")
+            self.refreshes += 1
+            self.verified = True
+            self.track(session)
+            self._persist(session)
+            inflight.set_result(session)
+            return session
+        except BaseException as exc:
+            inflight.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight = None
+
+    async def refresh_async(self) -> Session:
+        # fuera de run_blocking: un cambio de ruta no debe cancelar el refresco
+        return await asyncio.wrap_future(submit_background(self.refresh))
+
+    # ── Programación -------------------------------------------------------
+    def track(self, session: Session):
+        """Registra la sesión vigente y agenda su refresco antes del exp."""
+        self.session = session
+        unir(self.client, session)
+        delay = max((session.expires_at or 0) - time.time() - REFRESH_MARGIN, 0)
+        self.page.loop.call_soon_threadsafe(self._schedule, delay)
+
+    def _schedule(self, delay: float):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.session is None:                # se canceló (logout) antes de agendar
+            return
+        self._timer = self.page.loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self.page.run_task(self._background_refresh)
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh_async()
+            logger.info("Token refrescado en segundo plano")
+        except Exception as exc:
+            logger.warning("No se pudo refrescar el token: %s", exc)
+
+    def _persist(self, session: Session):
+        async def save():
+            await self.page.client_storage.set_async("access_token", session.access_token)
+            await self.page.client_storage.set_async("refresh_token", session.refresh_token)
+
+        try:
+            self.page.run_task(save)
+        except Exception as exc:                # la sesión Flet ya se cerró
+            logger.debug("Tokens no guardados: %s", exc)
+
+    def cancel(self):
+        if self._timer is not None:
+            self.page.loop.call_soon_threadsafe(self._timer.cancel)
+            self._timer = None
+        self.session = None
+
+
+def get_token_manager(page: ft.Page) -> TokenManager:
+    manager = page.session.get(MANAGER_KEY)
+    if manager is None:
+        manager = TokenManager(page, get_client(page))
+        page.session.set(MANAGER_KEY, manager)
+    return manager
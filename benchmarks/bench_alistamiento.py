@@ -0,0 +1,54 @@
+# benchmarks/bench_alistamiento.py
+"""
+Planificación de olas sobre líneas sintéticas (sin red).
+
+    python -m benchmarks.bench_alistamiento --lineas 20000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from services.alistamiento import plan_waves
+
+
+def generar_lineas(n: int, skus: int = 3_000, seed: int = 42) -> pd.DataFrame:
+    rnd = np.random.default_rng(seed)
+    # demanda tipo Pareto: pocos SKU concentran la mayoría de las líneas
+    sku_idx = np.minimum(rnd.zipf(1.3, n) - 1, skus - 1)
+    pasillos = np.array([chr(ord("A") + i) for i in range(20)])
+    ubic_sku = np.char.add(
+        np.char.add(pasillos[np.arange(skus) % 20], "-"),
+        np.char.add(np.char.zfill((np.arange(skus) // 20 % 50 + 1).astype(str), 2), "-1"),
+    )
+    ordenes = rnd.integers(0, n // 3, n)
+    return pd.DataFrame({
+        "numero_orden": np.char.add("ORD-", ordenes.astype(str)),
+        "sku": np.char.add("SKU-", sku_idx.astype(str)),
+        "cantidad": rnd.integers(1, 4, n),
+        "ubicacion": ubic_sku[sku_idx],
+    }).drop_duplicates(["numero_orden", "sku"])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lineas", type=int, default=20_000)
+    ap.add_argument("--max-ordenes", type=int, default=40)
+    ap.add_argument("--max-lineas", type=int, default=200)
+    args = ap.parse_args()
+
+    lineas = generar_lineas(args.lineas)
+    t0 = time.perf_counter()
+    plan = plan_waves(lineas, args.max_ordenes, args.max_lineas)
+    seconds = time.perf_counter() - t0
+
+    resumen, picking = plan["resumen"], plan["picking"]
+    print(f"líneas: {len(lineas):,}  órdenes: {lineas['numero_orden'].nunique():,}  "
+          f"olas: {len(resumen):,}  paradas: {len(picking):,}")
+    print(f"tiempo: {seconds:.2f} s  ({len(lineas) / seconds:,.0f} líneas/s)")
+    print(f"líneas por parada (consolidación media): {resumen['consolidacion'].mean():.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/bench_delta.py
+"""
+Re-subida de un exporte de órdenes: re-insert completo vs. carga delta
+(staging columnar + índice de hashes, services/staging.py).
+
+Escenario: se carga un archivo de ``--rows`` filas y luego se sube una
+versión nueva en la que ``--sin-cambios`` de las filas son idénticas; del
+resto, la mitad cambia de cantidad/dirección y la otra mitad son órdenes
+nuevas. Se mide además la re-subida del MISMO archivo (staging reutilizado).
+
+El cliente no toca la red: cuenta filas y requests y suma ``--ms-lote``
+por request para estimar el costo de PostgREST (la latencia medida es
+local: lectura, normalización, hashes e índice).
+
+    python -m benchmarks.bench_delta --rows 200000 --sin-cambios 0.95
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+# config.py exige credenciales aunque el benchmark no toque la red
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark")
+
+from benchmarks.bench_ingesta import MARKETPLACES, SKUS
+from services.ingesta import ingest_file
+from services.staging import HashIndex
+
+ENCABEZADO = ["Order ID", "Canal", "Seller SKU", "Qty", "Vendedor", "Fecha", "Address"]
+
+
+def filas_base(rows: int) -> list[list]:
+    rnd = random.Random(42)
+    return [
+        [
+            f"ORD-{i:08d}", rnd.choice(MARKETPLACES), rnd.choice(SKUS), rnd.randint(1, 5),
+            f"V{rnd.randint(1, 300):03d}", f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2025",
+            f"Calle {rnd.randint(1, 200)} # {rnd.randint(1, 99)}-{rnd.randint(1, 99)}",
+        ]
+        for i in range(rows)
+    ]
+
+
+def version_nueva(base: list[list], sin_cambios: float) -> list[list]:
+    """Copia de ``base`` con (1 - sin_cambios) filas cambiadas o reemplazadas por órdenes nuevas."""
+    rnd = random.Random(7)
+    filas = [list(f) for f in base]
+    tocadas = rnd.sample(range(len(filas)), int(len(filas) * (1 - sin_cambios)))
+    for n, i in enumerate(tocadas):
+        if n % 2:
+            filas[i][3] = filas[i][3] % 5 + 1                 # cambia la cantidad
+            filas[i][6] += " apto 2"
+        else:
+            filas[i][0] = f"ORD-N{i:08d}"                     # orden nueva
+    return filas
+
+
+def escribir(path: Path, filas: list[list]):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(ENCABEZADO)
+        w.writerows(filas)
+
+
+class CountingClient:
+    """Sumidero sin red: cuenta requests y filas enviadas."""
+
+    def __init__(self):
+        self.requests = 0
+        self.filas = 0
+
+    def table(self, _name):
+        return self
+
+    def upsert(self, rows, **_kwargs):
+        self.requests += 1
+        self.filas += len(rows)
+        return self
+
+    def execute(self):
+        return None
+
+
+def cargar(path: Path, index: HashIndex, staging: Path, ms_lote: float) -> dict:
+    client = CountingClient()
+    t0 = time.perf_counter()
+    r = ingest_file(path, client, index=index, staging_dir=staging, contexto={})
+    local = time.perf_counter() - t0
+    assert r["success"], r.get("error")
+    return {
+        **r,
+        "local_s": local,
+        "requests": client.requests,
+        "filas_enviadas": client.filas,
+        "total_s": local + client.requests * ms_lote / 1000,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--sin-cambios", type=float, default=0.95)
+    ap.add_argument("--ms-lote", type=float, default=60.0, help="latencia estimada por upsert de 1000 filas")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        v1, v2 = tmp / "exporte_v1.csv", tmp / "exporte_v2.csv"
+        base = filas_base(args.rows)
+        escribir(v1, base)
+        escribir(v2, version_nueva(base, args.sin_cambios))
+
+        index = HashIndex(tmp / "ingesta.db")
+        primera = cargar(v1, index, tmp / "staging", args.ms_lote)
+
+        # antes: cada re-subida insertaba todo el archivo (sin índice)
+        completo = cargar(v2, HashIndex(tmp / "vacio.db"), tmp / "staging_full", args.ms_lote)
+        delta = cargar(v2, index, tmp / "staging", args.ms_lote)
+        mismo = cargar(v2, index, tmp / "staging", args.ms_lote)
+
+    print(f"{args.rows:,} filas, {args.sin_cambios:.0%} sin cambios, {args.ms_lote:.0f} ms por lote estimados")
+    for nombre, r in (("primera carga", primera), ("re-insert completo", completo),
+                      ("delta (archivo nuevo)", delta), ("delta (mismo archivo)", mismo)):
+        print(f"{nombre:<22} local={r['local_s']:5.2f} s  enviadas={r['filas_enviadas']:>8,}  "
+              f"requests={r['requests']:>4}  total estimado={r['total_s']:6.1f} s  "
+              f"(nuevas {r['nuevas']:,} · cambiadas {r['cambiadas']:,} · sin cambios {r['sin_cambios']:,}"
+              f"{' · staging reutilizado' if r['staging_reutilizado'] else ''})")
+
+
+if __name__ == "__main__":
+    main()
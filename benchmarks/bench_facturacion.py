@@ -0,0 +1,87 @@
+# benchmarks/bench_facturacion.py
+"""
+Facturación masiva con datos sintéticos (sin red): render XML/PDF en el
+pool de procesos + inserts por lotes contra un cliente nulo.
+
+    python -m benchmarks.bench_facturacion --facturas 5000
+    python -m benchmarks.bench_facturacion --facturas 5000 --workers 1   # línea base
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+from services.facturacion import PDF_DISPONIBLE, WORKERS, armar_facturas, emitir_facturas
+
+
+class _NullClient:
+    """Sumidero de inserts: cuenta registros y lotes."""
+
+    def __init__(self):
+        self.registros = 0
+        self.lotes = 0
+
+    def table(self, _name):
+        return self
+
+    def insert(self, rows):
+        self.registros += len(rows)
+        self.lotes += 1
+        return self
+
+    def execute(self):
+        return None
+
+
+def datos_sinteticos(n: int, seed: int = 42) -> dict[tuple, list[dict]]:
+    rnd = random.Random(seed)
+    por_orden = {}
+    for i in range(n):
+        numero, vendedor = f"ORD-{i:08d}", f"V{rnd.randint(1, 300):03d}"
+        por_orden[("mercadolibre", vendedor, numero)] = [
+            {
+                "numero_orden": numero,
+                "sku": f"SKU-{rnd.randint(1, 2000):05d}",
+                "descripcion": f"Producto {rnd.randint(1, 2000)}",
+                "cantidad": rnd.randint(1, 5),
+                "precio": Decimal(f"{rnd.uniform(5_000, 500_000):.2f}"),
+                "codigo_vendedor": vendedor,
+                "marketplace": "mercadolibre",
+                "direccion": f"Calle {rnd.randint(1, 200)} # {rnd.randint(1, 99)}-{rnd.randint(1, 99)}",
+            }
+            for _ in range(rnd.randint(1, 6))
+        ]
+    return por_orden
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--facturas", type=int, default=5_000)
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--chunk-size", type=int, default=100)
+    ap.add_argument("--no-pdf", action="store_true")
+    args = ap.parse_args()
+
+    facturas = armar_facturas(datos_sinteticos(args.facturas), range(1, args.facturas + 1))
+    out_dir = Path(tempfile.mkdtemp(prefix="facturas-"))
+    client = _NullClient()
+    try:
+        r = emitir_facturas(
+            client, facturas, out_dir,
+            workers=args.workers, chunk_size=args.chunk_size, pdf=not args.no_pdf,
+        )
+        archivos = len(os.listdir(out_dir))
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    print(f"facturas: {r['done']:,}  procesos: {args.workers}  "
+          f"pdf: {PDF_DISPONIBLE and not args.no_pdf}  archivos: {archivos:,}")
+    print(f"tiempo: {r['seconds']:.2f} s  ({r['per_s']:,.0f} facturas/s)")
+    print(f"inserts: {client.lotes} lotes / {client.registros:,} registros")
+
+
+if __name__ == "__main__":
+    main()
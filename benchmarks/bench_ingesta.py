@@ -0,0 +1,97 @@
+# benchmarks/bench_ingesta.py
+"""
+Benchmark de ingesta: genera un CSV sintético y lo ingiere por bloques.
+
+Contra un stack local de Supabase (``supabase start``: PostgREST + Postgres):
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_ANON_KEY=... \
+        python -m benchmarks.bench_ingesta --rows 500000
+
+Sólo parseo/normalización (sin red):
+    python -m benchmarks.bench_ingesta --rows 500000 --dry-run
+"""
+import argparse
+import csv
+import os
+import random
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+# config.py exige credenciales aunque --dry-run no toque la red
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark")
+
+from services.ingesta import ingest_file
+from services.staging import HashIndex
+
+SKUS = [f"SKU-{i:05d}" for i in range(2_000)]
+MARKETPLACES = ["mercadolibre", "falabella", "linio", "exito"]
+
+
+def generar_csv(path: Path, rows: int):
+    rnd = random.Random(42)
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        w = csv.writer(fh)
+        w.writerow(["Order ID", "Canal", "Seller SKU", "Qty", "Vendedor", "Fecha", "Address"])
+        for i in range(rows):
+            w.writerow([
+                f"ORD-{i:08d}",
+                rnd.choice(MARKETPLACES),
+                rnd.choice(SKUS),
+                rnd.randint(1, 5),
+                f"V{rnd.randint(1, 300):03d}",
+                f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2025",
+                f"Calle {rnd.randint(1, 200)} # {rnd.randint(1, 99)}-{rnd.randint(1, 99)}",
+            ])
+
+
+class _NullClient:
+    """Sumidero sin red: mide sólo lectura + normalización."""
+
+    def table(self, _name):
+        return self
+
+    def upsert(self, _rows, **_kwargs):
+        return self
+
+    def execute(self):
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=500_000)
+    ap.add_argument("--chunk-size", type=int, default=10_000)
+    ap.add_argument("--batch-size", type=int, default=1_000)
+    ap.add_argument("--dry-run", action="store_true", help="no escribe en la base")
+    args = ap.parse_args()
+
+    if args.dry_run:
+        client = _NullClient()
+    else:
+        from supabase import create_client
+
+        client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_ANON_KEY"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "ordenes.csv"
+        t0 = time.perf_counter()
+        generar_csv(path, args.rows)
+        print(f"CSV sintético: {args.rows:,} filas en {time.perf_counter() - t0:.1f} s "
+              f"({path.stat().st_size / 1e6:.1f} MB)")
+
+        # índice y staging propios: cada corrida es una carga completa
+        result = ingest_file(
+            path, client=client, chunk_size=args.chunk_size, batch_size=args.batch_size,
+            index=HashIndex(Path(tmp) / "ingesta.db"), staging_dir=Path(tmp) / "staging", contexto={},
+        )
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"success={result['success']}  filas={result['done']:,}  rechazadas={result['rejected']:,}")
+    print(f"tiempo={result['seconds']:.1f} s  throughput={result['rows_per_s']:,.0f} filas/s")
+    print(f"RSS pico={peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
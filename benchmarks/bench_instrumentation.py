@@ -0,0 +1,81 @@
+# benchmarks/bench_instrumentation.py
+"""
+Costo de utils/instrumentation: ``span()`` apagado vs. encendido y cambio
+de ruta dentro del shell con ``page.update`` instrumentado, con y sin el
+perfilador por muestreo.
+
+    python -m benchmarks.bench_instrumentation --spans 200000 --rounds 50
+"""
+import argparse
+import statistics
+import time
+import warnings
+
+from benchmarks.flet_harness import make_page
+
+from components.app_shell import build_shell
+from components.routes import menu_rutas
+from utils import instrumentation
+from utils.instrumentation import instrument_page, profiler, span
+
+warnings.filterwarnings("ignore", category=RuntimeWarning)
+
+
+def spans(n: int) -> float:
+    """ns por ``with span(...)`` vacío."""
+    t0 = time.perf_counter_ns()
+    for _ in range(n):
+        with span("bench", ruta="/home"):
+            pass
+    return (time.perf_counter_ns() - t0) / n
+
+
+def route_switch(rounds: int) -> float:
+    page, _ = make_page()
+    instrument_page(page)
+    shell_view, pages, _ = build_shell(page)
+    page.views.append(shell_view)
+    page.update()
+    routes = {r.path: (lambda r=r: r.cargar()(page)) for r in menu_rutas() if r.roles is None}
+    for route, factory in routes.items():         # primera visita (no se mide)
+        pages.show(route, factory)
+
+    latencies = []
+    for _ in range(rounds):
+        for route, factory in routes.items():
+            t0 = time.perf_counter()
+            with span("route_change", ruta=route):
+                pages.show(route, factory)
+            latencies.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(latencies)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--spans", type=int, default=200_000)
+    ap.add_argument("--rounds", type=int, default=50)
+    args = ap.parse_args()
+
+    for enabled in (False, True):
+        instrumentation.ENABLED = enabled
+        instrumentation.reset()
+        print(f"METRICS={int(enabled)}: span={spans(args.spans):6.0f} ns  "
+              f"cambio de ruta p50={route_switch(args.rounds):.3f} ms")
+
+    profiler.start()
+    p50 = route_switch(args.rounds)
+    profiler.stop()
+    print(f"METRICS=1 + perfilador: cambio de ruta p50={p50:.3f} ms  ({profiler.muestras:,} muestras)")
+
+    print()
+    for r in instrumentation.snapshot():
+        if r["operacion"] != "bench":
+            print(f"{r['operacion']:<14} {r['etiquetas']:<24} n={r['llamadas']:<6} "
+                  f"p50={r['p50_ms']:.3f}  p95={r['p95_ms']:.3f}  p99={r['p99_ms']:.3f} ms")
+    print()
+    for r in profiler.report(top=8):
+        print(f"{r['pct_propias']:6.1%} {r['pct_acumuladas']:6.1%}  {r['funcion']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/bench_login.py
+"""
+Latencia de login (p50 / p99) contra un stand-in local de GoTrue + PostgREST
+con latencia simulada por request:
+
+  • anterior : sign_in_with_password + select .single() + upsert (1.ª vez)
+  • rpc      : sign_in_with_password + RPC perfil_usuario
+  • caché    : sign_in_with_password + perfil desde la caché por auth_uid
+
+    python -m benchmarks.bench_login --logins 200
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer
+
+from benchmarks.load_sessions import LATENCY_S, StandInHandler, _sub_from_request, fake_jwt
+
+
+class LoginStandIn(StandInHandler):
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path.startswith("/rest/v1/usuarios"):
+            time.sleep(LATENCY_S)
+            # primera vez: la fila no existe → .single() responde 406
+            self.send_response(406)
+            body = json.dumps({"code": "PGRST116", "message": "0 rows"}).encode()
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        super().do_GET()
+
+    def do_POST(self):
+        time.sleep(LATENCY_S)
+        body = self._body()
+        if self.path.startswith("/auth/v1/token"):
+            uid = str(uuid.uuid5(uuid.NAMESPACE_DNS, body.get("email", "")))
+            self._json({
+                "access_token": fake_jwt(uid),
+                "refresh_token": f"refresh-{uid}",
+                "expires_in": 3600,
+                "expires_at": int(time.time()) + 3600,
+                "token_type": "bearer",
+                "user": {
+                    "id": uid,
+                    "aud": "authenticated",
+                    "role": "authenticated",
+                    "email": body.get("email"),
+                    "app_metadata": {},
+                    "user_metadata": {},
+                    "created_at": "2025-01-01T00:00:00Z",
+                },
+            })
+        elif self.path.startswith("/rest/v1/rpc/perfil_usuario"):
+            uid = _sub_from_request(self)
+            self._json({"auth_uid": uid, "email": "x@y.co", "nombre_usuario": "x",
+                        "codigo_vendedor": "", "rol": "vendedor"})
+        elif self.path.startswith("/rest/v1/usuarios"):
+            self._json([])
+        else:
+            self.send_error(404)
+
+
+def sign_in_anterior(client, email: str, password: str):
+    """Flujo previo: hasta tres round-trips secuenciales."""
+    res = client.auth.sign_in_with_password({"email": email, "password": password})
+    uid = res.user.id
+    try:
+        row = client.table("usuarios").select("*").eq("auth_uid", uid).single().execute().data
+    except Exception:
+        row = None
+    if not row:
+        row = {"auth_uid": uid, "email": email, "nombre_usuario": email.split("@")[0],
+               "codigo_vendedor": "", "rol": "vendedor"}
+        client.table("usuarios").upsert(row, on_conflict="auth_uid").execute()
+    return {"success": True, "user": row, "session": res.session}
+
+
+def medir(fn, logins: int, emails: list[str]) -> list[float]:
+    from config import create_session_client
+
+    latencies = []
+    for i in range(logins):
+        client = create_session_client()
+        t0 = time.perf_counter()
+        result = fn(client, emails[i % len(emails)], "secreto")
+        latencies.append((time.perf_counter() - t0) * 1000)
+        assert result["success"], result
+    return latencies
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--logins", type=int, default=200)
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LoginStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SUPABASE_ANON_KEY"] = fake_jwt("anon")
+
+    from auth.session import invalidate_profile, sign_in
+
+    emails = [f"usuario{i}@colibri.co" for i in range(args.logins)]
+
+    def sign_in_sin_cache(client, email, password):
+        invalidate_profile()
+        return sign_in(client, email, password)
+
+    print(f"latencia stand-in={LATENCY_S * 1000:.0f} ms por request")
+    for nombre, fn in (("anterior", sign_in_anterior), ("rpc", sign_in_sin_cache), ("caché", sign_in)):
+        lat = medir(fn, args.logins, emails if nombre != "caché" else emails[:10])
+        print(f"{nombre:>9}: p50={statistics.median(lat):6.1f} ms  "
+              f"p99={statistics.quantiles(lat, n=100)[-1]:6.1f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
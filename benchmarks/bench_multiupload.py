@@ -0,0 +1,113 @@
+# benchmarks/bench_multiupload.py
+"""
+Carga de N archivos: uno tras otro (``ingest_file``) vs. el planificador
+de services/ingesta_multiple (preparación en procesos + escritores
+acotados). Un archivo con columnas faltantes comprueba que su error no
+detiene a los demás.
+
+El cliente no toca la red: cada upsert duerme ``--ms-lote`` y se registra
+el máximo de requests simultáneas (debe respetar ``ingesta.ESCRITORES``).
+
+    python -m benchmarks.bench_multiupload --files 20 --rows 20000 --ms-lote 40
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# config.py exige credenciales aunque el benchmark no toque la red
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark")
+
+from benchmarks.bench_delta import escribir, filas_base
+from services import ingesta
+from services.ingesta import ingest_file
+from services.ingesta_multiple import ingest_files
+from services.staging import HashIndex
+
+
+class SlowClient:
+    """Sumidero con latencia por request; cuenta requests en vuelo."""
+
+    def __init__(self, ms_lote: float):
+        self.ms_lote = ms_lote
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+        self.filas = 0
+        self._lock = threading.Lock()
+
+    def table(self, _name):
+        return self
+
+    def upsert(self, rows, **_kwargs):
+        return _Request(self, len(rows))
+
+
+class _Request:
+    def __init__(self, client: SlowClient, n: int):
+        self.client, self.n = client, n
+
+    def execute(self):
+        c = self.client
+        with c._lock:
+            c.en_vuelo += 1
+            c.max_en_vuelo = max(c.max_en_vuelo, c.en_vuelo)
+        time.sleep(c.ms_lote / 1000)
+        with c._lock:
+            c.en_vuelo -= 1
+            c.filas += self.n
+
+
+def generar(tmp: Path, files: int, rows: int) -> list[Path]:
+    paths = []
+    for f in range(files):
+        filas = [[f"V{f:02d}-{r[0]}", *r[1:]] for r in filas_base(rows)]
+        paths.append(tmp / f"vendedor_{f:02d}.csv")
+        escribir(paths[-1], filas)
+    roto = tmp / "vendedor_roto.csv"
+    roto.write_text("Canal,Qty\nfalabella,1\n", encoding="utf-8")
+    return paths[: files // 2] + [roto] + paths[files // 2:]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=20)
+    ap.add_argument("--rows", type=int, default=20_000)
+    ap.add_argument("--ms-lote", type=float, default=40.0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        paths = generar(tmp, args.files, args.rows)
+        print(f"{len(paths)} archivos × {args.rows:,} filas (uno inválido), {args.ms_lote:.0f} ms por upsert, "
+              f"tope de escritores={ingesta.ESCRITORES}")
+
+        client = SlowClient(args.ms_lote)
+        index = HashIndex(tmp / "secuencial.db")
+        t0 = time.perf_counter()
+        ok = sum(ingest_file(p, client, index=index, staging_dir=tmp / "st_seq", contexto={})["success"] for p in paths)
+        print(f"secuencial   {time.perf_counter() - t0:6.1f} s  archivos ok={ok}/{len(paths)}  "
+              f"filas={client.filas:,}  máx en vuelo={client.max_en_vuelo}")
+
+        client = SlowClient(args.ms_lote)
+        vistos = set()
+
+        def progreso(r: dict):
+            vistos.update((a["nombre"], a["estado"]) for a in r["archivos"])
+
+        t0 = time.perf_counter()
+        r = ingest_files(paths, client, on_progress=progreso,
+                         index=HashIndex(tmp / "paralelo.db"), staging_dir=tmp / "st_par")
+        ok = sum(a["estado"] == "listo" for a in r["archivos"])
+        errores = [f"{a['nombre']}: {a['error']}" for a in r["archivos"] if a["estado"] == "error"]
+        print(f"planificador {time.perf_counter() - t0:6.1f} s  archivos ok={ok}/{len(paths)}  "
+              f"filas={client.filas:,}  máx en vuelo={client.max_en_vuelo}  "
+              f"estados vistos={len({e for _, e in vistos})}")
+        for e in errores:
+            print(f"  error aislado → {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_resize.py
+"""
+CPU del servidor por "tormenta" de resize (arrastrar el borde de la ventana:
+un evento cada ~16 ms) con los seis módulos montados en el shell.
+
+  • antes: cada evento recalcula offsets/ancho y hace page.update() completo
+  • ahora: Throttler + update dirigido de rounded_container/content_container
+
+    python -m benchmarks.bench_resize --storms 5 --events 60
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.bench_updates import RESIZE_GAP, mount_shell, pump, shell_parts
+from benchmarks.flet_harness import make_page
+
+from components.app_shell import CONTENT_MAX_W, MENU_WIDTH
+from components.page_cache import get_page_cache
+from components.routes import menu_rutas
+
+
+def run(strategy: str, storms: int, events: int) -> dict:
+    page, conn = make_page()
+    parts = shell_parts(mount_shell(page))
+    pages = get_page_cache(page)
+    for ruta in menu_rutas():                         # árbol completo montado
+        pages.show(ruta.path, lambda r=ruta: r.cargar()(page))
+    handler = page.on_resized
+
+    cpu, msgs, nbytes = [], 0, 0
+    for s in range(storms):
+        conn.reset()
+        cpu0 = time.process_time()
+        for i in range(events):
+            page._set_attr("width", 1000 + ((i + s) % 40) * 7, dirty=False)
+            if strategy == "antes":
+                parts["rounded"].width = min(page.width - 40, CONTENT_MAX_W)
+                page.update()
+            else:
+                handler(None)
+            pump(page, RESIZE_GAP)
+        pump(page, 0.3)                               # trailing del throttle
+        cpu.append((time.process_time() - cpu0) * 1000)
+        msgs += conn.messages
+        nbytes += conn.bytes
+
+    return {
+        "cpu_ms_tormenta": statistics.median(cpu),
+        "mensajes_tormenta": msgs / storms,
+        "bytes_tormenta": nbytes / storms,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--storms", type=int, default=5)
+    ap.add_argument("--events", type=int, default=60)
+    args = ap.parse_args()
+    print(f"{args.events} eventos por tormenta, drawer de {MENU_WIDTH}px cerrado")
+    for strategy in ("antes", "ahora"):
+        r = run(strategy, args.storms, args.events)
+        print(f"{strategy:<6} cpu/tormenta={r['cpu_ms_tormenta']:7.1f} ms  "
+              f"mensajes={r['mensajes_tormenta']:5.0f}  bytes={r['bytes_tormenta']:8,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# benchmarks/bench_route_switch.py
+"""
+Latencia de cambio de ruta y bytes enviados por websocket:
+reconstruir el contenido en cada visita vs. PageCache (sólo alterna visibilidad).
+
+    python -m benchmarks.bench_route_switch --rounds 50
+"""
+import argparse
+import statistics
+import time
+import warnings
+
+from benchmarks.flet_harness import make_page
+
+from components.app_shell import build_shell
+from components.routes import menu_rutas
+
+# las cargas en segundo plano (page.run_task) no corren en el harness
+warnings.filterwarnings("ignore", category=RuntimeWarning)
+
+
+def factories(page):
+    return {r.path: (lambda r=r: r.cargar()(page)) for r in menu_rutas()}
+
+
+def run(strategy: str, rounds: int) -> dict:
+    page, conn = make_page()
+    shell_view, pages, _ = build_shell(page)
+    page.views.clear()
+    page.views.append(shell_view)
+    page.update()
+    routes = factories(page)
+
+    def switch(route):
+        if strategy == "rebuild":                 # comportamiento anterior
+            pages.host.controls = [routes[route]()]
+            page.update()
+        else:
+            pages.show(route, routes[route])
+
+    for route in routes:                          # primera visita (no se mide)
+        switch(route)
+
+    conn.reset()
+    latencies = []
+    for _ in range(rounds):
+        for route in routes:
+            t0 = time.perf_counter()
+            switch(route)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    n = len(latencies)
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1],
+        "msgs_per_switch": conn.messages / n,
+        "bytes_per_switch": conn.bytes / n,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=50)
+    args = ap.parse_args()
+    for strategy in ("rebuild", "cache"):
+        r = run(strategy, args.rounds)
+        print(f"{strategy:>8}: p50={r['p50_ms']:.2f} ms  p95={r['p95_ms']:.2f} ms  "
+              f"mensajes/cambio={r['msgs_per_switch']:.1f}  bytes/cambio={r['bytes_per_switch']:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_scan.py
+"""
+Latencia escaneo → confirmación en la estación de serialización
+(validación en memoria + almacén SQLite local + actualización de controles),
+con el envío a Supabase simulado en segundo plano.
+
+    python -m benchmarks.bench_scan --seriales 5000 --scans 2000
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.flet_harness import make_page
+
+import pages.serializacion_page as sp
+import services.serializacion as ser
+from services.local_store import LocalStore
+
+
+class _NullTable:
+    def __init__(self, sent: list):
+        self.sent = sent
+
+    def upsert(self, payload, **_):
+        self.sent.extend(payload)
+        return self
+
+    def execute(self):
+        time.sleep(0.05)                      # round-trip simulado
+        return self
+
+
+class _NullClient:
+    def __init__(self):
+        self.sent = []
+
+    def table(self, _):
+        return _NullTable(self.sent)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seriales", type=int, default=5000)
+    ap.add_argument("--scans", type=int, default=2000)
+    args = ap.parse_args()
+
+    esperados = {f"SN{i:08d}": f"SKU-{i % 50}" for i in range(args.seriales)}
+    client = _NullClient()
+    cola = LocalStore(Path(tempfile.mkdtemp()) / "estacion.db")
+
+    sp.get_local_store = lambda: cola
+    sp.get_client = lambda page: client
+    sp.cargar_orden = lambda client, numero, store: ser.OrdenSeriales(numero, dict(esperados))
+
+    page, conn = make_page()
+    page.session.set("user_data", {"auth_uid": "bench", "nombre_usuario": "bench"})
+    content = sp.serializacion_content(page)
+    page.add(content)
+    orden_field, scan_field = content.controls[1].controls[0], content.controls[2]
+
+    orden_field.value = "ORD-1"
+    page.loop.run_until_complete(orden_field.on_submit(None))
+
+    conn.reset()
+    seriales = list(esperados)[: args.scans]
+    latencies = []
+    for serial in seriales:
+        scan_field.value = serial
+        t0 = time.perf_counter()
+        scan_field.on_submit(None)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    deadline = time.time() + 30
+    while cola.pendientes() and time.time() < deadline:
+        time.sleep(0.1)
+
+    print(f"escaneos: {len(latencies):,}")
+    print(f"p50={statistics.median(latencies):.2f} ms  "
+          f"p99={statistics.quantiles(latencies, n=100)[-1]:.2f} ms  max={max(latencies):.2f} ms")
+    print(f"bytes/escaneo={conn.bytes / len(latencies):,.0f}  mensajes/escaneo={conn.messages / len(latencies):.1f}")
+    print(f"enviados a la base: {len(client.sent):,}  pendientes en cola: {cola.pendientes():,}")
+
+
+if __name__ == "__main__":
+    main()
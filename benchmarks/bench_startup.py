@@ -0,0 +1,67 @@
+# benchmarks/bench_startup.py
+"""
+Tiempo de arranque en frío y memoria del proceso al importar ``main``:
+import perezoso de páginas (components/routes.py) vs. importarlas todas
+al inicio (equivalente al main.py anterior). Cada medición corre en un
+proceso nuevo con ``python -X importtime``.
+
+    python -m benchmarks.bench_startup --runs 5 --top 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CODIGO = {
+    "perezoso": "import main",
+    "todo": "import main\nfrom components.routes import RUTAS\nfor r in RUTAS: r.cargar()",
+}
+RSS = "\nimport resource; print('RSS_KB', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+
+def medir(codigo: str) -> tuple[float, int, list[tuple[int, str]]]:
+    """(ms de import de main, RSS máximo en KB, [(µs acumulados, módulo)] de primer nivel)."""
+    env = {
+        **os.environ,
+        "SUPABASE_URL": os.getenv("SUPABASE_URL", "http://127.0.0.1:54321"),
+        "SUPABASE_ANON_KEY": os.getenv("SUPABASE_ANON_KEY", "benchmark"),
+    }
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo + RSS],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    total_us, modulos = 0, []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):              # sólo imports de primer nivel
+            total_us += int(cumulative)
+            modulos.append((int(cumulative), name.strip()))
+    rss = int(next(l.split()[1] for l in proc.stdout.splitlines() if l.startswith("RSS_KB")))
+    return total_us / 1000, rss, sorted(modulos, reverse=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=8)
+    args = ap.parse_args()
+
+    for nombre, codigo in CODIGO.items():
+        tiempos, rss, modulos = [], [], []
+        for _ in range(args.runs):
+            t, r, modulos = medir(codigo)
+            tiempos.append(t)
+            rss.append(r)
+        print(f"{nombre:<9} import={statistics.median(tiempos):7.0f} ms  RSS={statistics.median(rss) / 1024:6.0f} MB")
+        for us, mod in modulos[:args.top]:
+            print(f"    {us / 1000:8.1f} ms  {mod}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# benchmarks/bench_updates.py
+"""
+Mensajes, bytes por websocket y CPU del servidor en las interacciones más frecuentes:
+``page.update()`` completo en cada evento (antes) vs. actualizaciones
+dirigidas + debounce/throttle (utils/updates.py).
+
+  • resize: ráfaga de eventos cada ~16 ms (arrastrar el borde de la ventana)
+  • tecleo: escribir en los cinco campos del registro, ~12 teclas/s
+  • drawer: abrir y cerrar el menú
+  • snackbar: avisos consecutivos
+
+    python -m benchmarks.bench_updates --events 120
+"""
+import argparse
+import asyncio
+import logging
+import time
+import warnings
+
+from benchmarks.flet_harness import make_page
+
+import flet as ft
+
+from auth.register_page import register_page
+from components.app_shell import CONTENT_MAX_W, MENU_WIDTH, build_shell
+from pages.home_page import home_content
+from pages.tickets_page import tickets_content
+from utils.alerts import show_snackbar
+
+warnings.filterwarnings("ignore", category=RuntimeWarning)
+logging.disable(logging.WARNING)              # sin red: las cargas de datos fallan
+
+RESIZE_GAP = 0.016
+KEY_GAP    = 0.08
+
+
+def pump(page: ft.Page, seconds: float):
+    """Deja correr los timers del event loop (debounce/throttle) y el executor."""
+    page.loop.run_until_complete(asyncio.sleep(seconds))
+
+
+def find(root: ft.Control, predicate):
+    stack = [root]
+    while stack:
+        c = stack.pop()
+        if predicate(c):
+            return c
+        stack.extend(c._get_children())
+    return None
+
+
+def result(events: int, conn, cpu0: float) -> dict:
+    return {
+        "eventos": events,
+        "mensajes": conn.messages,
+        "bytes": conn.bytes,
+        "cpu_ms": (time.process_time() - cpu0) * 1000,
+    }
+
+
+# ── Escenarios -----------------------------------------------------------------
+def mount_shell(page: ft.Page):
+    shell_view, pages, _ = build_shell(page)
+    page.views.clear()
+    page.views.append(shell_view)
+    page.update()
+    pages.show("/home", lambda: home_content(page))
+    pages.show("/tickets", lambda: tickets_content(page))
+    return shell_view
+
+
+def shell_parts(view: ft.View) -> dict:
+    """Contenedores del shell que cambian con el drawer y el resize."""
+    rounded = find(view, lambda c: isinstance(c, ft.Container) and c.border_radius == 20)
+    return {
+        "menu": find(view, lambda c: isinstance(c, ft.Container) and c.width == MENU_WIDTH),
+        "content": find(view, lambda c: isinstance(c, ft.Container) and c.content is rounded),
+        "rounded": rounded,
+        "backdrop": find(view, lambda c: isinstance(c, ft.Container) and c.on_click is not None),
+        "boton": find(view, lambda c: isinstance(c, ft.IconButton) and c.icon == ft.Icons.MENU),
+    }
+
+
+def resize(strategy: str, events: int) -> dict:
+    page, conn = make_page()
+    parts = shell_parts(mount_shell(page))
+    handler = page.on_resized
+    conn.reset()
+    cpu0 = time.process_time()
+    for i in range(events):
+        page._set_attr("width", 900 + i * 3, dirty=False)
+        if strategy == "antes":
+            # on_resize anterior: recalcula y envía la página completa
+            parts["rounded"].width = min(page.width - 40, CONTENT_MAX_W)
+            page.update()
+        else:
+            handler(None)
+        pump(page, RESIZE_GAP)
+    pump(page, 0.3)
+    return result(events, conn, cpu0)
+
+
+def typing(strategy: str, events: int) -> dict:
+    page, conn = make_page()
+    view = register_page(page)
+    page.views.clear()
+    page.views.append(view)
+    page.update()
+    fields = [c for c in view.controls[0].content.content.controls if isinstance(c, ft.TextField)]
+    conn.reset()
+    cpu0 = time.process_time()
+    for i in range(events):
+        field = fields[i * len(fields) // events]
+        field.value = (field.value or "") + "x"
+        if strategy == "antes":
+            page.update()                     # validate_ui anterior en cada tecla
+        else:
+            page.loop.run_until_complete(field.on_change(None))
+        pump(page, KEY_GAP)
+    pump(page, 0.5)
+    return result(events, conn, cpu0)
+
+
+def drawer(strategy: str, events: int) -> dict:
+    page, conn = make_page()
+    parts = shell_parts(mount_shell(page))
+    conn.reset()
+    cpu0 = time.process_time()
+    for _ in range(events):
+        if strategy == "antes":
+            # toggle_menu anterior: mismos cambios y page.update() completo
+            abierto = not parts["backdrop"].visible
+            parts["menu"].offset = ft.Offset(0, 0) if abierto else ft.Offset(-1, 0)
+            parts["content"].offset = ft.Offset(MENU_WIDTH / page.width, 0) if abierto else ft.Offset(0, 0)
+            parts["backdrop"].visible = abierto
+            parts["backdrop"].opacity = 0.35 if abierto else 0
+            page.update()
+        else:
+            parts["boton"].on_click(None)
+    return result(events, conn, cpu0)
+
+
+def snackbar(strategy: str, events: int) -> dict:
+    page, conn = make_page()
+    mount_shell(page)
+    show_snackbar(page, "primero", "info")
+    conn.reset()
+    cpu0 = time.process_time()
+    for i in range(events):
+        if strategy == "antes":
+            sb = ft.SnackBar(content=ft.Text(f"aviso {i}"), bgcolor=ft.Colors.WHITE, duration=3000)
+            if page.overlay and isinstance(page.overlay[-1], ft.SnackBar):
+                page.overlay.pop()
+            page.overlay.append(sb)
+            sb.open = True
+            page.update()
+        else:
+            show_snackbar(page, f"aviso {i}", "info")
+    return result(events, conn, cpu0)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=120)
+    args = ap.parse_args()
+    escenarios = {"resize": resize, "tecleo": typing, "drawer": drawer, "snackbar": snackbar}
+    print(f"{'escenario':<10} {'estrategia':<10} {'eventos':>7} {'mensajes':>9} {'bytes':>10} {'bytes/evento':>13} {'cpu ms':>8}")
+    for nombre, fn in escenarios.items():
+        for strategy in ("antes", "ahora"):
+            r = fn(strategy, args.events if nombre != "drawer" else 20)
+            print(f"{nombre:<10} {strategy:<10} {r['eventos']:>7} {r['mensajes']:>9} "
+                  f"{r['bytes']:>10,} {r['bytes'] / r['eventos']:>13,.0f} {r['cpu_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
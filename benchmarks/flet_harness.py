@@ -0,0 +1,64 @@
+# benchmarks/flet_harness.py
+"""
+Página Flet sin navegador para benchmarks: la conexión serializa cada
+mensaje igual que el servidor websocket y cuenta mensajes y bytes.
+"""
+import asyncio
+import json
+import os
+
+# config.py exige credenciales aunque los benchmarks no toquen la red
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "benchmark")
+
+import flet as ft
+from flet.core.local_connection import LocalConnection
+from flet.core.protocol import (
+    ClientActions,
+    ClientMessage,
+    CommandEncoder,
+    PageCommandResponsePayload,
+    PageCommandsBatchResponsePayload,
+)
+
+
+class RecordingConnection(LocalConnection):
+    def __init__(self):
+        super().__init__()
+        self.messages = 0
+        self.bytes = 0
+
+    def reset(self):
+        self.messages = 0
+        self.bytes = 0
+
+    def _record(self, message: ClientMessage):
+        payload = json.dumps(message, cls=CommandEncoder, separators=(",", ":"))
+        self.messages += 1
+        self.bytes += len(payload.encode())
+
+    def send_command(self, session_id, command):
+        result, message = self._process_command(command)
+        if message:
+            self._record(message)
+        return PageCommandResponsePayload(result=result, error="")
+
+    def send_commands(self, session_id, commands):
+        results, messages = [], []
+        for command in commands:
+            result, message = self._process_command(command)
+            if command.name in ("add", "get"):
+                results.append(result)
+            if message:
+                messages.append(message)
+        if messages:
+            self._record(ClientMessage(ClientActions.PAGE_CONTROLS_BATCH, messages))
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+
+def make_page(width: int = 1280, height: int = 800) -> tuple[ft.Page, RecordingConnection]:
+    conn = RecordingConnection()
+    page = ft.Page(conn, "benchmark", loop=asyncio.new_event_loop())
+    page._set_attr("width", width, dirty=False)
+    page._set_attr("height", height, dirty=False)
+    return page, conn
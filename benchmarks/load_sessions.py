@@ -0,0 +1,134 @@
+# benchmarks/load_sessions.py
+"""
+Prueba de carga: N sesiones concurrentes, cada una con su propio cliente
+Supabase (config.create_session_client) sobre el pool HTTP compartido.
+
+Levanta un stand-in local de GoTrue + PostgREST que responde con el ``sub``
+del JWT recibido, así se detecta cualquier mezcla de tokens entre sesiones.
+
+    python -m benchmarks.load_sessions --sessions 200 --requests 20
+
+Con ``--shared`` todas las sesiones usan un único cliente (comportamiento
+anterior con el singleton global) para comparar.
+"""
+import argparse
+import base64
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_S = 0.02            # latencia simulada por request del stand-in
+
+
+# ────────────────────────────────────────────────────────────────
+# STAND-IN LOCAL (GoTrue /user + PostgREST /usuarios)
+# ────────────────────────────────────────────────────────────────
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def fake_jwt(sub: str, ttl: int = 3600) -> str:
+    header = _b64(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    payload = _b64(json.dumps({"sub": sub, "exp": int(time.time()) + ttl}).encode())
+    return f"{header}.{payload}.{_b64(b'sin-firma')}"
+
+
+def _sub_from_request(handler: BaseHTTPRequestHandler) -> str:
+    token = handler.headers.get("Authorization", "").removeprefix("Bearer ")
+    payload = token.split(".")[1] if token.count(".") == 2 else ""
+    try:
+        return json.loads(base64.urlsafe_b64decode(payload + "==")).get("sub", "anon")
+    except ValueError:
+        return "anon"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"           # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        time.sleep(LATENCY_S)
+        sub = _sub_from_request(self)
+        if self.path.startswith("/auth/v1/user"):
+            self._json({
+                "id": sub,
+                "aud": "authenticated",
+                "role": "authenticated",
+                "app_metadata": {},
+                "user_metadata": {},
+                "created_at": "2025-01-01T00:00:00Z",
+            })
+        elif self.path.startswith("/rest/v1/usuarios"):
+            self._json([{"auth_uid": sub}])
+        else:
+            self.send_error(404)
+
+
+# ────────────────────────────────────────────────────────────────
+# CARGA
+# ────────────────────────────────────────────────────────────────
+def run_level(n_sessions: int, n_requests: int, shared: bool) -> dict:
+    from config import create_session_client
+
+    shared_client = create_session_client() if shared else None
+    crosstalk = 0
+    lock = threading.Lock()
+
+    def session(i: int):
+        nonlocal crosstalk
+        uid = f"user-{i:04d}"
+        client = shared_client or create_session_client()
+        client.auth.set_session(fake_jwt(uid), f"refresh-{i}")
+        mismatches = 0
+        for _ in range(n_requests):
+            row = client.table("usuarios").select("auth_uid").execute().data[0]
+            mismatches += row["auth_uid"] != uid
+        with lock:
+            crosstalk += mismatches
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_sessions) as pool:
+        list(pool.map(session, range(n_sessions)))
+    elapsed = time.perf_counter() - t0
+    total = n_sessions * n_requests
+    return {"sessions": n_sessions, "requests": total, "seconds": elapsed,
+            "rps": total / elapsed, "crosstalk": crosstalk}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--requests", type=int, default=20, help="requests por sesión")
+    ap.add_argument("--shared", action="store_true", help="un solo cliente para todas")
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SUPABASE_ANON_KEY"] = fake_jwt("anon")
+
+    levels = sorted({lvl for lvl in (1, 10, 50, args.sessions) if lvl <= args.sessions})
+    print(f"modo={'compartido' if args.shared else 'por sesión'}  latencia stand-in={LATENCY_S * 1000:.0f} ms")
+    for n in levels:
+        r = run_level(n, args.requests, args.shared)
+        print(f"sesiones={r['sessions']:>4}  requests={r['requests']:>6}  "
+              f"{r['rps']:>8,.0f} req/s  cruces de token={r['crosstalk']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# benchmarks/load_workers.py
+"""
+Prueba de carga de asgi.py con 1, 2, 4… workers: throughput de interacciones
+con la app real (uvicorn + flet.fastapi) y clientes websocket que hablan el
+protocolo del cliente web de Flet.
+
+Cada cliente registra su sesión (``registerWebClient``), responde las
+``invokeMethod`` (client_storage) y alterna entre "/" y "/register": cada
+cambio de ruta construye una vista completa en el servidor y espera el
+lote de controles de respuesta. Es trabajo de CPU en Python, lo que un solo
+proceso no puede repartir entre núcleos por el GIL.
+
+    python -m benchmarks.load_workers --workers 1 2 4 --clients 48 --rounds 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import websockets
+
+ROOT = Path(__file__).resolve().parent.parent
+RUTAS = ("/register", "/")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SUPABASE_URL": os.getenv("SUPABASE_URL", "http://127.0.0.1:9"),     # sin red: no se usa
+        "SUPABASE_ANON_KEY": os.getenv("SUPABASE_ANON_KEY", "benchmark"),
+        "FLET_SECRET_KEY": "benchmark",
+        "SHARED_CACHE": "1",
+        "SHARED_STORE": str(ROOT / "data" / "bench_shared.db"),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "asgi:app", "--workers", str(workers),
+         "--port", str(port), "--log-level", "error"],
+        cwd=ROOT, env=env,
+    )
+
+
+async def wait_ready(port: int, timeout: float = 60):
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < timeout:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError("el servidor no arrancó")
+
+
+# ── Cliente web simulado ----------------------------------------------------------
+def _msg(action: str, payload: dict) -> str:
+    return json.dumps({"action": action, "payload": payload})
+
+
+def _event(target: str, name: str, data: str) -> str:
+    return _msg("pageEventFromWeb", {"eventTarget": target, "eventName": name, "eventData": data})
+
+
+class FakeWebClient:
+    def __init__(self, ws):
+        self.ws = ws
+
+    async def register(self):
+        await self.ws.send(_msg("registerWebClient", {
+            "pageName": "", "pageRoute": "/", "pageWidth": "1280", "pageHeight": "800",
+            "windowWidth": "1280", "windowHeight": "800", "windowTop": "0", "windowLeft": "0",
+            "isPWA": "false", "isWeb": "true", "isDebug": "false", "platform": "linux",
+            "platformBrightness": "light", "media": "{}", "sessionId": "",
+        }))
+        await self.until(lambda m: m["action"] == "registerWebClient")
+        await self.until(lambda m: m["action"] in ("pageControlsBatch", "addPageControls"))
+
+    async def until(self, predicate):
+        """Lee mensajes (respondiendo invokeMethod) hasta que uno cumple ``predicate``."""
+        while True:
+            m = json.loads(await self.ws.recv())
+            if m["action"] == "invokeMethod":
+                await self.ws.send(_event("page", "invoke_method_result", json.dumps(
+                    {"method_id": m["payload"]["methodId"], "result": "null", "error": None})))
+            if predicate(m):
+                return m
+
+    async def navigate(self, route: str):
+        await self.ws.send(_event("page", "route_change", route))
+        await self.until(lambda m: m["action"] == "pageControlsBatch")
+
+
+async def client(port: int, rounds: int, latencies: list):
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws", max_size=None) as ws:
+        c = FakeWebClient(ws)
+        await c.register()
+        for i in range(rounds):
+            t0 = time.perf_counter()
+            await c.navigate(RUTAS[i % len(RUTAS)])
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+
+async def run(workers: int, clients: int, rounds: int) -> dict:
+    port = _free_port()
+    server = start_server(workers, port)
+    try:
+        await wait_ready(port)
+        await asyncio.gather(*(client(port, 2, []) for _ in range(workers * 2)))   # calentamiento
+        latencies: list[float] = []
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client(port, rounds, latencies) for _ in range(clients)))
+        elapsed = time.perf_counter() - t0
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {
+        "interacciones_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": statistics.quantiles(latencies, n=20)[-1],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--clients", type=int, default=48)
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+    print(f"{os.cpu_count()} CPU · {args.clients} clientes × {args.rounds} cambios de ruta")
+    base = None
+    for w in args.workers:
+        r = asyncio.run(run(w, args.clients, args.rounds))
+        base = base or r["interacciones_s"]
+        print(f"workers={w:<2}  {r['interacciones_s']:7.1f} interacciones/s  (x{r['interacciones_s'] / base:.2f})  "
+              f"p50={r['p50_ms']:6.1f} ms  p95={r['p95_ms']:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,30 @@
 # components/app_shell.py
+import asyncio
 import logging
 import flet as ft
-from utils.alerts import show_snackbar
-from config import supabase
+from auth.tokens import cerrar_sesion, get_token_manager
+from components.page_cache import CACHE_KEY, PageCache
+from components.routes import menu_rutas
+from services.async_repo import run_blocking
+from services.local_store import soltar_sesion
+from config import get_client
+from utils.updates import Throttler, mark_dirty
 
 logger = logging.getLogger(__name__)
 
 MENU_WIDTH    = 240
 CONTENT_MAX_W = 1400            # ancho máximo del panel central
+RESIZE_EVERY  = 0.1             # s entre relayouts durante un resize continuo
 
 
 def build_shell(page: ft.Page):
     """
-    Crea la vista “shell” (header + drawer + footer) una sola vez y
+    Crea la vista “shell” (header + drawer + footer) una sola vez por sesión
+    (es el único shell de la app; el drawer sale de components/routes.py) y
     devuelve tres objetos:
       1. shell_view  – View completa
-      2. switcher    – AnimatedSwitcher para inyectar cada página interna
-      3. user_label  – Text que muestra el nombre del usuario (para actualizarlo)
+      2. pages       – PageCache que monta y alterna cada página interna
+      3. refresh_user – actualiza nombre y entradas del drawer según el rol
     """
     # ── Estado interno ---------------------------------------------------
     menu_open = {"value": False}
@@ -41,14 +49,27 @@ def build_shell(page: ft.Page):
     # --------------------------------------------------------------------
     # Logout
     # --------------------------------------------------------------------
-    def logout():
+    async def logout(_=None):
         logger.info("Cerrando sesión")
-        page.client_storage.clear()
-        page.session.clear()
+        get_token_manager(page).cancel()
+        uid = (page.session.get("user_data") or {}).get("auth_uid")
         try:
-            supabase.auth.sign_out()
-        except Exception as exc:
-            logger.warning(f"sign_out: {exc}")
+            # lo encolado en la estación se envía mientras el token sigue vigente
+            await run_blocking(page, soltar_sesion, uid)
+            # con trabajos en curso la revocación en Auth la hace el último (auth.tokens)
+            await run_blocking(page, cerrar_sesion, get_client(page))
+        except asyncio.CancelledError:
+            pass
+        await page.client_storage.clear_async()
+        pages.invalidate()              # nada del usuario anterior queda montado
+        # los controles del overlay (el FilePicker de carga) siguen montados:
+        # se conservan sus claves para no agregar uno nuevo en cada login
+        valores = {k: page.session.get(k) for k in page.session.get_keys()}
+        overlay = {k: v for k, v in valores.items() if any(v is c for c in page.overlay)}
+        page.session.clear()            # descarta también el cliente de la sesión
+        page.session.set(CACHE_KEY, pages)
+        for k, v in overlay.items():
+            page.session.set(k, v)
         page.go("/")
 
     # --------------------------------------------------------------------
@@ -59,26 +80,31 @@ def build_shell(page: ft.Page):
         update_offsets()
         backdrop.visible = menu_open["value"]
         backdrop.opacity = 0.35 if menu_open["value"] else 0
-        page.update()
+        # sólo los tres contenedores que cambian, en un mensaje
+        mark_dirty(menu_container, content_container, backdrop)
 
     # --------------------------------------------------------------------
     # Navegación desde el drawer
     # --------------------------------------------------------------------
-    def navigate_to(route: str, msg: str):
-        logger.info(f"Navegando a {route}")
+    def navigate_to(route: str):
+        logger.info("Navegando a %s", route)
         toggle_menu()
-        show_snackbar(page, msg, "info")
-        page.go(route)              # main.route_change reemplazará contenido
+        page.go(route)              # main.route_change alterna el contenido cacheado
 
     # --------------------------------------------------------------------
     # Listener de redimensionamiento
     # --------------------------------------------------------------------
-    def on_resize(_):
+    def relayout():
         update_offsets()
         update_width()
-        page.update()
+        # content_container contiene a rounded_container: con el drawer cerrado
+        # su offset no cambia y basta con enviar el panel interior
+        mark_dirty(content_container if menu_open["value"] else rounded_container)
 
-    page.on_resize = on_resize
+    # Arrastrar el borde de la ventana dispara decenas de eventos por segundo:
+    # se recalcula como máximo cada RESIZE_EVERY s y siempre con el tamaño final
+    resize_throttle = Throttler(page, RESIZE_EVERY, relayout)
+    page.on_resized = lambda _: resize_throttle()
 
     # --------------------------------------------------------------------
     # HEADER
@@ -104,8 +130,20 @@ def build_shell(page: ft.Page):
     )
 
     # --------------------------------------------------------------------
-    # DRAWER
+    # DRAWER (una entrada por módulo del registro de rutas)
     # --------------------------------------------------------------------
+    # (ocultas hasta saber el rol del usuario: ver refresh_user)
+    menu_items = {
+        ruta: ft.ListTile(
+            leading=ft.Icon(ruta.icono, color=ft.Colors.BLUE_GREY_700),
+            title=ft.Text(ruta.titulo),
+            hover_color=ft.Colors.BLUE_GREY_100,
+            visible=False,
+            on_click=lambda _, path=ruta.path: navigate_to(path),
+        )
+        for ruta in menu_rutas()
+    }
+
     menu_container = ft.Container(
         width=MENU_WIDTH,
         bgcolor=ft.Colors.SURFACE,
@@ -114,58 +152,21 @@ def build_shell(page: ft.Page):
         animate_offset=ft.Animation(300, "easeInOut"),
         clip_behavior=ft.ClipBehavior.HARD_EDGE,
         content=ft.Column(
-    expand=True,
-    controls=[
-        ft.Text("Menú", size=18, weight=ft.FontWeight.BOLD),
-        ft.Divider(),
-        ft.ListTile(
-            leading=ft.Icon(ft.Icons.HOME, color=ft.Colors.BLUE_GREY_700),
-            title=ft.Text("Resumen"),
-            hover_color=ft.Colors.BLUE_GREY_100,
-            on_click=lambda _: navigate_to("/home", "🔄 Cargando resumen..."),
-        ),
-        ft.ListTile(
-            leading=ft.Icon(ft.Icons.CLOUD_UPLOAD, color=ft.Colors.BLUE_GREY_700),
-            title=ft.Text("Cargar Órdenes"),
-            hover_color=ft.Colors.BLUE_GREY_100,
-            on_click=lambda _: navigate_to("/upload", "🔄 Cargando módulo de carga..."),
-        ),
-        # ─────────── Botones nuevos ──────────────────────────────────
-        ft.ListTile(  # 🆕
-            leading=ft.Icon(ft.Icons.RECEIPT, color=ft.Colors.BLUE_GREY_700),
-            title=ft.Text("Tickets"),
-            hover_color=ft.Colors.BLUE_GREY_100,
-            on_click=lambda _: navigate_to("/tickets", "🔄 Cargando tickets..."),
-        ),
-        ft.ListTile(  # 🆕
-            leading=ft.Icon(ft.Icons.MOVING, color=ft.Colors.BLUE_GREY_700),
-            title=ft.Text("Alistamiento"),
-            hover_color=ft.Colors.BLUE_GREY_100,
-            on_click=lambda _: navigate_to("/alistamiento", "🔄 Cargando alistamiento..."),
-        ),
-        ft.ListTile(  # 🆕
-            leading=ft.Icon(ft.Icons.INVENTORY, color=ft.Colors.BLUE_GREY_700),
-            title=ft.Text("Serialización"),
-            hover_color=ft.Colors.BLUE_GREY_100,
-            on_click=lambda _: navigate_to("/serializacion", "🔄 Cargando serialización..."),
-        ),
-        ft.ListTile(  # 🆕
-            leading=ft.Icon(ft.Icons.REQUEST_PAGE, color=ft.Colors.BLUE_GREY_700),
-            title=ft.Text("Facturas"),
-            hover_color=ft.Colors.BLUE_GREY_100,
-            on_click=lambda _: navigate_to("/facturas", "🔄 Cargando facturación..."),
-        ),
-        # ─────────── Fin botones nuevos ──────────────────────────────
-        ft.Container(expand=True),
-        ft.ElevatedButton(
-            icon=ft.Icon(ft.Icons.LOGOUT_OUTLINED, color=ft.Colors.RED),
-            text="Cerrar sesión",
+            expand=True,
+            controls=[
+                ft.Text("Menú", size=18, weight=ft.FontWeight.BOLD),
+                ft.Divider(),
+                *menu_items.values(),
+                ft.Container(expand=True),
+                ft.ElevatedButton(
+                    icon=ft.Icon(ft.Icons.LOGOUT_OUTLINED, color=ft.Colors.RED),
+                    text="Cerrar sesión",
                     style=ft.ButtonStyle(
                         bgcolor=ft.Colors.TRANSPARENT,
                         elevation=0,
                         overlay_color=ft.Colors.RED_50,
                     ),
-                    on_click=lambda _: logout(),
+                    on_click=logout,
                 ),
             ],
         ),
@@ -184,20 +185,18 @@ def build_shell(page: ft.Page):
     )
 
     # --------------------------------------------------------------------
-    # AnimatedSwitcher – panel central que cambiará entre páginas
+    # Panel central: cada página queda montada y se alterna su visibilidad
     # --------------------------------------------------------------------
-    switcher = ft.AnimatedSwitcher(
-        ft.Container(),                           # empieza vacío
-        transition=ft.AnimatedSwitcherTransition.FADE,  # FADE | SLIDE | SCALE
-        duration=300,
-    )
+    content_host = ft.Column(spacing=0)
+    pages = PageCache(content_host)
+    page.session.set(CACHE_KEY, pages)
 
     rounded_container = ft.Container(
         width=min(page.width - 40, CONTENT_MAX_W),
         bgcolor=ft.Colors.WHITE,
         border_radius=20,
         padding=25,
-        content=switcher,
+        content=content_host,
     )
 
     content_container = ft.Container(
@@ -232,7 +231,22 @@ def build_shell(page: ft.Page):
         controls=[ft.Column(spacing=0, expand=True, controls=[header, body_stack, footer])],
     )
 
+    # --------------------------------------------------------------------
+    # Usuario actual: nombre en el header y entradas permitidas por su rol
+    # --------------------------------------------------------------------
+    def refresh_user():
+        user = page.session.get("user_data") or {}
+        label = f"👤 {user.get('nombre_usuario', 'Invitado')}"
+        if user_label.value != label:
+            user_label.value = label
+            mark_dirty(user_label)
+        for ruta, tile in menu_items.items():
+            visible = ruta.permitida(user)
+            if tile.visible != visible:
+                tile.visible = visible
+                mark_dirty(tile)
+
     # ────────────────────────────────────────────────────────────────────
     # Devuelve la View + referencias
     # ────────────────────────────────────────────────────────────────────
-    return shell_view, switcher, user_label
+    return shell_view, pages, refresh_user
@@ -0,0 +1,203 @@
+# components/page_cache.py
+"""
+Caché por sesión de los contenidos de cada módulo dentro del shell.
+
+Cada contenido se construye una sola vez y queda montado en ``host``
+envuelto en un contenedor; cambiar de panel sólo alterna ``visible`` de dos
+contenedores (dos propiedades por websocket) en lugar de reconstruir y
+reenviar todo el árbol. El estado de los controles (filtros, valores,
+posición de la grilla) se conserva porque son los mismos objetos.
+
+  • Invalidación por datos: cuando un servicio avisa que cambió una tabla
+    (services/cambios.py) se descartan las rutas que la muestran según
+    ``Ruta.datos``; también a mano con ``invalidate(route)``. Si la ruta
+    invalidada es la que está en pantalla se reconstruye en el acto.
+  • Expulsión LRU con tope de controles montados; el tope de entradas por
+    defecto es el número de módulos del shell (components/routes.py), así
+    que por cantidad no se expulsa ninguno (p. ej. una carga en curso).
+  • Posición de scroll: se registra con ``on_scroll`` y se restaura al volver.
+  • Hook opcional: si ``content.data`` es un dict con ``"on_show"``, se llama
+    cada vez que el panel vuelve a mostrarse desde la caché.
+"""
+import logging
+import weakref
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import flet as ft
+
+from components.routes import POR_PATH, RUTAS
+from services import cambios
+from utils.instrumentation import span
+from utils.updates import after_flush, mark_dirty
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES  = sum(not r.vista for r in RUTAS)      # un contenido por módulo del shell
+MAX_CONTROLS = 20_000           # tope aproximado de controles montados
+CACHE_KEY    = "page_cache"
+
+
+def count_controls(control: ft.Control) -> int:
+    """Tamaño del subárbol (aproximación del costo en memoria / cliente)."""
+    total, stack = 0, [control]
+    while stack:
+        c = stack.pop()
+        total += 1
+        stack.extend(c._get_children())
+    return total
+
+
+class _Entry:
+    __slots__ = ("wrapper", "content", "factory", "size", "scroll_offset")
+
+    def __init__(self, wrapper: ft.Container, content: ft.Control, factory: Callable[[], ft.Control]):
+        self.wrapper = wrapper
+        self.content = content
+        self.factory = factory
+        self.size = count_controls(content)
+        self.scroll_offset: Optional[float] = None
+
+
+class PageCache:
+    def __init__(self, host: ft.Column, max_entries: int = MAX_ENTRIES, max_controls: int = MAX_CONTROLS):
+        self.host = host
+        self.max_entries = max_entries
+        self.max_controls = max_controls
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._current: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        _caches.add(self)
+
+    # ── API ---------------------------------------------------------------
+    def show(self, route: str, factory: Callable[[], ft.Control]) -> ft.Control:
+        """Muestra el contenido de ``route`` (construyéndolo sólo si no está)."""
+        previous = self._entries.get(self._current) if self._current != route else None
+        entry = self._entries.get(route)
+        dirty: list[ft.Control] = []
+
+        hit = entry is not None
+        if not hit:
+            self.misses += 1
+            with span("page_build", ruta=route):
+                content = factory()
+            entry = self._create(route, content, factory)
+            self.host.controls.append(entry.wrapper)
+            self._evict(keep=route)
+            dirty.append(self.host)
+        else:
+            self.hits += 1
+            entry.wrapper.visible = True
+            dirty.append(entry.wrapper)
+            self._entries.move_to_end(route)
+
+        if previous is not None:
+            previous.wrapper.visible = False
+            dirty.append(previous.wrapper)
+        self._current = route
+
+        self._flush(dirty)
+        if hit:
+            after_flush(lambda: self._restore(entry))
+        return entry.content
+
+    def invalidate(self, route: Optional[str] = None):
+        """
+        Descarta ``route`` o, sin ruta, todas (logout: nada se reconstruye).
+        Si ``route`` es la que está en pantalla se reconstruye de inmediato.
+        """
+        routes = [route] if route else list(self._entries)
+        removed, rebuild = False, None
+        for r in routes:
+            entry = self._entries.pop(r, None)
+            if entry is not None:
+                self.host.controls.remove(entry.wrapper)
+                removed = True
+                if r == self._current:
+                    self._current = None
+                    if route is not None:
+                        rebuild = (r, entry.factory)
+        if rebuild is not None:
+            self.show(*rebuild)
+        elif removed:
+            self._flush([self.host])
+
+    def on_data_changed(self, tablas: frozenset[str]):
+        """Descarta las rutas que muestran ``tablas`` (desde cualquier hilo)."""
+        routes = [r for r in self._entries if (ruta := POR_PATH.get(r)) is not None and ruta.datos & tablas]
+        if not routes:
+            return
+        page = self.host.page
+        if page is None or page.loop is None:
+            for r in routes:
+                self.invalidate(r)
+            return
+        # los controles de la sesión se tocan en su propio loop
+        page.loop.call_soon_threadsafe(self._invalidate_routes, routes)
+
+    def _invalidate_routes(self, routes: list[str]):
+        logger.info("Caché de páginas: datos cambiaron, reconstruyendo %s", ", ".join(routes))
+        for r in routes:
+            self.invalidate(r)
+
+    @property
+    def total_controls(self) -> int:
+        return sum(e.size for e in self._entries.values())
+
+    # ── Internos ----------------------------------------------------------
+    def _create(self, route: str, content: ft.Control, factory: Callable[[], ft.Control]) -> _Entry:
+        entry = _Entry(ft.Container(content=content, visible=True), content, factory)
+        if getattr(content, "scroll", None) and getattr(content, "on_scroll", None) is None:
+            def remember(e: ft.OnScrollEvent, entry=entry):
+                entry.scroll_offset = e.pixels
+            content.on_scroll = remember
+            content.on_scroll_interval = 200
+        self._entries[route] = entry
+        return entry
+
+    def _evict(self, keep: str):
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self.total_controls > self.max_controls
+        ):
+            route, entry = next((r, e) for r, e in self._entries.items() if r != keep)
+            self._entries.pop(route)
+            self.host.controls.remove(entry.wrapper)
+            logger.info("Caché de páginas: expulsando %s (%s controles)", route, entry.size)
+
+    def _restore(self, entry: _Entry):
+        if entry.scroll_offset and entry.content.page is not None:
+            entry.content.scroll_to(offset=entry.scroll_offset, duration=0)
+        data = entry.content.data
+        if isinstance(data, dict) and callable(data.get("on_show")):
+            data["on_show"]()
+
+    def _flush(self, dirty: list[ft.Control]):
+        if self.host.page is None:
+            return
+        # un solo lote por websocket con únicamente los controles tocados
+        # (dentro de ``batch_updates`` se suma al lote del handler)
+        mark_dirty(*([self.host] if self.host in dirty else dirty))
+
+
+# cachés vivas del proceso (una por sesión) y su suscripción a services/cambios
+_caches: "weakref.WeakSet[PageCache]" = weakref.WeakSet()
+
+
+def _on_data_changed(tablas: frozenset[str]):
+    for cache in list(_caches):
+        cache.on_data_changed(tablas)
+
+
+cambios.suscribir(_on_data_changed)
+
+
+def get_page_cache(page: ft.Page) -> Optional[PageCache]:
+    return page.session.get(CACHE_KEY)
+
+
+def invalidate_route(page: ft.Page, route: Optional[str] = None):
+    """Atajo para invalidar desde cualquier página tras un cambio de datos."""
+    cache = get_page_cache(page)
+    if cache is not None:
+        cache.invalidate(route)
@@ -0,0 +1,93 @@
+# components/routes.py
+"""
+Registro declarativo de rutas: una sola lista alimenta el drawer
+(components/app_shell.py) y la navegación (main.route_change).
+Agregar un módulo es agregar una ``Ruta`` aquí.
+
+  • Import perezoso: cada ruta apunta a ``"modulo:funcion"`` y el módulo se
+    importa en la primera visita. Así el arranque no paga pandas, NumPy,
+    reportlab, etc. de módulos que la sesión quizá nunca abra.
+  • ``protegida``: exige sesión. ``roles``: si se indica, sólo esos roles
+    (y ``admin``) pueden entrar y ver la entrada del drawer.
+  • ``vista``: la función devuelve una ``ft.View`` completa (login,
+    registro) en lugar de un contenido para el shell.
+  • ``datos``: tablas que el contenido muestra sin refrescarse solo. Cuando
+    un servicio avisa que cambiaron (services/cambios.py) la caché de
+    páginas lo descarta (components/page_cache.py).
+"""
+import importlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import flet as ft
+
+logger = logging.getLogger(__name__)
+
+ADMIN = "admin"
+
+
+@dataclass(frozen=True)
+class Ruta:
+    path: str
+    destino: str                                  # "paquete.modulo:funcion"
+    titulo: str = ""
+    icono: Optional[str] = None
+    protegida: bool = True
+    roles: Optional[frozenset[str]] = None        # None → cualquier usuario con sesión
+    vista: bool = False
+    en_menu: bool = True
+    datos: frozenset[str] = frozenset()           # tablas mostradas (invalidan la caché de páginas)
+
+    def cargar(self) -> Callable[[ft.Page], ft.Control]:
+        """Importa el módulo de la ruta (sólo la primera vez en el proceso)."""
+        fn = _cargadas.get(self.destino)
+        if fn is None:
+            with _import_lock:
+                fn = _cargadas.get(self.destino)
+                if fn is None:
+                    modulo, funcion = self.destino.split(":")
+                    logger.info("Cargando módulo %s", modulo)
+                    fn = _cargadas[self.destino] = getattr(importlib.import_module(modulo), funcion)
+        return fn
+
+    def permitida(self, user: Optional[dict]) -> bool:
+        if not self.protegida:
+            return True
+        if not user:
+            return False
+        return self.roles is None or user.get("rol") in self.roles or user.get("rol") == ADMIN
+
+
+_cargadas: dict[str, Callable] = {}
+_import_lock = threading.Lock()
+
+RUTAS: tuple[Ruta, ...] = (
+    # ── Vistas sin shell ---------------------------------------------------
+    Ruta("/",         "auth.login_page:login_page",       protegida=False, vista=True, en_menu=False),
+    Ruta("/register", "auth.register_page:register_page", protegida=False, vista=True, en_menu=False),
+    # ── Módulos del shell -------------------------------------------------
+    Ruta("/home",          "pages.home_page:home_content",                   "Resumen",        ft.Icons.HOME),
+    Ruta("/upload",        "pages.upload_page:upload_content",               "Cargar Órdenes", ft.Icons.CLOUD_UPLOAD),
+    Ruta("/tickets",       "pages.tickets_page:tickets_content",             "Tickets",        ft.Icons.RECEIPT,
+         datos=frozenset({"tickets"})),
+    # el plan en pantalla se calculó con las líneas de entonces
+    Ruta("/alistamiento",  "pages.alistamiento_page:alistamiento_content",   "Alistamiento",   ft.Icons.MOVING,
+         datos=frozenset({"ordenes"})),
+    Ruta("/serializacion", "pages.serializacion_page:serializacion_content", "Serialización",  ft.Icons.INVENTORY),
+    # rol 'facturacion': lo asigna un admin con asignar_rol (migrations/013)
+    Ruta("/facturas",      "pages.facturas_page:facturas_content",           "Facturas",       ft.Icons.REQUEST_PAGE,
+         roles=frozenset({"facturacion"})),
+    Ruta("/trabajos",      "pages.trabajos_page:trabajos_content",           "Trabajos",       ft.Icons.WORK_HISTORY),
+    # roles vacío → sólo admin
+    Ruta("/metricas",      "pages.metricas_page:metricas_content",           "Métricas",       ft.Icons.INSIGHTS,
+         roles=frozenset()),
+)
+
+POR_PATH: dict[str, Ruta] = {r.path: r for r in RUTAS}
+HOME = "/home"
+
+
+def menu_rutas() -> list[Ruta]:
+    return [r for r in RUTAS if r.en_menu]
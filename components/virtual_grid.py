@@ -0,0 +1,320 @@
+# components/virtual_grid.py
+"""
+Grilla virtualizada para vistas previas grandes (100k+ filas).
+
+Sólo existen como controles Flet las filas visibles; los datos viven en un
+buffer columnar de Arrow (en memoria o en un archivo IPC mapeado en memoria).
+Ordenar y filtrar producen un vector de índices sobre ese buffer: nunca se
+materializa la tabla completa como filas Python ni como controles.
+
+Uso:
+    source = ArrowSource.from_pandas(df)            # o ArrowSource.from_ipc_file(path)
+    grid = VirtualGrid(source, visible_rows=15)
+    column.controls.append(grid.control)
+
+``row_color(record) -> color | None`` resalta filas (p. ej. las que tienen
+errores en la vista previa de la carga); sólo se evalúa en las visibles.
+"""
+import logging
+from pathlib import Path
+from typing import Callable, Optional
+
+import flet as ft
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+ROW_HEIGHT   = 32
+COL_WIDTH    = 150
+OVERSCAN     = 20          # filas extra leídas por encima/debajo de la ventana
+WHEEL_STEP   = 3           # filas por "clic" de rueda
+
+
+# ────────────────────────────────────────────────────────────────
+# FUENTE DE DATOS COLUMNAR
+# ────────────────────────────────────────────────────────────────
+class ArrowSource:
+    """
+    Buffer columnar de solo lectura con orden y filtros perezosos.
+    ``window(start, stop)`` devuelve únicamente las filas pedidas.
+    """
+
+    def __init__(self, table: pa.Table):
+        self._table = table
+        self._view: Optional[np.ndarray] = None      # índices visibles (None = identidad)
+        self._filters: dict[str, str] = {}
+        self._sort: Optional[tuple[str, bool]] = None
+
+    # ── Constructores ----------------------------------------------------
+    @classmethod
+    def from_ipc_file(cls, path) -> "ArrowSource":
+        """Abre un archivo Arrow IPC mapeado en memoria (no lo carga en RAM)."""
+        source = pa.memory_map(str(Path(path)), "r")
+        return cls(pa.ipc.open_file(source).read_all())
+
+    @classmethod
+    def from_pandas(cls, df) -> "ArrowSource":
+        return cls(pa.Table.from_pandas(df, preserve_index=False))
+
+    @classmethod
+    def from_records(cls, rows: list[dict], columns: Optional[list[str]] = None) -> "ArrowSource":
+        """``columns`` conserva los encabezados cuando ``rows`` viene vacío."""
+        if not rows and columns:
+            return cls(pa.table({c: pa.array([], pa.string()) for c in columns}))
+        return cls(pa.Table.from_pylist(rows))
+
+    # ── Lectura ----------------------------------------------------------
+    @property
+    def columns(self) -> list[str]:
+        return self._table.column_names
+
+    @property
+    def total_rows(self) -> int:
+        return self._table.num_rows
+
+    def __len__(self) -> int:
+        return self.total_rows if self._view is None else len(self._view)
+
+    def window(self, start: int, stop: int) -> list[dict]:
+        start, stop = max(start, 0), min(stop, len(self))
+        if start >= stop:
+            return []
+        if self._view is None:
+            return self._table.slice(start, stop - start).to_pylist()
+        return self._table.take(pa.array(self._view[start:stop])).to_pylist()
+
+    # ── Orden / filtros --------------------------------------------------
+    @property
+    def filters(self) -> dict[str, str]:
+        return dict(self._filters)
+
+    @property
+    def sort_state(self) -> Optional[tuple[str, bool]]:
+        return self._sort
+
+    def set_sort(self, column: Optional[str], descending: bool = False):
+        self._sort = (column, descending) if column else None
+        self._rebuild()
+
+    def set_filter(self, column: str, text: str):
+        if text:
+            self._filters[column] = text
+        else:
+            self._filters.pop(column, None)
+        self._rebuild()
+
+    def _rebuild(self):
+        indices = None
+        if self._filters:
+            mask = None
+            for col, text in self._filters.items():
+                values = pc.cast(self._table[col], pa.string())
+                m = pc.fill_null(pc.match_substring(values, text, ignore_case=True), False)
+                mask = m if mask is None else pc.and_(mask, m)
+            indices = pc.indices_nonzero(mask).to_numpy()
+
+        if self._sort:
+            col, desc = self._sort
+            order = "descending" if desc else "ascending"
+            column = self._table[col] if indices is None else self._table[col].take(pa.array(indices))
+            ranked = pc.array_sort_indices(column, order=order, null_placement="at_end").to_numpy()
+            indices = ranked if indices is None else indices[ranked]
+
+        self._view = indices
+
+
+# ────────────────────────────────────────────────────────────────
+# COMPONENTE
+# ────────────────────────────────────────────────────────────────
+class VirtualGrid:
+    """
+    Tabla con ventana deslizante: ``visible_rows`` controles de fila reutilizados.
+    La rueda del mouse y la barra lateral desplazan el offset; sólo se
+    reemplazan los textos de las celdas visibles.
+    """
+
+    def __init__(
+        self,
+        source: ArrowSource,
+        visible_rows: int = 15,
+        overscan: int = OVERSCAN,
+        row_height: int = ROW_HEIGHT,
+        column_widths: Optional[dict[str, int]] = None,
+        row_color: Optional[Callable[[dict], Optional[str]]] = None,
+    ):
+        self.source = source
+        self.visible_rows = visible_rows
+        self.overscan = overscan
+        self.row_height = row_height
+        self.column_widths = column_widths or {}
+        self.row_color = row_color
+
+        self._offset = 0
+        self._cache_start = 0
+        self._cache: list[dict] = []
+
+        self._header = ft.Row(spacing=0)
+        self._filters = ft.Row(spacing=0)
+        self._rows = [self._make_row() for _ in range(visible_rows)]
+        self._body = ft.Column(spacing=0, controls=[r for r, _ in self._rows])
+        self._scrollbar = ft.Slider(min=0, max=1, value=0, on_change=self._on_slider)
+        self._status = ft.Text("", size=12, color=ft.Colors.BLUE_GREY_600)
+
+        self.control = ft.Column(
+            spacing=5,
+            controls=[
+                self._header,
+                self._filters,
+                ft.GestureDetector(
+                    content=ft.Container(
+                        height=visible_rows * row_height,
+                        clip_behavior=ft.ClipBehavior.HARD_EDGE,
+                        content=self._body,
+                    ),
+                    on_scroll=self._on_scroll,
+                ),
+                ft.Row([self._status, ft.Container(self._scrollbar, expand=True)]),
+            ],
+        )
+        self._build_columns()
+        self._render()
+
+    # ── Construcción -----------------------------------------------------
+    def _width(self, col: str) -> int:
+        return self.column_widths.get(col, COL_WIDTH)
+
+    def _make_row(self) -> tuple[ft.Container, list[ft.Text]]:
+        cells: list[ft.Text] = []
+        row = ft.Container(height=self.row_height, content=ft.Row(spacing=0))
+        return row, cells
+
+    def _build_columns(self):
+        cols = self.source.columns
+        self._header.controls = [
+            ft.Container(
+                width=self._width(c),
+                padding=ft.padding.symmetric(horizontal=6),
+                content=ft.Text(self._header_label(c), weight=ft.FontWeight.BOLD, size=13),
+                on_click=lambda _, c=c: self.toggle_sort(c),
+            )
+            for c in cols
+        ]
+        self._filters.controls = [
+            ft.Container(
+                width=self._width(c),
+                padding=ft.padding.symmetric(horizontal=2),
+                content=ft.TextField(
+                    hint_text="Filtrar…",
+                    dense=True,
+                    text_size=12,
+                    content_padding=6,
+                    on_submit=lambda e, c=c: self.set_filter(c, e.control.value),
+                    on_blur=lambda e, c=c: self.set_filter(c, e.control.value),
+                ),
+            )
+            for c in cols
+        ]
+        for row, cells in self._rows:
+            cells.clear()
+            cells.extend(ft.Text("", size=12, no_wrap=True) for _ in cols)
+            row.content.controls = [
+                ft.Container(width=self._width(c), padding=ft.padding.symmetric(horizontal=6), content=t)
+                for c, t in zip(cols, cells)
+            ]
+
+    def _header_label(self, col: str) -> str:
+        sort = self.source.sort_state
+        if sort and sort[0] == col:
+            return f"{col} {'▼' if sort[1] else '▲'}"
+        return col
+
+    # ── Ventana de datos -------------------------------------------------
+    def _visible_slice(self) -> list[dict]:
+        start, stop = self._offset, self._offset + self.visible_rows
+        cache_stop = self._cache_start + len(self._cache)
+        if start < self._cache_start or stop > cache_stop:
+            self._cache_start = max(start - self.overscan, 0)
+            self._cache = self.source.window(self._cache_start, stop + self.overscan)
+        i = start - self._cache_start
+        return self._cache[i:i + self.visible_rows]
+
+    def _invalidate(self):
+        self._cache, self._cache_start = [], 0
+
+    def _render(self):
+        cols = self.source.columns
+        data = self._visible_slice()
+        for i, (row, cells) in enumerate(self._rows):
+            record = data[i] if i < len(data) else None
+            row.visible = record is not None
+            color = self.row_color(record) if record and self.row_color else None
+            row.bgcolor = color or (ft.Colors.BLUE_GREY_50 if (self._offset + i) % 2 else None)
+            for col, cell in zip(cols, cells):
+                value = record.get(col) if record else None
+                cell.value = "" if value is None else str(value)
+
+        total = len(self.source)
+        max_offset = max(total - self.visible_rows, 0)
+        self._scrollbar.max = max(max_offset, 1)
+        self._scrollbar.value = min(self._offset, max_offset)
+        self._scrollbar.disabled = max_offset == 0
+        last = min(self._offset + self.visible_rows, total)
+        self._status.value = (
+            f"{self._offset + 1 if total else 0:,}–{last:,} de {total:,}"
+            + (f" (filtradas de {self.source.total_rows:,})" if total != self.source.total_rows else "")
+        )
+
+    def _refresh(self, *controls: ft.Control):
+        """Actualiza sólo los controles de la grilla que cambiaron."""
+        self._render()
+        if self.control.page is None:
+            return
+        for c in controls or (self._body, self._scrollbar, self._status):
+            c.update()
+
+    # ── API pública ------------------------------------------------------
+    def scroll_to(self, offset: int):
+        max_offset = max(len(self.source) - self.visible_rows, 0)
+        offset = min(max(int(offset), 0), max_offset)
+        if offset != self._offset:
+            self._offset = offset
+            self._refresh()
+
+    def toggle_sort(self, column: str):
+        sort = self.source.sort_state
+        if sort and sort[0] == column:
+            self.source.set_sort(None if sort[1] else column, descending=True)
+        else:
+            self.source.set_sort(column)
+        for c, h in zip(self.source.columns, self._header.controls):
+            h.content.value = self._header_label(c)
+        self._offset = 0
+        self._invalidate()
+        self._refresh(self._header, self._body, self._scrollbar, self._status)
+
+    def set_filter(self, column: str, text: Optional[str]):
+        text = (text or "").strip()
+        if self.source.filters.get(column, "") == text:
+            return
+        self.source.set_filter(column, text)
+        self._offset = 0
+        self._invalidate()
+        self._refresh()
+
+    def set_source(self, source: ArrowSource):
+        self.source = source
+        self._offset = 0
+        self._invalidate()
+        self._build_columns()
+        self._refresh(self.control)
+
+    # ── Eventos ----------------------------------------------------------
+    def _on_scroll(self, e):
+        dy = e.scroll_delta_y or 0
+        if dy:
+            self.scroll_to(self._offset + (WHEEL_STEP if dy > 0 else -WHEEL_STEP))
+
+    def _on_slider(self, e):
+        self.scroll_to(e.control.value)
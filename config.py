@@ -3,7 +3,10 @@ import os
 from pathlib import Path
 from typing import Final, Optional
 
-from supabase import create_client, Client
+import httpx
+from supabase import create_client, Client, ClientOptions
+
+from utils.instrumentation import instrument_http
 
 # ─── Cargar .env en desarrollo ───────────────────────────────────────────
 try:
@@ -26,8 +29,57 @@ if not SUPABASE_URL or not SUPABASE_ANON_KEY:
         "  ➜ Crea un archivo .env o expórtalas en tu entorno."
     )
 
-# ─── Cliente Supabase con clave anónima (frontend) ───────────────────────
-supabase: Final[Client] = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+# ─── Pool HTTP compartido (keep-alive) ───────────────────────────────────
+# Todas las sesiones reutilizan las mismas conexiones; cada cliente envía
+# sus propios headers de autorización en cada request.
+HTTP_POOL_SIZE: Final[int] = int(os.getenv("HTTP_POOL_SIZE", "50"))
+
+http_pool: Final[httpx.Client] = httpx.Client(
+    limits=httpx.Limits(
+        max_connections=HTTP_POOL_SIZE,
+        max_keepalive_connections=HTTP_POOL_SIZE,
+        keepalive_expiry=30,
+    ),
+    timeout=httpx.Timeout(30, connect=5),
+    follow_redirects=True,
+    http2=True,
+)
+instrument_http(http_pool)          # tiempos, filas y bytes por tabla (METRICS=1)
+
+SESSION_CLIENT_KEY: Final[str] = "supabase_client"
+
+
+# ─── Cliente Supabase por sesión (clave anónima) ─────────────────────────
+def create_session_client() -> Client:
+    """Cliente nuevo con su propio estado de auth, sobre el pool compartido."""
+    return create_client(
+        SUPABASE_URL,
+        SUPABASE_ANON_KEY,
+        # el refresco lo agenda auth.tokens.TokenManager (sin un Timer por cliente)
+        options=ClientOptions(httpx_client=http_pool, persist_session=False, auto_refresh_token=False),
+    )
+
+
+def get_client(page) -> Client:
+    """
+    Devuelve el cliente Supabase de la sesión Flet (``page``), creándolo
+    la primera vez. Nunca se comparte entre navegadores.
+    """
+    client = page.session.get(SESSION_CLIENT_KEY)
+    if client is None:
+        client = create_session_client()
+        page.session.set(SESSION_CLIENT_KEY, client)
+    return client
+
 
 # ─── Service role key (opcional) ─────────────────────────────────────────
 SUPABASE_SERVICE_KEY: Final[Optional[str]] = os.getenv("SUPABASE_SERVICE_KEY")
+
+# ─── Directorio de archivos subidos (FilePicker en modo web) ─────────────
+UPLOAD_DIR: Final[Path] = Path(__file__).parent / "uploads"
+
+# ─── Datos locales del servidor (colas durables, SQLite) ─────────────────
+DATA_DIR: Final[Path] = Path(os.getenv("DATA_DIR", Path(__file__).parent / "data"))
+
+# ─── Documentos de facturación generados (XML / PDF) ─────────────────────
+FACTURAS_DIR: Final[Path] = DATA_DIR / "facturas"
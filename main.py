@@ -1,19 +1,21 @@
 # main.py
+import asyncio
 import logging
+import os
 import flet as ft
-from config import supabase
-
-# Páginas Auth
-from auth.login_page import login_page
-from auth.register_page import register_page
-from pages.tickets_page import tickets_content
-from pages.alistamiento_page import alistamiento_content
-from pages.serializacion_page import serializacion_content
-from pages.facturas_page import facturas_content
-# Shell y contenidos
+from auth.session import get_profile
+from auth.tokens import get_token_manager
+from config import get_client, UPLOAD_DIR
+from services.async_repo import cancel_pending, run_blocking, submit_background
+from services.realtime_hub import hub
+from utils.instrumentation import instrument_page, serve, span
+from utils.updates import batch_updates
+from utils.ws_metrics import instrument
+
+# Shell y registro de rutas (las páginas se importan en su primera visita)
 from components.app_shell import build_shell
-from pages.home_page import home_content
-from pages.upload_page import upload_content
+from components.routes import HOME, POR_PATH
+from utils.alerts import show_snackbar
 
 # ── Logging global -------------------------------------------------------
 logging.basicConfig(
@@ -24,22 +26,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def main(page: ft.Page):
-    # ── Restaurar sesión (si hay JWT) -----------------------------------
-    access_token = page.client_storage.get("access_token")
-    refresh_token = page.client_storage.get("refresh_token")
-    if access_token and refresh_token:
-        try:
-            supabase.auth.set_session(access_token, refresh_token)
-            new_session = supabase.auth.refresh_session()
-            if new_session:
-                page.client_storage.set("access_token", new_session.access_token)
-                page.client_storage.set("refresh_token", new_session.refresh_token)
-            logger.info("Sesión restaurada desde client_storage")
-        except Exception as exc:
-            logger.warning(f"Tokens inválidos: {exc}")
-            page.client_storage.clear()
-
+async def main(page: ft.Page):
     # ── Configuración general de la página ------------------------------
     page.title      = "Colibrí - Web"
     page.theme_mode = ft.ThemeMode.LIGHT
@@ -47,79 +34,111 @@ def main(page: ft.Page):
     page.margin     = 0
     page.drawer     = None
 
+    # ── Métricas de websocket por interacción (WS_METRICS=1) ------------
+    instrument(page)
+    # ── Tiempos de page.update() por sesión (METRICS=1) -----------------
+    instrument_page(page)
+
+    # ── Suscripción de cambios del panel (una por proceso) --------------
+    hub.ensure_started(page.loop)
+
     # ── Construir el ‘shell’ una sola vez -------------------------------
-    shell_view, switcher, user_label = build_shell(page)
-
-    # ── Rutas protegidas -------------------------------------------------
-    protected_routes = {
-        "/home",
-        "/upload",
-        "/tickets",
-        "/alistamiento",
-        "/serializacion",
-        "/facturas",
-    }
-
-    def is_authenticated() -> bool:
-        return bool(page.session.get("user_data"))
-
-    def refresh_user_label():
-        user = page.session.get("user_data") or {}
-        user_label.value = f"👤 {user.get('nombre_usuario', 'Invitado')}"
-
-    
-    # ── Navegación -------------------------------------------------------
-    def route_change(event):
-        route = event.data
-        logger.info(f"Cambio de ruta → {route}")
+    shell_view, pages, refresh_user = build_shell(page)
 
-        # Rutas que requieren sesión
-        if route in protected_routes and not is_authenticated():
-            page.views.clear()
-            page.views.append(login_page(page))
-            page.update()                 # ←
+    # ── Navegación (rutas y permisos: components/routes.py) -------------
+    def navigate(route: str):
+        logger.info("Cambio de ruta → %s", route)
+        cancel_pending(page)              # descarta llamadas de la vista anterior
+        if route != HOME:
+            hub.unsubscribe(page.session_id)
+
+        ruta = POR_PATH.get(route)
+        user = page.session.get("user_data")
+
+        # Rutas que requieren sesión (la vista de login la monta el route_change de "/")
+        if ruta is not None and ruta.protegida and not user:
             page.go("/")
             return
-
-        # ---------- Vistas SIN shell ----------
-        if route == "/":
-            page.views.clear()
-            page.views.append(login_page(page))
-            page.update()                 # ←
+        if ruta is not None and not ruta.permitida(user):
+            logger.warning("Rol %r sin permiso para %s", user.get("rol"), route)
+            show_snackbar(page, "No tienes permiso para este módulo", "warning")
+            page.go(HOME)
             return
 
-        if route == "/register":
+        # ---------- Vistas SIN shell ----------
+        if ruta is not None and ruta.vista:
             page.views.clear()
-            page.views.append(register_page(page))
-            page.update()                 # ←
+            page.views.append(ruta.cargar()(page))
+            page.update()
             return
 
         # ---------- Vistas DENTRO del shell ----------
-        if not page.views or page.views[-1].route != "/shell":
+        factory = (lambda: ruta.cargar()(page)) if ruta else ft.Container
+        mounting = not page.views or page.views[-1].route != "/shell"
+        if mounting:
             page.views.clear()
             page.views.append(shell_view)
-        refresh_user_label()
-
-        if route == "/home":
-            switcher.content = home_content(page)
-        elif route == "/upload":
-            switcher.content = upload_content(page)
-        elif route == "/tickets":
-            switcher.content = tickets_content(page)
-        elif route == "/alistamiento":
-            switcher.content = alistamiento_content(page)
-        elif route == "/serializacion":
-            switcher.content = serializacion_content(page)
-        elif route == "/facturas":
-            switcher.content = facturas_content(page)
-        else:
-            switcher.content = ft.Container()
-
-        page.update()                     # ← siempre actualiza
+            refresh_user()
+            pages.show(route, factory)
+            page.update()                 # primer montaje del shell completo
+            return
+
+        # Shell ya montado: etiqueta y alternancia de panel en un solo mensaje.
+        # Cada módulo se construye una vez por sesión; luego sólo se alterna
+        with batch_updates(page):
+            refresh_user()
+            pages.show(route, factory)
+
+    def route_change(event):
+        ruta = POR_PATH.get(event.data)
+        with span("route_change", ruta=ruta.path if ruta else "otra"):
+            navigate(event.data)
+
+    # ── Restaurar sesión (si hay JWT) sin bloquear el primer render ------
+    async def restore():
+        """
+        Sesión guardada en client_storage. Con ``SUPABASE_JWT_SECRET`` un token
+        vigente se verifica localmente y se navega sin red; sin secreto se
+        espera a que Auth confirme el token (un round-trip) antes de cargar el
+        perfil y navegar, porque su ``sub`` no está firmado.
+        """
+        # En handlers async se usan las variantes *_async de client_storage
+        access_token = await page.client_storage.get_async("access_token")
+        refresh_token = await page.client_storage.get_async("refresh_token")
+        if not (access_token and refresh_token):
+            return
+        manager = get_token_manager(page)
+        try:
+            # vigente → se instala localmente; sólo se refresca si está por vencer
+            session = manager.restore(access_token, refresh_token)
+            if session is None:
+                session = await manager.refresh_async()
+            elif not manager.verified:
+                # sin secreto JWT local el "sub" no está firmado: Auth lo confirma
+                # antes de cargar su perfil y rol (fuera de run_blocking, como el refresco)
+                await asyncio.wrap_future(submit_background(manager.verify))
+            # perfil desde la caché por auth_uid (sin consulta si ya se cargó)
+            user = await run_blocking(page, get_profile, get_client(page), session.user.id)
+        except asyncio.CancelledError:
+            return
+        except Exception as exc:
+            logger.warning("Tokens inválidos: %s", exc)
+            manager.cancel()
+            await page.client_storage.clear_async()
+            return
+
+        page.session.set("user_data", user)
+        if page.route == "/":
+            page.go("/home")
+        logger.info("Sesión restaurada desde client_storage")
 
     page.on_route_change = route_change
     page.go("/")
+    await restore()
 
 
-# Ejecutar
-ft.app(target=main, view=ft.WEB_BROWSER)
+# Ejecutar (el guard evita relanzar la app en los procesos "spawn" de facturación)
+if __name__ == "__main__":
+    if os.getenv("METRICS_PORT"):
+        serve(int(os.environ["METRICS_PORT"]))
+    ft.app(target=main, view=ft.WEB_BROWSER, upload_dir=str(UPLOAD_DIR))
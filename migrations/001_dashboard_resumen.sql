@@ -0,0 +1,29 @@
+-- migrations/001_dashboard_resumen.sql
+-- Conteos del panel principal en un solo round-trip (RPC dashboard_resumen).
+-- SECURITY DEFINER: el resultado es el mismo para todas las sesiones y la app
+-- lo guarda en una caché compartida del proceso.
+
+create or replace function public.dashboard_resumen()
+returns table (
+    ordenes_totales          bigint,
+    tickets_pendientes       bigint,
+    alistamiento_en_proceso  bigint,
+    serializacion_pendiente  bigint,
+    facturas_pendientes      bigint,
+    instantanea              text           -- para descartar eventos ya contados (migrations/002)
+)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select
+        (select count(*) from ordenes),
+        (select count(*) from tickets       where estado = 'pendiente'),
+        (select count(*) from alistamiento  where estado = 'en_proceso'),
+        (select count(*) from serializacion where estado = 'pendiente'),
+        (select count(*) from facturas      where estado = 'pendiente'),
+        pg_current_snapshot()::text;
+$$;
+
+grant execute on function public.dashboard_resumen() to authenticated;
@@ -0,0 +1,117 @@
+-- migrations/002_realtime_panel.sql
+-- Eventos de cambio para los contadores del panel (services/realtime_hub.py).
+-- Triggers POR SENTENCIA con tablas de transición (como migrations/011): una
+-- carga de 500k filas emite un evento por sentencia con el cambio agregado
+-- por estado, no 500k eventos. Las tablas de origen no se publican ni usan
+-- REPLICA IDENTITY FULL (no se duplica el WAL de cada escritura).
+--   • panel_cambios: un evento por sentencia, {estado: cambio en filas}. Es
+--     la única tabla publicada en supabase_realtime; guarda una ventana
+--     corta (los eventos sólo sirven a quien ya está suscrito).
+--   • Alternativa local (REALTIME_PG_DSN): el mismo evento por NOTIFY.
+--   • xid: transacción que hizo el cambio. dashboard_resumen devuelve la
+--     instantánea de sus conteos (migrations/001, 011) y la app descarta los
+--     eventos que esa instantánea ya incluye.
+
+create table if not exists public.panel_cambios (
+    id         bigserial   primary key,
+    tabla      text        not null,
+    xid        bigint      not null,
+    deltas     jsonb       not null,
+    creado_at  timestamptz not null default now()
+);
+
+alter table public.panel_cambios enable row level security;
+
+drop policy if exists panel_cambios_select on public.panel_cambios;
+create policy panel_cambios_select
+    on public.panel_cambios for select to authenticated using (true);
+
+-- sólo el trigger escribe (SECURITY DEFINER)
+revoke insert, update, delete, truncate on public.panel_cambios from anon, authenticated;
+
+do $$
+begin
+    if not exists (
+        select 1 from pg_publication_tables
+         where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = 'panel_cambios'
+    ) then
+        alter publication supabase_realtime add table public.panel_cambios;
+    end if;
+end;
+$$;
+
+create or replace function public.notify_cambio_panel()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    d       jsonb;
+    evento  public.panel_cambios%rowtype;
+begin
+    if tg_op = 'INSERT' then
+        select jsonb_object_agg(estado, n) into d
+          from (select coalesce(to_jsonb(t) ->> 'estado', '') as estado, count(*) as n
+                  from nuevas t group by 1) c;
+    elsif tg_op = 'DELETE' then
+        select jsonb_object_agg(estado, n) into d
+          from (select coalesce(to_jsonb(t) ->> 'estado', '') as estado, -count(*) as n
+                  from viejas t group by 1) c;
+    else
+        -- UPDATE: sólo lo que cambió de estado (un upsert sin cambios no emite nada)
+        select jsonb_object_agg(estado, n) into d
+          from (select estado, sum(n) as n
+                  from (select coalesce(to_jsonb(t) ->> 'estado', '') as estado, 1 as n from nuevas t
+                        union all
+                        select coalesce(to_jsonb(t) ->> 'estado', ''), -1 from viejas t) u
+                 group by 1
+                having sum(n) <> 0) c;
+    end if;
+
+    if d is null then
+        return null;
+    end if;
+
+    insert into panel_cambios (tabla, xid, deltas)
+    values (tg_table_name, pg_current_xact_id()::text::bigint, d)
+    returning * into evento;
+    delete from panel_cambios where id <= evento.id - 1000;
+
+    perform pg_notify(
+        'colibri_cambios',
+        json_build_object('tabla', evento.tabla, 'xid', evento.xid, 'deltas', evento.deltas)::text
+    );
+    return null;
+end;
+$$;
+
+-- Postgres no admite tablas de transición en un trigger con varios eventos:
+-- uno por evento, todos con la misma función.
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['ordenes', 'tickets', 'alistamiento', 'serializacion', 'facturas'] loop
+        execute format('drop trigger if exists trg_notify_panel on public.%I', t);
+        execute format('drop trigger if exists trg_panel_ins on public.%I', t);
+        execute format('drop trigger if exists trg_panel_upd on public.%I', t);
+        execute format('drop trigger if exists trg_panel_del on public.%I', t);
+        execute format(
+            'create trigger trg_panel_ins after insert on public.%I
+             referencing new table as nuevas
+             for each statement execute function public.notify_cambio_panel()', t
+        );
+        execute format(
+            'create trigger trg_panel_upd after update on public.%I
+             referencing old table as viejas new table as nuevas
+             for each statement execute function public.notify_cambio_panel()', t
+        );
+        execute format(
+            'create trigger trg_panel_del after delete on public.%I
+             referencing old table as viejas
+             for each statement execute function public.notify_cambio_panel()', t
+        );
+    end loop;
+end;
+$$;
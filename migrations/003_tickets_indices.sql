@@ -0,0 +1,35 @@
+-- migrations/003_tickets_indices.sql
+-- Listado de tickets con paginación keyset (created_at desc, id desc).
+-- Cada combinación de filtro usada por pages/tickets_page tiene un índice
+-- cuyo orden coincide con el ORDER BY, así el costo de una página no
+-- depende del tamaño de la tabla.
+
+-- Búsqueda de texto completo en Postgres (columna generada + GIN)
+alter table public.tickets
+    add column if not exists busqueda tsvector
+    generated always as (
+        to_tsvector(
+            'spanish',
+            coalesce(numero_orden, '') || ' ' ||
+            coalesce(asunto, '')       || ' ' ||
+            coalesce(descripcion, '')
+        )
+    ) stored;
+
+create index if not exists tickets_busqueda_gin
+    on public.tickets using gin (busqueda);
+
+-- Sin filtros / sólo rango de fechas
+create index if not exists tickets_keyset_idx
+    on public.tickets (created_at desc, id desc);
+
+-- Filtro por estado
+create index if not exists tickets_estado_keyset_idx
+    on public.tickets (estado, created_at desc, id desc);
+
+-- Filtro por vendedor (con o sin estado)
+create index if not exists tickets_vendedor_keyset_idx
+    on public.tickets (codigo_vendedor, estado, created_at desc, id desc);
+
+create index if not exists tickets_vendedor_fecha_idx
+    on public.tickets (codigo_vendedor, created_at desc, id desc);
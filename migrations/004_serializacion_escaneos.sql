@@ -0,0 +1,49 @@
+-- migrations/004_serializacion_escaneos.sql
+-- Escaneos de seriales confirmados en las estaciones (services/serializacion).
+-- La app inserta en micro-lotes con ON CONFLICT DO NOTHING: reenviar un lote
+-- tras un corte de red es seguro. Un trigger marca el serial esperado como
+-- serializado, lo que a su vez mueve el contador del panel (migrations/002).
+
+create table if not exists public.serializacion_escaneos (
+    id            bigserial primary key,
+    numero_orden  text        not null,
+    serial        text        not null,
+    sku           text,
+    usuario       text,
+    escaneado_at  timestamptz not null,
+    recibido_at   timestamptz not null default now(),
+    unique (numero_orden, serial)
+);
+
+-- Carga del índice en memoria: un SELECT por orden
+create index if not exists serializacion_orden_serial_idx
+    on public.serializacion (numero_orden, serial);
+
+create or replace function public.marcar_serial_escaneado()
+returns trigger
+language plpgsql
+as $$
+begin
+    update public.serializacion
+       set estado = 'serializado'
+     where numero_orden = new.numero_orden
+       and serial       = new.serial
+       and estado      <> 'serializado';
+    return new;
+end;
+$$;
+
+drop trigger if exists serializacion_escaneos_marcar on public.serializacion_escaneos;
+create trigger serializacion_escaneos_marcar
+    after insert on public.serializacion_escaneos
+    for each row execute function public.marcar_serial_escaneado();
+
+alter table public.serializacion_escaneos enable row level security;
+
+drop policy if exists serializacion_escaneos_insert on public.serializacion_escaneos;
+create policy serializacion_escaneos_insert
+    on public.serializacion_escaneos for insert to authenticated with check (true);
+
+drop policy if exists serializacion_escaneos_select on public.serializacion_escaneos;
+create policy serializacion_escaneos_select
+    on public.serializacion_escaneos for select to authenticated using (true);
@@ -0,0 +1,87 @@
+-- migrations/005_alistamiento_olas.sql
+-- Planificador de olas (services/alistamiento).
+--   • ubicaciones: posición de cada SKU en bodega ("PASILLO-MODULO-NIVEL").
+--   • alistamiento: una fila por orden, identificada por (marketplace,
+--     codigo_vendedor, numero_orden); el mismo número de dos vendedores o
+--     canales son dos órdenes distintas.
+--   • ordenes_por_alistar: líneas de órdenes que aún no tienen ola, con la
+--     ubicación del SKU resuelta en la base (una sola lectura paginada) y la
+--     clave completa de la línea para paginar con un orden total.
+
+create table if not exists public.ubicaciones (
+    sku        text primary key,
+    ubicacion  text not null
+);
+
+-- lectura para cualquier sesión; sólo la service role (carga de ubicaciones)
+-- escribe. TRUNCATE no pasa por RLS: se revoca junto con las escrituras.
+alter table public.ubicaciones enable row level security;
+
+drop policy if exists ubicaciones_select on public.ubicaciones;
+create policy ubicaciones_select
+    on public.ubicaciones for select to authenticated using (true);
+
+revoke insert, update, delete, truncate on public.ubicaciones from anon, authenticated;
+
+alter table public.alistamiento
+    add column if not exists ola             integer,
+    add column if not exists marketplace     text,
+    add column if not exists codigo_vendedor text;
+
+-- filas anteriores (sólo numero_orden): se completan cuando el número es de
+-- una sola orden; las ambiguas quedan sin clave y se listan para asignarlas a mano
+do $$
+declare
+    ambiguas bigint;
+    muestra  text;
+begin
+    update public.alistamiento a
+       set marketplace = o.marketplace,
+           codigo_vendedor = o.codigo_vendedor
+      from (
+            select numero_orden, min(marketplace) as marketplace, min(codigo_vendedor) as codigo_vendedor
+              from public.ordenes
+             group by numero_orden
+            having count(distinct (marketplace, codigo_vendedor)) = 1
+           ) o
+     where o.numero_orden = a.numero_orden
+       and a.marketplace is null
+       and a.codigo_vendedor is null;
+
+    select count(*), string_agg(distinct a.numero_orden, ', ')
+      into ambiguas, muestra
+      from public.alistamiento a
+     where a.marketplace is null and a.codigo_vendedor is null
+       and (select count(distinct (o.marketplace, o.codigo_vendedor)) from public.ordenes o
+             where o.numero_orden = a.numero_orden) > 1;
+
+    if ambiguas > 0 then
+        raise notice '% filas de alistamiento con un numero_orden de varios vendedores o canales; completar marketplace y codigo_vendedor a mano', ambiguas
+              using detail = 'Órdenes: ' || muestra;
+    end if;
+end;
+$$;
+
+drop index if exists public.alistamiento_numero_orden_idx;
+create index if not exists alistamiento_orden_idx
+    on public.alistamiento (numero_orden, codigo_vendedor, marketplace);
+
+create or replace view public.ordenes_por_alistar
+with (security_invoker = true) as
+select o.numero_orden,
+       o.sku,
+       o.cantidad,
+       u.ubicacion,
+       o.marketplace,
+       o.codigo_vendedor
+  from public.ordenes o
+  left join public.ubicaciones u on u.sku = o.sku
+ where not exists (
+        select 1
+          from public.alistamiento a
+         where a.numero_orden = o.numero_orden
+           and a.codigo_vendedor is not distinct from o.codigo_vendedor
+           and a.marketplace is not distinct from o.marketplace
+       );
+
+grant select on public.ordenes_por_alistar to authenticated;
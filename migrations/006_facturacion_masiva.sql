@@ -0,0 +1,121 @@
+-- migrations/006_facturacion_masiva.sql
+-- Facturación masiva (services/facturacion).
+--   • productos: descripción y precio unitario por SKU.
+--   • facturas: columnas del documento emitido. Una factura por orden:
+--     (marketplace, codigo_vendedor, numero_orden) es única, así re-correr
+--     un cierre no factura dos veces la misma orden.
+--   • reservar_numeros_factura(n): reserva un rango consecutivo en una sola
+--     llamada (hasta 10000; la app pide por tramos) y sólo para los roles
+--     'facturacion' y 'admin'; la app numera localmente dentro del rango.
+
+create table if not exists public.productos (
+    sku          text primary key,
+    descripcion  text,
+    precio       numeric(14, 2) not null default 0
+);
+
+-- precios: lectura para cualquier sesión, escritura sólo con la service role
+-- (TRUNCATE no pasa por RLS: se revoca junto con las escrituras)
+alter table public.productos enable row level security;
+
+drop policy if exists productos_select on public.productos;
+create policy productos_select
+    on public.productos for select to authenticated using (true);
+
+revoke insert, update, delete, truncate on public.productos from anon, authenticated;
+
+alter table public.facturas
+    add column if not exists numero_factura  text,
+    add column if not exists marketplace     text,
+    add column if not exists codigo_vendedor text,
+    add column if not exists numero_orden    text,
+    add column if not exists fecha           date,
+    add column if not exists subtotal        numeric(14, 2),
+    add column if not exists iva             numeric(14, 2),
+    add column if not exists total           numeric(14, 2),
+    add column if not exists archivo_xml     text,
+    add column if not exists archivo_pdf     text;
+
+create unique index if not exists facturas_numero_factura_key
+    on public.facturas (numero_factura);
+
+-- facturas anteriores sin canal ni vendedor: se completan cuando el número
+-- de orden es de una sola orden. Si después de eso una orden tiene dos
+-- facturas, la migración falla y las lista (no borra nada).
+do $$
+declare
+    repetidas bigint;
+    muestra   text;
+begin
+    update public.facturas f
+       set marketplace = o.marketplace,
+           codigo_vendedor = o.codigo_vendedor
+      from (
+            select numero_orden, min(marketplace) as marketplace, min(codigo_vendedor) as codigo_vendedor
+              from public.ordenes
+             group by numero_orden
+            having count(distinct (marketplace, codigo_vendedor)) = 1
+           ) o
+     where o.numero_orden = f.numero_orden
+       and f.marketplace is null
+       and f.codigo_vendedor is null;
+
+    select count(*), string_agg(format('%s/%s/%s ×%s', marketplace, codigo_vendedor, numero_orden, n), ', ')
+      into repetidas, muestra
+      from (
+            select marketplace, codigo_vendedor, numero_orden, count(*) as n
+              from public.facturas
+             where numero_orden is not null
+             group by marketplace, codigo_vendedor, numero_orden
+            having count(*) > 1
+             order by count(*) desc
+             limit 20
+           ) r;
+
+    if repetidas > 0 then
+        raise exception 'facturas tiene órdenes facturadas más de una vez; depurar antes de crear el índice único'
+              using detail = 'Primeras: ' || muestra;
+    end if;
+end;
+$$;
+
+create unique index if not exists facturas_orden_key
+    on public.facturas (marketplace, codigo_vendedor, numero_orden) nulls not distinct
+ where numero_orden is not null;
+
+create index if not exists ordenes_numero_orden_idx
+    on public.ordenes (numero_orden);
+
+create sequence if not exists public.facturas_consecutivo;
+
+create or replace function public.reservar_numeros_factura(cantidad integer)
+returns bigint
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    ultimo bigint;
+begin
+    -- sólo quien emite facturas (rol 'facturacion' o 'admin') consume consecutivos
+    if not exists (
+        select 1 from public.usuarios u
+         where u.auth_uid = auth.uid() and u.rol in ('facturacion', 'admin')
+    ) then
+        raise exception 'reservar_numeros_factura requiere el rol facturacion'
+              using errcode = '42501';
+    end if;
+    -- tope por llamada: un error o un abuso no deja huecos de millones de números
+    if cantidad < 1 or cantidad > 10000 then
+        raise exception 'cantidad debe estar entre 1 y 10000 (recibido %)', cantidad;
+    end if;
+    -- setval/nextval son atómicos: dos cierres simultáneos no se pisan
+    perform pg_advisory_xact_lock(hashtext('reservar_numeros_factura'));
+    ultimo := nextval('facturas_consecutivo');
+    perform setval('facturas_consecutivo', ultimo + cantidad - 1);
+    return ultimo;
+end;
+$$;
+
+revoke execute on function public.reservar_numeros_factura(integer) from public, anon;
+grant execute on function public.reservar_numeros_factura(integer) to authenticated;
@@ -0,0 +1,43 @@
+-- migrations/007_perfil_usuario.sql
+-- Perfil del usuario autenticado en un solo round-trip (auth.session.get_profile).
+-- Obtiene la fila de public.usuarios o la crea en la primera sesión, de forma
+-- atómica (INSERT ... ON CONFLICT), y devuelve sólo las columnas que usa la app.
+
+create unique index if not exists usuarios_auth_uid_key
+    on public.usuarios (auth_uid);
+
+create or replace function public.perfil_usuario()
+returns json
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    uid    uuid := auth.uid();
+    correo text := lower(coalesce(auth.jwt() ->> 'email', ''));
+    perfil json;
+begin
+    if uid is null then
+        raise exception 'perfil_usuario requiere una sesión autenticada';
+    end if;
+
+    insert into public.usuarios (auth_uid, email, nombre_usuario, codigo_vendedor, rol)
+    values (uid, correo, split_part(correo, '@', 1), '', 'vendedor')
+    on conflict (auth_uid) do nothing;
+
+    select json_build_object(
+               'auth_uid',        u.auth_uid,
+               'email',           u.email,
+               'nombre_usuario',  u.nombre_usuario,
+               'codigo_vendedor', u.codigo_vendedor,
+               'rol',             u.rol
+           )
+      into perfil
+      from public.usuarios u
+     where u.auth_uid = uid;
+
+    return perfil;
+end;
+$$;
+
+grant execute on function public.perfil_usuario() to authenticated;
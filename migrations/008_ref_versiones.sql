@@ -0,0 +1,52 @@
+-- migrations/008_ref_versiones.sql
+-- Sellos de versión para la caché de referencias (services/referencias).
+-- Cada INSERT / UPDATE / DELETE en una tabla de referencia incrementa su
+-- versión; la app lee todos los sellos en una consulta y descarta sólo las
+-- tablas que cambiaron. También se emite NOTIFY por si hay listeners.
+-- Los códigos de vendedor no tienen tabla propia: salen de
+-- usuarios.codigo_vendedor (RPC codigos_vendedor, migrations/012).
+
+create table if not exists public.ref_versiones (
+    tabla    text primary key,
+    version  bigint not null default 1
+);
+
+insert into public.ref_versiones (tabla)
+values ('usuarios'), ('productos'), ('ubicaciones')
+on conflict (tabla) do nothing;
+
+create or replace function public.bump_ref_version()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    update public.ref_versiones
+       set version = version + 1
+     where tabla = tg_table_name;
+    perform pg_notify('colibri_referencias', tg_table_name);
+    return null;
+end;
+$$;
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['usuarios', 'productos', 'ubicaciones'] loop
+        execute format('drop trigger if exists %I on public.%I', t || '_ref_version', t);
+        execute format(
+            'create trigger %I after insert or update or delete on public.%I '
+            'for each statement execute function public.bump_ref_version()',
+            t || '_ref_version', t
+        );
+    end loop;
+end;
+$$;
+
+alter table public.ref_versiones enable row level security;
+
+drop policy if exists ref_versiones_select on public.ref_versiones;
+create policy ref_versiones_select
+    on public.ref_versiones for select to authenticated using (true);
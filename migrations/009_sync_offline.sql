@@ -0,0 +1,91 @@
+-- migrations/009_sync_offline.sql
+-- Sincronización de las estaciones offline-first (services/local_store).
+--   • alistamiento.version: la asigna la base (1 al insertar, +1 en cada
+--     update, también los que no vienen de la app). mutacion_id guarda la
+--     última mutación aplicada para reconocer reenvíos.
+--   • sync_alistamiento(p_filas): aplica un lote de mutaciones versionadas.
+--     Cada fila trae la orden (marketplace, codigo_vendedor, numero_orden,
+--     ver migrations/005), ola, estado, version_base y mutacion_id;
+--     responde una fila por mutación con estado 'aplicada' o 'conflicto'
+--     y la fila vigente del servidor (gana el servidor).
+
+alter table public.alistamiento
+    add column if not exists version        bigint      not null default 1,
+    add column if not exists mutacion_id    text,
+    add column if not exists actualizado_at timestamptz not null default now();
+
+create or replace function public.alistamiento_version()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.version        := old.version + 1;
+    new.actualizado_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists alistamiento_version on public.alistamiento;
+create trigger alistamiento_version
+    before update on public.alistamiento
+    for each row execute function public.alistamiento_version();
+
+create or replace function public.sync_alistamiento(p_filas jsonb)
+returns table (mutacion_id text, clave text, estado text, fila jsonb)
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+    f      jsonb;
+    k      text;                      -- clave de la orden, para locks y respuestas
+    actual public.alistamiento%rowtype;
+begin
+    for f in select * from jsonb_array_elements(p_filas)
+    loop
+        k := concat_ws('|', f->>'marketplace', f->>'codigo_vendedor', f->>'numero_orden');
+        -- dos estaciones con la misma orden se serializan aquí
+        perform pg_advisory_xact_lock(hashtext('alistamiento:' || k));
+
+        select * into actual
+          from public.alistamiento a
+         where a.numero_orden = f->>'numero_orden'
+           and a.codigo_vendedor is not distinct from f->>'codigo_vendedor'
+           and a.marketplace is not distinct from f->>'marketplace'
+         limit 1;
+
+        if not found then
+            if f->>'version_base' is not null then
+                -- la estación editaba una fila que ya no existe en el servidor
+                return query select f->>'mutacion_id', k, 'conflicto'::text, null::jsonb;
+                continue;
+            end if;
+            insert into public.alistamiento (marketplace, codigo_vendedor, numero_orden, ola, estado, mutacion_id)
+            values (f->>'marketplace', f->>'codigo_vendedor', f->>'numero_orden', (f->>'ola')::integer,
+                    f->>'estado', f->>'mutacion_id')
+            returning * into actual;
+            return query select f->>'mutacion_id', k, 'aplicada'::text, to_jsonb(actual);
+
+        elsif actual.mutacion_id = f->>'mutacion_id' then
+            -- reenvío de un lote cuya respuesta se perdió
+            return query select f->>'mutacion_id', k, 'aplicada'::text, to_jsonb(actual);
+
+        elsif (f->>'version_base')::bigint = actual.version then
+            update public.alistamiento a
+               set ola         = coalesce((f->>'ola')::integer, a.ola),
+                   estado      = coalesce(f->>'estado', a.estado),
+                   mutacion_id = f->>'mutacion_id'
+             where a.numero_orden = actual.numero_orden
+               and a.codigo_vendedor is not distinct from actual.codigo_vendedor
+               and a.marketplace is not distinct from actual.marketplace
+            returning * into actual;
+            return query select f->>'mutacion_id', k, 'aplicada'::text, to_jsonb(actual);
+
+        else
+            return query select f->>'mutacion_id', k, 'conflicto'::text, to_jsonb(actual);
+        end if;
+    end loop;
+end;
+$$;
+
+grant execute on function public.sync_alistamiento(jsonb) to authenticated;
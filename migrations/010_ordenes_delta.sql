@@ -0,0 +1,40 @@
+-- migrations/010_ordenes_delta.sql
+-- Cargas incrementales de órdenes (services/ingesta + services/staging).
+--   • Una línea de orden se identifica por (marketplace, codigo_vendedor,
+--     numero_orden, sku): las re-subidas hacen upsert sobre esa clave y sólo
+--     envían filas nuevas o cambiadas. El vendedor y el canal son parte de
+--     la clave: la carga de un vendedor nunca pisa la línea de otro que
+--     tenga el mismo número de orden y SKU.
+--   • Antes cada re-subida insertaba el archivo completo otra vez. Esta
+--     migración no borra nada: si quedan líneas repetidas para la clave,
+--     falla y las lista para depurarlas a mano antes de volver a correrla.
+
+do $$
+declare
+    repetidas bigint;
+    muestra   text;
+begin
+    select count(*), string_agg(format('%s/%s/%s/%s ×%s', marketplace, codigo_vendedor, numero_orden, sku, n), ', ')
+      into repetidas, muestra
+      from (
+            select marketplace, codigo_vendedor, numero_orden, sku, count(*) as n
+              from public.ordenes
+             group by marketplace, codigo_vendedor, numero_orden, sku
+            having count(*) > 1
+             order by count(*) desc
+             limit 20
+           ) r;
+
+    if repetidas > 0 then
+        raise exception 'ordenes tiene líneas repetidas para (marketplace, codigo_vendedor, numero_orden, sku); depurar antes de crear el índice único'
+              using detail = 'Primeras: ' || muestra;
+    end if;
+end;
+$$;
+
+-- nulls not distinct: una línea sin canal o sin vendedor también es única
+create unique index if not exists ordenes_linea_uk
+    on public.ordenes (marketplace, codigo_vendedor, numero_orden, sku) nulls not distinct;
+
+-- el upsert actualiza las filas cambiadas: además de INSERT necesita UPDATE
+grant insert, update on public.ordenes to authenticated;
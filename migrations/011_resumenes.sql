@@ -0,0 +1,302 @@
+-- migrations/011_resumenes.sql
+-- Resúmenes por vendedor y por etapa mantenidos de forma incremental
+-- (services/reportes.py). El panel y los reportes leen sólo estas tablas,
+-- nunca ``ordenes`` ni las tablas de etapa completas.
+--   • resumen_vendedor: líneas y unidades de ``ordenes`` por vendedor.
+--   • resumen_etapa: filas de cada etapa del flujo (tickets → alistamiento →
+--     serializacion → facturas) por vendedor y estado.
+-- Los triggers son POR SENTENCIA con tablas de transición: cada upsert de la
+-- ingesta (1000 filas) aplica UN delta agregado, una fila por vendedor /
+-- estado, en lugar de mil actualizaciones sobre la misma fila del resumen.
+-- El vendedor de una fila de etapa es el de la fila (tickets) o el de su
+-- orden al momento de escribirla. recalcular_resumenes() reconstruye todo
+-- desde cero: carga inicial (al final de esta migración) y corrección
+-- periódica si alguna orden cambia de vendedor después.
+
+create table if not exists public.resumen_vendedor (
+    codigo_vendedor  text        primary key,          -- '' = sin vendedor
+    lineas           bigint      not null default 0,
+    unidades         bigint      not null default 0,
+    actualizado_at   timestamptz not null default now()
+);
+
+create table if not exists public.resumen_etapa (
+    etapa            text        not null,
+    codigo_vendedor  text        not null,
+    estado           text        not null,
+    n                bigint      not null default 0,
+    actualizado_at   timestamptz not null default now(),
+    primary key (etapa, codigo_vendedor, estado)
+);
+
+-- 1. Órdenes → resumen_vendedor
+--    Las claves se aplican en orden fijo: dos cargas simultáneas bloquean
+--    las filas del resumen en el mismo orden y no se interbloquean.
+create or replace function public.resumen_ordenes_delta()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into resumen_vendedor as r (codigo_vendedor, lineas, unidades)
+        select coalesce(codigo_vendedor, ''), count(*), coalesce(sum(cantidad), 0)
+          from nuevas
+         group by 1
+         order by 1
+        on conflict (codigo_vendedor) do update
+           set lineas = r.lineas + excluded.lineas,
+               unidades = r.unidades + excluded.unidades,
+               actualizado_at = now();
+    end if;
+    if tg_op in ('UPDATE', 'DELETE') then
+        insert into resumen_vendedor as r (codigo_vendedor, lineas, unidades)
+        select coalesce(codigo_vendedor, ''), -count(*), -coalesce(sum(cantidad), 0)
+          from viejas
+         group by 1
+         order by 1
+        on conflict (codigo_vendedor) do update
+           set lineas = r.lineas + excluded.lineas,
+               unidades = r.unidades + excluded.unidades,
+               actualizado_at = now();
+    end if;
+    return null;
+end;
+$$;
+
+-- 2. Etapas → resumen_etapa (misma función para las cuatro tablas)
+create or replace function public.resumen_etapa_delta()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into resumen_etapa as r (etapa, codigo_vendedor, estado, n)
+        select tg_table_name, v.codigo_vendedor, coalesce(t.estado, ''), count(*)
+          from nuevas t
+          cross join lateral (
+                select coalesce(
+                           to_jsonb(t) ->> 'codigo_vendedor',
+                           (select o.codigo_vendedor from ordenes o where o.numero_orden = t.numero_orden limit 1),
+                           ''
+                       ) as codigo_vendedor
+               ) v
+         group by 2, 3
+         order by 2, 3
+        on conflict (etapa, codigo_vendedor, estado) do update
+           set n = r.n + excluded.n,
+               actualizado_at = now();
+    end if;
+    if tg_op in ('UPDATE', 'DELETE') then
+        insert into resumen_etapa as r (etapa, codigo_vendedor, estado, n)
+        select tg_table_name, v.codigo_vendedor, coalesce(t.estado, ''), -count(*)
+          from viejas t
+          cross join lateral (
+                select coalesce(
+                           to_jsonb(t) ->> 'codigo_vendedor',
+                           (select o.codigo_vendedor from ordenes o where o.numero_orden = t.numero_orden limit 1),
+                           ''
+                       ) as codigo_vendedor
+               ) v
+         group by 2, 3
+         order by 2, 3
+        on conflict (etapa, codigo_vendedor, estado) do update
+           set n = r.n + excluded.n,
+               actualizado_at = now();
+    end if;
+    return null;
+end;
+$$;
+
+-- Postgres no admite tablas de transición en un trigger con varios eventos:
+-- uno por evento, todos con la misma función.
+do $$
+declare
+    t   text;
+    fn  text;
+begin
+    foreach t in array array['ordenes', 'tickets', 'alistamiento', 'serializacion', 'facturas'] loop
+        fn := case when t = 'ordenes' then 'resumen_ordenes_delta' else 'resumen_etapa_delta' end;
+        execute format('drop trigger if exists trg_resumen_ins on public.%I', t);
+        execute format('drop trigger if exists trg_resumen_upd on public.%I', t);
+        execute format('drop trigger if exists trg_resumen_del on public.%I', t);
+        execute format(
+            'create trigger trg_resumen_ins after insert on public.%I
+             referencing new table as nuevas
+             for each statement execute function public.%I()', t, fn
+        );
+        execute format(
+            'create trigger trg_resumen_upd after update on public.%I
+             referencing old table as viejas new table as nuevas
+             for each statement execute function public.%I()', t, fn
+        );
+        execute format(
+            'create trigger trg_resumen_del after delete on public.%I
+             referencing old table as viejas
+             for each statement execute function public.%I()', t, fn
+        );
+    end loop;
+end;
+$$;
+
+-- 3. Reconstrucción completa (migración, pg_cron nocturno). No expuesta a la app.
+create or replace function public.recalcular_resumenes()
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    t text;
+begin
+    -- sin escrituras en las tablas origen mientras se reconstruye
+    lock table ordenes, tickets, alistamiento, serializacion, facturas in share mode;
+    lock table resumen_vendedor, resumen_etapa in exclusive mode;
+
+    delete from resumen_vendedor;
+    insert into resumen_vendedor (codigo_vendedor, lineas, unidades)
+    select coalesce(codigo_vendedor, ''), count(*), coalesce(sum(cantidad), 0)
+      from ordenes
+     group by 1;
+
+    delete from resumen_etapa;
+    foreach t in array array['tickets', 'alistamiento', 'serializacion', 'facturas'] loop
+        execute format(
+            $q$insert into resumen_etapa (etapa, codigo_vendedor, estado, n)
+               select %L, v.codigo_vendedor, coalesce(t.estado, ''), count(*)
+                 from public.%I t
+                 cross join lateral (
+                       select coalesce(
+                                  to_jsonb(t) ->> 'codigo_vendedor',
+                                  (select o.codigo_vendedor from ordenes o where o.numero_orden = t.numero_orden limit 1),
+                                  ''
+                              ) as codigo_vendedor
+                      ) v
+                group by 2, 3$q$,
+            t, t
+        );
+    end loop;
+end;
+$$;
+
+revoke execute on function public.recalcular_resumenes() from public, anon, authenticated;
+
+-- 4. API de reportes: leen sólo los resúmenes
+--    Alcance de la sesión: ``admin`` ve todos los vendedores; cualquier otro
+--    rol, sólo su propio código (nada si no tiene). Las funciones son
+--    SECURITY DEFINER y no pasan por RLS: el filtro va dentro de cada una.
+create or replace function public.reporte_alcance(out todos boolean, out codigo text)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select u.rol = 'admin', nullif(btrim(u.codigo_vendedor), '')
+      from usuarios u
+     where u.auth_uid = auth.uid();
+$$;
+
+create or replace function public.reporte_vendedores()
+returns table (
+    codigo_vendedor          text,
+    lineas                   bigint,
+    unidades                 bigint,
+    tickets_pendientes       bigint,
+    alistamiento_en_proceso  bigint,
+    serializacion_pendiente  bigint,
+    facturas_pendientes      bigint
+)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    with etapas as (
+        select codigo_vendedor,
+               sum(n) filter (where etapa = 'tickets'       and estado = 'pendiente')  as tickets_pendientes,
+               sum(n) filter (where etapa = 'alistamiento'  and estado = 'en_proceso') as alistamiento_en_proceso,
+               sum(n) filter (where etapa = 'serializacion' and estado = 'pendiente')  as serializacion_pendiente,
+               sum(n) filter (where etapa = 'facturas'      and estado = 'pendiente')  as facturas_pendientes
+          from resumen_etapa
+         group by codigo_vendedor
+    )
+    select coalesce(v.codigo_vendedor, e.codigo_vendedor),
+           coalesce(v.lineas, 0),
+           coalesce(v.unidades, 0),
+           coalesce(e.tickets_pendientes, 0)::bigint,
+           coalesce(e.alistamiento_en_proceso, 0)::bigint,
+           coalesce(e.serializacion_pendiente, 0)::bigint,
+           coalesce(e.facturas_pendientes, 0)::bigint
+      from resumen_vendedor v
+      full join etapas e on e.codigo_vendedor = v.codigo_vendedor
+     cross join reporte_alcance() a
+     where (coalesce(v.lineas, 0) <> 0 or e.codigo_vendedor is not null)
+       and (a.todos or coalesce(v.codigo_vendedor, e.codigo_vendedor) = a.codigo)
+     order by 2 desc, 1;
+$$;
+
+create or replace function public.reporte_etapas(p_codigo_vendedor text default null)
+returns table (etapa text, estado text, n bigint)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select r.etapa, r.estado, sum(r.n)::bigint
+      from resumen_etapa r
+     cross join reporte_alcance() a
+     where (a.todos or r.codigo_vendedor = a.codigo)
+       and (p_codigo_vendedor is null or r.codigo_vendedor = p_codigo_vendedor)
+     group by r.etapa, r.estado
+    having sum(r.n) <> 0
+     order by r.etapa, r.estado;
+$$;
+
+revoke execute on function public.reporte_alcance() from public, anon;
+revoke execute on function public.reporte_vendedores() from public, anon;
+revoke execute on function public.reporte_etapas(text) from public, anon;
+grant execute on function public.reporte_alcance() to authenticated;
+grant execute on function public.reporte_vendedores() to authenticated;
+grant execute on function public.reporte_etapas(text) to authenticated;
+
+-- 5. El panel (migrations/001) también lee de los resúmenes
+create or replace function public.dashboard_resumen()
+returns table (
+    ordenes_totales          bigint,
+    tickets_pendientes       bigint,
+    alistamiento_en_proceso  bigint,
+    serializacion_pendiente  bigint,
+    facturas_pendientes      bigint,
+    instantanea              text           -- para descartar eventos ya contados (migrations/002)
+)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select
+        (select coalesce(sum(lineas), 0)::bigint from resumen_vendedor),
+        (select coalesce(sum(n), 0)::bigint from resumen_etapa where etapa = 'tickets'       and estado = 'pendiente'),
+        (select coalesce(sum(n), 0)::bigint from resumen_etapa where etapa = 'alistamiento'  and estado = 'en_proceso'),
+        (select coalesce(sum(n), 0)::bigint from resumen_etapa where etapa = 'serializacion' and estado = 'pendiente'),
+        (select coalesce(sum(n), 0)::bigint from resumen_etapa where etapa = 'facturas'      and estado = 'pendiente'),
+        pg_current_snapshot()::text;
+$$;
+
+alter table public.resumen_vendedor enable row level security;
+alter table public.resumen_etapa    enable row level security;
+
+drop policy if exists resumen_vendedor_select on public.resumen_vendedor;
+create policy resumen_vendedor_select
+    on public.resumen_vendedor for select to authenticated
+    using (exists (select 1 from public.reporte_alcance() a where a.todos or a.codigo = codigo_vendedor));
+
+drop policy if exists resumen_etapa_select on public.resumen_etapa;
+create policy resumen_etapa_select
+    on public.resumen_etapa for select to authenticated
+    using (exists (select 1 from public.reporte_alcance() a where a.todos or a.codigo = codigo_vendedor));
+
+select public.recalcular_resumenes();
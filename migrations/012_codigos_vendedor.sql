@@ -0,0 +1,22 @@
+-- migrations/012_codigos_vendedor.sql
+-- Catálogo de códigos de vendedor para validar la ingesta (services/referencias).
+-- La regla sólo necesita saber qué códigos están asignados a algún usuario:
+-- la RPC devuelve esos códigos y nada más (ni correos ni roles), igual para
+-- cualquier sesión, sin depender de las políticas RLS de public.usuarios.
+-- La caché de la app se invalida con el sello de 'usuarios' (migrations/008).
+
+create or replace function public.codigos_vendedor()
+returns table (codigo_vendedor text)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select distinct btrim(u.codigo_vendedor)
+      from public.usuarios u
+     where coalesce(btrim(u.codigo_vendedor), '') <> ''
+     order by 1;
+$$;
+
+revoke execute on function public.codigos_vendedor() from public;
+grant execute on function public.codigos_vendedor() to authenticated;
@@ -0,0 +1,54 @@
+-- migrations/013_rol_facturacion.sql
+-- Rol 'facturacion': abre /facturas (components/routes.py) y reserva
+-- consecutivos (reservar_numeros_factura, migrations/006). Antes cualquier
+-- sesión podía facturar; ahora sólo 'facturacion' y 'admin'.
+--
+-- Después de desplegar, un admin asigna el rol a quien factura:
+--     select public.asignar_rol('persona@empresa.com', 'facturacion');
+-- Hasta entonces sólo los admin facturan. El rol se lee al iniciar sesión:
+-- quien lo recibe debe volver a entrar para ver el módulo.
+--
+--   • asignar_rol(correo, rol): sólo para admin; roles válidos 'vendedor',
+--     'facturacion' y 'admin'. Devuelve el perfil actualizado.
+
+create or replace function public.asignar_rol(p_email text, p_rol text)
+returns json
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    perfil json;
+begin
+    if not exists (
+        select 1 from public.usuarios u
+         where u.auth_uid = auth.uid() and u.rol = 'admin'
+    ) then
+        raise exception 'asignar_rol requiere el rol admin'
+              using errcode = '42501';
+    end if;
+    if p_rol is null or p_rol not in ('vendedor', 'facturacion', 'admin') then
+        raise exception 'rol desconocido: %', p_rol;
+    end if;
+
+    update public.usuarios u
+       set rol = p_rol
+     where lower(u.email) = lower(btrim(p_email))
+    returning json_build_object(
+                  'auth_uid',        u.auth_uid,
+                  'email',           u.email,
+                  'nombre_usuario',  u.nombre_usuario,
+                  'codigo_vendedor', u.codigo_vendedor,
+                  'rol',             u.rol
+              )
+         into perfil;
+
+    if perfil is null then
+        raise exception 'no hay un usuario con el correo %', p_email;
+    end if;
+    return perfil;
+end;
+$$;
+
+revoke execute on function public.asignar_rol(text, text) from public, anon;
+grant execute on function public.asignar_rol(text, text) to authenticated;
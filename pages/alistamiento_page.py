@@ -1,9 +1,188 @@
-import logging, flet as ft
+# pages/alistamiento_page.py
+import asyncio
+import logging
+
+import flet as ft
+
+from components.virtual_grid import ArrowSource, VirtualGrid
+from config import get_client
+from services import dashboard
+from services.alistamiento import MAX_LINEAS, MAX_ORDENES, TABLA_ALISTAMIENTO, confirmar_ola
+from services.async_repo import run_blocking
+from services.local_store import get_local_store
+from services.trabajos import CORRIENDO, LISTO, TERMINADOS, get_planificador, usuario_sesion
+from services.trabajos_tipos import leer_plan
+from utils.alerts import show_snackbar
+from utils.loading import busy, update_if_mounted
+
 logger = logging.getLogger(__name__)
 
+COLUMNAS_PICKING = ["secuencia", "ubicacion", "sku", "cantidad", "ordenes"]
+
+
 def alistamiento_content(page: ft.Page) -> ft.Control:
+    """
+    Planificación de olas: carga las líneas abiertas, agrupa órdenes por
+    SKU y zona y muestra la lista de picking de cada ola en orden de recorrido.
+    Lecturas y confirmaciones pasan por el almacén local de la estación.
+    El plan se calcula como trabajo en segundo plano (services/trabajos.py).
+    """
     logger.info("Generando contenido Alistamiento")
+
+    store = get_local_store()
+    uid = (page.session.get("user_data") or {}).get("auth_uid")
+    if uid:
+        store.registrar(uid, get_client(page))      # reanuda lo que dejó pendiente
+    planificador = get_planificador()
+    state = {"plan": None}
+
+    max_ordenes = ft.TextField(label="Órdenes por carro", value=str(MAX_ORDENES), width=150)
+    max_lineas  = ft.TextField(label="Líneas por carro", value=str(MAX_LINEAS), width=150)
+    btn_plan    = ft.ElevatedButton("Planificar olas", icon=ft.Icons.ROUTE)
+    spinner     = ft.ProgressRing(width=20, height=20, visible=False)
+    status      = ft.Text("", size=12, color=ft.Colors.BLUE_GREY_600)
+    sync_text   = ft.Text("", size=12, color=ft.Colors.BLUE_GREY_600)
+
+    ola_select  = ft.Dropdown(label="Ola", width=160, disabled=True)
+    ola_resumen = ft.Text("")
+    btn_confirm = ft.OutlinedButton("Confirmar ola", icon=ft.Icons.CHECK, disabled=True)
+    grid = VirtualGrid(
+        ArrowSource.from_records([], columns=COLUMNAS_PICKING),
+        visible_rows=15,
+        column_widths={"secuencia": 90, "cantidad": 90, "ordenes": 90},
+    )
+
+    def _entero(field: ft.TextField, default: int) -> int:
+        try:
+            return max(int(field.value), 1)
+        except (TypeError, ValueError):
+            return default
+
+    def show_ola(ola: int):
+        plan = state["plan"]
+        picking = plan["picking"]
+        grid.set_source(ArrowSource.from_pandas(picking.loc[picking["ola"] == ola, COLUMNAS_PICKING]))
+        r = plan["resumen"].set_index("ola").loc[ola]
+        ola_resumen.value = (
+            f"{r['ordenes']:.0f} órdenes  ·  {r['lineas']:.0f} líneas  ·  {r['unidades']:,.0f} unidades  ·  "
+            f"{r['pasillos']:.0f} pasillos  ·  {r['consolidacion']:.2f} líneas por parada"
+        )
+        ola_resumen.update()
+
+    def refresh_sync():
+        pendientes = store.pendientes(TABLA_ALISTAMIENTO)
+        conflictos = sum(c["tabla"] == TABLA_ALISTAMIENTO for c in store.conflictos())
+        partes = []
+        if pendientes:
+            partes.append(f"{pendientes:,} órdenes por sincronizar")
+        if store.ultimo_error:
+            partes.append(f"⚠️ {store.ultimo_error}")
+        if conflictos:
+            partes.append(f"{conflictos} órdenes ya tomadas por otra estación (se conservó la del servidor)")
+        sync_text.value = "  ·  ".join(partes)
+
+    async def _esperar_plan(mo: int, ml: int) -> dict:
+        """Encola el trabajo ``olas`` y espera su resultado sin ocupar un hilo."""
+        loop = asyncio.get_running_loop()
+        listo: asyncio.Future = loop.create_future()
+
+        def resolver(t: dict):
+            if not listo.done():
+                listo.set_result(t)
+
+        def on_trabajo(t: dict):
+            if t["estado"] in TERMINADOS:
+                loop.call_soon_threadsafe(resolver, t)
+                return False
+            if t["estado"] == CORRIENDO and t["progreso"]:
+                status.value = f"{(t['progreso'].get('etapa') or 'planificando').capitalize()}…"
+                update_if_mounted(status)
+
+        trabajo_id = planificador.enviar(
+            "olas", {"max_ordenes": mo, "max_lineas": ml}, get_client(page), usuario=usuario_sesion(page),
+        )
+        planificador.suscribir(f"{page.session_id}:olas", on_trabajo, trabajo_id)
+        t = planificador.obtener(trabajo_id)
+        if t is not None and t["estado"] in TERMINADOS:      # terminó antes de suscribirse
+            resolver(t)
+        t = await listo
+        if t["estado"] != LISTO:
+            raise RuntimeError(t["error"] or t["estado"])
+        return await run_blocking(page, leer_plan, t["resultado"]["dir"])
+
+    async def on_plan(_):
+        mo, ml = _entero(max_ordenes, MAX_ORDENES), _entero(max_lineas, MAX_LINEAS)
+        try:
+            with busy(btn_plan, indicator=spinner):
+                plan = await _esperar_plan(mo, ml)
+        except asyncio.CancelledError:
+            return
+        except Exception as exc:
+            logger.warning("Error planificando olas: %s", exc)
+            status.value = "⚠️ No se pudo planificar"
+            update_if_mounted(status)
+            return
+
+        state["plan"] = plan
+        resumen = plan["resumen"]
+        refresh_sync()
+        if resumen.empty:
+            status.value = "No hay órdenes pendientes de alistar"
+            ola_select.options, ola_select.disabled, btn_confirm.disabled = [], True, True
+            update_if_mounted(status, sync_text, ola_select, btn_confirm)
+            return
+
+        status.value = (
+            f"{len(plan['asignacion']):,} órdenes en {len(resumen):,} olas  ·  "
+            f"{len(plan['picking']):,} paradas"
+        )
+        ola_select.options = [ft.dropdown.Option(str(o)) for o in resumen["ola"]]
+        ola_select.value = ola_select.options[0].key
+        ola_select.disabled = btn_confirm.disabled = False
+        update_if_mounted(status, sync_text, ola_select, btn_confirm)
+        show_ola(int(ola_select.value))
+
+    def on_select(e):
+        if state["plan"] is not None and ola_select.value:
+            show_ola(int(ola_select.value))
+
+    async def on_confirm(_):
+        plan, ola = state["plan"], int(ola_select.value)
+        try:
+            with busy(btn_confirm, ola_select, indicator=spinner):
+                n = await run_blocking(page, confirmar_ola, get_client(page), plan["asignacion"], ola, store, uid)
+        except asyncio.CancelledError:
+            return
+        except Exception as exc:
+            logger.warning("Error confirmando ola %s: %s", ola, exc)
+            show_snackbar(page, f"❌ No se pudo confirmar la ola {ola}", "error")
+            return
+
+        dashboard.invalidate()
+        ola_select.options = [o for o in ola_select.options if o.key != str(ola)]
+        show_snackbar(page, f"✅ Ola {ola} en alistamiento ({n} órdenes)", "success")
+        refresh_sync()
+        update_if_mounted(sync_text)
+        if ola_select.options:
+            ola_select.value = ola_select.options[0].key
+            ola_select.update()
+            show_ola(int(ola_select.value))
+        else:
+            ola_select.value, ola_select.disabled, btn_confirm.disabled = None, True, True
+            update_if_mounted(ola_select, btn_confirm)
+
+    btn_plan.on_click = on_plan
+    ola_select.on_change = on_select
+    btn_confirm.on_click = on_confirm
+
     return ft.Column(
-        spacing=25,
-        controls=[ft.Text("Panel de Alistamiento", size=24, weight=ft.FontWeight.BOLD)],
+        spacing=20,
+        controls=[
+            ft.Text("Panel de Alistamiento", size=24, weight=ft.FontWeight.BOLD),
+            ft.Row([max_ordenes, max_lineas, btn_plan, spinner], spacing=10),
+            status,
+            sync_text,
+            ft.Row([ola_select, btn_confirm, ola_resumen], spacing=15),
+            grid.control,
+        ],
     )
@@ -1,9 +1,124 @@
-import logging, flet as ft
+# pages/facturas_page.py
+import logging
+import re
+import time
+from datetime import datetime
+
+import flet as ft
+
+from config import FACTURAS_DIR, get_client
+from services.facturacion import PDF_DISPONIBLE
+from services.trabajos import CORRIENDO, EN_COLA, get_planificador, usuario_sesion
+from utils.alerts import show_snackbar
+
 logger = logging.getLogger(__name__)
 
+PROGRESS_INTERVAL = 0.25        # s entre refrescos de la barra de progreso
+
+
 def facturas_content(page: ft.Page) -> ft.Control:
+    """
+    Emisión masiva de facturas como trabajo en segundo plano
+    (services/trabajos.py): sigue aunque se cierre la pestaña.
+    """
     logger.info("Generando contenido Facturas")
+
+    planificador = get_planificador()
+    trabajo = {"id": None}
+    last_refresh = {"t": 0.0}
+
+    ordenes_field = ft.TextField(
+        label="Números de orden (uno por línea, o separados por coma)",
+        multiline=True,
+        min_lines=4,
+        max_lines=8,
+        width=520,
+    )
+    pdf_check = ft.Checkbox(
+        label="Generar PDF" if PDF_DISPONIBLE else "Generar PDF (requiere reportlab)",
+        value=PDF_DISPONIBLE,
+        disabled=not PDF_DISPONIBLE,
+    )
+    btn_emitir = ft.ElevatedButton("Emitir facturas", icon=ft.Icons.RECEIPT_LONG)
+    btn_cancel = ft.OutlinedButton(
+        "Cancelar", icon=ft.Icons.CANCEL, visible=False, on_click=lambda _: planificador.cancelar(trabajo["id"])
+    )
+    progress    = ft.ProgressBar(value=0, visible=False)
+    count_label = ft.Text("")
+    speed_label = ft.Text("", color=ft.Colors.BLUE_GREY_600)
+
+    def set_running(running: bool):
+        btn_emitir.disabled = running
+        ordenes_field.disabled = running
+        btn_cancel.visible = running
+        progress.visible = True
+        page.update(btn_emitir, ordenes_field, btn_cancel, progress)
+
+    # ── Progreso (llamado desde los hilos del planificador) -------------
+    def on_progress(stats: dict, force: bool = False):
+        now = time.monotonic()
+        if not force and now - last_refresh["t"] < PROGRESS_INTERVAL:
+            return
+        last_refresh["t"] = now
+
+        done, total = stats["done"], stats["total"]
+        progress.value = done / total if total else 0
+        count_label.value = f"{done:,} / {total:,} facturas"
+        speed_label.value = f"{stats['per_s']:,.0f} facturas/s  ·  {stats['seconds']:.1f} s"
+        page.update(progress, count_label, speed_label)
+
+    def on_trabajo(t: dict):
+        if t["estado"] == EN_COLA:
+            count_label.value = "En cola…"
+            page.update(count_label)
+        elif t["estado"] == CORRIENDO:
+            if t["progreso"]:
+                on_progress(t["progreso"])
+        else:
+            terminar(t)
+            return False
+
+    # ── Emisión (trabajo en segundo plano; el render va al pool de procesos)
+    def run_facturacion(numeros: list[str]):
+        set_running(True)
+        count_label.value, speed_label.value = "Cargando órdenes…", ""
+        page.update(count_label, speed_label)
+        out_dir = FACTURAS_DIR / datetime.now().strftime("%Y%m%d-%H%M%S")
+        trabajo["id"] = planificador.enviar(
+            "facturacion",
+            {"numeros": numeros, "out_dir": str(out_dir), "pdf": pdf_check.value},
+            get_client(page),
+            usuario=usuario_sesion(page),
+            titulo=f"Facturación de {len(numeros):,} órdenes",
+        )
+        planificador.suscribir(f"{page.session_id}:facturas", on_trabajo, trabajo["id"])
+
+    def terminar(t: dict):
+        result = t["resultado"] or {"success": False, "done": 0, "total": 0, "seconds": 0.0, "per_s": 0.0,
+                                    "error": t["error"] or "Facturación cancelada"}
+        on_progress(result, force=True)
+        set_running(False)
+        omitidas = f"  ·  {result['omitidas']:,} ya facturadas" if result.get("omitidas") else ""
+        if result["success"]:
+            show_snackbar(page, f"✅ {result['done']:,} facturas emitidas en {result['dir']}{omitidas}", "success")
+        else:
+            show_snackbar(page, f"❌ {result.get('error') or t['error']} ({result['done']:,} emitidas){omitidas}", "error")
+
+    def on_emitir(_):
+        numeros = list(dict.fromkeys(n for n in re.split(r"[\s,;]+", ordenes_field.value or "") if n))
+        if not numeros:
+            show_snackbar(page, "Ingresa al menos un número de orden", "warning")
+            return
+        run_facturacion(numeros)
+
+    btn_emitir.on_click = on_emitir
+
     return ft.Column(
         spacing=25,
-        controls=[ft.Text("Gestión de Facturas", size=24, weight=ft.FontWeight.BOLD)],
+        controls=[
+            ft.Text("Gestión de Facturas", size=24, weight=ft.FontWeight.BOLD),
+            ordenes_field,
+            ft.Row([btn_emitir, btn_cancel, pdf_check], spacing=15),
+            ft.Column([progress, count_label, speed_label], spacing=5),
+        ],
     )
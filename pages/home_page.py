@@ -1,11 +1,20 @@
 # pages/home_page.py
+import asyncio
 import logging
 import flet as ft
 
+from components.virtual_grid import ArrowSource, VirtualGrid
+from config import get_client
+from services import reportes
+from services.async_repo import run_blocking
+from services.dashboard import METRICAS, get_resumen
+from services.realtime_hub import hub
+from utils.loading import update_if_mounted
+
 logger = logging.getLogger(__name__)
 
 
-def metric_card(title: str) -> ft.Card:
+def metric_card(title: str, value: ft.Text) -> ft.Card:
     return ft.Card(
         content=ft.Container(
             width=180,
@@ -14,7 +23,15 @@ def metric_card(title: str) -> ft.Card:
             alignment=ft.alignment.center,
             bgcolor=ft.Colors.BLUE_GREY_50,
             border_radius=12,
-            content=ft.Text(title, weight=ft.FontWeight.BOLD, size=14, text_align=ft.TextAlign.CENTER),
+            content=ft.Column(
+                [
+                    ft.Text(title, weight=ft.FontWeight.BOLD, size=14, text_align=ft.TextAlign.CENTER),
+                    value,
+                ],
+                spacing=8,
+                alignment=ft.MainAxisAlignment.CENTER,
+                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+            ),
         )
     )
 
@@ -22,16 +39,16 @@ def metric_card(title: str) -> ft.Card:
 def home_content(page: ft.Page) -> ft.Control:
     """
     Devuelve SOLO el contenido interno. El shell lo envolverá.
+    Los valores se cargan en segundo plano desde la caché compartida y luego
+    se mantienen al día con los eventos de ``realtime_hub`` (sólo las tarjetas).
+    El embudo por etapa y la tabla por vendedor salen de los resúmenes
+    incrementales (services/reportes), nunca de un recorrido de ``ordenes``.
     """
     logger.info("Generando contenido Home")
 
-    cards = [
-        metric_card("Órdenes totales"),
-        metric_card("Tickets Pendientes"),
-        metric_card("Alistamiento en Proceso"),
-        metric_card("Serialización Pendiente"),
-        metric_card("Facturas Pendientes"),
-    ]
+    values = {key: ft.Text("…", size=26, weight=ft.FontWeight.BOLD) for key, _ in METRICAS}
+    cards = [metric_card(title, values[key]) for key, title in METRICAS]
+    status = ft.Text("", size=12, color=ft.Colors.BLUE_GREY_600)
 
     cards_row = ft.ResponsiveRow(
         controls=[ft.Container(c, col={"xs": 12, "sm": 6, "md": 3, "lg": 3, "xl": 3}) for c in cards],
@@ -39,10 +56,90 @@ def home_content(page: ft.Page) -> ft.Control:
         spacing=15,
     )
 
+    async def load_metrics():
+        try:
+            resumen = await run_blocking(page, get_resumen, get_client(page))
+        except asyncio.CancelledError:
+            return
+        except Exception as exc:
+            logger.warning("Métricas no disponibles: %s", exc)
+            status.value = "⚠️ Métricas no disponibles"
+            update_if_mounted(status)
+            return
+
+        valores = resumen["valores"]
+        if hub.live:
+            hub.subscribe(page.session_id, values.keys(), on_push)
+            if not hub.seeded:
+                try:
+                    await run_blocking(page, hub.sembrar, get_client(page))
+                except asyncio.CancelledError:
+                    return
+                except Exception as exc:
+                    logger.warning("No se pudo sembrar el panel en vivo: %s", exc)
+            if hub.seeded:
+                valores = hub.snapshot()
+
+        for key, text in values.items():
+            text.value = f"{valores[key]:,}"
+        status.value = (
+            "En vivo" if hub.live and hub.seeded else f"Datos de hace {resumen['edad_s']:.0f} s"
+        ) + f"  ·  aciertos de caché {resumen['hit_rate']:.0%}"
+        update_if_mounted(*values.values(), status)
+
+    def on_push(metrica: str, valor: int):
+        """Diff de realtime_hub: sólo se reenvía la tarjeta afectada."""
+        text = values[metrica]
+        if text.page is None:               # la sesión ya no muestra el panel
+            return False
+        text.value = f"{valor:,}"
+        text.update()
+
+    # ── Reportes por etapa y por vendedor -------------------------------
+    embudo_row = ft.Row(spacing=30, wrap=True)
+    columnas = [c for c, _ in reportes.COLUMNAS_VENDEDOR]
+    grid = VirtualGrid(ArrowSource.from_records([], columnas), visible_rows=10)
+
+    async def load_reportes():
+        try:
+            alcance = reportes.alcance(page.session.get("user_data"))
+            filas = await run_blocking(page, reportes.por_vendedor, get_client(page), alcance)
+            etapas = await run_blocking(page, reportes.embudo, get_client(page), alcance)
+        except asyncio.CancelledError:
+            return
+        except Exception as exc:
+            logger.warning("Reportes no disponibles: %s", exc)
+            return
+        embudo_row.controls = [
+            ft.Column(
+                [
+                    ft.Text(e["titulo"], weight=ft.FontWeight.BOLD),
+                    ft.Text(f"{e['abiertas']:,} abiertas / {e['total']:,}"),
+                ],
+                spacing=2,
+            )
+            for e in etapas
+        ]
+        grid.set_source(ArrowSource.from_records(filas, columnas))
+        update_if_mounted(embudo_row)
+
+    def on_show():
+        page.run_task(load_metrics)
+        page.run_task(load_reportes)
+
+    on_show()
+
     return ft.Column(
         spacing=25,
         controls=[
             ft.Text("Panel principal", size=24, weight=ft.FontWeight.BOLD),
             cards_row,
+            status,
+            ft.Text("Por etapa", size=18, weight=ft.FontWeight.BOLD),
+            embudo_row,
+            ft.Text("Por vendedor", size=18, weight=ft.FontWeight.BOLD),
+            grid.control,
         ],
+        # page_cache: al volver al panel sólo se refrescan los valores
+        data={"on_show": on_show},
     )
@@ -0,0 +1,101 @@
+# pages/metricas_page.py
+import logging
+import time
+
+import flet as ft
+
+from components.virtual_grid import ArrowSource, VirtualGrid
+from config import DATA_DIR
+from utils import instrumentation
+from utils.instrumentation import profiler
+from utils.loading import update_if_mounted
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_OPS    = ["operacion", "etiquetas", "llamadas", "p50_ms", "p95_ms", "p99_ms", "max_ms", "filas", "bytes"]
+COLUMNAS_PERFIL = ["funcion", "propias", "acumuladas", "pct_propias", "pct_acumuladas"]
+PERFILES_DIR    = DATA_DIR / "perfiles"
+
+
+def _redondear(rows: list[dict]) -> list[dict]:
+    return [{k: round(v, 2) if isinstance(v, float) else v for k, v in r.items()} for r in rows]
+
+
+def metricas_content(page: ft.Page) -> ft.Control:
+    """
+    Panel de administración: p50/p95/p99 por operación de este proceso
+    (utils/instrumentation) y perfilador por muestreo a demanda.
+    """
+    logger.info("Generando contenido Métricas")
+
+    estado = ft.Text(
+        f"Proceso {instrumentation.PID}  ·  "
+        + ("instrumentación activa" if instrumentation.ENABLED else "instrumentación apagada (METRICS=1 para activarla)"),
+        size=12, color=ft.Colors.BLUE_GREY_600,
+    )
+    btn_refrescar = ft.ElevatedButton("Actualizar", icon=ft.Icons.REFRESH)
+    btn_reset     = ft.OutlinedButton("Reiniciar series", icon=ft.Icons.RESTART_ALT)
+    ops_grid = VirtualGrid(
+        ArrowSource.from_records([], columns=COLUMNAS_OPS),
+        visible_rows=12,
+        column_widths={"etiquetas": 320, "llamadas": 90, "filas": 90},
+    )
+
+    perfil_switch = ft.Switch(label="Perfilador por muestreo", value=profiler.activo)
+    perfil_text   = ft.Text("", size=12, color=ft.Colors.BLUE_GREY_600)
+    btn_guardar   = ft.OutlinedButton("Guardar pilas (folded)", icon=ft.Icons.SAVE)
+    perfil_grid = VirtualGrid(
+        ArrowSource.from_records([], columns=COLUMNAS_PERFIL),
+        visible_rows=12,
+        column_widths={"funcion": 360},
+    )
+
+    def refresh(_=None):
+        ops_grid.set_source(ArrowSource.from_records(_redondear(instrumentation.snapshot()), columns=COLUMNAS_OPS))
+        perfil_grid.set_source(ArrowSource.from_records(_redondear(profiler.report()), columns=COLUMNAS_PERFIL))
+        perfil_text.value = (
+            f"{'Muestreando' if profiler.activo else 'Detenido'}  ·  {profiler.muestras:,} muestras"
+            f"  ·  cada {profiler.intervalo * 1000:.0f} ms"
+        )
+        update_if_mounted(perfil_text)
+
+    def on_reset(_):
+        instrumentation.reset()
+        refresh()
+
+    def on_toggle(e):
+        if perfil_switch.value:
+            profiler.start()
+        else:
+            profiler.stop()
+        refresh()
+
+    def on_guardar(_):
+        PERFILES_DIR.mkdir(parents=True, exist_ok=True)
+        destino = PERFILES_DIR / f"perfil-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+        destino.write_text(profiler.folded(), encoding="utf-8")
+        perfil_text.value = f"Pilas guardadas en {destino}"
+        update_if_mounted(perfil_text)
+
+    btn_refrescar.on_click = refresh
+    btn_reset.on_click = on_reset
+    perfil_switch.on_change = on_toggle
+    btn_guardar.on_click = on_guardar
+
+    refresh()
+
+    return ft.Column(
+        spacing=20,
+        scroll=ft.ScrollMode.AUTO,
+        controls=[
+            ft.Text("Métricas del servidor", size=24, weight=ft.FontWeight.BOLD),
+            estado,
+            ft.Row([btn_refrescar, btn_reset], spacing=10),
+            ops_grid.control,
+            ft.Row([perfil_switch, btn_guardar], spacing=15),
+            perfil_text,
+            perfil_grid.control,
+        ],
+        # page_cache: al volver al panel se muestran los valores actuales
+        data={"on_show": refresh},
+    )
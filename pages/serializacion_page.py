@@ -1,9 +1,137 @@
-import logging, flet as ft
+# pages/serializacion_page.py
+import asyncio
+import logging
+import time
+
+import flet as ft
+
+from config import get_client
+from services.async_repo import run_blocking
+from services.local_store import es_error_de_red, get_local_store
+from services.serializacion import DESCONOCIDO, DUPLICADO, OK, cargar_orden, registrar_escaneo
+from utils.loading import busy, update_if_mounted
+
 logger = logging.getLogger(__name__)
 
+HISTORIAL = 15          # últimos escaneos visibles
+
+FEEDBACK = {
+    OK:          ("✅ {serial} · {sku}", ft.Colors.GREEN_700),
+    DUPLICADO:   ("⚠️ {serial} ya fue escaneado", ft.Colors.ORANGE_700),
+    DESCONOCIDO: ("❌ {serial} no pertenece a la orden", ft.Colors.RED_700),
+}
+
+
 def serializacion_content(page: ft.Page) -> ft.Control:
+    """
+    Estación de escaneo. La validación es contra el índice en memoria de la
+    orden y la confirmación sólo escribe en el almacén local de la estación;
+    el envío a Supabase ocurre en micro-lotes fuera de la ruta del escaneo,
+    y la estación sigue escaneando aunque se caiga el Wi-Fi.
+    """
     logger.info("Generando contenido Serialización")
+
+    cola = get_local_store()
+    uid = (page.session.get("user_data") or {}).get("auth_uid")
+    if uid:
+        cola.registrar(uid, get_client(page))       # escaneos propios aún sin enviar
+    state = {"orden": None}
+
+    orden_field = ft.TextField(label="Número de orden", width=220, autofocus=True)
+    btn_cargar  = ft.ElevatedButton("Cargar orden", icon=ft.Icons.INVENTORY_2)
+    spinner     = ft.ProgressRing(width=20, height=20, visible=False)
+
+    scan_field = ft.TextField(
+        label="Escanear serial",
+        width=360,
+        disabled=True,
+        prefix_icon=ft.Icons.QR_CODE_SCANNER,
+    )
+    feedback  = ft.Text("", size=20, weight=ft.FontWeight.BOLD)
+    progreso  = ft.Text("", size=14)
+    cola_text = ft.Text("", size=12, color=ft.Colors.BLUE_GREY_600)
+    historial = ft.ListView(spacing=2, height=HISTORIAL * 24)
+
+    def refresh_progreso():
+        orden = state["orden"]
+        progreso.value = f"{len(orden.escaneados):,} / {orden.total:,} seriales  ·  faltan {orden.pendientes:,}"
+
+    # ── Carga del índice (una vez por orden) -----------------------------
+    async def on_cargar(_):
+        numero = (orden_field.value or "").strip()
+        if not numero:
+            return
+        try:
+            with busy(btn_cargar, orden_field, indicator=spinner):
+                orden = await run_blocking(page, cargar_orden, get_client(page), numero, cola)
+        except asyncio.CancelledError:
+            return
+        except Exception as exc:
+            logger.warning("No se pudo cargar la orden %s: %s", numero, exc)
+            feedback.value = (
+                f"❌ Sin conexión y la orden {numero} no está en la estación"
+                if es_error_de_red(exc) else f"❌ Error cargando la orden {numero}"
+            )
+            feedback.color = ft.Colors.RED_700
+            update_if_mounted(feedback)
+            return
+
+        state["orden"] = orden
+        historial.controls.clear()
+        if orden.total:
+            feedback.value, feedback.color = f"Orden {numero} lista para escanear", ft.Colors.BLUE_GREY_800
+        else:
+            feedback.value, feedback.color = f"⚠️ La orden {numero} no tiene seriales esperados", ft.Colors.ORANGE_700
+        refresh_progreso()
+        scan_field.disabled = not orden.total
+        scan_field.value = ""
+        update_if_mounted(feedback, progreso, historial, scan_field)
+        if orden.total:
+            scan_field.focus()
+
+    # ── Escaneo (ruta crítica: memoria + SQLite local) --------------------
+    def on_scan(_):
+        t0 = time.perf_counter()
+        orden = state["orden"]
+        serial = (scan_field.value or "").strip()
+        scan_field.value = ""
+        if orden is None or not serial:
+            scan_field.update()
+            return
+
+        resultado, sku = orden.validar(serial)
+        if resultado == OK:
+            user = page.session.get("user_data") or {}
+            registrar_escaneo(cola, get_client(page), orden.numero_orden, serial, sku,
+                              user.get("nombre_usuario"), uid)
+            refresh_progreso()
+
+        template, color = FEEDBACK[resultado]
+        feedback.value, feedback.color = template.format(serial=serial, sku=sku), color
+        historial.controls.insert(0, ft.Text(feedback.value, size=12, color=color))
+        del historial.controls[HISTORIAL:]
+        cola_text.value = (
+            f"Confirmado en {(time.perf_counter() - t0) * 1000:.1f} ms  ·  "
+            f"por enviar {cola.pendientes():,}  ·  enviados {cola.enviados:,}"
+            + (f"  ·  ⚠️ {cola.ultimo_error}" if cola.ultimo_error else "")
+        )
+        # un solo lote por websocket con los controles tocados
+        page.update(scan_field, feedback, progreso, historial, cola_text)
+        scan_field.focus()
+
+    btn_cargar.on_click = on_cargar
+    orden_field.on_submit = on_cargar
+    scan_field.on_submit = on_scan
+
     return ft.Column(
-        spacing=25,
-        controls=[ft.Text("Panel de Serialización", size=24, weight=ft.FontWeight.BOLD)],
+        spacing=20,
+        controls=[
+            ft.Text("Panel de Serialización", size=24, weight=ft.FontWeight.BOLD),
+            ft.Row([orden_field, btn_cargar, spinner], spacing=10),
+            scan_field,
+            feedback,
+            progreso,
+            historial,
+            cola_text,
+        ],
     )
@@ -1,9 +1,128 @@
-import logging, flet as ft
+# pages/tickets_page.py
+import asyncio
+import logging
+
+import flet as ft
+
+from components.virtual_grid import ArrowSource, VirtualGrid
+from config import get_client
+from services.async_repo import run_blocking
+from services.tickets_repo import COLUMNAS, ESTADOS, TicketFiltro, TicketPager, codigos_vendedor
+from utils.loading import busy, update_if_mounted
+
 logger = logging.getLogger(__name__)
 
+COLUMN_WIDTHS = {"id": 80, "estado": 110, "asunto": 320, "created_at": 200}
+VENDEDORES_KEY = "tickets_vendedores"       # códigos del filtro, por sesión
+
+
 def tickets_content(page: ft.Page) -> ft.Control:
+    """
+    Listado de tickets paginado en el servidor (keyset). Cada página trae
+    ``PAGE_SIZE`` filas; la siguiente se precarga en segundo plano.
+    """
     logger.info("Generando contenido Tickets")
+
+    pager = TicketPager(get_client(page))
+    columnas = COLUMNAS.split(",")
+
+    # ── Filtros ---------------------------------------------------------
+    estado = ft.Dropdown(
+        label="Estado",
+        width=170,
+        options=[ft.dropdown.Option("", "Todos")] + [ft.dropdown.Option(e) for e in ESTADOS],
+        value="",
+    )
+    vendedor = ft.Dropdown(
+        label="Vendedor",
+        width=200,
+        options=[ft.dropdown.Option("", "Todos")],
+        value="",
+    )
+    desde    = ft.TextField(label="Desde (AAAA-MM-DD)", width=170)
+    hasta    = ft.TextField(label="Hasta (AAAA-MM-DD)", width=170)
+    texto    = ft.TextField(label="Buscar", width=260, prefix_icon=ft.Icons.SEARCH)
+    btn_buscar = ft.ElevatedButton("Buscar", icon=ft.Icons.FILTER_ALT)
+
+    # ── Resultados ------------------------------------------------------
+    grid = VirtualGrid(
+        ArrowSource.from_records([], columns=columnas),
+        visible_rows=15,
+        column_widths=COLUMN_WIDTHS,
+    )
+    spinner    = ft.ProgressRing(width=20, height=20, visible=False)
+    page_label = ft.Text("", size=12, color=ft.Colors.BLUE_GREY_600)
+    btn_prev   = ft.IconButton(ft.Icons.CHEVRON_LEFT, tooltip="Anterior", disabled=True)
+    btn_next   = ft.IconButton(ft.Icons.CHEVRON_RIGHT, tooltip="Siguiente", disabled=True)
+
+    def current_filter() -> TicketFiltro:
+        return TicketFiltro(
+            estado=estado.value or None,
+            codigo_vendedor=vendedor.value or None,
+            desde=(desde.value or "").strip() or None,
+            hasta=(hasta.value or "").strip() or None,
+            texto=(texto.value or "").strip() or None,
+        )
+
+    async def load(fn, *args):
+        """Ejecuta un movimiento del pager y muestra la página resultante."""
+        try:
+            with busy(btn_buscar, btn_prev, btn_next, indicator=spinner):
+                rows = await run_blocking(page, fn, *args)
+        except asyncio.CancelledError:
+            return
+        except Exception as exc:
+            logger.warning("Error consultando tickets: %s", exc)
+            page_label.value = "⚠️ No se pudieron cargar los tickets"
+            update_if_mounted(page_label)
+            return
+
+        grid.set_source(ArrowSource.from_records(rows, columns=columnas))
+        btn_prev.disabled = not pager.has_prev
+        btn_next.disabled = not pager.has_next
+        page_label.value = f"Página {pager.page_number}  ·  {len(rows)} tickets" + (
+            "" if pager.has_next else "  ·  fin de resultados"
+        )
+        update_if_mounted(btn_prev, btn_next, page_label)
+
+    async def load_vendedores():
+        """Códigos de vendedor, una consulta por sesión (logout limpia la sesión)."""
+        codigos = page.session.get(VENDEDORES_KEY)
+        if codigos is None:
+            try:
+                codigos = await run_blocking(page, codigos_vendedor, get_client(page))
+            except asyncio.CancelledError:
+                return
+            except Exception as exc:
+                logger.warning("Vendedores no disponibles: %s", exc)
+                return
+            page.session.set(VENDEDORES_KEY, codigos)
+        vendedor.options = [ft.dropdown.Option("", "Todos")] + [ft.dropdown.Option(c) for c in codigos]
+        update_if_mounted(vendedor)
+
+    async def on_search(_):
+        await load(pager.reset, current_filter())
+
+    async def on_next(_):
+        await load(pager.next)
+
+    async def on_prev(_):
+        await load(pager.prev)
+
+    btn_buscar.on_click = on_search
+    texto.on_submit = on_search
+    btn_next.on_click = on_next
+    btn_prev.on_click = on_prev
+
+    page.run_task(load_vendedores)
+    page.run_task(load, pager.reset, TicketFiltro())
+
     return ft.Column(
-        spacing=25,
-        controls=[ft.Text("Gestión de Tickets", size=24, weight=ft.FontWeight.BOLD)],
+        spacing=20,
+        controls=[
+            ft.Text("Gestión de Tickets", size=24, weight=ft.FontWeight.BOLD),
+            ft.Row([estado, vendedor, desde, hasta, texto, btn_buscar, spinner], spacing=10, wrap=True),
+            grid.control,
+            ft.Row([btn_prev, page_label, btn_next], spacing=10),
+        ],
     )
@@ -0,0 +1,157 @@
+# pages/trabajos_page.py
+import logging
+import time
+
+import flet as ft
+
+from components.routes import ADMIN
+from config import get_client
+from services.trabajos import CANCELADO, CORRIENDO, EN_COLA, ERROR, LISTO, get_planificador, usuario_sesion
+from utils.alerts import show_snackbar
+from utils.loading import update_if_mounted
+
+logger = logging.getLogger(__name__)
+
+LIMITE = 50
+
+ICONOS = {
+    EN_COLA:   (ft.Icons.SCHEDULE, ft.Colors.BLUE_GREY_400),
+    CORRIENDO: (ft.Icons.PLAY_CIRCLE, ft.Colors.BLUE_600),
+    LISTO:     (ft.Icons.CHECK_CIRCLE, ft.Colors.GREEN_600),
+    ERROR:     (ft.Icons.ERROR, ft.Colors.RED_600),
+    CANCELADO: (ft.Icons.CANCEL, ft.Colors.BLUE_GREY_400),
+}
+ETIQUETAS = {EN_COLA: "en cola", CORRIENDO: "corriendo", LISTO: "listo", ERROR: "error", CANCELADO: "cancelado"}
+
+
+def trabajos_content(page: ft.Page) -> ft.Control:
+    """
+    Trabajos en segundo plano (services/trabajos.py) de la sesión, o de todos
+    los usuarios para admin: estado, progreso en vivo, cancelar y reintentar.
+    Siguen corriendo aunque se cierre la pestaña que los pidió.
+    """
+    logger.info("Generando contenido Trabajos")
+
+    planificador = get_planificador()
+    user = page.session.get("user_data") or {}
+    usuario = None if user.get("rol") == ADMIN else usuario_sesion(page)
+    clave = f"{page.session_id}:trabajos"
+
+    lista  = ft.Column(spacing=6)
+    status = ft.Text("", size=12, color=ft.Colors.BLUE_GREY_600)
+    btn_refrescar = ft.ElevatedButton("Actualizar", icon=ft.Icons.REFRESH)
+    filas: dict[str, dict] = {}
+    vista = {"montada": False}
+
+    # ── Una fila por trabajo ---------------------------------------------
+    def fila_trabajo(trabajo_id: str) -> dict:
+        c = {
+            "icono": ft.Icon(ft.Icons.SCHEDULE, size=20),
+            "titulo": ft.Text("", weight=ft.FontWeight.BOLD, width=260, no_wrap=True),
+            "detalle": ft.Text("", size=12, color=ft.Colors.BLUE_GREY_600),
+            "barra": ft.ProgressBar(value=0, width=180),
+            "estado": ft.Text("", size=12, width=280),
+            "cancelar": ft.IconButton(ft.Icons.STOP_CIRCLE, tooltip="Cancelar",
+                                      on_click=lambda _: on_cancelar(trabajo_id)),
+            "reintentar": ft.IconButton(ft.Icons.REPLAY, tooltip="Reintentar",
+                                        on_click=lambda _: on_reintentar(trabajo_id)),
+        }
+        c["fila"] = ft.Row(
+            [c["icono"], ft.Column([c["titulo"], c["detalle"]], spacing=0), c["barra"], c["estado"],
+             c["cancelar"], c["reintentar"]],
+            spacing=12,
+        )
+        return c
+
+    def pintar(c: dict, t: dict):
+        estado = t["estado"]
+        prog = t["progreso"] or {}
+        done, total = prog.get("done"), prog.get("total")
+
+        c["icono"].name, c["icono"].color = ICONOS[estado]
+        c["titulo"].value = t["titulo"]
+        c["detalle"].value = (
+            f"{t['tipo']}  ·  {time.strftime('%d/%m %H:%M', time.localtime(t['creado_at']))}"
+            + (f"  ·  {t['usuario']}" if usuario is None and t["usuario"] else "")
+            + (f"  ·  intento {t['intentos']}/{t['max_intentos']}" if t["intentos"] > 1 else "")
+        )
+        if estado == LISTO:
+            c["barra"].value = 1
+        elif estado == CORRIENDO:
+            c["barra"].value = done / total if total else None
+        else:
+            c["barra"].value = 0
+        if estado == CORRIENDO and total:
+            detalle = f"{done or 0:,} / {total:,}"
+        elif estado == CORRIENDO:
+            detalle = prog.get("etapa") or "corriendo"
+        elif estado == EN_COLA and t["error"]:
+            detalle = f"reintento pendiente: {t['error']}"
+        elif t["error"]:
+            detalle = t["error"]
+        else:
+            detalle = ETIQUETAS[estado]
+        c["estado"].value = detalle
+        c["estado"].color = ft.Colors.RED_700 if estado == ERROR else ft.Colors.BLUE_GREY_600
+        c["cancelar"].visible = estado in (EN_COLA, CORRIENDO)
+        c["reintentar"].visible = estado in (ERROR, CANCELADO)
+
+    # ── Cambios en vivo (llamado desde los hilos del planificador) ------
+    def on_cambio(t: dict):
+        if lista.page is None:                  # aún no montada, o la sesión ya no la muestra
+            return False if vista["montada"] else None
+        vista["montada"] = True
+        if usuario is not None and t["usuario"] != usuario:
+            return
+        c = filas.get(t["id"])
+        if c is None:
+            c = filas[t["id"]] = fila_trabajo(t["id"])
+            lista.controls.insert(0, c["fila"])
+            pintar(c, t)
+            lista.update()
+            return
+        pintar(c, t)
+        c["fila"].update()
+
+    def cargar(_=None):
+        trabajos = planificador.listar(usuario, LIMITE)
+        filas.clear()
+        for t in trabajos:
+            pintar(filas.setdefault(t["id"], fila_trabajo(t["id"])), t)
+        lista.controls = [filas[t["id"]]["fila"] for t in trabajos]
+        activos = sum(t["estado"] in (EN_COLA, CORRIENDO) for t in trabajos)
+        status.value = (
+            f"{len(trabajos)} trabajos" + (f"  ·  {activos} en curso o en cola" if activos else "")
+            if trabajos else "Sin trabajos recientes"
+        )
+        update_if_mounted(lista, status)
+
+    def on_cancelar(trabajo_id: str):
+        if not planificador.cancelar(trabajo_id):
+            show_snackbar(page, "El trabajo ya terminó", "warning")
+
+    def on_reintentar(trabajo_id: str):
+        nuevo = planificador.reintentar(trabajo_id, get_client(page))
+        if nuevo is None:
+            show_snackbar(page, "El trabajo no se puede reintentar", "warning")
+        else:
+            show_snackbar(page, "Trabajo en cola de nuevo", "info")
+
+    def on_show():
+        vista["montada"] = False
+        planificador.suscribir(clave, on_cambio)
+        cargar()
+
+    btn_refrescar.on_click = cargar
+    on_show()
+
+    return ft.Column(
+        spacing=20,
+        controls=[
+            ft.Text("Trabajos en segundo plano", size=24, weight=ft.FontWeight.BOLD),
+            ft.Row([btn_refrescar, status], spacing=15),
+            lista,
+        ],
+        # page_cache: al volver se recarga la lista y se renueva la suscripción
+        data={"on_show": on_show},
+    )
@@ -1,22 +1,255 @@
 # pages/upload_page.py
 import logging
+import time
+import uuid
+from pathlib import Path
+
 import flet as ft
+
+from components.virtual_grid import ArrowSource, VirtualGrid
+from config import UPLOAD_DIR, get_client
+from services.ingesta_multiple import CARGANDO, ERROR, LISTO, PREPARANDO
+from services.trabajos import CORRIENDO, EN_COLA, get_planificador, usuario_sesion
+from utils.alerts import show_snackbar
+
 logger = logging.getLogger(__name__)
 
+EXTENSIONES = ["csv", "xlsx"]
+PROGRESS_INTERVAL = 0.25        # s entre refrescos de la barra de progreso
+
+
+def _get_file_picker(page: ft.Page) -> ft.FilePicker:
+    """Un único FilePicker por sesión (evita acumularlos en page.overlay)."""
+    picker = page.session.get("upload_picker")
+    if picker is None:
+        picker = ft.FilePicker()
+        page.overlay.append(picker)
+        page.session.set("upload_picker", picker)
+        page.update()
+    return picker
+
 
 def upload_content(page: ft.Page) -> ft.Control:
+    """
+    Carga de uno o varios exportes a la vez (services/ingesta_multiple):
+    una fila de progreso por archivo más el total. Cada archivo termina por
+    su cuenta; su vista previa se abre desde su fila.
+    La carga es un trabajo en segundo plano (services/trabajos.py): sigue
+    aunque se cierre la pestaña y se puede seguir desde "Trabajos".
+    """
     logger.info("Generando contenido Upload")
+
+    picker = _get_file_picker(page)
+    planificador = get_planificador()
+    trabajo = {"id": None}
+    last_refresh = {"t": 0.0}
+    subidas = {"pendientes": set(), "paths": []}      # modo web: se espera a que suban todos
+
+    # ── Controles de progreso -------------------------------------------
+    file_label  = ft.Text("Ningún archivo seleccionado", italic=True)
+    progress    = ft.ProgressBar(value=0, visible=False)
+    rows_label  = ft.Text("")
+    speed_label = ft.Text("", color=ft.Colors.BLUE_GREY_600)
+    files_box   = ft.Column(spacing=4)
+    errores_box = ft.Column(spacing=2)
+    preview_box = ft.Container()
+    btn_select  = ft.ElevatedButton(
+        "Seleccionar archivos",
+        icon=ft.Icons.UPLOAD_FILE,
+        on_click=lambda _: picker.pick_files(allowed_extensions=EXTENSIONES, allow_multiple=True),
+    )
+    btn_cancel  = ft.OutlinedButton(
+        "Cancelar", icon=ft.Icons.CANCEL, visible=False, on_click=lambda _: planificador.cancelar(trabajo["id"])
+    )
+    filas_archivo: list[dict] = []
+
+    def set_running(running: bool):
+        btn_select.disabled = running
+        btn_cancel.visible = running
+        progress.visible = True
+        page.update(btn_select, btn_cancel, progress)
+
+    # ── Una fila por archivo --------------------------------------------
+    def fila_archivo(nombre: str) -> dict:
+        controles = {
+            "barra": ft.ProgressBar(value=0, width=180),
+            "estado": ft.Text("en cola", size=12, color=ft.Colors.BLUE_GREY_600),
+            "ver": ft.IconButton(ft.Icons.VISIBILITY, tooltip="Vista previa", disabled=True),
+        }
+        controles["fila"] = ft.Row(
+            [ft.Text(nombre, width=260, no_wrap=True), controles["barra"], controles["estado"], controles["ver"]],
+            spacing=10,
+        )
+        return controles
+
+    def pintar_archivo(c: dict, a: dict):
+        total = a["total"] or 1
+        if a["estado"] == PREPARANDO:
+            c["barra"].value = a["leidas"] / total / 2
+            detalle = f"preparando {a['leidas']:,} / {a['total']:,}"
+        elif a["estado"] == CARGANDO:
+            c["barra"].value = 0.5 + (a["done"] + a["rejected"]) / total / 2
+            detalle = f"cargando {a['done']:,} / {a['total']:,}"
+        elif a["estado"] == LISTO:
+            c["barra"].value = 1
+            detalle = (
+                f"{a['nuevas'] + a['cambiadas']:,} nuevas o cambiadas  ·  {a['sin_cambios']:,} sin cambios"
+                + (f"  ·  {a['rejected']:,} rechazadas" if a["rejected"] else "")
+            )
+        elif a["estado"] == ERROR:
+            detalle = f"❌ {a['error']}"
+        else:
+            detalle = a["estado"]
+        c["estado"].value = detalle
+        c["estado"].color = ft.Colors.RED_700 if a["estado"] == ERROR else ft.Colors.BLUE_GREY_600
+        c["ver"].disabled = a["estado"] != LISTO or not a["preview"]
+        c["ver"].on_click = lambda _, p=a["preview"], e=a["errores"]: show_preview(Path(p), e)
+
+    # ── Progreso (llamado desde los hilos del planificador) -------------
+    def on_progress(resumen: dict, force: bool = False):
+        now = time.monotonic()
+        if not force and now - last_refresh["t"] < PROGRESS_INTERVAL:
+            return
+        last_refresh["t"] = now
+
+        done, total = resumen["done"], resumen["total"]
+        progress.value = done / total if total else None
+        rows_label.value = (
+            f"{resumen['terminados']} / {len(resumen['archivos'])} archivos  ·  "
+            + (f"{done:,} / {total:,} filas" if total else f"{done:,} filas")
+        )
+        speed_label.value = f"{resumen['rows_per_s']:,.0f} filas/s  ·  {resumen['seconds']:.1f} s"
+        for c, a in zip(filas_archivo, resumen["archivos"]):
+            pintar_archivo(c, a)
+        # un solo lote por websocket con todo lo que cambió
+        page.update(progress, rows_label, speed_label, *(c["fila"] for c in filas_archivo))
+
+    def on_trabajo(t: dict):
+        if t["estado"] == EN_COLA:
+            rows_label.value = "En cola…" + (f" (reintento: {t['error']})" if t["error"] else "")
+            page.update(rows_label)
+        elif t["estado"] == CORRIENDO:
+            if t["progreso"]:
+                on_progress(t["progreso"])
+        else:
+            terminar(t)
+            return False
+
+    # ── Ingesta (trabajo en segundo plano; la página sólo la observa) ---
+    def run_ingest(paths: list):
+        paths = [Path(p) for p in paths]
+        filas_archivo[:] = [fila_archivo(p.name) for p in paths]
+        files_box.controls = [c["fila"] for c in filas_archivo]
+        file_label.value = paths[0].name if len(paths) == 1 else f"{len(paths)} archivos"
+        page.update(files_box, file_label)
+        set_running(True)
+        trabajo["id"] = planificador.enviar(
+            "ingesta",
+            {"paths": [str(p) for p in paths]},      # las vistas previas van a la carpeta del trabajo
+            get_client(page),
+            usuario=usuario_sesion(page),
+            titulo=f"Carga de {file_label.value}",
+        )
+        planificador.suscribir(f"{page.session_id}:upload", on_trabajo, trabajo["id"])
+
+    def terminar(t: dict):
+        set_running(False)
+        result = t["resultado"]
+        if not result:                          # cancelado en cola o falló antes de empezar
+            progress.visible = False
+            page.update(progress)
+            show_snackbar(page, f"❌ {t['error'] or 'Carga cancelada'}", "error")
+            return
+        on_progress(result, force=True)
+
+        archivos = result["archivos"]
+        enviadas = sum(a["nuevas"] + a["cambiadas"] for a in archivos)     # el trabajo ya invalidó el panel
+        listos = [a for a in archivos if a["estado"] == LISTO]
+        if len(listos) == 1:
+            show_preview(Path(listos[0]["preview"]), listos[0]["errores"])
+        sin_cambios = sum(a["sin_cambios"] for a in listos)
+        mensaje = (
+            f"{enviadas:,} órdenes nuevas o cambiadas"
+            + (f" ({sin_cambios:,} ya estaban cargadas)" if sin_cambios else "")
+        )
+        if result["success"]:
+            show_snackbar(page, f"✅ {mensaje}", "success")
+        elif listos:
+            show_snackbar(page, f"⚠️ {len(listos)} de {len(archivos)} archivos cargados: {mensaje}", "warning")
+        else:
+            errores = [a["error"] for a in archivos if a["error"]]
+            show_snackbar(page, f"❌ {errores[0] if errores else 'Carga cancelada'}", "error")
+
+    # ── Vista previa virtualizada (sólo filas visibles como controles) --
+    def color_fila(record: dict):
+        if record.get("cambio") == "rechazada":
+            return ft.Colors.RED_50
+        if record.get("errores"):
+            return ft.Colors.AMBER_50
+        return None
+
+    def show_preview(preview_path: Path, errores: list[dict]):
+        source = ArrowSource.from_ipc_file(preview_path)
+        grid = page.session.get("upload_grid")
+        if grid is None:
+            grid = VirtualGrid(source, visible_rows=15, column_widths={"errores": 320}, row_color=color_fila)
+            page.session.set("upload_grid", grid)
+        else:
+            grid.set_source(source)
+        # reporte por regla (filtrar la columna "errores" por el mensaje muestra esas filas)
+        errores_box.controls = [
+            ft.Text(
+                f"{'⛔' if e['bloquea'] else '⚠️'} {e['mensaje']}: {e['filas']:,} filas",
+                size=12, color=ft.Colors.RED_700 if e["bloquea"] else ft.Colors.AMBER_900,
+            )
+            for e in errores
+        ]
+        preview_box.content = grid.control
+        page.update(errores_box, preview_box)
+
+    # ── FilePicker ------------------------------------------------------
+    def on_result(e: ft.FilePickerResultEvent):
+        if not e.files:
+            return
+        file_label.value = ", ".join(f.name for f in e.files[:3]) + ("…" if len(e.files) > 3 else "")
+        file_label.update()
+
+        if all(f.path for f in e.files):            # modo escritorio
+            run_ingest([f.path for f in e.files])
+        else:                                       # modo web: subir primero
+            # carpeta propia de esta selección: otra sesión con un archivo del
+            # mismo nombre nunca pisa el que este trabajo va a cargar
+            lote = f"{page.session_id}/{uuid.uuid4().hex[:8]}"
+            (UPLOAD_DIR / lote).mkdir(parents=True, exist_ok=True)
+            subidas["pendientes"] = {f.name for f in e.files}
+            subidas["paths"] = [UPLOAD_DIR / lote / f.name for f in e.files]
+            picker.upload([
+                ft.FilePickerUploadFile(f.name, upload_url=page.get_upload_url(f"{lote}/{f.name}", 600))
+                for f in e.files
+            ])
+
+    def on_upload(e: ft.FilePickerUploadEvent):
+        if e.error:
+            show_snackbar(page, f"❌ Error subiendo {e.file_name}: {e.error}", "error")
+            subidas["paths"] = [p for p in subidas["paths"] if p.name != e.file_name]
+        elif e.progress != 1:
+            return
+        subidas["pendientes"].discard(e.file_name)
+        if not subidas["pendientes"] and subidas["paths"]:
+            run_ingest(subidas["paths"])
+            subidas["paths"] = []
+
+    picker.on_result = on_result
+    picker.on_upload = on_upload
+
     return ft.Column(
         spacing=25,
         controls=[
             ft.Text("Carga y vista previa de órdenes", size=24, weight=ft.FontWeight.BOLD),
-            ft.Container(
-                alignment=ft.alignment.center,
-                content=ft.Text(
-                    "Aquí irá el flujo de carga y vista previa.",
-                    size=18,
-                    text_align=ft.TextAlign.CENTER,
-                ),
-            ),
+            ft.Row([btn_select, btn_cancel, file_label], spacing=15),
+            ft.Column([progress, rows_label, speed_label], spacing=5),
+            files_box,
+            errores_box,
+            preview_box,
         ],
     )
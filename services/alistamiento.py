@@ -0,0 +1,253 @@
+# services/alistamiento.py
+"""
+Planificador de olas de alistamiento (picking por lotes).
+
+Entrada: líneas abiertas (marketplace, codigo_vendedor, numero_orden, sku,
+cantidad, ubicacion).
+Salida : olas de órdenes y, por ola, una lista de picking consolidada por
+SKU y ordenada según el recorrido de la bodega.
+
+Una orden es ``CLAVE_ORDEN`` (marketplace, codigo_vendedor, numero_orden):
+el mismo número puede ser de dos vendedores o canales y son dos órdenes
+distintas al planificar, al confirmar y al excluir lo ya confirmado.
+
+  1. Ubicación "PASILLO-MODULO-NIVEL" (p. ej. "B-07-2") → clave de recorrido
+     en serpentina: pasillos en orden, módulos ascendentes en pasillos
+     pares y descendentes en impares (no se devuelve al inicio del pasillo).
+  2. Cada orden se describe por su pasillo dominante y su SKU "ancla" (el
+     SKU más demandado de la orden). Ordenar por (pasillo, ancla) deja
+     juntas a las órdenes que comparten SKU y zona.
+  3. Las órdenes ordenadas se cortan en olas según la capacidad del carro
+     (``max_ordenes`` / ``max_lineas``).
+
+Todo es pandas/NumPy vectorizado salvo el corte final, que recorre un
+arreglo por orden (no por línea).
+
+Con el almacén local de la estación (services/local_store.py) las líneas
+quedan copiadas para planificar sin red, y confirmar una ola sólo encola
+mutaciones versionadas (RPC ``sync_alistamiento``, migrations/009): si otra
+estación ya tomó una orden, gana el servidor y la orden se reporta como
+conflicto.
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from supabase import Client
+
+from services import cambios
+from services.local_store import LocalStore, es_error_de_red
+
+logger = logging.getLogger(__name__)
+
+VISTA_LINEAS    = "ordenes_por_alistar"      # migrations/005
+TABLA_ALISTAMIENTO = "alistamiento"
+RPC_SYNC        = "sync_alistamiento"         # migrations/009
+MAX_ORDENES     = 40                          # órdenes por carro
+MAX_LINEAS      = 200                         # líneas por carro
+PAGE_SIZE       = 1_000                       # filas por request a PostgREST
+SIN_UBICACION   = "ZZ-999-9"                  # al final del recorrido
+
+COLUMNAS_LINEA = ["numero_orden", "sku", "cantidad", "ubicacion"]
+# identidad de la orden (alistamiento, migrations/005 y 009) y de la línea
+# (índice único de migrations/010): orden total al paginar y clave de la copia local
+CLAVE_ORDEN = ["marketplace", "codigo_vendedor", "numero_orden"]
+CLAVE_LINEA = CLAVE_ORDEN + ["sku"]
+COLUMNAS_VISTA = COLUMNAS_LINEA + ["marketplace", "codigo_vendedor"]
+
+
+# ── Carga ----------------------------------------------------------------------
+def _consultar_lineas(client: Client, limite: Optional[int] = None) -> pd.DataFrame:
+    """Líneas de órdenes aún sin ola (paginado por rango, orden estable)."""
+    frames, start = [], 0
+    while limite is None or start < limite:
+        stop = start + PAGE_SIZE - 1 if limite is None else min(start + PAGE_SIZE, limite) - 1
+        q = client.table(VISTA_LINEAS).select(",".join(COLUMNAS_VISTA))
+        for columna in ("numero_orden", "sku", "marketplace", "codigo_vendedor"):
+            q = q.order(columna)
+        rows = q.range(start, stop).execute().data
+        if rows:
+            frames.append(pd.DataFrame.from_records(rows, columns=COLUMNAS_VISTA))
+        if len(rows) < stop - start + 1:
+            break
+        start = stop + 1
+    if not frames:
+        return pd.DataFrame(columns=COLUMNAS_VISTA)
+    return pd.concat(frames, ignore_index=True)
+
+
+def cargar_lineas(client: Client, limite: Optional[int] = None, store: Optional[LocalStore] = None) -> pd.DataFrame:
+    """
+    Líneas abiertas. Con ``store`` la lectura completa se copia a la estación;
+    sin red se planifica con la última copia. En ambos casos se excluyen las
+    órdenes con una confirmación local aún no sincronizada.
+    """
+    if store is None:
+        return _consultar_lineas(client, limite)
+    try:
+        lineas = _consultar_lineas(client, limite)
+        if limite is None:
+            store.guardar(VISTA_LINEAS, lineas.to_dict("records"), ",".join(CLAVE_LINEA))
+    except Exception as exc:
+        if not es_error_de_red(exc) or not store.tiene(VISTA_LINEAS):
+            raise
+        logger.warning("Alistamiento sin conexión: se usa la copia local (%s)", exc)
+        lineas = pd.DataFrame.from_records(store.leer(VISTA_LINEAS), columns=COLUMNAS_VISTA)
+        if limite is not None:
+            lineas = lineas.head(limite)
+
+    confirmadas = {tuple(f.get(c) for c in CLAVE_ORDEN) for f in store.pendientes_de(TABLA_ALISTAMIENTO)}
+    if confirmadas:
+        claves = _claves_orden(lineas)
+        lineas = lineas[[k not in confirmadas for k in claves]].reset_index(drop=True)
+    return lineas
+
+
+def _claves_orden(df: pd.DataFrame) -> list[tuple]:
+    """``CLAVE_ORDEN`` de cada fila, con ``None`` (no NaN) en las partes vacías."""
+    claves = df[CLAVE_ORDEN].astype(object)
+    return list(claves.where(claves.notna(), None).itertuples(index=False, name=None))
+
+
+# ── Recorrido ------------------------------------------------------------------
+def clave_recorrido(ubicaciones: pd.Series) -> pd.DataFrame:
+    """Descompone ubicaciones y calcula la clave de recorrido en serpentina."""
+    partes = (
+        ubicaciones.fillna(SIN_UBICACION).astype(str).str.upper()
+        .str.extract(r"^\s*([A-Z]+)\D*(\d+)?\D*(\d+)?")
+    )
+    pasillo = partes[0].fillna("ZZ")
+    modulo  = pd.to_numeric(partes[1], errors="coerce").fillna(0).astype(np.int64)
+    nivel   = pd.to_numeric(partes[2], errors="coerce").fillna(0).astype(np.int64)
+
+    # rango del pasillo en orden alfabético ("A" < "B" < ... < "AA")
+    codigos = pd.Categorical(pasillo, categories=sorted(pasillo.unique(), key=lambda p: (len(p), p)))
+    rango = np.asarray(codigos.codes, dtype=np.int64)
+    modulo_recorrido = np.where(rango % 2 == 0, modulo, 10_000 - modulo)
+
+    return pd.DataFrame(
+        {
+            "pasillo": pasillo.to_numpy(),
+            "recorrido": rango * 100_000_000 + modulo_recorrido * 1_000 + nivel.to_numpy(),
+        },
+        index=ubicaciones.index,
+    )
+
+
+# ── Planificación --------------------------------------------------------------
+def _cortar_olas(lineas_por_orden: np.ndarray, max_ordenes: int, max_lineas: int) -> np.ndarray:
+    """Asigna un número de ola a cada orden (ya ordenadas) respetando capacidad."""
+    olas = np.empty(len(lineas_por_orden), dtype=np.int64)
+    ola = ordenes = lineas = 0
+    for i, n in enumerate(lineas_por_orden):
+        if ordenes and (ordenes + 1 > max_ordenes or lineas + n > max_lineas):
+            ola, ordenes, lineas = ola + 1, 0, 0
+        olas[i] = ola
+        ordenes += 1
+        lineas += n
+    return olas + 1
+
+
+def plan_waves(
+    lineas: pd.DataFrame,
+    max_ordenes: int = MAX_ORDENES,
+    max_lineas: int = MAX_LINEAS,
+) -> dict:
+    """
+    Devuelve un dict con:
+      • ``asignacion``: marketplace, codigo_vendedor, numero_orden → ola
+      • ``picking``   : ola, secuencia, ubicacion, sku, cantidad, ordenes
+      • ``resumen``   : por ola, órdenes / líneas / unidades / SKUs / pasillos
+    """
+    df = lineas.reindex(columns=COLUMNAS_VISTA)
+    df["cantidad"] = pd.to_numeric(df["cantidad"], errors="coerce").fillna(0).astype(np.int64)
+    df["ubicacion"] = df["ubicacion"].fillna(SIN_UBICACION)
+    df = df.join(clave_recorrido(df["ubicacion"]))
+    df["zona"] = df["recorrido"] // 100_000_000          # rango del pasillo en el recorrido
+
+    if df.empty:
+        vacio = pd.DataFrame()
+        return {"asignacion": vacio, "picking": vacio, "resumen": vacio}
+
+    # un entero por orden (CLAVE_ORDEN, nulos incluidos) para agrupar sin claves compuestas
+    df["orden"] = df.groupby(CLAVE_ORDEN, dropna=False).ngroup()
+
+    # popularidad global de cada SKU (en cuántas órdenes aparece)
+    df["popularidad"] = df.groupby("sku")["orden"].transform("nunique")
+
+    # SKU ancla = el más popular de la orden; pasillo dominante = el de más unidades
+    ancla = (
+        df.sort_values(["orden", "popularidad", "sku"], ascending=[True, False, True])
+        .drop_duplicates("orden")
+        .set_index("orden")["sku"]
+    )
+    dominante = (
+        df.groupby(["orden", "zona"])["cantidad"].sum()
+        .reset_index()
+        .sort_values(["orden", "cantidad"], ascending=[True, False])
+        .drop_duplicates("orden")
+        .set_index("orden")["zona"]
+    )
+    ordenes = pd.DataFrame({
+        "ancla": ancla,
+        "zona": dominante,
+        "inicio": df.groupby("orden")["recorrido"].min(),
+        "lineas": df.groupby("orden").size(),
+    })
+    ordenes["recorrido_ancla"] = ordenes["ancla"].map(df.groupby("sku")["recorrido"].min())
+    ordenes = ordenes.sort_values(["zona", "recorrido_ancla", "ancla", "inicio"], kind="stable")
+    ordenes["ola"] = _cortar_olas(ordenes["lineas"].to_numpy(), max_ordenes, max_lineas)
+
+    df["ola"] = df["orden"].map(ordenes["ola"])
+
+    # lista consolidada: una parada por (ola, ubicación, SKU)
+    picking = (
+        df.groupby(["ola", "recorrido", "ubicacion", "sku"], sort=True)
+        .agg(cantidad=("cantidad", "sum"), ordenes=("orden", "nunique"))
+        .reset_index()
+    )
+    picking["secuencia"] = picking.groupby("ola").cumcount() + 1
+    picking = picking[["ola", "secuencia", "ubicacion", "sku", "cantidad", "ordenes"]]
+
+    resumen = df.groupby("ola").agg(
+        ordenes=("orden", "nunique"),
+        lineas=("sku", "size"),
+        unidades=("cantidad", "sum"),
+        skus=("sku", "nunique"),
+        pasillos=("pasillo", "nunique"),
+    ).reset_index()
+    # líneas por parada: > 1 indica que varias órdenes comparten el mismo pick
+    resumen["consolidacion"] = (resumen["lineas"] / picking.groupby("ola").size().to_numpy()).round(2)
+
+    asignacion = (
+        df.drop_duplicates("orden").set_index("orden")[CLAVE_ORDEN]
+        .join(ordenes["ola"])
+        .sort_values(["ola", "numero_orden"], kind="stable")
+        .reset_index(drop=True)
+    )
+    logger.info("Plan de alistamiento: %s órdenes, %s líneas, %s olas",
+                len(ordenes), len(df), len(resumen))
+    return {"asignacion": asignacion, "picking": picking, "resumen": resumen}
+
+
+# ── Confirmación ---------------------------------------------------------------
+def confirmar_ola(client: Client, asignacion: pd.DataFrame, ola: int, store: Optional[LocalStore] = None,
+                  propietario: Optional[str] = None) -> int:
+    """
+    Registra las órdenes de la ola en ``alistamiento`` (estado en_proceso).
+    Con ``store`` sólo se encola (funciona sin red) y se sincroniza después
+    con ``client``, la sesión de ``propietario`` (auth_uid).
+    """
+    ordenes = _claves_orden(asignacion.loc[asignacion["ola"] == ola])
+    if not ordenes:
+        return 0
+    filas = [{**dict(zip(CLAVE_ORDEN, k)), "ola": int(ola), "estado": "en_proceso"} for k in ordenes]
+    if store is not None:
+        n = store.encolar(client, TABLA_ALISTAMIENTO, filas, clave=",".join(CLAVE_ORDEN),
+                          propietario=propietario, rpc=RPC_SYNC)
+    else:
+        client.table(TABLA_ALISTAMIENTO).insert(filas).execute()
+        n = len(ordenes)
+    cambios.notificar(TABLA_ALISTAMIENTO)
+    return n
@@ -0,0 +1,67 @@
+# services/async_repo.py
+"""
+Capa asíncrona para las llamadas bloqueantes a Supabase.
+
+Los handlers de Flet (``async def``) hacen ``await run_blocking(page, fn, ...)``:
+la llamada de red corre en un pool de hilos acotado y el event loop de Flet
+sigue atendiendo eventos. Las tareas quedan registradas por sesión para
+poder cancelarlas cuando el usuario navega a otra ruta.
+"""
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+import flet as ft
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DB_WORKERS = int(os.getenv("DB_WORKERS", "32"))
+TASKS_KEY  = "pending_db_tasks"
+
+_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+
+
+def _pending(page: ft.Page) -> set:
+    tasks = page.session.get(TASKS_KEY)
+    if tasks is None:
+        tasks = set()
+        page.session.set(TASKS_KEY, tasks)
+    return tasks
+
+
+async def run_blocking(page: ft.Page, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Ejecuta ``fn(*args, **kwargs)`` en el pool de I/O sin bloquear el loop.
+    Si la ruta cambia antes de terminar, la espera se cancela
+    (``asyncio.CancelledError``) y el resultado se descarta.
+    """
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    pending = _pending(page)
+    pending.add((loop, task))
+    try:
+        return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+    finally:
+        pending.discard((loop, task))
+
+
+def cancel_pending(page: ft.Page) -> int:
+    """Cancela las esperas en curso de la sesión (p. ej. al cambiar de ruta)."""
+    pending = _pending(page)
+    for loop, task in list(pending):
+        loop.call_soon_threadsafe(task.cancel)
+    if pending:
+        logger.info("Canceladas %s llamadas pendientes", len(pending))
+    count = len(pending)
+    pending.clear()
+    return count
+
+
+def submit_background(fn: Callable[..., T], *args: Any, **kwargs: Any) -> Future:
+    """Lanza ``fn`` en el pool de I/O sin esperar (prefetch, precargas)."""
+    return _executor.submit(fn, *args, **kwargs)
@@ -0,0 +1,162 @@
+# services/cache.py
+"""
+Caché en memoria compartida por todo el proceso (todas las sesiones Flet).
+Con ``shared="nombre"`` y ``SHARED_CACHE=1`` usa además el almacén SQLite
+común a los workers (services/shared_store.py) como segundo nivel.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from services.shared_store import get_store
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Caché clave → valor con expiración por tiempo.
+    ``get_or_load`` es "single-flight": si 100 sesiones piden la misma clave
+    expirada a la vez, sólo una ejecuta ``loader`` y el resto espera su resultado.
+    Con ``max_entries`` se expulsan las claves menos usadas recientemente (LRU).
+    Con ``shared`` las claves que faltan en memoria se buscan primero en el
+    almacén compartido (lo que cargó otro worker) y lo cargado se publica ahí.
+    """
+
+    def __init__(self, ttl: float, max_entries: Optional[int] = None, shared: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.shared = shared
+        self._data: "OrderedDict[Hashable, tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_hits = 0
+
+    def _fresh(self, key: Hashable) -> Optional[tuple[Any, float]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and time.time() - entry[1] < self.ttl:
+                self._data.move_to_end(key)
+                return entry
+        return None
+
+    def _put(self, key: Hashable, entry: tuple[Any, float]):
+        """Guarda en memoria y expulsa por LRU (llamar con ``_lock`` tomado)."""
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while self.max_entries is not None and len(self._data) > self.max_entries:
+            old, _ = self._data.popitem(last=False)
+            self._key_locks.pop(old, None)
+            self.evictions += 1
+
+    def _store(self, key: Hashable, value: Any) -> tuple[Any, float]:
+        entry = (value, time.time())
+        with self._lock:
+            self._put(key, entry)
+            self.misses += 1
+        return entry
+
+    # ── Segundo nivel compartido entre workers ------------------------------
+    def _shared_get(self, keys: list) -> dict:
+        """{clave: entrada} vigentes en el almacén compartido (y las copia a memoria)."""
+        store = get_store() if self.shared else None
+        if store is None or not keys:
+            return {}
+        try:
+            found = store.get_many(self.shared, keys)
+        except sqlite3.Error as exc:
+            logger.warning("Caché %s: almacén compartido no disponible: %s", self.shared, exc)
+            return {}
+        now, out = time.time(), {}
+        with self._lock:
+            for key, entry in found.items():
+                if now - entry[1] < self.ttl:
+                    self._put(key, entry)
+                    out[key] = entry
+            self.hits += len(out)
+            self.shared_hits += len(out)
+        return out
+
+    def _shared_set(self, values: dict, stored_at: float):
+        store = get_store() if self.shared else None
+        if store is None or not values:
+            return
+        try:
+            store.set_many(self.shared, values, stored_at)
+        except sqlite3.Error as exc:
+            logger.warning("Caché %s: no se pudo publicar: %s", self.shared, exc)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> tuple[Any, float]:
+        """Devuelve (valor, timestamp en que se cargó)."""
+        entry = self._fresh(key)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self._fresh(key)          # otro hilo pudo cargarla mientras esperábamos
+            if entry is not None:
+                with self._lock:
+                    self.hits += 1
+                return entry
+            entry = self._shared_get([key]).get(key)     # ¿la cargó otro worker?
+            if entry is not None:
+                return entry
+            entry = self._store(key, loader())
+            self._shared_set({key: entry[0]}, entry[1])
+            return entry
+
+    def get_many(self, keys: Iterable[Hashable], loader: Callable[[list], dict]) -> dict:
+        """
+        Valores de varias claves. Las ausentes o vencidas se piden juntas a
+        ``loader(faltantes) -> {clave: valor}`` (una sola consulta). Las claves
+        que el loader no devuelve se guardan como None (caché negativa).
+        """
+        out, faltantes = {}, []
+        for key in dict.fromkeys(keys):
+            entry = self._fresh(key)
+            if entry is None:
+                faltantes.append(key)
+            else:
+                out[key] = entry[0]
+        with self._lock:
+            self.hits += len(out)
+        for key, entry in self._shared_get(faltantes).items():
+            out[key] = entry[0]
+        faltantes = [key for key in faltantes if key not in out]
+        if faltantes:
+            cargados = loader(faltantes)
+            for key in faltantes:
+                out[key] = self._store(key, cargados.get(key))[0]
+            self._shared_set({key: out[key] for key in faltantes}, time.time())
+        return out
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+        store = get_store() if self.shared else None
+        if store is not None:
+            try:
+                store.delete(self.shared, key)
+            except sqlite3.Error as exc:
+                logger.warning("Caché %s: no se pudo invalidar: %s", self.shared, exc)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,44 @@
+# services/cambios.py
+"""
+Avisos de cambios de datos dentro del proceso.
+
+Los servicios que escriben llaman ``notificar("ordenes", ...)`` después de
+confirmar la escritura; quien muestra esos datos se suscribe con
+``suscribir`` (la caché de páginas de cada sesión, components/page_cache.py,
+según ``Ruta.datos`` del registro de rutas). Los oyentes corren en el hilo
+que notifica: deben delegar el trabajo de UI al loop de su sesión.
+"""
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+Oyente = Callable[[frozenset[str]], None]
+
+_oyentes: list[Oyente] = []
+_lock = threading.Lock()
+
+
+def suscribir(oyente: Oyente):
+    with _lock:
+        if oyente not in _oyentes:
+            _oyentes.append(oyente)
+
+
+def desuscribir(oyente: Oyente):
+    with _lock:
+        if oyente in _oyentes:
+            _oyentes.remove(oyente)
+
+
+def notificar(*tablas: str):
+    """Avisa que ``tablas`` cambiaron (un oyente que falla no frena a los demás)."""
+    cambio = frozenset(tablas)
+    with _lock:
+        oyentes = list(_oyentes)
+    for oyente in oyentes:
+        try:
+            oyente(cambio)
+        except Exception as exc:
+            logger.warning("Oyente de cambios falló: %s", exc)
@@ -0,0 +1,64 @@
+# services/dashboard.py
+"""
+Métricas del panel principal: un solo RPC (``dashboard_resumen``) cuyo
+resultado se comparte entre todas las sesiones mediante una caché TTL.
+Con N supervisores en /home se hace como máximo una consulta por intervalo.
+"""
+import logging
+import os
+import time
+
+from supabase import Client
+
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_TTL = float(os.getenv("DASHBOARD_TTL", "30"))       # segundos
+
+# (columna del RPC, título de la tarjeta)
+METRICAS = [
+    ("ordenes_totales", "Órdenes totales"),
+    ("tickets_pendientes", "Tickets Pendientes"),
+    ("alistamiento_en_proceso", "Alistamiento en Proceso"),
+    ("serializacion_pendiente", "Serialización Pendiente"),
+    ("facturas_pendientes", "Facturas Pendientes"),
+]
+
+_cache = TTLCache(ttl=DASHBOARD_TTL, shared="dashboard")
+
+
+def consultar(client: Client) -> dict:
+    """
+    Lectura directa, sin caché: {"valores": {metrica: n}, "instantanea":
+    pg_current_snapshot de la consulta}. La usa realtime_hub para sembrar.
+    """
+    logger.info("Consultando dashboard_resumen")
+    data = client.rpc("dashboard_resumen").execute().data
+    row = data[0] if isinstance(data, list) else data
+    return {
+        "valores": {key: int(row.get(key) or 0) for key, _ in METRICAS},
+        "instantanea": row.get("instantanea"),
+    }
+
+
+def _fetch_resumen(client: Client) -> dict:
+    return consultar(client)["valores"]
+
+
+def get_resumen(client: Client) -> dict:
+    """
+    Devuelve {"valores": {metrica: n}, "edad_s": segundos desde la consulta,
+    "hit_rate": tasa de aciertos de la caché}.
+    """
+    valores, cargado = _cache.get_or_load("resumen", lambda: _fetch_resumen(client))
+    return {
+        "valores": valores,
+        "edad_s": time.time() - cargado,
+        "hit_rate": _cache.hit_rate,
+    }
+
+
+def invalidate():
+    """Fuerza la próxima lectura a consultar la base (p. ej. tras una carga)."""
+    _cache.invalidate("resumen")
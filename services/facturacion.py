@@ -0,0 +1,352 @@
+# services/facturacion.py
+"""
+Facturación masiva (cierre de mes).
+
+  1. Se leen las órdenes y los precios en lotes (``in`` de PostgREST) y se
+     arma una factura por orden, identificada por ``CLAVE_ORDEN``
+     (marketplace, codigo_vendedor, numero_orden): el mismo número de dos
+     vendedores o canales son dos facturas. Las órdenes que ya tienen
+     factura se omiten (y un índice único en la base lo garantiza). Los
+     números se reservan de una sola vez en la base (RPC
+     ``reservar_numeros_factura``, migrations/006). Los importes son
+     ``Decimal`` redondeados al centavo, como las columnas numeric(14,2).
+  2. El render de documentos (XML siempre, PDF si ``reportlab`` está
+     instalado) corre en un pool de procesos: cada tarea recibe un bloque
+     de facturas y escribe sus archivos, así el costo de serializar entre
+     procesos se paga por bloque y no por factura.
+  3. A medida que vuelven los bloques, los registros se insertan en
+     ``facturas`` en lotes (cada insert de PostgREST es una transacción).
+
+Cancelar descarta los bloques que aún no empezaron; los que se estaban
+renderizando terminan y se registran con el resto de lo ya renderizado, así
+todo documento en disco tiene su registro. Si la emisión falla (p. ej. un
+insert), se borran los documentos que no alcanzaron a registrarse. En ambos
+casos el resumen indica cuántas facturas quedaron registradas.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from services import referencias
+
+logger = logging.getLogger(__name__)
+
+try:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    PDF_DISPONIBLE = True
+except ImportError:
+    # reportlab es opcional: sin él sólo se genera el XML
+    PDF_DISPONIBLE = False
+
+TABLA_FACTURAS = "facturas"
+TABLA_ORDENES  = "ordenes"
+PREFIJO        = os.getenv("FACTURA_PREFIJO", "FE")
+IVA            = Decimal("0.19")
+CENTAVO        = Decimal("0.01")
+CLAVE_ORDEN    = ("marketplace", "codigo_vendedor", "numero_orden")   # índice único de facturas (migrations/006)
+FILTRO_IN      = 200               # valores por filtro ``in`` (largo de URL)
+CHUNK_SIZE     = 100               # facturas por tarea del pool
+BATCH_SIZE     = 500               # registros por INSERT
+RESERVA_MAX    = 10_000            # números por llamada a reservar_numeros_factura (migrations/006)
+WORKERS        = max((os.cpu_count() or 2) - 1, 1)
+
+ProgressCallback = Callable[[dict], None]
+
+
+# ────────────────────────────────────────────────────────────────
+# DATOS
+# ────────────────────────────────────────────────────────────────
+def _en_bloques(valores: list, n: int):
+    for i in range(0, len(valores), n):
+        yield valores[i:i + n]
+
+
+def _clave(fila: dict) -> tuple:
+    return tuple(fila.get(c) for c in CLAVE_ORDEN)
+
+
+def _centavos(valor: Decimal) -> Decimal:
+    return valor.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def cargar_ordenes(client, numeros: list[str]) -> dict[tuple, list[dict]]:
+    """Líneas de cada orden (``CLAVE_ORDEN`` → líneas) y precio de cada SKU."""
+    lineas: list[dict] = []
+    for bloque in _en_bloques(numeros, FILTRO_IN):
+        lineas += (
+            client.table(TABLA_ORDENES)
+            .select("numero_orden,sku,cantidad,codigo_vendedor,marketplace,direccion")
+            .in_("numero_orden", bloque)
+            .execute()
+            .data
+        )
+
+    # precios desde la caché de referencias (sólo se consultan los SKU que faltan)
+    productos = referencias.get_many(client, "productos", (l["sku"] for l in lineas))
+
+    por_orden: dict[tuple, list[dict]] = {}
+    for l in lineas:
+        p = productos.get(l["sku"]) or {}
+        l["descripcion"] = p.get("descripcion") or l["sku"]
+        l["precio"] = Decimal(str(p.get("precio") or 0))
+        por_orden.setdefault(_clave(l), []).append(l)
+    return por_orden
+
+
+def ya_facturadas(client, numeros: list[str]) -> set[tuple]:
+    """Claves de las órdenes de ``numeros`` que ya tienen factura (en cualquier estado)."""
+    claves: set[tuple] = set()
+    for bloque in _en_bloques(numeros, FILTRO_IN):
+        filas = (
+            client.table(TABLA_FACTURAS)
+            .select(",".join(CLAVE_ORDEN))
+            .in_("numero_orden", bloque)
+            .execute()
+            .data
+        )
+        claves.update(_clave(f) for f in filas)
+    return claves
+
+
+def reservar_numeros(client, cantidad: int) -> list[int]:
+    """
+    ``cantidad`` consecutivos reservados en la base, en tramos de hasta
+    ``RESERVA_MAX`` (cada tramo es consecutivo; entre tramos puede haber
+    números de otro cierre simultáneo).
+    """
+    numeros: list[int] = []
+    while len(numeros) < cantidad:
+        n = min(cantidad - len(numeros), RESERVA_MAX)
+        primero = int(client.rpc("reservar_numeros_factura", {"cantidad": n}).execute().data)
+        numeros.extend(range(primero, primero + n))
+    return numeros
+
+
+def armar_facturas(por_orden: dict[tuple, list[dict]], numeros: Iterable[int], fecha: Optional[str] = None) -> list[dict]:
+    """Una factura por orden, numeradas en orden de clave con ``numeros``."""
+    fecha = fecha or date.today().isoformat()
+    facturas = []
+    orden = sorted(por_orden, key=lambda k: tuple("" if v is None else str(v) for v in k))
+    for clave, numero in zip(orden, numeros, strict=True):
+        lineas = por_orden[clave]
+        subtotal = _centavos(sum((l["cantidad"] * l["precio"] for l in lineas), Decimal(0)))
+        iva = _centavos(subtotal * IVA)
+        facturas.append({
+            **dict(zip(CLAVE_ORDEN, clave)),
+            "numero_factura": f"{PREFIJO}{numero:08d}",
+            "fecha": fecha,
+            "direccion": lineas[0].get("direccion"),
+            "lineas": lineas,
+            "subtotal": subtotal,
+            "iva": iva,
+            "total": subtotal + iva,
+        })
+    return facturas
+
+
+# ────────────────────────────────────────────────────────────────
+# RENDER (corre en los procesos del pool)
+# ────────────────────────────────────────────────────────────────
+def _xml(f: dict) -> bytes:
+    raiz = ET.Element("Factura", numero=f["numero_factura"], fecha=f["fecha"])
+    ET.SubElement(raiz, "Orden").text = f["numero_orden"]
+    ET.SubElement(raiz, "Canal").text = f["marketplace"] or ""
+    ET.SubElement(raiz, "Vendedor").text = f["codigo_vendedor"] or ""
+    ET.SubElement(raiz, "Direccion").text = f["direccion"] or ""
+    items = ET.SubElement(raiz, "Lineas")
+    for l in f["lineas"]:
+        ET.SubElement(
+            items, "Linea",
+            sku=l["sku"], cantidad=str(l["cantidad"]), precio=f"{l['precio']:.2f}",
+            total=f"{l['cantidad'] * l['precio']:.2f}",
+        ).text = l["descripcion"]
+    totales = ET.SubElement(raiz, "Totales")
+    for campo in ("subtotal", "iva", "total"):
+        ET.SubElement(totales, campo.capitalize()).text = f"{f[campo]:.2f}"
+    return ET.tostring(raiz, encoding="utf-8", xml_declaration=True)
+
+
+def _pdf(f: dict, path: Path):
+    c = canvas.Canvas(str(path), pagesize=letter)
+    _, alto = letter
+    y = alto - 60
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, y, f"Factura {f['numero_factura']}")
+    c.setFont("Helvetica", 10)
+    for texto in (f"Fecha: {f['fecha']}", f"Orden: {f['numero_orden']}", f"Dirección: {f['direccion'] or ''}"):
+        y -= 16
+        c.drawString(50, y, texto)
+    y -= 30
+    for l in f["lineas"]:
+        c.drawString(50, y, f"{l['sku']}  {l['descripcion'][:50]}")
+        c.drawRightString(450, y, f"{l['cantidad']} x {l['precio']:,.2f}")
+        c.drawRightString(560, y, f"{l['cantidad'] * l['precio']:,.2f}")
+        y -= 14
+        if y < 80:
+            c.showPage()
+            c.setFont("Helvetica", 10)
+            y = alto - 60
+    y -= 16
+    for campo in ("subtotal", "iva", "total"):
+        c.drawRightString(560, y, f"{campo.upper()}: {f[campo]:,.2f}")
+        y -= 14
+    c.save()
+
+
+def render_bloque(facturas: list[dict], out_dir: str, pdf: bool) -> list[dict]:
+    """Escribe los documentos de un bloque y devuelve los registros para ``facturas``."""
+    out = Path(out_dir)
+    registros = []
+    for f in facturas:
+        xml_path = out / f"{f['numero_factura']}.xml"
+        xml_path.write_bytes(_xml(f))
+        pdf_path = None
+        if pdf:
+            pdf_path = out / f"{f['numero_factura']}.pdf"
+            _pdf(f, pdf_path)
+        registros.append({
+            "numero_factura": f["numero_factura"],
+            "marketplace": f["marketplace"],
+            "codigo_vendedor": f["codigo_vendedor"],
+            "numero_orden": f["numero_orden"],
+            "fecha": f["fecha"],
+            # como texto: JSON no tiene decimales exactos y PostgREST lo castea a numeric
+            "subtotal": str(f["subtotal"]),
+            "iva": str(f["iva"]),
+            "total": str(f["total"]),
+            "archivo_xml": xml_path.name,
+            "archivo_pdf": pdf_path.name if pdf_path else None,
+            "estado": "emitida",
+        })
+    return registros
+
+
+# ────────────────────────────────────────────────────────────────
+# ORQUESTACIÓN
+# ────────────────────────────────────────────────────────────────
+def emitir_facturas(
+    client,
+    facturas: list[dict],
+    out_dir,
+    workers: int = WORKERS,
+    chunk_size: int = CHUNK_SIZE,
+    batch_size: int = BATCH_SIZE,
+    pdf: Optional[bool] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> dict:
+    """
+    Renderiza ``facturas`` en ``workers`` procesos y registra cada una.
+    Devuelve {success, done, total, seconds, per_s, dir[, error]}.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pdf = PDF_DISPONIBLE if pdf is None else pdf and PDF_DISPONIBLE
+    stats = {"done": 0, "total": len(facturas), "seconds": 0.0, "per_s": 0.0, "dir": str(out_dir)}
+    t0 = time.perf_counter()
+    pendientes_insert: list[dict] = []
+    registradas: set[str] = set()
+
+    def emitir():
+        stats["seconds"] = time.perf_counter() - t0
+        stats["per_s"] = stats["done"] / stats["seconds"] if stats["seconds"] else 0.0
+        if on_progress:
+            on_progress(dict(stats))
+
+    def insertar(forzar: bool = False):
+        while len(pendientes_insert) >= batch_size or (forzar and pendientes_insert):
+            lote = pendientes_insert[:batch_size]
+            client.table(TABLA_FACTURAS).insert(lote).execute()
+            registradas.update(r["numero_factura"] for r in lote)
+            del pendientes_insert[:batch_size]
+            stats["done"] += len(lote)
+            emitir()
+
+    logger.info("Facturación: %s facturas en %s procesos (pdf=%s)", len(facturas), workers, pdf)
+    # "spawn": el servidor Flet tiene hilos vivos y fork podría copiar locks tomados
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    en_curso: set = set()
+    try:
+        en_curso = {pool.submit(render_bloque, b, str(out_dir), pdf) for b in _en_bloques(facturas, chunk_size)}
+        while en_curso:
+            if cancel_event is not None and cancel_event.is_set():
+                # los bloques que ya se renderizan terminan de escribir: se esperan y se registran
+                listos = _detener(en_curso)
+                en_curso = set()
+                for fut in listos:
+                    pendientes_insert.extend(fut.result())
+                insertar(forzar=True)
+                logger.info("Facturación cancelada tras %s facturas", stats["done"])
+                emitir()
+                return {**stats, "success": False, "error": "Cancelada por el usuario"}
+
+            listos, en_curso = wait(en_curso, timeout=0.25, return_when=FIRST_COMPLETED)
+            for fut in listos:
+                pendientes_insert.extend(fut.result())
+            insertar()
+        insertar(forzar=True)
+    except Exception as exc:
+        logger.error("Facturación falló: %s", exc)
+        _detener(en_curso)
+        borradas = _borrar_sin_registro(facturas, registradas, out_dir)
+        if borradas:
+            logger.warning("Facturación: %s documentos sin registro eliminados", borradas)
+        emitir()
+        return {**stats, "success": False, "error": str(exc)}
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+    emitir()
+    logger.info("Facturación completa: %s facturas a %.0f/s", stats["done"], stats["per_s"])
+    return {**stats, "success": True}
+
+
+def _detener(en_curso: set) -> list:
+    """Cancela lo que no empezó y espera lo que ya corre; devuelve los bloques terminados sin error."""
+    for fut in en_curso:
+        fut.cancel()
+    terminados, _ = wait(en_curso)
+    return [f for f in terminados if not f.cancelled() and f.exception() is None]
+
+
+def _borrar_sin_registro(facturas: list[dict], registradas: set[str], out_dir: Path) -> int:
+    """Elimina los XML/PDF de las facturas que no quedaron en ``facturas``."""
+    borradas = 0
+    for f in facturas:
+        if f["numero_factura"] in registradas:
+            continue
+        for ext in (".xml", ".pdf"):
+            path = out_dir / f"{f['numero_factura']}{ext}"
+            if path.exists():
+                path.unlink()
+                borradas += 1
+    return borradas
+
+
+def facturar_ordenes(client, numeros: list[str], out_dir, **kwargs) -> dict:
+    """
+    Atajo de la página: carga datos, omite lo ya facturado, reserva números
+    y emite. ``omitidas`` cuenta las órdenes que ya tenían factura.
+    """
+    por_orden = cargar_ordenes(client, numeros)
+    facturadas = ya_facturadas(client, numeros) if por_orden else set()
+    por_facturar = {k: v for k, v in por_orden.items() if k not in facturadas}
+    omitidas = len(por_orden) - len(por_facturar)
+    if omitidas:
+        logger.info("Facturación: %s órdenes ya tenían factura y se omiten", omitidas)
+    if not por_facturar:
+        error = "Todas las órdenes ya tienen factura" if por_orden else "Ninguna de las órdenes existe"
+        return {"success": False, "done": 0, "total": 0, "seconds": 0.0, "per_s": 0.0,
+                "dir": str(out_dir), "omitidas": omitidas, "error": error}
+    facturas = armar_facturas(por_facturar, reservar_numeros(client, len(por_facturar)))
+    return {**emitir_facturas(client, facturas, out_dir, **kwargs), "omitidas": omitidas}
@@ -0,0 +1,388 @@
+# services/ingesta.py
+"""
+Motor de ingesta por bloques para archivos de órdenes (CSV / XLSX).
+
+El archivo nunca se carga completo en memoria:
+  1. Se lee en bloques de tamaño acotado (``chunk_size`` filas).
+  2. Cada bloque se normaliza y valida de forma vectorizada con las reglas
+     de ``MOTOR_ORDENES`` (services/reglas.py) y se guarda en el staging
+     columnar (services/staging.py) junto a su mapa de errores por fila. Si
+     el mismo archivo ya se había subido, se leen los lotes del staging.
+  3. Las filas con errores bloqueantes se rechazan (quedan en la vista
+     previa con sus mensajes). El resto se clasifica contra el índice de
+     hashes de lo ya cargado y sólo las nuevas o cambiadas se envían (upsert
+     por ``CLAVE_ORDEN``, en lotes de ``batch_size``). Re-subir un exporte es
+     una carga delta.
+
+El uso de memoria depende sólo de ``chunk_size``, no del tamaño del archivo.
+"""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from services import referencias, reglas
+from services.staging import (
+    CAMBIADA, ETIQUETAS_CAMBIO, NUEVA, RECHAZADA, SIN_CAMBIOS, STAGING_DIR, HashIndex, Staging, get_hash_index,
+)
+
+logger = logging.getLogger(__name__)
+
+TABLA_ORDENES = "ordenes"
+CLAVE_ORDEN   = "marketplace,codigo_vendedor,numero_orden,sku"   # índice único (migrations/010)
+CHUNK_SIZE    = 10_000          # filas leídas por bloque
+BATCH_SIZE    = 1_000           # filas por upsert
+ESCRITORES    = int(os.getenv("INGESTA_ESCRITORES", "4"))   # upserts simultáneos en el proceso
+
+# Columnas destino en public.ordenes
+COLUMNAS_ORDEN = [
+    "numero_orden",
+    "marketplace",
+    "sku",
+    "cantidad",
+    "codigo_vendedor",
+    "fecha_orden",
+    "direccion",
+]
+COLUMNAS_REQUERIDAS = ["numero_orden", "sku", "cantidad"]
+
+# Esquema fijo de las filas normalizadas (staging y vista previa, Arrow IPC)
+ESQUEMA_ORDEN = pa.schema(
+    [(c, pa.int64() if c == "cantidad" else pa.string()) for c in COLUMNAS_ORDEN]
+)
+# Staging: más el mapa de errores de las reglas (uint32, un bit por regla)
+ESQUEMA_STAGING = ESQUEMA_ORDEN.append(pa.field("errores", pa.uint32()))
+# La vista previa muestra además qué pasó con cada fila y sus errores en texto
+ESQUEMA_PREVIEW = ESQUEMA_ORDEN.append(pa.field("cambio", pa.string())).append(pa.field("errores", pa.string()))
+
+# Encabezados habituales de los exportes de marketplace → columna destino
+ALIAS_COLUMNAS = {
+    "orden": "numero_orden",
+    "order_id": "numero_orden",
+    "id_orden": "numero_orden",
+    "n_orden": "numero_orden",
+    "canal": "marketplace",
+    "seller_sku": "sku",
+    "referencia": "sku",
+    "qty": "cantidad",
+    "quantity": "cantidad",
+    "unidades": "cantidad",
+    "vendedor": "codigo_vendedor",
+    "fecha": "fecha_orden",
+    "order_date": "fecha_orden",
+    "direccion_envio": "direccion",
+    "address": "direccion",
+}
+
+ProgressCallback = Callable[[dict], None]
+
+
+# ────────────────────────────────────────────────────────────────
+# LECTURA POR BLOQUES
+# ────────────────────────────────────────────────────────────────
+def _contar_filas_csv(path: Path) -> int:
+    """
+    Cuenta saltos de línea leyendo en binario (sin parsear). Es una
+    estimación: un campo entre comillas con saltos de línea cuenta de más y
+    una última fila sin salto final, de menos.
+    """
+    lineas = 0
+    with open(path, "rb") as fh:
+        for bloque in iter(lambda: fh.read(1 << 20), b""):
+            lineas += bloque.count(b"\n")
+    return max(lineas - 1, 0)          # sin encabezado
+
+
+def contar_filas(path: Path) -> Optional[int]:
+    """
+    Total aproximado de filas de datos (None si no se puede estimar). Sólo
+    para el progreso: la ingesta lo ajusta a las filas leídas.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        return _contar_filas_csv(path)
+    try:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True)
+        max_row = wb.active.max_row
+        wb.close()
+        return max(max_row - 1, 0) if max_row else None
+    except Exception as exc:
+        logger.warning("No se pudo estimar filas de %s: %s", path.name, exc)
+        return None
+
+
+def _iter_csv(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    with pd.read_csv(
+        path,
+        sep=_detectar_separador(path),
+        chunksize=chunk_size,
+        dtype=str,
+        keep_default_na=False,
+        encoding="utf-8-sig",
+    ) as reader:
+        yield from reader
+
+
+def _detectar_separador(path: Path) -> str:
+    """Los exportes en español suelen venir separados por ';'."""
+    with open(path, "r", encoding="utf-8-sig", errors="ignore") as fh:
+        encabezado = fh.readline()
+    return ";" if encabezado.count(";") > encabezado.count(",") else ","
+
+
+def _iter_xlsx(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        filas = wb.active.iter_rows(values_only=True)
+        encabezado = [str(c or "").strip() for c in next(filas, [])]
+        buffer = []
+        for fila in filas:
+            buffer.append(fila)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=encabezado, dtype=str)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=encabezado, dtype=str)
+    finally:
+        wb.close()
+
+
+def iter_chunks(path, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Itera el archivo en DataFrames de como máximo ``chunk_size`` filas."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return _iter_csv(path, chunk_size)
+    if suffix in (".xlsx", ".xlsm"):
+        return _iter_xlsx(path, chunk_size)
+    raise ValueError(f"Formato no soportado: {suffix}")
+
+
+# ────────────────────────────────────────────────────────────────
+# NORMALIZACIÓN / VALIDACIÓN
+# ────────────────────────────────────────────────────────────────
+def _normalizar_encabezados(df: pd.DataFrame) -> pd.DataFrame:
+    cols = (
+        df.columns.str.strip()
+        .str.lower()
+        .str.replace(r"[\s\-]+", "_", regex=True)
+    )
+    df.columns = [ALIAS_COLUMNAS.get(c, c) for c in cols]
+    return df
+
+
+# Normalización y reglas de las filas de órdenes (services/reglas.py).
+# El orden de REGLAS_ORDEN fija el bit de cada una en el mapa de errores.
+SKU_PATRON = r"^[A-Z0-9][A-Z0-9._/-]{1,39}$"
+FORMATOS_FECHA = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+ABREVIATURAS_DIRECCION = {
+    r"(?i)\bcalle\b": "Cl",
+    r"(?i)\bcarrera\b": "Cra",
+    r"(?i)\bavenida\b": "Av",
+    r"(?i)\bdiagonal\b": "Dg",
+    r"(?i)\btransversal\b": "Tv",
+    r"(?i)\bn[o°º]\.?\s*(\d)": r"# \1",
+}
+
+MOTOR_ORDENES = reglas.Motor(
+    ESQUEMA_ORDEN,
+    normalizaciones=(
+        reglas.Normalizacion("numero_orden", (reglas.recortar,)),
+        reglas.Normalizacion("marketplace", (reglas.recortar,)),
+        reglas.Normalizacion("sku", (reglas.recortar, reglas.mayusculas)),
+        reglas.Normalizacion("cantidad", (reglas.recortar, reglas.reemplazos({r"\.0+$": ""}), reglas.entero)),
+        reglas.Normalizacion("codigo_vendedor", (reglas.recortar,)),
+        reglas.Normalizacion("fecha_orden", (reglas.recortar, reglas.fecha(*FORMATOS_FECHA))),
+        reglas.Normalizacion(
+            "direccion", (reglas.recortar, reglas.colapsar_espacios, reglas.reemplazos(ABREVIATURAS_DIRECCION)),
+        ),
+    ),
+    reglas=(
+        reglas.requerido("numero_orden", "Falta número de orden"),
+        reglas.requerido("sku", "Falta SKU"),
+        reglas.patron("sku", SKU_PATRON, "SKU con formato inválido"),
+        reglas.mayor_que("cantidad", 0, "Cantidad no es un entero mayor que 0"),
+        reglas.en_catalogo("codigo_vendedor", "vendedores", "Vendedor sin usuario asignado"),
+        reglas.interpretable("fecha_orden", "Fecha no reconocida"),
+    ),
+)
+MASCARA_RECHAZO = np.uint32(MOTOR_ORDENES.mascara_bloqueo)
+
+
+def contexto_reglas(client) -> dict:
+    """
+    Datos externos de las reglas. Sin catálogo (error de red, RPC
+    ``codigos_vendedor`` no instalada, catálogo vacío) la regla de vendedor
+    se omite en lugar de rechazar todas las filas.
+    """
+    try:
+        codigos = referencias.codigos_vendedor(client)
+    except Exception as exc:
+        logger.warning("Sin catálogo de vendedores para validar la carga: %s", exc)
+        return {}
+    return {"vendedores": codigos} if codigos else {}
+
+
+def normalizar_chunk(df: pd.DataFrame, compilado: Optional[reglas.Compilado] = None) -> pa.Table:
+    """
+    Normaliza y valida un bloque (columnar, sin recorrer filas).
+    Devuelve las filas en ``ESQUEMA_STAGING``: COLUMNAS_ORDEN más ``errores``
+    (bits de MOTOR_ORDENES); las filas con errores no se descartan aquí.
+    """
+    compilado = compilado or MOTOR_ORDENES.compilar()
+    crudo = reglas.columnas_crudas(_normalizar_encabezados(df), COLUMNAS_REQUERIDAS)
+    tabla, errores = compilado.aplicar(crudo)
+    return tabla.append_column("errores", pa.array(errores, pa.uint32()))
+
+
+# ────────────────────────────────────────────────────────────────
+# INGESTA
+# ────────────────────────────────────────────────────────────────
+# Tope de escrituras en vuelo para todo el proceso (todas las cargas y
+# sesiones): varias cargas en paralelo no multiplican la presión sobre
+# PostgREST ni chocan con su límite de requests.
+_escritores = threading.BoundedSemaphore(ESCRITORES)
+
+
+def _upsert_lotes(client, lote: pa.RecordBatch, batch_size: int, index: HashIndex):
+    """Envía ``lote`` por partes; cada parte confirmada se registra en el índice."""
+    for i in range(0, lote.num_rows, batch_size):
+        parte = lote.slice(i, batch_size)
+        registros = parte.select(COLUMNAS_ORDEN).to_pylist()
+        with _escritores:
+            client.table(TABLA_ORDENES).upsert(registros, on_conflict=CLAVE_ORDEN).execute()
+        index.registrar(parte.column("clave").to_numpy(), parte.column("hash").to_numpy())
+
+
+def _ultima_por_clave(clave: np.ndarray) -> np.ndarray:
+    """Posiciones de la última aparición de cada clave, en orden (un upsert no admite claves repetidas)."""
+    _, desde_el_final = np.unique(clave[::-1], return_index=True)
+    return np.sort(len(clave) - 1 - desde_el_final)
+
+
+def normalizar_archivo(
+    path, chunk_size: int = CHUNK_SIZE, compilado: Optional[reglas.Compilado] = None,
+) -> Iterator[pa.Table]:
+    """Bloque normalizado (con ``errores``) por cada bloque del archivo original."""
+    compilado = compilado or MOTOR_ORDENES.compilar()
+    for chunk in iter_chunks(path, chunk_size):
+        yield normalizar_chunk(chunk, compilado)
+
+
+def abrir_staging(path, staging_dir=None, contexto: Optional[dict] = None) -> tuple[Staging, reglas.Compilado]:
+    """Staging de ``path`` para las reglas compiladas con ``contexto``."""
+    compilado = MOTOR_ORDENES.compilar(contexto)
+    etapa = Staging(
+        path, ESQUEMA_STAGING, staging_dir or STAGING_DIR, variante=compilado.firma, columnas_hash=COLUMNAS_ORDEN,
+    )
+    return etapa, compilado
+
+
+def ingest_file(
+    path,
+    client,
+    chunk_size: int = CHUNK_SIZE,
+    batch_size: int = BATCH_SIZE,
+    on_progress: Optional[ProgressCallback] = None,
+    cancel_event: Optional[threading.Event] = None,
+    preview_path=None,
+    index: Optional[HashIndex] = None,
+    staging_dir=None,
+    contexto: Optional[dict] = None,
+) -> dict:
+    """
+    Ingiere ``path`` en ``ordenes`` por bloques usando ``client`` (cliente
+    Supabase de la sesión que inició la carga). Sólo se envían las filas
+    sin errores bloqueantes y nuevas o cambiadas según ``index`` (por
+    defecto el índice del servidor); ``staging_dir`` cambia dónde se guarda
+    el staging del archivo y ``contexto`` los datos de las reglas (por
+    defecto ``contexto_reglas(client)``).
+    Si se indica ``preview_path`` las filas normalizadas se escriben además en
+    un archivo Arrow IPC, que la vista previa abre mapeado en memoria.
+    Devuelve un resumen {success, done, rejected, total, nuevas, cambiadas,
+    sin_cambios, errores, staging_reutilizado, seconds, rows_per_s[, error]};
+    ``errores`` es el reporte por regla (``Motor.reporte``).
+    """
+    path = Path(path)
+    index = index if index is not None else get_hash_index()
+    contexto = contexto if contexto is not None else contexto_reglas(client)
+    etapa, compilado = abrir_staging(path, staging_dir, contexto)
+    total = contar_filas(path)
+    conteo = np.zeros(len(MOTOR_ORDENES.reglas), dtype=np.int64)
+    stats = {
+        "done": 0, "rejected": 0, "total": total, "nuevas": 0, "cambiadas": 0, "sin_cambios": 0, "errores": [],
+        "staging_reutilizado": etapa.reutilizado, "seconds": 0.0, "rows_per_s": 0.0,
+    }
+    logger.info("Ingesta iniciada: %s (%s filas, staging %s)", path.name, total,
+                "reutilizado" if etapa.reutilizado else "nuevo")
+    t0 = time.perf_counter()
+
+    def emitir():
+        stats["errores"] = MOTOR_ORDENES.reporte(conteo)
+        stats["seconds"] = time.perf_counter() - t0
+        leidas = stats["done"] + stats["rejected"]
+        if stats["total"] is not None and leidas > stats["total"]:
+            stats["total"] = leidas         # la estimación se quedó corta: el progreso no pasa del 100 %
+        stats["rows_per_s"] = leidas / stats["seconds"] if stats["seconds"] else 0.0
+        if on_progress:
+            on_progress(dict(stats))
+
+    preview = pa.ipc.new_file(str(preview_path), ESQUEMA_PREVIEW) if preview_path else None
+    lotes = etapa.lotes(lambda: normalizar_archivo(path, chunk_size, compilado))
+    try:
+        for lote in lotes:
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info("Ingesta cancelada: %s", path.name)
+                return {**stats, "success": False, "error": "Cancelada por el usuario"}
+
+            clave = lote.column("clave").to_numpy()
+            errores = lote.column("errores").to_numpy()
+            rechazada = (errores & MASCARA_RECHAZO) != 0
+            estado = index.clasificar(clave, lote.column("hash").to_numpy())
+            estado[rechazada] = RECHAZADA
+            enviar = np.flatnonzero((estado == NUEVA) | (estado == CAMBIADA))
+            if len(enviar):
+                enviar = enviar[_ultima_por_clave(clave[enviar])]
+                _upsert_lotes(client, lote.take(pa.array(enviar)), batch_size, index)
+            if preview is not None:
+                cambio = pa.array(pd.Series(estado).map(ETIQUETAS_CAMBIO).to_numpy(), pa.string())
+                preview.write_batch(
+                    lote.select(COLUMNAS_ORDEN)
+                    .append_column("cambio", cambio)
+                    .append_column("errores", MOTOR_ORDENES.etiquetas(errores))
+                )
+
+            conteo += MOTOR_ORDENES.conteo(errores)
+            stats["rejected"] += int(rechazada.sum())
+            stats["done"] += lote.num_rows - int(rechazada.sum())
+            stats["nuevas"] += int((estado == NUEVA).sum())
+            stats["cambiadas"] += int((estado == CAMBIADA).sum())
+            stats["sin_cambios"] += int((estado == SIN_CAMBIOS).sum())
+            emitir()
+    except Exception as exc:
+        logger.error("Ingesta falló en %s: %s", path.name, exc)
+        emitir()
+        return {**stats, "success": False, "error": str(exc)}
+    finally:
+        lotes.close()                       # staging incompleto → se descarta
+        if preview is not None:
+            preview.close()
+
+    stats["total"] = stats["done"] + stats["rejected"]     # exacto al terminar
+    emitir()
+    logger.info(
+        "Ingesta completa: %s filas (%s nuevas, %s cambiadas, %s sin cambios, %s rechazadas) a %.0f filas/s",
+        stats["done"], stats["nuevas"], stats["cambiadas"], stats["sin_cambios"], stats["rejected"],
+        stats["rows_per_s"],
+    )
+    return {**stats, "success": True}
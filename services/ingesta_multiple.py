@@ -0,0 +1,247 @@
+# services/ingesta_multiple.py
+"""
+Carga de varios archivos de órdenes a la vez (p. ej. los exportes de cada
+vendedor del día).
+
+Dos etapas con contrapresión entre ellas:
+  1. Preparación en un pool de procesos (``workers``): cada tarea lee y
+     normaliza UN archivo y escribe su staging columnar (services/staging).
+     Es la parte de CPU (pandas) y en procesos no compite por el GIL.
+  2. Escritura en hilos (``escritores`` archivos a la vez): ``ingest_file``
+     sobre el staging ya listo (clasificación por hashes + upsert delta).
+     Las requests a Supabase además pasan por el tope global del proceso
+     (``ingesta.ESCRITORES``), así varias cargas no suman presión.
+
+Contrapresión: entre archivos en preparación y preparados sin escritor
+nunca hay más de ``workers + en_espera``; con esa cola llena no se prepara
+ningún archivo más, de modo que un Supabase lento no acumula staging en
+disco ni procesos ocupados sin límite.
+
+Cada archivo termina por su cuenta: un error (columnas faltantes, fallo de
+red...) se informa en su fila y el resto sigue.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Optional
+
+from services.ingesta import CHUNK_SIZE, abrir_staging, contar_filas, contexto_reglas, ingest_file, normalizar_archivo
+from services.staging import STAGING_DIR, HashIndex, get_hash_index
+
+logger = logging.getLogger(__name__)
+
+WORKERS    = max(min((os.cpu_count() or 2) - 1, 4), 1)    # procesos de preparación
+ESCRITORES = 4                                            # archivos escribiéndose a la vez
+EN_ESPERA  = 2                                            # archivos preparados sin escritor
+
+# Estados de cada archivo
+EN_COLA, PREPARANDO, ESPERANDO, CARGANDO, LISTO, ERROR, CANCELADO = (
+    "en cola", "preparando", "esperando", "cargando", "listo", "error", "cancelado",
+)
+
+ProgressCallback = Callable[[dict], None]
+
+
+# ────────────────────────────────────────────────────────────────
+# ETAPA 1: PREPARACIÓN (en el proceso hijo)
+# ────────────────────────────────────────────────────────────────
+_progreso: Optional["multiprocessing.Queue"] = None
+
+
+def _init_worker(cola):
+    global _progreso
+    _progreso = cola
+
+
+def preparar_staging(
+    i: int, path: str, staging_dir: str, contexto: dict, chunk_size: int = CHUNK_SIZE,
+) -> dict:
+    """Escribe el staging de ``path`` informando filas leídas por ``_progreso``."""
+    etapa, compilado = abrir_staging(path, Path(staging_dir), contexto)
+    if etapa.reutilizado:
+        return {"reutilizado": True}
+    leidas = 0
+    for lote in etapa.lotes(lambda: normalizar_archivo(path, chunk_size, compilado)):
+        leidas += lote.num_rows
+        if _progreso is not None:
+            _progreso.put((i, leidas))
+    return {"reutilizado": False, "filas": leidas}
+
+
+# ────────────────────────────────────────────────────────────────
+# ORQUESTACIÓN
+# ────────────────────────────────────────────────────────────────
+def ingest_files(
+    paths,
+    client,
+    workers: int = WORKERS,
+    escritores: int = ESCRITORES,
+    en_espera: int = EN_ESPERA,
+    on_progress: Optional[ProgressCallback] = None,
+    cancel_event: Optional[threading.Event] = None,
+    preview_dir=None,
+    index: Optional[HashIndex] = None,
+    staging_dir=None,
+) -> dict:
+    """
+    Carga ``paths`` con ``client``. ``on_progress`` recibe
+    {archivos: [...], done, total, terminados, seconds, rows_per_s} donde cada
+    archivo es {nombre, estado, leidas, done, total, nuevas, cambiadas,
+    sin_cambios, rejected, errores, preview, error}.
+    Devuelve lo mismo más ``success`` (True si ningún archivo falló).
+    """
+    paths = [Path(p) for p in paths]
+    index = index if index is not None else get_hash_index()
+    staging_dir = Path(staging_dir or STAGING_DIR)
+    contexto = contexto_reglas(client)              # una vez para todos (los hijos no consultan Supabase)
+    preview_dir = Path(preview_dir) if preview_dir else None
+    t0 = time.perf_counter()
+    lock = threading.Lock()
+
+    archivos = [
+        {
+            "nombre": p.name, "estado": EN_COLA, "leidas": 0, "done": 0, "total": contar_filas(p) or 0,
+            "nuevas": 0, "cambiadas": 0, "sin_cambios": 0, "rejected": 0, "errores": [], "error": None,
+            "preview": str(preview_dir / f"{i:02d}-{p.stem}.preview.arrow") if preview_dir else None,
+        }
+        for i, p in enumerate(paths)
+    ]
+
+    def resumen() -> dict:
+        with lock:
+            filas = [dict(a) for a in archivos]
+        seconds = time.perf_counter() - t0
+        done = sum(a["done"] + a["rejected"] for a in filas)
+        return {
+            "archivos": filas,
+            "done": done,
+            "total": sum(a["total"] for a in filas),
+            "terminados": sum(a["estado"] in (LISTO, ERROR, CANCELADO) for a in filas),
+            "seconds": seconds,
+            "rows_per_s": done / seconds if seconds else 0.0,
+        }
+
+    def emitir():
+        if on_progress:
+            on_progress(resumen())
+
+    def actualizar(i: int, **cambios):
+        with lock:
+            archivos[i].update(cambios)
+        emitir()
+
+    def cargar(i: int) -> dict:
+        actualizar(i, estado=CARGANDO)
+
+        def progreso(stats: dict):
+            leidas = stats["done"] + stats["rejected"]
+            actualizar(
+                i, total=max(archivos[i]["total"], leidas),
+                **{k: stats[k] for k in ("done", "nuevas", "cambiadas", "sin_cambios", "rejected", "errores")},
+            )
+
+        return ingest_file(
+            paths[i], client, on_progress=progreso, cancel_event=cancel_event,
+            preview_path=archivos[i]["preview"], index=index, staging_dir=staging_dir, contexto=contexto,
+        )
+
+    def terminar(i: int, r: dict):
+        if r["success"]:
+            actualizar(i, estado=LISTO, total=r["total"])        # exacto (ver ingest_file)
+        else:
+            cancelado = cancel_event is not None and cancel_event.is_set()
+            actualizar(i, estado=CANCELADO if cancelado else ERROR, error=r.get("error"))
+
+    if preview_dir:
+        preview_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(min(workers, len(paths)), 1)
+    logger.info("Carga múltiple: %s archivos (%s procesos, %s escritores)", len(paths), workers, escritores)
+
+    if len(paths) == 1:
+        # un solo archivo: sin pool (arrancar un proceso cuesta más que lo que se paraleliza)
+        terminar(0, cargar(0))
+        return _cerrar(resumen())
+
+    ctx = multiprocessing.get_context("spawn")       # ver services/facturacion.py
+    cola = ctx.Queue()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(cola,))
+    hilos = ThreadPoolExecutor(max_workers=escritores, thread_name_prefix="ingesta")
+    pendientes = deque(range(len(paths)))
+    listos: deque[int] = deque()                     # preparados, esperando escritor
+    preparando: dict = {}
+    cargando: dict = {}
+    try:
+        while pendientes or preparando or listos or cargando:
+            if cancel_event is not None and cancel_event.is_set():
+                for i in [*pendientes, *listos, *preparando.values()]:
+                    actualizar(i, estado=CANCELADO)
+                pendientes.clear()
+                listos.clear()
+                preparando.clear()
+                if not cargando:
+                    break
+
+            # contrapresión: sólo se prepara si la cola de preparados tiene lugar
+            while pendientes and len(preparando) < workers and len(preparando) + len(listos) < workers + en_espera:
+                i = pendientes.popleft()
+                try:
+                    preparando[pool.submit(preparar_staging, i, str(paths[i]), str(staging_dir), contexto)] = i
+                except BrokenProcessPool as exc:        # un hijo murió (memoria): fallan sólo los que faltan
+                    actualizar(i, estado=ERROR, error=str(exc))
+                    continue
+                actualizar(i, estado=PREPARANDO)
+            while listos and len(cargando) < escritores:
+                i = listos.popleft()
+                cargando[hilos.submit(cargar, i)] = i
+
+            terminados, _ = wait([*preparando, *cargando], timeout=0.2, return_when=FIRST_COMPLETED)
+            try:
+                while True:
+                    i, leidas = cola.get_nowait()
+                    leidas = max(leidas, archivos[i]["leidas"])                 # la cola puede llegar tarde
+                    actualizar(i, leidas=leidas, total=max(archivos[i]["total"], leidas))
+            except queue.Empty:
+                pass
+
+            for fut in terminados:
+                if fut in preparando:
+                    i = preparando.pop(fut)
+                    try:
+                        preparado = fut.result()
+                    except Exception as exc:
+                        logger.warning("Preparación de %s falló: %s", paths[i].name, exc)
+                        actualizar(i, estado=ERROR, error=str(exc))
+                        continue
+                    listos.append(i)
+                    # el staging nuevo sabe cuántas filas tiene: reemplaza la estimación
+                    total = preparado.get("filas", archivos[i]["total"])
+                    actualizar(i, estado=ESPERANDO, leidas=total, total=total)
+                else:
+                    i = cargando.pop(fut)
+                    try:
+                        terminar(i, fut.result())
+                    except Exception as exc:                 # ingest_file ya captura lo esperable
+                        terminar(i, {"success": False, "error": str(exc)})
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        hilos.shutdown(wait=True)
+
+    return _cerrar(resumen())
+
+
+def _cerrar(out: dict) -> dict:
+    """Registra el resultado de la carga y agrega ``success``."""
+    fallidos = [a["nombre"] for a in out["archivos"] if a["estado"] != LISTO]
+    logger.info(
+        "Carga múltiple completa: %s/%s archivos, %s filas en %.1f s%s",
+        len(out["archivos"]) - len(fallidos), len(out["archivos"]), out["done"], out["seconds"],
+        f" (sin completar: {', '.join(fallidos)})" if fallidos else "",
+    )
+    return {**out, "success": not fallidos}
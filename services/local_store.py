@@ -0,0 +1,504 @@
+# services/local_store.py
+"""
+Almacén local de la estación (offline-first) y cola de mutaciones salientes.
+
+Las estaciones de bodega corren la app en el equipo de la estación y sólo
+Supabase queda al otro lado del Wi-Fi. Todo pasa primero por un SQLite local
+(modo WAL) para que la UI siga funcionando sin conexión:
+
+  • ``filas``: copia local de lo que la estación lee (seriales de una orden,
+    líneas por alistar…), agrupada por ``grupo`` (p. ej. numero_orden).
+    Las lecturas se sirven desde aquí; la red sólo refresca la copia.
+  • ``cola``: mutaciones pendientes, escritas en la misma transacción que su
+    efecto optimista sobre ``filas``. Un hilo de fondo las envía en lotes
+    cuando hay conexión (backoff exponencial si no).
+      - modo ``upsert``: insert idempotente (``on_conflict`` + ignorar
+        duplicados), para datos de sólo-agregar como los escaneos.
+      - modo ``versionada``: se envía a una RPC con la versión que la
+        estación conocía (``version_base``) y un ``mutacion_id``. La base
+        asigna las versiones; si la fila cambió en el servidor la RPC
+        responde ``conflicto`` con la fila vigente, que reemplaza la local
+        (gana el servidor) y queda registrada en ``conflictos``.
+        Reenviar un lote cuya respuesta se perdió no genera conflictos: la
+        RPC reconoce el ``mutacion_id`` ya aplicado.
+  • Cada mutación guarda su ``propietario`` (auth_uid de quien la hizo) y
+    se envía con el cliente de esa sesión, registrado con ``registrar``:
+    las RLS y las RPC SECURITY INVOKER ven al usuario correcto. Si el
+    propietario no tiene sesión en este proceso (cerró sesión, reinicio),
+    sus filas esperan a que vuelva a registrarse sin frenar las de otros.
+  • Varios procesos (asgi.py) pueden compartir el archivo: cada lote se
+    reclama con ``begin immediate`` antes de enviarlo.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+import httpx
+from supabase import Client
+
+from config import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE     = 100
+FLUSH_INTERVAL = 1.0              # s entre envíos si no se llena el lote
+MAX_BACKOFF    = 30.0             # s de espera máxima tras errores de red
+CLAIM_TIMEOUT  = 60.0             # s tras los que un lote reclamado se reintenta
+RETENCION      = timedelta(days=int(os.getenv("LOCAL_STORE_DIAS", "7")))   # copia sincronizada
+
+UPSERT     = "upsert"
+VERSIONADA = "versionada"
+
+
+def es_error_de_red(exc: BaseException) -> bool:
+    """Fallos de conectividad (no errores de la API): se sirve la copia local."""
+    return isinstance(exc, (httpx.TransportError, OSError))
+
+
+def _ahora() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _clave(fila: dict, columnas: str) -> str:
+    return "|".join(str(fila.get(c.strip())) for c in columnas.split(","))
+
+
+class LocalStore:
+    def __init__(self, path: Path, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.execute("pragma journal_mode=wal")
+        self._db.execute("pragma synchronous=normal")     # durable ante caídas del proceso
+        self._db.executescript(
+            """
+            create table if not exists filas (
+                tabla    text not null,
+                clave    text not null,
+                grupo    text,
+                datos    text not null,
+                version  integer,
+                sync_at  text,
+                primary key (tabla, clave)
+            );
+            create index if not exists filas_grupo on filas (tabla, grupo);
+
+            create table if not exists cola (
+                id            integer primary key autoincrement,
+                mutacion_id   text not null,
+                tabla         text not null,
+                modo          text not null,
+                destino       text,                 -- on_conflict (upsert) o RPC (versionada)
+                clave         text not null,
+                grupo         text,
+                datos         text not null,
+                version_base  integer,
+                creado_at     text not null,
+                propietario   text,                 -- auth_uid de la sesión que la encoló
+                intentos      integer not null default 0,
+                reclamado_por text,
+                reclamado_at  real
+            );
+            create index if not exists cola_grupo on cola (tabla, grupo);
+
+            create table if not exists conflictos (
+                id          integer primary key autoincrement,
+                tabla       text not null,
+                clave       text not null,
+                local       text not null,
+                servidor    text,
+                detectado_at text not null
+            );
+            """
+        )
+        columnas = {r[1] for r in self._db.execute("pragma table_info(cola)")}
+        if "propietario" not in columnas:                  # archivo de una versión anterior
+            self._db.execute("alter table cola add column propietario text")
+        self._db.execute("create index if not exists cola_propietario on cola (propietario, id)")
+        huerfanas = self._db.execute("select count(*) from cola where propietario is null").fetchone()[0]
+        if huerfanas:
+            logger.warning("%s mutaciones sin propietario en %s: no se enviarán", huerfanas, self.path)
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._clientes: dict[str, Client] = {}             # propietario → cliente de su sesión
+        self._thread: Optional[threading.Thread] = None
+        self._owner = f"{os.getpid()}-{id(self)}"
+        self.enviados = 0
+        self.ultimo_error: Optional[str] = None
+        self.purgar()
+
+    def purgar(self, retencion: timedelta = RETENCION):
+        """Descarta la copia local sincronizada hace más de ``retencion`` (nunca lo pendiente)."""
+        limite = (datetime.now(timezone.utc) - retencion).isoformat()
+        with self._lock:
+            self._db.execute("delete from filas where sync_at is not null and sync_at < ?", (limite,))
+
+    # ── Copia local (lecturas) --------------------------------------------
+    def guardar(self, tabla: str, filas: list[dict], clave: str, grupo: Optional[str] = None,
+                valor_grupo: Optional[str] = None, reemplazar: bool = True):
+        """
+        Guarda filas leídas del servidor. Con ``reemplazar`` descarta primero
+        la copia anterior del grupo (o de la tabla si no hay grupo), salvo
+        las filas con mutaciones aún pendientes (su versión local manda).
+        """
+        ahora = _ahora()
+        with self._lock:
+            self._db.execute("begin")
+            try:
+                pendientes = {
+                    r[0] for r in self._db.execute("select distinct clave from cola where tabla = ?", (tabla,))
+                }
+                if reemplazar:
+                    sql, args = "delete from filas where tabla = ?", [tabla]
+                    if valor_grupo is not None:
+                        sql, args = sql + " and grupo = ?", args + [valor_grupo]
+                    self._db.execute(
+                        sql + " and clave not in (select clave from cola where tabla = ?)", args + [tabla]
+                    )
+                self._db.executemany(
+                    "insert or replace into filas (tabla, clave, grupo, datos, version, sync_at) values (?, ?, ?, ?, ?, ?)",
+                    [
+                        (tabla, k, valor_grupo if grupo is None else str(f.get(grupo)),
+                         json.dumps(f, default=str), f.get("version"), ahora)
+                        for f in filas
+                        if (k := _clave(f, clave)) not in pendientes
+                    ],
+                )
+                self._db.execute("commit")
+            except BaseException:
+                self._db.execute("rollback")
+                raise
+
+    def leer(self, tabla: str, grupo: Optional[str] = None) -> list[dict]:
+        with self._lock:
+            if grupo is None:
+                rows = self._db.execute("select datos from filas where tabla = ?", (tabla,))
+            else:
+                rows = self._db.execute("select datos from filas where tabla = ? and grupo = ?", (tabla, grupo))
+            return [json.loads(r[0]) for r in rows]
+
+    def tiene(self, tabla: str, grupo: Optional[str] = None) -> bool:
+        sql, args = "select 1 from filas where tabla = ?", [tabla]
+        if grupo is not None:
+            sql, args = sql + " and grupo = ?", args + [grupo]
+        with self._lock:
+            return self._db.execute(sql + " limit 1", args).fetchone() is not None
+
+    # ── Sesiones que envían sus mutaciones --------------------------------
+    def registrar(self, propietario: str, client: Client):
+        """Envía las mutaciones de ``propietario`` (también las de antes) con ``client``."""
+        with self._lock:
+            self._clientes[propietario] = client
+            self._ensure_thread()
+        self._wake.set()
+
+    def soltar(self, propietario: str, enviar: bool = True):
+        """
+        Deja de usar el cliente de ``propietario`` (logout). Con ``enviar`` se
+        intenta antes un último envío de lo suyo; lo que quede sigue en la
+        cola hasta que vuelva a registrarse.
+        """
+        if enviar and propietario in self._clientes:
+            try:
+                while self.flush(propietario) == self.batch_size:
+                    pass
+            except Exception as exc:
+                logger.info("Pendientes de %s quedan en la cola: %s", propietario, exc)
+        with self._lock:
+            self._clientes.pop(propietario, None)
+
+    # ── Mutaciones (ruta crítica: sólo SQLite local) ----------------------
+    def encolar(
+        self,
+        client: Client,
+        tabla: str,
+        filas: Iterable[dict],
+        *,
+        clave: str,
+        propietario: str,
+        grupo: Optional[str] = None,
+        on_conflict: Optional[str] = None,
+        rpc: Optional[str] = None,
+    ) -> int:
+        """
+        Encola ``filas`` y aplica su efecto en la copia local, en una sola
+        transacción. Con ``rpc`` la mutación es versionada; si no, es un
+        upsert idempotente sobre ``tabla`` con ``on_conflict``. Se enviarán
+        con ``client``, la sesión de ``propietario``.
+        """
+        if not propietario:
+            raise ValueError("encolar requiere el propietario (auth_uid) de la sesión")
+        modo, destino = (VERSIONADA, rpc) if rpc else (UPSERT, on_conflict)
+        ahora = _ahora()
+        n = 0
+        with self._lock:
+            self._db.execute("begin")
+            try:
+                for f in filas:
+                    k = _clave(f, clave)
+                    g = None if grupo is None else str(f.get(grupo))
+                    previa = self._db.execute(
+                        "select datos, version from filas where tabla = ? and clave = ?", (tabla, k)
+                    ).fetchone()
+                    version = previa[1] if previa else None
+                    datos = {**(json.loads(previa[0]) if previa else {}), **f}
+                    self._db.execute(
+                        "insert into cola (mutacion_id, tabla, modo, destino, clave, grupo, datos, version_base,"
+                        " creado_at, propietario) values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (uuid.uuid4().hex, tabla, modo, destino, k, g, json.dumps(f, default=str), version,
+                         ahora, propietario),
+                    )
+                    self._db.execute(
+                        "insert or replace into filas (tabla, clave, grupo, datos, version, sync_at)"
+                        " values (?, ?, ?, ?, ?, null)",
+                        (tabla, k, g, json.dumps(datos, default=str), version),
+                    )
+                    n += 1
+                self._db.execute("commit")
+            except BaseException:
+                self._db.execute("rollback")
+                raise
+            self._clientes[propietario] = client
+            self._ensure_thread()
+        if n and self.pendientes() >= self.batch_size:
+            self._wake.set()
+        return n
+
+    def pendientes(self, tabla: Optional[str] = None) -> int:
+        with self._lock:
+            if tabla is None:
+                return self._db.execute("select count(*) from cola").fetchone()[0]
+            return self._db.execute("select count(*) from cola where tabla = ?", (tabla,)).fetchone()[0]
+
+    def pendientes_de(self, tabla: str, grupo: Optional[str] = None) -> list[dict]:
+        """Datos de las mutaciones aún no confirmadas por el servidor."""
+        sql, args = "select datos from cola where tabla = ?", [tabla]
+        if grupo is not None:
+            sql, args = sql + " and grupo = ?", args + [grupo]
+        with self._lock:
+            return [json.loads(r[0]) for r in self._db.execute(sql + " order by id", args)]
+
+    def conflictos(self, limite: int = 50) -> list[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "select tabla, clave, local, servidor, detectado_at from conflictos order by id desc limit ?",
+                (limite,),
+            ).fetchall()
+        return [
+            {"tabla": t, "clave": k, "local": json.loads(l), "servidor": json.loads(s) if s else None, "detectado_at": d}
+            for t, k, l, s, d in rows
+        ]
+
+    @property
+    def en_linea(self) -> bool:
+        return self.ultimo_error is None
+
+    # ── Envío a Supabase ---------------------------------------------------
+    def _reclamar(self, propietario: str) -> list[tuple]:
+        """Reserva el próximo lote de ``propietario`` para este proceso (otro worker no lo tomará)."""
+        with self._lock:
+            self._db.execute("begin immediate")
+            try:
+                rows = self._db.execute(
+                    "select id, mutacion_id, tabla, modo, destino, clave, datos, version_base from cola"
+                    " where propietario = ? and (reclamado_at is null or reclamado_at < ?) order by id limit ?",
+                    (propietario, time.time() - CLAIM_TIMEOUT, self.batch_size),
+                ).fetchall()
+                if rows:
+                    self._db.executemany(
+                        "update cola set reclamado_por = ?, reclamado_at = ? where id = ?",
+                        [(self._owner, time.time(), r[0]) for r in rows],
+                    )
+                self._db.execute("commit")
+            except BaseException:
+                self._db.execute("rollback")
+                raise
+        return rows
+
+    def _liberar(self, ids: list[int]):
+        with self._lock:
+            self._db.executemany(
+                "update cola set reclamado_por = null, reclamado_at = null, intentos = intentos + 1 where id = ?",
+                [(i,) for i in ids],
+            )
+
+    def flush(self, propietario: Optional[str] = None) -> int:
+        """
+        Envía un lote pendiente de cada propietario registrado (o sólo de
+        ``propietario``), cada uno con su cliente. Devuelve las mutaciones
+        confirmadas; un error de un propietario no frena a los demás y se
+        relanza al final.
+        """
+        with self._lock:
+            if propietario is None:
+                clientes = list(self._clientes.items())
+            else:
+                clientes = [(propietario, self._clientes[propietario])] if propietario in self._clientes else []
+        enviados, error = 0, None
+        for uid, client in clientes:
+            try:
+                enviados += self._flush_de(uid, client)
+            except Exception as exc:
+                logger.debug("Envío de %s falló: %s", uid, exc)
+                error = exc
+        if error is not None:
+            raise error
+        return enviados
+
+    def _flush_de(self, propietario: str, client: Client) -> int:
+        rows = self._reclamar(propietario)
+        if not rows:
+            return 0
+
+        # grupos consecutivos de igual (tabla, modo, destino): un request por grupo
+        grupos: list[tuple[tuple, list]] = []
+        for r in rows:
+            key = (r[2], r[3], r[4])
+            if grupos and grupos[-1][0] == key:
+                grupos[-1][1].append(r)
+            else:
+                grupos.append((key, [r]))
+
+        hechos: list[int] = []
+        try:
+            for (tabla, modo, destino), lote in grupos:
+                if modo == UPSERT:
+                    client.table(tabla).upsert(
+                        [json.loads(r[6]) for r in lote], on_conflict=destino, ignore_duplicates=True
+                    ).execute()
+                    self._confirmar(tabla, [(r[0], r[5], None) for r in lote])
+                    hechos += [r[0] for r in lote]
+                else:
+                    sin_respuesta = self._enviar_versionadas(client, tabla, destino, lote)
+                    hechos += [r[0] for r in lote if r[0] not in sin_respuesta]
+                    if sin_respuesta:
+                        raise RuntimeError(f"{destino}: {len(sin_respuesta)} mutaciones sin respuesta")
+        except Exception:
+            # lo no confirmado se libera aquí, una sola vez, para el próximo intento
+            hechos_set = set(hechos)
+            self._liberar([r[0] for r in rows if r[0] not in hechos_set])
+            self.enviados += len(hechos)
+            raise
+        self.enviados += len(hechos)
+        return len(hechos)
+
+    def _enviar_versionadas(self, client: Client, tabla: str, rpc: str, lote: list[tuple]) -> set[int]:
+        """Aplica confirmaciones y conflictos; devuelve los ids que quedaron sin respuesta."""
+        payload = [
+            {**json.loads(r[6]), "mutacion_id": r[1], "version_base": r[7]}
+            for r in lote
+        ]
+        resultados = {x["mutacion_id"]: x for x in client.rpc(rpc, {"p_filas": payload}).execute().data or []}
+
+        confirmadas, conflictos, sin_respuesta = [], [], set()
+        for r in lote:
+            res = resultados.get(r[1])
+            if res is None:
+                sin_respuesta.add(r[0])                   # se reintenta en el próximo lote
+            elif res.get("estado") == "aplicada":
+                confirmadas.append((r[0], r[5], res.get("fila")))
+            else:
+                conflictos.append((r, res.get("fila")))
+        self._confirmar(tabla, confirmadas)
+        if conflictos:
+            self._resolver_conflictos(tabla, conflictos)
+        return sin_respuesta
+
+    def _confirmar(self, tabla: str, items: list[tuple[int, str, Optional[dict]]]):
+        """Quita de la cola lo aplicado; si hay fila del servidor, actualiza la copia con su versión."""
+        ahora = _ahora()
+        with self._lock:
+            self._db.execute("begin")
+            try:
+                for id_, k, fila in items:
+                    self._db.execute("delete from cola where id = ?", (id_,))
+                    if fila is None:
+                        self._db.execute("update filas set sync_at = ? where tabla = ? and clave = ?", (ahora, tabla, k))
+                    else:
+                        self._db.execute(
+                            "update filas set datos = ?, version = ?, sync_at = ? where tabla = ? and clave = ?",
+                            (json.dumps(fila, default=str), fila.get("version"), ahora, tabla, k),
+                        )
+                self._db.execute("commit")
+            except BaseException:
+                self._db.execute("rollback")
+                raise
+
+    def _resolver_conflictos(self, tabla: str, conflictos: list[tuple[tuple, Optional[dict]]]):
+        """Gana el servidor: su fila reemplaza la local y el cambio local queda registrado."""
+        ahora = _ahora()
+        with self._lock:
+            self._db.execute("begin")
+            try:
+                for r, fila in conflictos:
+                    id_, k, local = r[0], r[5], r[6]
+                    self._db.execute("delete from cola where id = ?", (id_,))
+                    # mutaciones posteriores de la misma fila partían de la versión perdida
+                    self._db.execute("delete from cola where tabla = ? and clave = ? and id > ?", (tabla, k, id_))
+                    if fila is None:
+                        self._db.execute("delete from filas where tabla = ? and clave = ?", (tabla, k))
+                    else:
+                        self._db.execute(
+                            "update filas set datos = ?, version = ?, sync_at = ? where tabla = ? and clave = ?",
+                            (json.dumps(fila, default=str), fila.get("version"), ahora, tabla, k),
+                        )
+                    self._db.execute(
+                        "insert into conflictos (tabla, clave, local, servidor, detectado_at) values (?, ?, ?, ?, ?)",
+                        (tabla, k, local, json.dumps(fila, default=str) if fila is not None else None, ahora),
+                    )
+                    logger.warning("Conflicto en %s[%s]: se conserva la versión del servidor", tabla, k)
+                self._db.execute("commit")
+            except BaseException:
+                self._db.execute("rollback")
+                raise
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="local-store-sync", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        backoff = self.flush_interval
+        while True:
+            self._wake.wait(backoff)
+            self._wake.clear()
+            try:
+                while self.flush() >= self.batch_size:
+                    pass                              # hay más: seguir sin esperar
+                self.ultimo_error = None
+                backoff = self.flush_interval
+            except Exception as exc:
+                self.ultimo_error = "sin conexión" if es_error_de_red(exc) else str(exc)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                logger.warning("Sincronización falló (reintento en %.0f s): %s", backoff, exc)
+
+
+_store: Optional[LocalStore] = None
+_store_lock = threading.Lock()
+
+
+def get_local_store() -> LocalStore:
+    """Almacén único de la estación (todas las pantallas comparten el archivo)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LocalStore(Path(os.getenv("LOCAL_STORE", DATA_DIR / "estacion.db")))
+        return _store
+
+
+def soltar_sesion(propietario: Optional[str]):
+    """Logout: envía lo pendiente de ``propietario`` y suelta su cliente (sin crear el almacén)."""
+    store = _store
+    if store is not None and propietario:
+        store.soltar(propietario)
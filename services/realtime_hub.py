@@ -0,0 +1,225 @@
+# services/realtime_hub.py
+"""
+Suscripción única por proceso a los cambios de Postgres que afectan el panel.
+
+  • Una sola conexión Realtime (o LISTEN/NOTIFY en local) para todo el proceso.
+  • Los contadores del panel se mantienen en memoria y se ajustan con el
+    delta agregado de cada sentencia, sin volver a consultar la base.
+  • La cuenta inicial se lee DESPUÉS de suscribirse. Los eventos que llegan
+    mientras tanto se guardan y, al sembrar, sólo se suman los que la
+    instantánea de esa lectura todavía no incluye (por xid).
+  • Cada sesión se suscribe a las métricas que tiene en pantalla y recibe
+    sólo los cambios de esas métricas (actualiza únicamente esos controles).
+
+Fuente de eventos:
+  - Supabase Realtime (por defecto): INSERT en ``panel_cambios``, una fila
+    por sentencia escrita por los triggers de migrations/002.
+  - LISTEN/NOTIFY (``REALTIME_PG_DSN``) para pruebas contra un Postgres local;
+    el mismo evento, enviado por ``notify_cambio_panel``.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CANAL_NOTIFY = "colibri_cambios"
+
+# métrica → (tabla, estado que cuenta; None = todas las filas)
+REGLAS = {
+    "ordenes_totales": ("ordenes", None),
+    "tickets_pendientes": ("tickets", "pendiente"),
+    "alistamiento_en_proceso": ("alistamiento", "en_proceso"),
+    "serializacion_pendiente": ("serializacion", "pendiente"),
+    "facturas_pendientes": ("facturas", "pendiente"),
+}
+
+# callback(metrica, valor) → False si la sesión ya no muestra el control
+Listener = Callable[[str, int], Optional[bool]]
+
+
+def deltas(tabla: str, por_estado: dict) -> dict:
+    """Cambio de cada métrica a partir del evento ``{estado: cambio en filas}``."""
+    out = {}
+    for metrica, (t, estado) in REGLAS.items():
+        if t != tabla:
+            continue
+        d = sum(por_estado.values()) if estado is None else por_estado.get(estado, 0)
+        if d:
+            out[metrica] = d
+    return out
+
+
+def visible(xid: int, instantanea: str) -> bool:
+    """¿La instantánea ``xmin:xmax:xip,…`` (``pg_current_snapshot``) ya ve la transacción?"""
+    xmin, xmax, activos = instantanea.split(":")
+    if xid < int(xmin):
+        return True
+    if xid >= int(xmax):
+        return False
+    return str(xid) not in activos.split(",")
+
+
+class CounterHub:
+    """Contadores en memoria + fan-out por métrica hacia las sesiones."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, int] = {}
+        self._pendientes: list[tuple[dict, int]] = []    # (cambios, xid) llegados durante la siembra
+        self._sembrando = False
+        self._generacion = 0                   # sube con cada (re)conexión
+        self._listeners: dict[str, tuple[set, Listener]] = {}    # session_id → (métricas, cb)
+        self._task: Optional[Future] = None
+        self._realtime = None                  # referencia viva al cliente Realtime
+        self.live = False
+
+    # ── Estado -----------------------------------------------------------
+    @property
+    def seeded(self) -> bool:
+        return bool(self._counters)
+
+    def sembrar(self, client) -> bool:
+        """
+        Punto de partida: lectura directa de ``dashboard_resumen`` (nunca la
+        caché, que puede ser anterior a la suscripción) más los eventos
+        llegados durante la lectura que su instantánea no incluye. Devuelve
+        False si otra sesión está sembrando o hubo una reconexión entretanto.
+        """
+        from services import dashboard
+
+        with self._lock:
+            if self.seeded or self._sembrando or not self.live:
+                return self.seeded
+            self._sembrando, self._pendientes = True, []
+            generacion = self._generacion
+        try:
+            resumen = dashboard.consultar(client)
+        except Exception:
+            with self._lock:
+                self._sembrando, self._pendientes = False, []
+            raise
+
+        with self._lock:
+            pendientes, self._pendientes, self._sembrando = self._pendientes, [], False
+            if generacion != self._generacion:
+                return False
+            valores = dict(resumen["valores"])
+            for cambios, xid in pendientes:
+                if not visible(xid, resumen["instantanea"]):
+                    for metrica, d in cambios.items():
+                        valores[metrica] = valores.get(metrica, 0) + d
+            self._counters = valores
+            return True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+    # ── Suscriptores -----------------------------------------------------
+    def subscribe(self, session_id: str, metricas, callback: Listener):
+        """Una suscripción por sesión; la nueva reemplaza a la anterior."""
+        with self._lock:
+            self._listeners[session_id] = (set(metricas), callback)
+
+    def unsubscribe(self, session_id: str):
+        with self._lock:
+            self._listeners.pop(session_id, None)
+
+    # ── Eventos ----------------------------------------------------------
+    def apply_change(self, tabla: str, por_estado: dict, xid: int):
+        """Un evento de ``panel_cambios``: el cambio agregado de una sentencia."""
+        cambios = deltas(tabla, por_estado)
+        if not cambios:
+            return
+        with self._lock:
+            if not self.seeded:
+                if self._sembrando:
+                    self._pendientes.append((cambios, int(xid)))
+                return
+            for metrica, d in cambios.items():
+                self._counters[metrica] = self._counters.get(metrica, 0) + d
+            valores = {m: self._counters[m] for m in cambios}
+            listeners = list(self._listeners.items())
+
+        for session_id, (metricas, callback) in listeners:
+            for metrica in metricas & valores.keys():
+                try:
+                    if callback(metrica, valores[metrica]) is False:
+                        self.unsubscribe(session_id)
+                        break
+                except Exception as exc:
+                    logger.warning("Listener %s falló: %s", session_id, exc)
+                    self.unsubscribe(session_id)
+                    break
+
+    def _reset(self):
+        """Tras una reconexión los contadores pueden estar desfasados."""
+        from services import dashboard
+
+        with self._lock:
+            self._counters, self._pendientes = {}, []
+            self._generacion += 1
+        dashboard.invalidate()
+
+    # ── Fuente de eventos ------------------------------------------------
+    def ensure_started(self, loop: asyncio.AbstractEventLoop):
+        """Arranca la suscripción del proceso (idempotente)."""
+        with self._lock:
+            if self._task is not None:
+                return
+            self._task = asyncio.run_coroutine_threadsafe(self._run(), loop)
+
+    async def _run(self):
+        dsn = os.getenv("REALTIME_PG_DSN")
+        try:
+            if dsn:
+                await self._listen_pg_notify(dsn)
+            else:
+                await self._listen_supabase()
+        except Exception as exc:
+            logger.error("Suscripción de panel detenida: %s", exc)
+            self.live = False
+
+    async def _listen_supabase(self):
+        from realtime import AsyncRealtimeClient, RealtimeSubscribeStates
+
+        from config import SUPABASE_ANON_KEY, SUPABASE_SERVICE_KEY, SUPABASE_URL
+
+        client = self._realtime = AsyncRealtimeClient(
+            f"{SUPABASE_URL}/realtime/v1", token=SUPABASE_SERVICE_KEY or SUPABASE_ANON_KEY
+        )
+        channel = client.channel("colibri-panel")
+
+        def on_change(payload):
+            evt = payload["data"]["record"]
+            self.apply_change(evt["tabla"], evt["deltas"], evt["xid"])
+
+        def on_state(state, err):
+            self.live = state == RealtimeSubscribeStates.SUBSCRIBED
+            if self.live:
+                self._reset()
+            logger.info("Realtime panel: %s%s", state, f" ({err})" if err else "")
+
+        channel.on_postgres_changes("INSERT", callback=on_change, table="panel_cambios", schema="public")
+        await channel.subscribe(on_state)
+
+    async def _listen_pg_notify(self, dsn: str):
+        import psycopg
+
+        conn = await psycopg.AsyncConnection.connect(dsn, autocommit=True)
+        async with conn:
+            await conn.execute(f"LISTEN {CANAL_NOTIFY}")
+            self.live = True
+            self._reset()
+            logger.info("LISTEN %s activo", CANAL_NOTIFY)
+            async for notify in conn.notifies():
+                evt = json.loads(notify.payload)
+                self.apply_change(evt["tabla"], evt["deltas"], evt["xid"])
+
+
+hub = CounterHub()
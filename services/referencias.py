@@ -0,0 +1,178 @@
+# services/referencias.py
+"""
+Caché de lectura (read-through) de datos de referencia, compartida por
+todas las sesiones del proceso: usuarios, productos y ubicaciones.
+
+  • Una ``TTLCache`` por tabla, con TTL y tope de entradas (LRU) propios.
+  • ``get`` / ``get_many`` consultan sólo las claves que faltan, en un único
+    ``in`` por bloque; las claves inexistentes también quedan en caché.
+  • ``listar`` guarda la tabla completa (sólo catálogos pequeños).
+  • Derivadas: resultados de una RPC que dependen de una tabla (p. ej. los
+    códigos de vendedor asignados, migrations/012) se invalidan con el
+    sello de esa tabla. Así no se cachea la tabla completa (usuarios).
+  • Con varios workers (asgi.py) cada tabla usa además el almacén SQLite
+    compartido: lo que carga un proceso lo reutilizan los demás.
+  • Invalidación por versión: cada tabla tiene un sello en ``ref_versiones``
+    (migrations/008) que los triggers incrementan en cada cambio. La caché
+    lee todos los sellos en una sola consulta cada ``VERSION_CHECK`` segundos
+    y descarta las tablas cuyo sello cambió. Tras una escritura propia se
+    puede invalidar directamente con ``invalidate(tabla, clave)``.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Hashable, Iterable, Optional
+
+from supabase import Client
+
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+VERSION_CHECK = float(os.getenv("REF_VERSION_CHECK", "15"))    # s entre lecturas de sellos
+FILTRO_IN     = 200                                             # claves por filtro ``in``
+TODAS         = "__todas__"                                     # clave de ``listar``
+
+
+@dataclass(frozen=True)
+class Tabla:
+    clave: str
+    columnas: str
+    ttl: float
+    max_entries: int
+
+
+TABLAS = {
+    "usuarios":    Tabla("auth_uid", "auth_uid,email,nombre_usuario,codigo_vendedor,rol", ttl=600, max_entries=5_000),
+    "productos":   Tabla("sku", "sku,descripcion,precio", ttl=900, max_entries=50_000),
+    "ubicaciones": Tabla("sku", "sku,ubicacion", ttl=900, max_entries=50_000),
+}
+
+# derivada → tabla de cuyo sello depende
+DERIVADAS = {
+    "codigos_vendedor": "usuarios",
+}
+
+_caches = {nombre: TTLCache(t.ttl, t.max_entries, shared=f"ref:{nombre}") for nombre, t in TABLAS.items()}
+_caches.update(
+    {nombre: TTLCache(TABLAS[tabla].ttl, 1, shared=f"ref:{nombre}") for nombre, tabla in DERIVADAS.items()}
+)
+_versiones: dict[str, int] = {}
+_version_lock = threading.Lock()
+_ultimo_check = {"t": 0.0}
+
+
+# ── Versiones ------------------------------------------------------------------
+def check_versions(client: Client, force: bool = False):
+    """Descarta las tablas cuyo sello cambió (como máximo una lectura por intervalo)."""
+    now = time.monotonic()
+    if not force and now - _ultimo_check["t"] < VERSION_CHECK:
+        return
+    if not _version_lock.acquire(blocking=False):
+        return                                  # otro hilo ya está consultando
+    try:
+        _ultimo_check["t"] = now
+        rows = client.table("ref_versiones").select("tabla,version").execute().data
+        for row in rows:
+            tabla, version = row["tabla"], int(row["version"])
+            previa = _versiones.get(tabla)
+            _versiones[tabla] = version
+            if previa is not None and previa != version and tabla in _caches:
+                logger.info("Referencias: %s cambió (v%s → v%s), invalidando", tabla, previa, version)
+                _caches[tabla].invalidate()
+                for derivada, origen in DERIVADAS.items():
+                    if origen == tabla:
+                        _caches[derivada].invalidate()
+    except Exception as exc:
+        # sin sellos la caché sigue funcionando por TTL
+        logger.warning("No se pudieron leer ref_versiones: %s", exc)
+    finally:
+        _version_lock.release()
+
+
+# ── Lectura ------------------------------------------------------------------------
+def _en_bloques(valores: list, n: int):
+    for i in range(0, len(valores), n):
+        yield valores[i:i + n]
+
+
+def get_many(client: Client, tabla: str, claves: Iterable[Hashable]) -> dict:
+    """{clave: fila o None} consultando sólo las claves que no están en caché."""
+    t = TABLAS[tabla]
+    check_versions(client)
+
+    def load(faltantes: list) -> dict:
+        out = {}
+        for bloque in _en_bloques(faltantes, FILTRO_IN):
+            for row in client.table(tabla).select(t.columnas).in_(t.clave, bloque).execute().data:
+                out[row[t.clave]] = row
+        return out
+
+    return _caches[tabla].get_many(claves, load)
+
+
+def get(client: Client, tabla: str, clave: Hashable) -> Optional[dict]:
+    return get_many(client, tabla, [clave]).get(clave)
+
+
+def get_or_load(client: Client, tabla: str, clave: Hashable, loader: Callable[[], dict]) -> dict:
+    """Read-through con un loader propio (p. ej. la RPC del perfil de usuario)."""
+    check_versions(client)
+    return _caches[tabla].get_or_load(clave, loader)[0]
+
+
+def listar(client: Client, tabla: str, orden: Optional[str] = None) -> list[dict]:
+    """Tabla completa (sólo para catálogos pequeños)."""
+    t = TABLAS[tabla]
+    check_versions(client)
+
+    def load() -> list[dict]:
+        return client.table(tabla).select(t.columnas).order(orden or t.clave).execute().data
+
+    return _caches[tabla].get_or_load(TODAS, load)[0]
+
+
+def codigos_vendedor(client: Client) -> frozenset[str]:
+    """
+    Códigos de vendedor asignados a algún usuario (validación de la ingesta).
+    La RPC (SECURITY DEFINER) devuelve lo mismo a cualquier sesión y sólo
+    los códigos: es seguro compartirlos entre sesiones.
+    """
+    check_versions(client)
+
+    def load() -> list[str]:
+        return [r["codigo_vendedor"] for r in client.rpc("codigos_vendedor").execute().data or []]
+
+    return frozenset(_caches["codigos_vendedor"].get_or_load(TODAS, load)[0])
+
+
+# ── Invalidación y métricas -------------------------------------------------------
+def invalidate(tabla: Optional[str] = None, clave: Optional[Hashable] = None):
+    """Descarta una clave, una tabla (y sus derivadas) o toda la caché de referencias."""
+    for nombre in [tabla] if tabla else list(_caches):
+        cache = _caches[nombre]
+        if clave is None:
+            cache.invalidate()
+        else:
+            cache.invalidate(clave)
+            cache.invalidate(TODAS)
+    if tabla:
+        for derivada, origen in DERIVADAS.items():
+            if origen == tabla:
+                _caches[derivada].invalidate()
+
+
+def stats() -> dict:
+    """{tabla: {hits, misses, evictions, entries, hit_rate}}"""
+    return {
+        nombre: {
+            "hits": c.hits,
+            "misses": c.misses,
+            "evictions": c.evictions,
+            "entries": len(c),
+            "hit_rate": c.hit_rate,
+        }
+        for nombre, c in _caches.items()
+    }
@@ -0,0 +1,316 @@
+# services/reglas.py
+"""
+Motor declarativo de normalización y validación por columnas (Arrow).
+
+Las reglas se declaran una vez (ver ``ingesta.MOTOR_ORDENES``) y se
+compilan a operaciones vectorizadas de ``pyarrow.compute`` sobre el bloque
+completo: ninguna regla recorre filas en Python.
+
+  • ``Normalizacion(columna, pasos)``: cadena de transformaciones de una
+    columna (recortar, mayúsculas, reemplazos por regex, entero, fecha...).
+  • ``Regla``: condición de error sobre el bloque normalizado (y el crudo,
+    p. ej. para saber si una fecha vino pero no se pudo interpretar).
+    Cada regla ocupa un bit del mapa de errores ``uint32`` por fila; las
+    ``bloquea=False`` son advertencias (se marcan pero la fila se carga).
+  • Reglas con ``requiere``: necesitan un dato de contexto (catálogo de
+    vendedores...). ``Motor.compilar(contexto)`` las omite si falta, así el
+    motor también corre en procesos hijos sin acceso a Supabase.
+
+    compilado = MOTOR.compilar({"vendedores": codigos})
+    tabla, errores = compilado.aplicar(crudo)        # pa.Table, np.ndarray[uint32]
+    MOTOR.etiquetas(errores)                         # mensajes por fila (vista previa)
+    MOTOR.reporte(MOTOR.conteo(errores))             # filas por regla incumplida
+"""
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+MAX_REGLAS = 32                 # bits del mapa de errores
+
+Paso = Callable[[pa.Array], pa.Array]
+Condicion = Callable[[pa.Table, pa.Table, dict], pa.Array]     # (normalizada, cruda, contexto) → True = error
+
+
+# ────────────────────────────────────────────────────────────────
+# PASOS DE NORMALIZACIÓN
+# ────────────────────────────────────────────────────────────────
+def recortar(col: pa.Array) -> pa.Array:
+    return pc.utf8_trim_whitespace(col)
+
+
+def mayusculas(col: pa.Array) -> pa.Array:
+    return pc.utf8_upper(col)
+
+
+def colapsar_espacios(col: pa.Array) -> pa.Array:
+    """Espacios repetidos → uno (split/join: ~2× más rápido que un regex ``\\s+``)."""
+    return pc.binary_join(pc.utf8_split_whitespace(col), " ")
+
+
+def reemplazos(pares: dict[str, str]) -> Paso:
+    """
+    Reemplazos por regex en orden (p. ej. abreviaturas de direcciones). Sólo
+    se reescriben las filas que coinciden: buscar cuesta mucho menos que
+    reemplazar y la mayoría de patrones aparece en pocas filas.
+    """
+    def paso(col: pa.Array) -> pa.Array:
+        for patron, valor in pares.items():
+            coincide = pc.fill_null(pc.match_substring_regex(col, patron), False)
+            if not pc.any(coincide).as_py():
+                continue
+            nuevos = pc.replace_substring_regex(col.filter(coincide), patron, valor)
+            col = pc.replace_with_mask(col, coincide, nuevos)
+        return col
+    return paso
+
+
+def vacio_a_nulo(col: pa.Array) -> pa.Array:
+    return pc.if_else(pc.equal(col, ""), pa.scalar(None, col.type), col)
+
+
+def entero(col: pa.Array) -> pa.Array:
+    """Texto → int64; lo que no es un entero queda nulo."""
+    return pc.cast(pc.if_else(pc.utf8_is_digit(col), col, pa.scalar(None, pa.string())), pa.int64())
+
+
+_CAMPOS_FECHA = {
+    "%d": (pc.day, 2), "%m": (pc.month, 2), "%Y": (pc.year, 4),
+    "%H": (pc.hour, 2), "%M": (pc.minute, 2), "%S": (pc.second, 2),
+}
+
+
+def _formatear(ts: pa.Array, formato: str) -> pa.Array:
+    """``strftime`` con componentes y concatenación (``pc.strftime`` es ~3× más lento)."""
+    partes = []
+    for pieza in re.split(r"(%[dmYHMS])", formato):
+        if pieza in _CAMPOS_FECHA:
+            campo, ancho = _CAMPOS_FECHA[pieza]
+            partes.append(pc.utf8_lpad(pc.cast(campo(ts), pa.string()), ancho, "0"))
+        elif pieza:
+            partes.append(pieza)
+    return pc.binary_join_element_wise(*partes, "")
+
+
+def fecha(*formatos: str) -> Paso:
+    """
+    Texto → fecha ISO (``YYYY-MM-DD``) probando ``formatos`` (%d %m %Y %H %M
+    %S) en orden; cada formato sólo sobre las filas que los anteriores no
+    interpretaron. ``strptime`` de Arrow acepta fechas imposibles (31/02 →
+    03/03), así que un formato sólo vale si al formatear el resultado se
+    obtiene el mismo texto (con día y mes completados: 3/2/2025 → 03/02/2025).
+    """
+    def paso(col: pa.Array) -> pa.Array:
+        col = pc.replace_substring_regex(col, r"\b(\d)\b", r"0\1")
+        segundos = np.zeros(len(col), dtype=np.int64)
+        valida = np.zeros(len(col), dtype=bool)
+        pendientes = np.flatnonzero(pc.fill_null(pc.not_equal(col, ""), False).to_numpy(zero_copy_only=False))
+        for fmt in formatos:
+            if not len(pendientes):
+                break
+            texto = col.take(pa.array(pendientes))
+            intento = pc.strptime(texto, format=fmt, unit="s", error_is_null=True)
+            ok = pc.fill_null(pc.equal(_formatear(intento, fmt), texto), False).to_numpy(zero_copy_only=False)
+            segundos[pendientes[ok]] = pc.cast(intento.filter(pa.array(ok)), pa.int64()).to_numpy()
+            valida[pendientes[ok]] = True
+            pendientes = pendientes[~ok]
+        fechas = pc.cast(pa.array(segundos, pa.timestamp("s"), mask=~valida), pa.date32())
+        return pc.cast(fechas, pa.string())
+    return paso
+
+
+@dataclass(frozen=True)
+class Normalizacion:
+    columna: str
+    pasos: tuple[Paso, ...]
+
+
+# ────────────────────────────────────────────────────────────────
+# REGLAS
+# ────────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class Regla:
+    nombre: str
+    columna: str
+    mensaje: str
+    condicion: Condicion
+    bloquea: bool = True
+    requiere: Optional[str] = None
+
+
+def requerido(columna: str, mensaje: Optional[str] = None) -> Regla:
+    return Regla(
+        f"{columna}_requerido", columna, mensaje or f"Falta {columna}",
+        lambda t, _c, _x: pc.or_kleene(pc.is_null(t[columna]), pc.equal(t[columna], "")),
+    )
+
+
+def patron(columna: str, regex: str, mensaje: str, bloquea: bool = True) -> Regla:
+    """Error si el valor no vacío no cumple ``regex`` (los vacíos los marca ``requerido``)."""
+    return Regla(
+        f"{columna}_formato", columna, mensaje,
+        lambda t, _c, _x: pc.and_(
+            pc.not_equal(t[columna], ""), pc.invert(pc.match_substring_regex(t[columna], regex)),
+        ),
+        bloquea,
+    )
+
+
+def mayor_que(columna: str, minimo, mensaje: str) -> Regla:
+    """Error si el valor es nulo (no numérico) o no supera ``minimo``."""
+    return Regla(
+        f"{columna}_rango", columna, mensaje,
+        lambda t, _c, _x: pc.fill_null(pc.less_equal(t[columna], minimo), True),
+    )
+
+
+def en_catalogo(columna: str, catalogo: str, mensaje: str, omitir_vacios: bool = True, bloquea: bool = True) -> Regla:
+    """Error si el valor no está en ``contexto[catalogo]`` (pa.Array de valores válidos)."""
+    def condicion(t, _c, contexto):
+        fuera = pc.invert(pc.is_in(t[columna], value_set=contexto[catalogo]))
+        if omitir_vacios:
+            return pc.and_(pc.not_equal(t[columna], ""), fuera)
+        return fuera
+    return Regla(f"{columna}_desconocido", columna, mensaje, condicion, bloquea, requiere=catalogo)
+
+
+def interpretable(columna: str, mensaje: str, bloquea: bool = False) -> Regla:
+    """Error si el valor crudo vino pero la normalización lo dejó nulo (fechas, números)."""
+    return Regla(
+        f"{columna}_invalida", columna, mensaje,
+        lambda t, c, _x: pc.and_(pc.not_equal(recortar(c[columna]), ""), pc.is_null(t[columna])),
+        bloquea,
+    )
+
+
+# ────────────────────────────────────────────────────────────────
+# MOTOR
+# ────────────────────────────────────────────────────────────────
+@dataclass
+class Motor:
+    """
+    Esquema de salida + normalizaciones + reglas. El orden de ``reglas``
+    fija los bits: no reordenar sin regenerar lo que ya esté en staging.
+    """
+    esquema: pa.Schema
+    normalizaciones: tuple[Normalizacion, ...]
+    reglas: tuple[Regla, ...]
+
+    def __post_init__(self):
+        if len(self.reglas) > MAX_REGLAS:
+            raise ValueError(f"Máximo {MAX_REGLAS} reglas por motor ({len(self.reglas)} declaradas)")
+
+    @property
+    def mascara_bloqueo(self) -> int:
+        return sum(1 << i for i, r in enumerate(self.reglas) if r.bloquea)
+
+    def compilar(self, contexto: Optional[dict] = None) -> "Compilado":
+        contexto = {
+            k: v if isinstance(v, pa.Array) else pa.array(sorted(v), pa.string())
+            for k, v in (contexto or {}).items() if v is not None
+        }
+        activas = []
+        for i, r in enumerate(self.reglas):
+            if r.requiere and r.requiere not in contexto:
+                logger.info("Regla %s omitida: sin %s", r.nombre, r.requiere)
+                continue
+            activas.append((np.uint32(1 << i), r))
+        return Compilado(self, activas, contexto)
+
+    def describir(self, errores: int) -> list[str]:
+        return [r.nombre for i, r in enumerate(self.reglas) if errores >> i & 1]
+
+    def mensajes(self, errores: int) -> list[str]:
+        return [r.mensaje for i, r in enumerate(self.reglas) if errores >> i & 1]
+
+    def etiquetas(self, errores: np.ndarray) -> pa.Array:
+        """Mensajes por fila ("SKU inválido; Vendedor desconocido"), nulo si no hay errores.
+        Se decodifica una vez por combinación distinta de bits, no por fila."""
+        combinaciones, inversa = np.unique(errores, return_inverse=True)
+        textos = pa.array([
+            "; ".join(self.mensajes(int(c))) if c else None for c in combinaciones
+        ], pa.string())
+        return textos.take(pa.array(inversa.astype(np.int32)))
+
+    def conteo(self, errores: np.ndarray) -> np.ndarray:
+        """Filas que incumplen cada regla (vector de ``len(reglas)``)."""
+        return np.array(
+            [np.count_nonzero(errores & np.uint32(1 << i)) for i in range(len(self.reglas))], dtype=np.int64,
+        )
+
+    def reporte(self, conteo) -> list[dict]:
+        """Conteo por regla → [{regla, columna, mensaje, bloquea, filas}] de las incumplidas."""
+        return [
+            {"regla": r.nombre, "columna": r.columna, "mensaje": r.mensaje, "bloquea": r.bloquea, "filas": int(n)}
+            for r, n in zip(self.reglas, conteo) if n
+        ]
+
+
+class Compilado:
+    def __init__(self, motor: Motor, activas: list[tuple[np.uint32, Regla]], contexto: dict):
+        self.motor = motor
+        self.activas = activas
+        self.contexto = contexto
+
+    @property
+    def n_reglas(self) -> int:
+        return len(self.activas)
+
+    def normalizar(self, cruda: pa.Table) -> pa.Table:
+        columnas = {}
+        for campo in self.motor.esquema:
+            if campo.name in cruda.column_names:
+                columnas[campo.name] = cruda[campo.name].combine_chunks()     # los pasos trabajan sobre pa.Array
+            else:
+                columnas[campo.name] = pa.repeat("", cruda.num_rows)
+        for n in self.motor.normalizaciones:
+            col = columnas[n.columna]
+            for paso in n.pasos:
+                col = paso(col)
+            columnas[n.columna] = col
+        return pa.table(columnas).cast(self.motor.esquema)
+
+    def validar(self, tabla: pa.Table, cruda: pa.Table) -> np.ndarray:
+        errores = np.zeros(tabla.num_rows, dtype=np.uint32)
+        for bit, regla in self.activas:
+            falla = pc.fill_null(regla.condicion(tabla, cruda, self.contexto), False)
+            errores[falla.to_numpy(zero_copy_only=False)] |= bit
+        return errores
+
+    def aplicar(self, cruda: pa.Table) -> tuple[pa.Table, np.ndarray]:
+        """(tabla normalizada con el esquema del motor, mapa de errores por fila)."""
+        # las reglas también leen la columna cruda: una opcional ausente llega vacía
+        for campo in self.motor.esquema:
+            if campo.name not in cruda.column_names:
+                cruda = cruda.append_column(campo.name, pa.repeat("", cruda.num_rows))
+        tabla = self.normalizar(cruda)
+        return tabla, self.validar(tabla, cruda)
+
+    @property
+    def firma(self) -> str:
+        """Identifica reglas activas + contexto (el staging depende de ambos)."""
+        h = hashlib.sha1()
+        for _, r in self.activas:
+            h.update(r.nombre.encode())
+        for k in sorted(self.contexto):
+            h.update(k.encode())
+            h.update("\x1f".join(map(str, self.contexto[k].to_pylist())).encode())
+        return h.hexdigest()[:12]
+
+
+def columnas_crudas(df, requeridas: Iterable[str]) -> pa.Table:
+    """DataFrame de texto (columnas ya renombradas) → pa.Table de strings, nulos como ''."""
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    faltantes = [c for c in requeridas if c not in tabla.column_names]
+    if faltantes:
+        raise ValueError(f"Columnas requeridas ausentes: {', '.join(faltantes)}")
+    return pa.table({
+        c: pc.fill_null(pc.cast(tabla[c], pa.string()), "") for c in tabla.column_names
+    })
@@ -0,0 +1,97 @@
+# services/reportes.py
+"""
+Reportes por vendedor y por etapa del flujo (ticket → alistamiento →
+serialización → factura).
+
+Sólo se leen los resúmenes que Postgres mantiene por delta
+(migrations/011_resumenes.sql): el costo de cada consulta depende de la
+cantidad de vendedores y estados, no del tamaño de ``ordenes``. Como el
+panel, los resultados se comparten entre sesiones con una caché TTL, por
+alcance: las RPC filtran por el rol de quien consulta (``admin`` ve todos
+los vendedores, los demás sólo su código), así que la clave lo incluye.
+"""
+import logging
+import os
+from typing import Optional
+
+from supabase import Client
+
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+REPORTES_TTL = float(os.getenv("REPORTES_TTL", "60"))      # segundos
+
+# Etapas del flujo en orden: (tabla, título, estado "abierto")
+ETAPAS = [
+    ("tickets", "Ticket", "pendiente"),
+    ("alistamiento", "Alistamiento", "en_proceso"),
+    ("serializacion", "Serialización", "pendiente"),
+    ("facturas", "Factura", "pendiente"),
+]
+
+# (columna de reporte_vendedores, título)
+COLUMNAS_VENDEDOR = [
+    ("codigo_vendedor", "Vendedor"),
+    ("lineas", "Líneas"),
+    ("unidades", "Unidades"),
+    ("tickets_pendientes", "Tickets pend."),
+    ("alistamiento_en_proceso", "En alistamiento"),
+    ("serializacion_pendiente", "Serialización pend."),
+    ("facturas_pendientes", "Facturas pend."),
+]
+
+_cache = TTLCache(ttl=REPORTES_TTL, max_entries=1_000, shared="reportes")
+
+ADMIN = "admin"
+
+
+def alcance(usuario: Optional[dict]) -> str:
+    """Lo que ``usuario`` puede ver, como en reporte_alcance(): "*" o su código."""
+    usuario = usuario or {}
+    if usuario.get("rol") == ADMIN:
+        return "*"
+    return (usuario.get("codigo_vendedor") or "").strip()
+
+
+def por_vendedor(client: Client, alcance: str) -> list[dict]:
+    """Una fila por vendedor visible con líneas, unidades y pendientes de cada etapa."""
+    def load() -> list[dict]:
+        logger.info("Consultando reporte_vendedores")
+        rows = client.rpc("reporte_vendedores").execute().data or []
+        return [
+            {c: (r.get(c) or "") if c == "codigo_vendedor" else int(r.get(c) or 0) for c, _ in COLUMNAS_VENDEDOR}
+            for r in rows
+        ]
+
+    return _cache.get_or_load(f"vendedores|{alcance}", load)[0]
+
+
+def embudo(client: Client, alcance: str, codigo_vendedor: Optional[str] = None) -> list[dict]:
+    """
+    Etapas en orden del flujo: [{etapa, titulo, abiertas, total, estados: {estado: n}}].
+    Con ``codigo_vendedor`` sólo las filas de ese vendedor (dentro del alcance).
+    """
+    def load() -> list[dict]:
+        logger.info("Consultando reporte_etapas (%s)", codigo_vendedor or "todos")
+        rows = client.rpc("reporte_etapas", {"p_codigo_vendedor": codigo_vendedor}).execute().data or []
+        estados: dict[str, dict[str, int]] = {}
+        for r in rows:
+            estados.setdefault(r["etapa"], {})[r["estado"]] = int(r["n"])
+        return [
+            {
+                "etapa": etapa,
+                "titulo": titulo,
+                "abiertas": estados.get(etapa, {}).get(abierto, 0),
+                "total": sum(estados.get(etapa, {}).values()),
+                "estados": estados.get(etapa, {}),
+            }
+            for etapa, titulo, abierto in ETAPAS
+        ]
+
+    return _cache.get_or_load(f"etapas|{alcance}|{codigo_vendedor or '*'}", load)[0]
+
+
+def invalidate():
+    """Descarta los reportes en caché (p. ej. tras una carga de órdenes)."""
+    _cache.invalidate()
@@ -0,0 +1,129 @@
+# services/serializacion.py
+"""
+Flujo de escaneo de seriales por orden.
+
+  • ``OrdenSeriales``: índice en memoria de los seriales esperados de la orden
+    (se carga una vez por orden); validar un escaneo es una búsqueda O(1).
+  • Almacén local de la estación (services/local_store.py): cada escaneo
+    confirmado se escribe ahí antes de responder al operario, así que no se
+    pierde aunque caiga la conexión o se reinicie el servidor. Un hilo de
+    fondo lo envía a Supabase en micro-lotes; el insert es idempotente
+    (unique numero_orden + serial), reenviar un lote no duplica nada.
+    Cada escaneo lleva el auth_uid de quien lo hizo y se envía con el
+    cliente de esa sesión, nunca con el de otra estación.
+  • Los seriales de cada orden también quedan en la copia local: una orden
+    ya vista se abre sin red y se refresca en segundo plano.
+"""
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+from supabase import Client
+
+from services.async_repo import submit_background
+from services.local_store import LocalStore
+
+logger = logging.getLogger(__name__)
+
+TABLA_SERIALES  = "serializacion"             # seriales esperados por orden
+TABLA_ESCANEOS  = "serializacion_escaneos"    # escaneos confirmados (migrations/004)
+CLAVE_ESCANEO   = "numero_orden,serial"
+
+# Resultados de ``OrdenSeriales.validar``
+OK          = "ok"
+DUPLICADO   = "duplicado"
+DESCONOCIDO = "desconocido"
+
+
+# ── Índice en memoria por orden ---------------------------------------------
+@dataclass
+class OrdenSeriales:
+    numero_orden: str
+    esperados: dict[str, str]                         # serial → sku
+    escaneados: set[str] = field(default_factory=set)
+
+    @property
+    def total(self) -> int:
+        return len(self.esperados)
+
+    @property
+    def pendientes(self) -> int:
+        return self.total - len(self.escaneados)
+
+    def validar(self, serial: str) -> tuple[str, Optional[str]]:
+        """Devuelve (resultado, sku). Si es válido lo marca como escaneado."""
+        sku = self.esperados.get(serial)
+        if sku is None:
+            return DESCONOCIDO, None
+        if serial in self.escaneados:
+            return DUPLICADO, sku
+        self.escaneados.add(serial)
+        return OK, sku
+
+
+def _consultar_orden(client: Client, numero_orden: str) -> list[dict]:
+    """Un solo SELECT con los seriales de la orden (y su estado)."""
+    return (
+        client.table(TABLA_SERIALES)
+        .select("serial,sku,estado")
+        .eq("numero_orden", numero_orden)
+        .execute()
+        .data
+    )
+
+
+def _refrescar_orden(client: Client, numero_orden: str, store: LocalStore):
+    try:
+        store.guardar(TABLA_SERIALES, _consultar_orden(client, numero_orden), "serial", valor_grupo=numero_orden)
+    except Exception as exc:
+        logger.info("Orden %s: sin refresco (%s), se mantiene la copia local", numero_orden, exc)
+
+
+def cargar_orden(client: Client, numero_orden: str, store: Optional[LocalStore] = None) -> OrdenSeriales:
+    """
+    Índice de la orden. Con ``store``, si la orden ya está en la copia local
+    se usa de inmediato (y se refresca en segundo plano); si no, se consulta
+    y se guarda. Los escaneos locales (enviados o no) cuentan como hechos.
+    """
+    if store is not None and store.tiene(TABLA_SERIALES, numero_orden):
+        rows = store.leer(TABLA_SERIALES, numero_orden)
+        submit_background(_refrescar_orden, client, numero_orden, store)
+    else:
+        rows = _consultar_orden(client, numero_orden)
+        if store is not None:
+            store.guardar(TABLA_SERIALES, rows, "serial", valor_grupo=numero_orden)
+
+    orden = OrdenSeriales(
+        numero_orden,
+        {r["serial"]: r["sku"] for r in rows},
+        {r["serial"] for r in rows if r.get("estado") == "serializado"},
+    )
+    if store is not None:
+        orden.escaneados.update(r["serial"] for r in store.leer(TABLA_ESCANEOS, numero_orden))
+    logger.info("Orden %s: %s seriales esperados, %s ya escaneados",
+                numero_orden, orden.total, len(orden.escaneados))
+    return orden
+
+
+def registrar_escaneo(store: LocalStore, client: Client, numero_orden: str, serial: str,
+                      sku: Optional[str], usuario: Optional[str], propietario: str):
+    """
+    Ruta crítica del escaneo: sólo escribe en el SQLite local. El envío usa
+    ``client``, la sesión de ``propietario`` (auth_uid de quien escanea).
+    """
+    store.encolar(
+        client,
+        TABLA_ESCANEOS,
+        [{
+            "numero_orden": numero_orden,
+            "serial": serial,
+            "sku": sku,
+            "usuario": usuario,
+            "escaneado_at": datetime.now(timezone.utc).isoformat(),
+        }],
+        clave=CLAVE_ESCANEO,
+        propietario=propietario,
+        grupo="numero_orden",
+        on_conflict=CLAVE_ESCANEO,
+    )
@@ -0,0 +1,113 @@
+# services/shared_store.py
+"""
+Almacén clave → valor compartido entre los procesos worker de una máquina
+(ver asgi.py). Es un archivo SQLite en modo WAL: varios procesos leen en
+paralelo y las escrituras son cortas, suficiente como segundo nivel de las
+cachés de proceso (``TTLCache(shared=...)``) sin agregar un servidor Redis.
+
+Se activa con ``SHARED_CACHE=1`` (asgi.py lo fija para todos los workers).
+Los valores se guardan como JSON junto con el instante de carga, así cada
+caché aplica su propio TTL igual que en memoria.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Hashable, Iterable, Optional
+
+from config import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+ENABLED    = os.getenv("SHARED_CACHE", "0") == "1"
+STORE_PATH = Path(os.getenv("SHARED_STORE", DATA_DIR / "shared.db"))
+PURGE_AGE  = 24 * 3600                  # s: filas más viejas se borran al abrir
+
+
+def _k(key: Hashable) -> str:
+    return json.dumps(key, separators=(",", ":"))
+
+
+class SharedStore:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._db.execute("pragma journal_mode=wal")
+        self._db.execute("pragma synchronous=normal")
+        self._db.execute(
+            """create table if not exists kv (
+                   ns        text not null,
+                   key       text not null,
+                   value     text,
+                   stored_at real not null,
+                   primary key (ns, key)
+               ) without rowid"""
+        )
+        self._lock = threading.Lock()
+        self.purge(PURGE_AGE)
+
+    # ── Lectura ------------------------------------------------------------
+    def get(self, ns: str, key: Hashable) -> Optional[tuple[Any, float]]:
+        """(valor, instante de carga) o None si no está."""
+        return self.get_many(ns, [key]).get(key)
+
+    def get_many(self, ns: str, keys: Iterable[Hashable]) -> dict:
+        por_clave = {_k(key): key for key in keys}
+        claves = list(por_clave)
+        out = {}
+        with self._lock:
+            for i in range(0, len(claves), 500):               # límite de parámetros
+                bloque = claves[i:i + 500]
+                rows = self._db.execute(
+                    f"select key, value, stored_at from kv where ns = ? and key in ({','.join('?' * len(bloque))})",
+                    (ns, *bloque),
+                ).fetchall()
+                for k, value, stored_at in rows:
+                    out[por_clave[k]] = (json.loads(value), stored_at)
+        return out
+
+    # ── Escritura ----------------------------------------------------------
+    def set(self, ns: str, key: Hashable, value: Any, stored_at: Optional[float] = None):
+        self.set_many(ns, {key: value}, stored_at)
+
+    def set_many(self, ns: str, values: dict, stored_at: Optional[float] = None):
+        stored_at = stored_at or time.time()
+        try:
+            rows = [(ns, _k(k), json.dumps(v, default=str), stored_at) for k, v in values.items()]
+        except TypeError as exc:                                # clave no serializable
+            logger.warning("SharedStore: %s no se comparte: %s", ns, exc)
+            return
+        with self._lock:
+            self._db.executemany(
+                "insert or replace into kv (ns, key, value, stored_at) values (?, ?, ?, ?)", rows
+            )
+
+    def delete(self, ns: str, key: Optional[Hashable] = None):
+        with self._lock:
+            if key is None:
+                self._db.execute("delete from kv where ns = ?", (ns,))
+            else:
+                self._db.execute("delete from kv where ns = ? and key = ?", (ns, _k(key)))
+
+    def purge(self, older_than: float):
+        with self._lock:
+            self._db.execute("delete from kv where stored_at < ?", (time.time() - older_than,))
+
+
+_store: Optional[SharedStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Optional[SharedStore]:
+    """Almacén del proceso, o None si ``SHARED_CACHE`` no está activo."""
+    global _store
+    if not ENABLED:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = SharedStore(STORE_PATH)
+        return _store
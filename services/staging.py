@@ -0,0 +1,233 @@
+# services/staging.py
+"""
+Staging columnar de los archivos de órdenes e índice de hashes para cargas
+incrementales (services/ingesta.py).
+
+  • Staging: cada archivo subido se parsea y normaliza UNA vez a Arrow IPC
+    en ``DATA_DIR/staging/<sha256 del archivo>.arrow``. Volver a subir el
+    mismo exporte no vuelve a leer el CSV/XLSX: se recorren los lotes del
+    archivo mapeado en memoria. El archivo lleva, además de las columnas
+    normalizadas (y el mapa de errores de services/reglas.py), dos columnas
+    int64 calculadas al normalizar:
+      - ``clave``: hash de (marketplace, codigo_vendedor, numero_orden, sku),
+        la identidad de la línea (índice único de migrations/010).
+      - ``hash``:  hash del contenido normalizado de la fila.
+    Como los errores dependen del contexto de las reglas (catálogo de
+    vendedores), el nombre lleva además la ``variante`` de ese contexto.
+  • ``HashIndex``: SQLite persistente clave → hash de lo ya cargado en
+    Supabase. Una fila es ``nueva`` si su clave no está, ``cambiada`` si el
+    hash difiere y ``sin cambios`` si coincide; sólo las dos primeras se
+    envían. El índice se actualiza después de cada lote confirmado, así un
+    fallo a mitad de carga se completa en el siguiente intento.
+
+Los hashes son de 64 bits (``pd.util.hash_pandas_object``, clave fija):
+deterministas entre procesos y ejecuciones.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from config import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR  = DATA_DIR / "staging"
+STAGING_DIAS = float(os.getenv("STAGING_DIAS", "3"))       # antigüedad máxima de un staging sin usar
+COLUMNAS_CLAVE = ["marketplace", "codigo_vendedor", "numero_orden", "sku"]
+FORMATO      = 2          # sube si cambia cómo se calcula ``clave``: los staging anteriores no se reutilizan
+
+NUEVA, CAMBIADA, SIN_CAMBIOS, RECHAZADA = 0, 1, 2, 3
+ETIQUETAS_CAMBIO = {NUEVA: "nueva", CAMBIADA: "cambiada", SIN_CAMBIOS: "sin cambios", RECHAZADA: "rechazada"}
+
+
+def huella_archivo(path) -> str:
+    """sha256 del contenido del archivo (identifica re-subidas aunque cambie el nombre)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for bloque in iter(lambda: fh.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def hash_filas(tabla: pa.Table, columnas: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (clave, hash) int64 por fila: identidad de la línea y contenido de ``columnas``.
+    Se hashea el texto de cada columna: el resultado no depende de si el
+    bloque trae nulos (que en pandas cambiarían int64 por float64).
+    """
+    df = pd.DataFrame({c: pc.cast(tabla[c], pa.string()).to_pandas() for c in columnas})
+    clave = pd.util.hash_pandas_object(df[COLUMNAS_CLAVE], index=False).to_numpy().view(np.int64)
+    contenido = pd.util.hash_pandas_object(df[columnas], index=False).to_numpy().view(np.int64)
+    return clave, contenido
+
+
+# ────────────────────────────────────────────────────────────────
+# STAGING (Arrow IPC)
+# ────────────────────────────────────────────────────────────────
+def esquema_staging(esquema: pa.Schema) -> pa.Schema:
+    return esquema.append(pa.field("clave", pa.int64())).append(pa.field("hash", pa.int64()))
+
+
+def purgar_staging(dias: float = STAGING_DIAS):
+    if not STAGING_DIR.exists():
+        return
+    limite = time.time() - dias * 86400
+    for f in STAGING_DIR.iterdir():
+        if f.stat().st_mtime < limite:
+            f.unlink(missing_ok=True)
+
+
+class Staging:
+    """
+    Lotes normalizados de un archivo, desde el staging si ya existe o
+    generándolo mientras se recorre el archivo original.
+
+        etapa = Staging(path, esquema, variante=compilado.firma, columnas_hash=columnas)
+        for lote in etapa.lotes(leer_bloques):   # pa.RecordBatch con clave y hash
+            ...
+
+    ``columnas_hash`` (por defecto todo ``esquema``) son las que definen si
+    una fila cambió; p. ej. el mapa de errores no entra en el hash.
+    """
+
+    def __init__(
+        self,
+        path,
+        esquema: pa.Schema,
+        directorio: Path = STAGING_DIR,
+        variante: str = "",
+        columnas_hash: Optional[list[str]] = None,
+    ):
+        self.origen = Path(path)
+        self.esquema = esquema_staging(esquema)
+        self.columnas_hash = columnas_hash or esquema.names
+        self.huella = huella_archivo(self.origen)
+        self.path = Path(directorio) / f"{self.huella}-f{FORMATO}{'-' + variante if variante else ''}.arrow"
+        self._meta = self.path.with_suffix(".json")
+        self.reutilizado = self.path.exists() and self._meta.exists()
+
+    def lotes(self, normalizados: Callable[[], Iterator[pa.Table]]) -> Iterator[pa.RecordBatch]:
+        """
+        ``normalizados()`` produce un bloque normalizado (pa.Table con las
+        columnas del esquema) por bloque del archivo original; sólo se llama
+        si no hay staging previo.
+        """
+        if self.reutilizado:
+            yield from self._leer()
+        else:
+            yield from self._escribir(normalizados())
+
+    def _leer(self) -> Iterator[pa.RecordBatch]:
+        os.utime(self.path)                          # en uso: no se purga
+        reader = pa.ipc.open_file(pa.memory_map(str(self.path), "r"))
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+    def _escribir(self, bloques: Iterator[pa.Table]) -> Iterator[pa.RecordBatch]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        columnas = [f.name for f in self.esquema if f.name not in ("clave", "hash")]
+        writer = pa.ipc.new_file(str(tmp), self.esquema)
+        completo = False
+        try:
+            filas = 0
+            for bloque in bloques:
+                clave, contenido = hash_filas(bloque, self.columnas_hash)
+                tabla = bloque.select(columnas).append_column(
+                    "clave", pa.array(clave)).append_column("hash", pa.array(contenido))
+                for lote in tabla.cast(self.esquema).to_batches():
+                    writer.write_batch(lote)
+                    filas += lote.num_rows
+                    yield lote
+            completo = True
+        finally:
+            writer.close()
+            if completo:
+                os.replace(tmp, self.path)
+                self._meta.write_text(json.dumps({"origen": self.origen.name, "filas": filas}))
+                logger.info("Staging creado: %s → %s (%s filas)", self.origen.name, self.path.name, filas)
+            else:
+                tmp.unlink(missing_ok=True)
+
+
+# ────────────────────────────────────────────────────────────────
+# ÍNDICE DE HASHES (lo ya cargado)
+# ────────────────────────────────────────────────────────────────
+class HashIndex:
+    def __init__(self, path: Path, tabla: str = "ordenes"):
+        self.path = Path(path)
+        self.tabla = tabla
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.execute("pragma journal_mode=wal")
+        self._db.execute("pragma synchronous=normal")
+        self._db.execute(
+            """create table if not exists hashes (
+                   tabla     text    not null,
+                   clave     integer not null,
+                   hash      integer not null,
+                   cargado_at real   not null,
+                   primary key (tabla, clave)
+               ) without rowid"""
+        )
+        self._lock = threading.Lock()
+
+    def clasificar(self, clave: np.ndarray, contenido: np.ndarray) -> np.ndarray:
+        """NUEVA / CAMBIADA / SIN_CAMBIOS (int8) por fila."""
+        with self._lock:
+            rows = self._db.execute(
+                "select clave, hash from hashes where tabla = ? and clave in (select value from json_each(?))",
+                (self.tabla, json.dumps(np.unique(clave).tolist())),
+            ).fetchall()
+        estado = np.full(len(clave), NUEVA, dtype=np.int8)
+        if rows:
+            conocidas = np.array(rows, dtype=np.int64)
+            pos = pd.Index(conocidas[:, 0]).get_indexer(clave)
+            hay = pos >= 0
+            igual = conocidas[pos[hay], 1] == contenido[hay]
+            estado[hay] = np.where(igual, SIN_CAMBIOS, CAMBIADA)
+        return estado
+
+    def registrar(self, clave: np.ndarray, contenido: np.ndarray):
+        """Marca filas como cargadas (después de confirmar la escritura en Supabase)."""
+        ahora = time.time()
+        with self._lock:
+            self._db.executemany(
+                """insert into hashes (tabla, clave, hash, cargado_at) values (?, ?, ?, ?)
+                   on conflict (tabla, clave) do update set hash = excluded.hash, cargado_at = excluded.cargado_at""",
+                ((self.tabla, k, h, ahora) for k, h in zip(clave.tolist(), contenido.tolist())),
+            )
+
+    def olvidar(self):
+        """Vacía el índice (p. ej. tras borrar órdenes en el servidor): la próxima carga es completa."""
+        with self._lock:
+            self._db.execute("delete from hashes where tabla = ?", (self.tabla,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("select count(*) from hashes where tabla = ?", (self.tabla,)).fetchone()[0]
+
+
+_index: Optional[HashIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_hash_index() -> HashIndex:
+    """Índice único del servidor (compartido por sesiones y workers vía WAL)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = HashIndex(Path(os.getenv("INGESTA_INDEX", DATA_DIR / "ingesta.db")))
+            purgar_staging()
+        return _index
@@ -0,0 +1,140 @@
+# services/tickets_repo.py
+"""
+Listado de tickets con paginación keyset (cursor) sobre PostgREST.
+
+El orden es (created_at desc, id desc) y cada página pide "las filas
+posteriores al último (created_at, id) visto", de modo que Postgres usa
+los índices de migrations/003 y el costo no crece con el número de página
+(a diferencia de OFFSET). Filtros y búsqueda de texto se resuelven en la base.
+"""
+import logging
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+
+from supabase import Client
+
+from services.async_repo import submit_background
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50
+COLUMNAS  = "id,numero_orden,codigo_vendedor,estado,asunto,created_at"
+ESTADOS   = ["pendiente", "en_proceso", "resuelto", "cerrado"]
+RPC_CODIGOS = "codigos_vendedor"  # migrations/012: usuarios.codigo_vendedor
+
+Cursor = tuple[str, int]          # (created_at, id) de la última fila de la página
+
+
+@dataclass(frozen=True)
+class TicketFiltro:
+    estado: Optional[str] = None
+    codigo_vendedor: Optional[str] = None
+    desde: Optional[str] = None        # YYYY-MM-DD (incluido)
+    hasta: Optional[str] = None        # YYYY-MM-DD (incluido)
+    texto: Optional[str] = None        # búsqueda websearch en español
+
+
+def codigos_vendedor(client: Client) -> list[str]:
+    """
+    Códigos para el filtro de vendedor, de ``usuarios.codigo_vendedor``.
+    Se consultan con la sesión del usuario: la página los guarda en su
+    sesión, no en una caché del proceso.
+    """
+    return [r["codigo_vendedor"] for r in client.rpc(RPC_CODIGOS).execute().data or []]
+
+
+def fetch_page(
+    client: Client,
+    filtro: TicketFiltro,
+    cursor: Optional[Cursor] = None,
+    limit: int = PAGE_SIZE,
+) -> tuple[list[dict], Optional[Cursor]]:
+    """Devuelve (filas, cursor de la página siguiente o None si no hay más)."""
+    q = client.table("tickets").select(COLUMNAS)
+
+    if filtro.estado:
+        q = q.eq("estado", filtro.estado)
+    if filtro.codigo_vendedor:
+        q = q.eq("codigo_vendedor", filtro.codigo_vendedor)
+    if filtro.desde:
+        q = q.gte("created_at", filtro.desde)
+    if filtro.hasta:
+        # día completo: antes de las 00:00 del día siguiente
+        q = q.lt("created_at", (date.fromisoformat(filtro.hasta) + timedelta(days=1)).isoformat())
+    if filtro.texto:
+        q = q.filter("busqueda", "wfts(spanish)", filtro.texto)
+
+    if cursor is not None:
+        created_at, last_id = cursor
+        q = q.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id})')
+
+    # Se pide una fila extra para saber si existe la página siguiente
+    rows = q.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute().data
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = (rows[-1]["created_at"], rows[-1]["id"]) if has_more else None
+    return rows, next_cursor
+
+
+class TicketPager:
+    """
+    Estado de navegación de una sesión: pila de cursores para "Anterior"
+    y prefetch en segundo plano de la página siguiente. El estado sólo
+    cambia cuando la página se cargó: tras un error se sigue en la misma.
+    """
+
+    def __init__(self, client: Client, page_size: int = PAGE_SIZE):
+        self.client = client
+        self.page_size = page_size
+        self.filtro = TicketFiltro()
+        self._cursors: list[Optional[Cursor]] = [None]     # cursor de inicio de cada página visitada
+        self._next_cursor: Optional[Cursor] = None
+        self._prefetch: Optional[tuple[TicketFiltro, Cursor, Future]] = None
+
+    @property
+    def page_number(self) -> int:
+        return len(self._cursors)
+
+    @property
+    def has_next(self) -> bool:
+        return self._next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return len(self._cursors) > 1
+
+    def reset(self, filtro: TicketFiltro) -> list[dict]:
+        rows = self._load(filtro, None)
+        self._cursors = [None]
+        return rows
+
+    def next(self) -> list[dict]:
+        cursor = self._next_cursor
+        if cursor is None:
+            raise IndexError("No hay más páginas")
+        rows = self._load(self.filtro, cursor)
+        self._cursors.append(cursor)
+        return rows
+
+    def prev(self) -> list[dict]:
+        rows = self._load(self.filtro, self._cursors[-2] if len(self._cursors) > 1 else None)
+        if len(self._cursors) > 1:
+            self._cursors.pop()
+        return rows
+
+    def _load(self, filtro: TicketFiltro, cursor: Optional[Cursor]) -> list[dict]:
+        prefetched, self._prefetch = self._prefetch, None
+        if prefetched is not None and prefetched[:2] == (filtro, cursor):
+            rows, next_cursor = prefetched[2].result()
+        else:
+            rows, next_cursor = fetch_page(self.client, filtro, cursor, self.page_size)
+        self.filtro, self._next_cursor = filtro, next_cursor
+        if next_cursor is not None:
+            self._prefetch = (
+                filtro,
+                next_cursor,
+                submit_background(fetch_page, self.client, filtro, next_cursor, self.page_size),
+            )
+        return rows
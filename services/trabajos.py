@@ -0,0 +1,525 @@
+# services/trabajos.py
+"""
+Trabajos en segundo plano: operaciones largas (ingesta masiva, facturación,
+planificación de olas) que no dependen de la sesión Flet que las pidió.
+
+  • ``trabajos`` (SQLite en DATA_DIR, modo WAL) guarda cada trabajo con su
+    tipo, parámetros, prioridad, estado, progreso y resultado. Cerrar la
+    pestaña no lo detiene; cualquier sesión puede verlo desde "Trabajos".
+  • Un pool de hilos por proceso toma el próximo trabajo disponible por
+    prioridad (mayor primero) y antigüedad. El reclamo es un
+    ``begin immediate``: con varios workers (asgi.py) el límite de
+    concurrencia de cada tipo se cuenta en la base, no en memoria.
+  • Reintentos: si la función falla con un error reintentable (de red por
+    defecto) el trabajo vuelve a la cola con backoff exponencial
+    (``disponible_at``) hasta ``max_intentos``.
+  • Progreso: ``ctx.progreso(dict)`` avisa a los oyentes del proceso (las
+    sesiones que miran el trabajo) y se guarda en la base como máximo cada
+    ``GUARDAR_CADA`` segundos; los demás procesos lo leen de ahí.
+  • Cancelar: un trabajo en cola se descarta; uno en curso recibe
+    ``ctx.cancel_event`` (las funciones largas ya aceptan ``cancel_event``).
+  • Cada trabajo tiene su propio cliente Supabase con una copia de la
+    sesión de quien lo pidió (auth.tokens.cliente_trabajo): cerrar sesión en
+    la página no lo desconecta, y su token se renueva antes de cada intento
+    y mientras reporta progreso. Vive sólo en memoria del proceso que encoló
+    el trabajo (no se escriben tokens a disco): cada trabajo corre en ese
+    proceso y, si el proceso se reinicia, sus trabajos pendientes quedan en
+    error ("Interrumpido") y se pueden reintentar desde la página.
+  • Latido: cada ``LATIDO`` s el proceso marca sus trabajos en curso. Un
+    trabajo ``corriendo`` sin latido por ``LEASE`` s (su worker murió) pasa
+    a error en el próximo reclamo de cualquier proceso y libera su cupo.
+"""
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from supabase import Client
+
+from auth.tokens import cliente_trabajo, renovar, soltar
+from config import DATA_DIR
+from services.local_store import es_error_de_red
+from utils.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+WORKERS       = int(os.getenv("TRABAJOS_WORKERS", "4"))       # hilos por proceso
+ESPERA        = 1.0               # s entre revisiones de la cola (backoff, otros procesos)
+GUARDAR_CADA  = 1.0               # s entre escrituras del progreso a la base
+AVISAR_CADA   = 0.25              # s entre avisos de progreso a los oyentes
+BACKOFF_MAX   = 300.0             # s de espera máxima entre intentos
+LATIDO        = 10.0              # s entre latidos de los trabajos en curso
+LEASE         = float(os.getenv("TRABAJOS_LEASE", "60"))   # s sin latido tras los que se da por muerto
+RETENCION_S   = int(os.getenv("TRABAJOS_DIAS", "7")) * 86_400
+
+# Estados
+EN_COLA   = "en_cola"
+CORRIENDO = "corriendo"
+LISTO     = "listo"
+ERROR     = "error"
+CANCELADO = "cancelado"
+TERMINADOS = (LISTO, ERROR, CANCELADO)
+
+# Prioridades (mayor = antes)
+BAJA, NORMAL, ALTA = 0, 5, 10
+
+Oyente = Callable[[dict], Optional[bool]]          # False → desuscribir
+
+
+@dataclass(frozen=True)
+class TipoTrabajo:
+    """
+    ``funcion(ctx, params) -> dict`` hace el trabajo; su resultado debe ser
+    serializable a JSON. Si trae ``success: False`` el trabajo termina en
+    error con ``resultado["error"]`` (sin reintentos: la función ya decidió).
+    """
+    nombre: str
+    titulo: str
+    funcion: Callable[["Contexto", dict], dict]
+    concurrencia: int = 1                           # trabajos de este tipo a la vez (todos los procesos)
+    prioridad: int = NORMAL
+    max_intentos: int = 3
+    backoff: float = 5.0                            # s antes del 2.º intento; se duplica en cada uno
+    reintentable: Callable[[BaseException], bool] = es_error_de_red
+
+
+_tipos: dict[str, TipoTrabajo] = {}
+
+
+def registrar(tipo: TipoTrabajo) -> TipoTrabajo:
+    _tipos[tipo.nombre] = tipo
+    return tipo
+
+
+def tipos() -> dict[str, TipoTrabajo]:
+    return dict(_tipos)
+
+
+def usuario_sesion(page) -> Optional[str]:
+    """Identidad con la que se guardan los trabajos de la sesión Flet ``page``."""
+    user = page.session.get("user_data") or {}
+    return user.get("email") or user.get("nombre_usuario")
+
+
+class Contexto:
+    """Lo que recibe la función de un trabajo mientras corre."""
+
+    def __init__(self, planificador: "Planificador", trabajo: dict, client: Client, cancel_event: threading.Event):
+        self.id = trabajo["id"]
+        self.intento = trabajo["intentos"]
+        self.usuario = trabajo["usuario"]
+        self.client = client
+        self.cancel_event = cancel_event
+        self._planificador = planificador
+
+    @property
+    def cancelado(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def progreso(self, datos: dict):
+        """Reporta avance (``done``/``total`` alimentan la barra de la página Trabajos)."""
+        self._planificador._progreso(self.id, datos)
+
+    def directorio(self) -> Path:
+        """Carpeta propia del trabajo para archivos de resultado."""
+        d = self._planificador.path.parent / "trabajos" / self.id
+        d.mkdir(parents=True, exist_ok=True)
+        return d
+
+
+def _proceso_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True                                 # existe pero es de otro usuario
+    return True
+
+
+def _fila(row: sqlite3.Row) -> dict:
+    t = dict(row)
+    for c in ("params", "progreso", "resultado"):
+        t[c] = json.loads(t[c]) if t[c] else None
+    return t
+
+
+class Planificador:
+    def __init__(self, path: Path, workers: int = WORKERS):
+        self.path = Path(path)
+        self.workers = workers
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("pragma journal_mode=wal")
+        self._db.execute("pragma synchronous=normal")
+        self._db.executescript(
+            """
+            create table if not exists trabajos (
+                id             text primary key,
+                tipo           text not null,
+                titulo         text not null,
+                usuario        text,
+                estado         text not null,
+                prioridad      integer not null,
+                params         text not null,
+                progreso       text,
+                resultado      text,
+                error          text,
+                intentos       integer not null default 0,
+                max_intentos   integer not null,
+                cancelar       integer not null default 0,
+                proceso        integer not null,         -- pid dueño del cliente de la sesión
+                creado_at      real not null,
+                disponible_at  real not null,
+                iniciado_at    real,
+                latido_at      real,                     -- último latido del proceso que lo corre
+                terminado_at   real
+            );
+            create index if not exists trabajos_cola on trabajos (estado, prioridad desc, creado_at);
+            create index if not exists trabajos_usuario on trabajos (usuario, creado_at desc);
+            """
+        )
+        if "latido_at" not in {r[1] for r in self._db.execute("pragma table_info(trabajos)")}:
+            self._db.execute("alter table trabajos add column latido_at real")     # base de una versión anterior
+        self._lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._pid = os.getpid()
+        self._clientes: dict[str, Client] = {}                  # trabajos de este proceso
+        self._cancel: dict[str, threading.Event] = {}           # trabajos corriendo aquí
+        self._oyentes: dict[str, tuple[Optional[str], Oyente]] = {}   # clave → (trabajo_id | None, cb)
+        self._avisado: dict[str, float] = {}
+        self._ultimo: dict[str, dict] = {}                      # progreso aún sin guardar
+        self._guardado: dict[str, float] = {}
+        self._threads: list[threading.Thread] = []
+        self._latido: Optional[threading.Thread] = None
+        self._recuperar()
+        self.purgar()
+
+    # ── Base ---------------------------------------------------------------
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    def _recuperar(self):
+        """Los trabajos de procesos que ya no existen no pueden seguir (su cliente murió con ellos)."""
+        with self._lock:
+            pids = [r[0] for r in self._db.execute(
+                "select distinct proceso from trabajos where estado in (?, ?)", (EN_COLA, CORRIENDO)
+            )]
+            muertos = [p for p in pids if p == self._pid or not _proceso_vivo(p)]
+            for pid in muertos:
+                n = self._db.execute(
+                    "update trabajos set estado = ?, error = ?, terminado_at = ?"
+                    " where proceso = ? and estado in (?, ?)",
+                    (ERROR, "Interrumpido: el servidor se reinició", time.time(), pid, EN_COLA, CORRIENDO),
+                ).rowcount
+                if n:
+                    logger.warning("Trabajos: %s trabajos del proceso %s quedaron interrumpidos", n, pid)
+
+    def purgar(self, retencion_s: float = RETENCION_S):
+        """Descarta los trabajos terminados hace más de ``retencion_s``."""
+        self._execute(
+            f"delete from trabajos where estado in ({','.join('?' * len(TERMINADOS))}) and terminado_at < ?",
+            (*TERMINADOS, time.time() - retencion_s),
+        )
+
+    # ── API de las páginas -------------------------------------------------
+    def enviar(
+        self,
+        tipo: str,
+        params: dict,
+        client: Client,
+        usuario: Optional[str] = None,
+        titulo: Optional[str] = None,
+        prioridad: Optional[int] = None,
+        max_intentos: Optional[int] = None,
+    ) -> str:
+        """
+        Encola un trabajo y devuelve su id. ``client`` es el de la sesión que
+        lo pide; el trabajo corre con un cliente propio que copia su sesión.
+        """
+        t = _tipos[tipo]
+        trabajo_id = uuid.uuid4().hex[:12]
+        ahora = time.time()
+        self._clientes[trabajo_id] = cliente_trabajo(client)
+        self._execute(
+            "insert into trabajos (id, tipo, titulo, usuario, estado, prioridad, params, max_intentos,"
+            " proceso, creado_at, disponible_at) values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                trabajo_id, tipo, titulo or t.titulo, usuario, EN_COLA,
+                t.prioridad if prioridad is None else prioridad,
+                json.dumps(params, default=str), max_intentos or t.max_intentos,
+                self._pid, ahora, ahora,
+            ),
+        )
+        logger.info("Trabajo %s (%s) en cola para %s", trabajo_id, tipo, usuario or "-")
+        self._ensure_threads()
+        self._notificar(trabajo_id)
+        with self._wake:
+            self._wake.notify()
+        return trabajo_id
+
+    def reintentar(self, trabajo_id: str, client: Client) -> Optional[str]:
+        """Encola de nuevo un trabajo terminado en error o cancelado (con el cliente de quien lo pide)."""
+        t = self.obtener(trabajo_id)
+        if t is None or t["estado"] not in (ERROR, CANCELADO):
+            return None
+        return self.enviar(t["tipo"], t["params"], client, t["usuario"], t["titulo"], t["prioridad"])
+
+    def cancelar(self, trabajo_id: str) -> bool:
+        """Descarta un trabajo en cola o pide detener uno en curso (en cualquier proceso)."""
+        n = self._execute(
+            "update trabajos set estado = ?, terminado_at = ? where id = ? and estado = ?",
+            (CANCELADO, time.time(), trabajo_id, EN_COLA),
+        ).rowcount
+        if n:
+            self._soltar_cliente(trabajo_id)
+            self._notificar(trabajo_id)
+            return True
+        n = self._execute(
+            "update trabajos set cancelar = 1 where id = ? and estado = ?", (trabajo_id, CORRIENDO)
+        ).rowcount
+        evento = self._cancel.get(trabajo_id)
+        if evento is not None:
+            evento.set()
+        return bool(n)
+
+    def obtener(self, trabajo_id: str) -> Optional[dict]:
+        row = self._execute("select * from trabajos where id = ?", (trabajo_id,)).fetchone()
+        return _fila(row) if row else None
+
+    def listar(self, usuario: Optional[str] = None, limite: int = 50) -> list[dict]:
+        """Trabajos más recientes primero (de ``usuario`` o de todos)."""
+        if usuario is None:
+            rows = self._execute("select * from trabajos order by creado_at desc limit ?", (limite,))
+        else:
+            rows = self._execute(
+                "select * from trabajos where usuario = ? order by creado_at desc limit ?", (usuario, limite)
+            )
+        return [_fila(r) for r in rows.fetchall()]
+
+    def suscribir(self, clave: str, oyente: Oyente, trabajo_id: Optional[str] = None):
+        """
+        ``oyente(trabajo)`` en cada cambio de ``trabajo_id`` (o de todos si es
+        None). Una suscripción por clave; la nueva reemplaza a la anterior.
+        """
+        with self._lock:
+            self._oyentes[clave] = (trabajo_id, oyente)
+
+    def desuscribir(self, clave: str):
+        with self._lock:
+            self._oyentes.pop(clave, None)
+
+    # ── Avisos -------------------------------------------------------------
+    def _notificar(self, trabajo_id: str, trabajo: Optional[dict] = None):
+        with self._lock:
+            oyentes = [(k, cb) for k, (tid, cb) in self._oyentes.items() if tid is None or tid == trabajo_id]
+        if not oyentes:
+            return
+        trabajo = trabajo or self.obtener(trabajo_id)
+        if trabajo is None:
+            return
+        for clave, cb in oyentes:
+            try:
+                if cb(trabajo) is False:
+                    self.desuscribir(clave)
+            except Exception as exc:
+                # la sesión se cerró o la vista ya no existe
+                logger.debug("Oyente %s de trabajos falló: %s", clave, exc)
+                self.desuscribir(clave)
+
+    def _progreso(self, trabajo_id: str, datos: dict):
+        ahora = time.monotonic()
+        self._ultimo[trabajo_id] = datos
+        if ahora - self._guardado.get(trabajo_id, 0.0) >= GUARDAR_CADA:
+            self._guardado[trabajo_id] = ahora
+            self._execute("update trabajos set progreso = ? where id = ?", (json.dumps(datos, default=str), trabajo_id))
+            self._renovar(trabajo_id)
+            # cancelación pedida desde otro proceso
+            row = self._execute("select cancelar from trabajos where id = ?", (trabajo_id,)).fetchone()
+            if row and row[0] and trabajo_id in self._cancel:
+                self._cancel[trabajo_id].set()
+        if ahora - self._avisado.get(trabajo_id, 0.0) >= AVISAR_CADA:
+            self._avisado[trabajo_id] = ahora
+            trabajo = self.obtener(trabajo_id)
+            if trabajo is not None:
+                trabajo["progreso"] = datos
+                self._notificar(trabajo_id, trabajo)
+
+    # ── Pool de hilos --------------------------------------------------------
+    def _ensure_threads(self):
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                t = threading.Thread(target=self._run, name=f"trabajos-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            if self._latido is None or not self._latido.is_alive():
+                self._latido = threading.Thread(target=self._latir, name="trabajos-latido", daemon=True)
+                self._latido.start()
+
+    def _latir(self):
+        """Marca los trabajos que corren en este proceso (ver ``LEASE``)."""
+        while True:
+            time.sleep(LATIDO)
+            ids = list(self._cancel)
+            if not ids:
+                continue
+            try:
+                self._execute(
+                    f"update trabajos set latido_at = ? where estado = ? and id in ({','.join('?' * len(ids))})",
+                    (time.time(), CORRIENDO, *ids),
+                )
+            except sqlite3.Error as exc:
+                logger.warning("Trabajos: no se pudo registrar el latido: %s", exc)
+
+    def _vencer(self, ahora: float) -> int:
+        """Trabajos en curso sin latido: su worker murió y no deben seguir ocupando cupo."""
+        return self._db.execute(
+            "update trabajos set estado = ?, error = ?, terminado_at = ?"
+            " where estado = ? and coalesce(latido_at, iniciado_at) < ?",
+            (ERROR, "Interrumpido: el proceso dejó de responder", ahora, CORRIENDO, ahora - LEASE),
+        ).rowcount
+
+    def _reclamar(self) -> Optional[dict]:
+        """Próximo trabajo de este proceso cuyo tipo no llegó a su límite de concurrencia."""
+        with self._lock:
+            self._db.execute("begin immediate")
+            try:
+                ahora = time.time()
+                if vencidos := self._vencer(ahora):
+                    logger.warning("Trabajos: %s trabajos sin latido pasaron a error", vencidos)
+                corriendo = dict(self._db.execute(
+                    "select tipo, count(*) from trabajos where estado = ? group by tipo", (CORRIENDO,)
+                ).fetchall())
+                llenos = [n for n, t in _tipos.items() if corriendo.get(n, 0) >= t.concurrencia]
+                row = self._db.execute(
+                    "select * from trabajos where estado = ? and proceso = ? and disponible_at <= ?"
+                    f" and tipo not in ({','.join('?' * len(llenos))})"
+                    " order by prioridad desc, creado_at limit 1",
+                    (EN_COLA, self._pid, ahora, *llenos),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "update trabajos set estado = ?, intentos = intentos + 1, iniciado_at = ?, latido_at = ?,"
+                        " cancelar = 0, error = null where id = ?",
+                        (CORRIENDO, ahora, ahora, row["id"]),
+                    )
+                self._db.execute("commit")
+            except BaseException:
+                self._db.execute("rollback")
+                raise
+        if row is None:
+            return None
+        trabajo = _fila(row)
+        trabajo.update(estado=CORRIENDO, intentos=trabajo["intentos"] + 1)
+        return trabajo
+
+    def _run(self):
+        while True:
+            try:
+                trabajo = self._reclamar()
+            except sqlite3.Error as exc:
+                logger.warning("Trabajos: no se pudo leer la cola: %s", exc)
+                trabajo = None
+            if trabajo is None:
+                with self._wake:
+                    self._wake.wait(ESPERA)
+                continue
+            self._ejecutar(trabajo)
+            with self._wake:
+                self._wake.notify_all()           # se liberó un cupo de su tipo
+
+    def _ejecutar(self, trabajo: dict):
+        trabajo_id, tipo = trabajo["id"], _tipos.get(trabajo["tipo"])
+        client = self._clientes.get(trabajo_id)
+        if tipo is None or client is None:
+            self._terminar(trabajo_id, ERROR, error="Tipo de trabajo o sesión no disponible")
+            return
+
+        cancel_event = self._cancel[trabajo_id] = threading.Event()
+        self._notificar(trabajo_id, trabajo)
+        logger.info("Trabajo %s (%s) intento %s/%s", trabajo_id, tipo.nombre, trabajo["intentos"],
+                    trabajo["max_intentos"])
+        try:
+            renovar(client)                       # pudo esperar en cola más que la vida del token
+            with span("trabajo", tipo=tipo.nombre):
+                resultado = tipo.funcion(Contexto(self, trabajo, client, cancel_event), trabajo["params"]) or {}
+        except Exception as exc:
+            if trabajo["intentos"] < trabajo["max_intentos"] and tipo.reintentable(exc) and not cancel_event.is_set():
+                espera = min(tipo.backoff * 2 ** (trabajo["intentos"] - 1), BACKOFF_MAX) * random.uniform(0.8, 1.2)
+                logger.warning("Trabajo %s falló (reintento en %.0f s): %s", trabajo_id, espera, exc)
+                self._execute(
+                    "update trabajos set estado = ?, error = ?, disponible_at = ? where id = ?",
+                    (EN_COLA, str(exc), time.time() + espera, trabajo_id),
+                )
+                self._cancel.pop(trabajo_id, None)
+                self._notificar(trabajo_id)
+                return
+            logger.error("Trabajo %s falló: %s", trabajo_id, exc)
+            self._terminar(trabajo_id, CANCELADO if cancel_event.is_set() else ERROR, error=str(exc))
+            return
+
+        if cancel_event.is_set():
+            estado = CANCELADO
+        elif resultado.get("success") is False:
+            estado = ERROR
+        else:
+            estado = LISTO
+        self._terminar(trabajo_id, estado, resultado=resultado, error=resultado.get("error"))
+
+    def _renovar(self, trabajo_id: str):
+        client = self._clientes.get(trabajo_id)
+        if client is None:
+            return
+        try:
+            renovar(client)
+        except Exception as exc:
+            logger.warning("Trabajo %s: no se pudo renovar el token: %s", trabajo_id, exc)
+
+    def _soltar_cliente(self, trabajo_id: str):
+        client = self._clientes.pop(trabajo_id, None)
+        if client is None:
+            return
+        try:
+            soltar(client)                        # revoca si la página ya cerró sesión
+        except Exception as exc:
+            logger.warning("Trabajo %s: no se pudo soltar su sesión: %s", trabajo_id, exc)
+
+    def _terminar(self, trabajo_id: str, estado: str, resultado: Optional[dict] = None, error: Optional[str] = None):
+        ultimo = self._ultimo.get(trabajo_id)
+        self._execute(
+            "update trabajos set estado = ?, resultado = ?, error = ?, terminado_at = ?,"
+            " progreso = coalesce(?, progreso) where id = ?",
+            (estado, json.dumps(resultado, default=str) if resultado is not None else None, error, time.time(),
+             json.dumps(ultimo, default=str) if ultimo is not None else None, trabajo_id),
+        )
+        self._soltar_cliente(trabajo_id)
+        for d in (self._cancel, self._avisado, self._guardado, self._ultimo):
+            d.pop(trabajo_id, None)
+        logger.info("Trabajo %s terminó: %s", trabajo_id, estado)
+        self._notificar(trabajo_id)
+
+
+_planificador: Optional[Planificador] = None
+_planificador_lock = threading.Lock()
+
+
+def get_planificador() -> Planificador:
+    """Planificador único del proceso (registra los tipos de la app la primera vez)."""
+    global _planificador
+    with _planificador_lock:
+        if _planificador is None:
+            import services.trabajos_tipos  # noqa: F401  (registra ingesta, facturación y olas)
+
+            _planificador = Planificador(Path(os.getenv("TRABAJOS_DB", DATA_DIR / "trabajos.db")))
+        return _planificador
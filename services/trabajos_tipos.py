@@ -0,0 +1,98 @@
+# services/trabajos_tipos.py
+"""
+Tipos de trabajo de la app (services/trabajos.py). Cada función adapta una
+operación existente al contexto del trabajo: progreso y cancelación pasan
+por ``ctx``; el resultado queda en la base como JSON.
+
+  • ingesta:      ingest_files sobre archivos ya subidos al servidor; las
+                  vistas previas se escriben en la carpeta del trabajo.
+  • facturacion:  facturar_ordenes. Un solo intento: los números de factura
+                  se reservan en la base y repetir la emisión no es inocuo.
+  • olas:         plan_waves; el plan (tres DataFrames) se guarda como
+                  archivos Arrow en la carpeta del trabajo.
+
+Los módulos pesados (pandas, pyarrow) se importan al correr el trabajo.
+"""
+import logging
+from pathlib import Path
+
+from services import cambios, dashboard, reportes
+from services.trabajos import ALTA, BAJA, NORMAL, Contexto, TipoTrabajo, registrar
+
+logger = logging.getLogger(__name__)
+
+PLAN_OLAS = ("asignacion", "picking", "resumen")
+
+
+def _ingesta(ctx: Contexto, params: dict) -> dict:
+    from services.ingesta_multiple import ingest_files
+
+    result = ingest_files(
+        params["paths"],
+        ctx.client,
+        on_progress=ctx.progreso,
+        cancel_event=ctx.cancel_event,
+        preview_dir=ctx.directorio() / "previews",
+    )
+    if any(a["nuevas"] + a["cambiadas"] for a in result["archivos"]):
+        dashboard.invalidate()                  # los conteos del panel cambiaron
+        reportes.invalidate()
+        cambios.notificar("ordenes")            # páginas en caché que muestran órdenes
+    return result
+
+
+def _facturacion(ctx: Contexto, params: dict) -> dict:
+    from services.facturacion import facturar_ordenes
+
+    result = facturar_ordenes(
+        ctx.client,
+        params["numeros"],
+        params["out_dir"],
+        pdf=params.get("pdf"),
+        on_progress=ctx.progreso,
+        cancel_event=ctx.cancel_event,
+    )
+    if result["done"]:
+        dashboard.invalidate()
+        cambios.notificar("facturas")
+    return result
+
+
+def _olas(ctx: Contexto, params: dict) -> dict:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    from services.alistamiento import cargar_lineas, plan_waves
+    from services.local_store import get_local_store
+
+    ctx.progreso({"etapa": "cargando líneas"})
+    lineas = cargar_lineas(ctx.client, store=get_local_store())
+    ctx.progreso({"etapa": "planificando", "lineas": len(lineas)})
+    plan = plan_waves(lineas, params["max_ordenes"], params["max_lineas"])
+
+    directorio = ctx.directorio()
+    for nombre in PLAN_OLAS:
+        feather.write_feather(pa.Table.from_pandas(plan[nombre], preserve_index=False), directorio / f"{nombre}.arrow")
+    return {
+        "dir": str(directorio),
+        "ordenes": len(plan["asignacion"]),
+        "olas": len(plan["resumen"]),
+        "paradas": len(plan["picking"]),
+    }
+
+
+def leer_plan(directorio) -> dict:
+    """El plan de un trabajo ``olas`` como lo devuelve plan_waves."""
+    import pandas as pd
+
+    return {nombre: pd.read_feather(Path(directorio) / f"{nombre}.arrow") for nombre in PLAN_OLAS}
+
+
+# Olas: alguien espera en la estación. Facturación: cierre de mes, puede esperar.
+# Ingesta y facturación usan su propio pool de procesos: de a uno por servidor.
+INGESTA     = registrar(TipoTrabajo("ingesta", "Carga de órdenes", _ingesta, concurrencia=1, prioridad=NORMAL,
+                                    max_intentos=2))
+FACTURACION = registrar(TipoTrabajo("facturacion", "Facturación", _facturacion, concurrencia=1, prioridad=BAJA,
+                                    max_intentos=1))
+OLAS        = registrar(TipoTrabajo("olas", "Planificación de olas", _olas, concurrencia=2, prioridad=ALTA,
+                                    max_intentos=3, backoff=2.0))
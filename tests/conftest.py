@@ -0,0 +1,19 @@
+# tests/conftest.py
+"""
+Configuración común de las pruebas: sin servidor Supabase ni navegador.
+config.py exige credenciales al importarse y los almacenes SQLite escriben
+en DATA_DIR, así que ambos se fijan antes de importar cualquier módulo.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "pruebas")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="colibri-pruebas-"))
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,168 @@
+# tests/test_alistamiento.py
+"""
+Planificador de olas (services/alistamiento.py): lectura paginada de las
+líneas abiertas, su copia local en la estación, recorrido en serpentina,
+corte por capacidad del carro y listas de picking consolidadas.
+"""
+import httpx
+import pandas as pd
+import pytest
+
+from services import alistamiento
+from services.local_store import LocalStore
+
+
+class VistaFalsa:
+    """``table(...).select(...).order(...).range(a, b).execute()`` sobre una lista."""
+
+    def __init__(self, filas: list[dict], error: Exception | None = None):
+        self.filas = filas
+        self.error = error
+        self.pedidos: list[tuple[int, int]] = []
+
+    def table(self, _nombre):
+        return _Consulta(self)
+
+
+class _Consulta:
+    def __init__(self, vista: VistaFalsa):
+        self.vista = vista
+        self.columnas: list[str] = []
+        self.orden: list[str] = []
+        self.rango = (0, 0)
+
+    def select(self, columnas):
+        self.columnas = columnas.split(",")
+        return self
+
+    def order(self, columna):
+        self.orden.append(columna)
+        return self
+
+    def range(self, a, b):
+        self.rango = (a, b)
+        return self
+
+    def execute(self):
+        if self.vista.error:
+            raise self.vista.error
+        self.vista.pedidos.append(self.rango)
+        filas = sorted(self.vista.filas, key=lambda f: tuple(str(f.get(c)) for c in self.orden))
+        a, b = self.rango
+        self.data = [{c: f.get(c) for c in self.columnas} for f in filas[a:b + 1]]
+        return self
+
+
+def linea(orden, sku, cantidad=1, ubicacion="A-01-1", marketplace="ml", vendedor="V1") -> dict:
+    return {"numero_orden": orden, "sku": sku, "cantidad": cantidad, "ubicacion": ubicacion,
+            "marketplace": marketplace, "codigo_vendedor": vendedor}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(LocalStore, "_ensure_thread", lambda self: None)
+    return LocalStore(tmp_path / "estacion.db")
+
+
+def test_paginas_con_orden_total(monkeypatch):
+    monkeypatch.setattr(alistamiento, "PAGE_SIZE", 2)
+    filas = [linea("1", "A", vendedor=v) for v in ("V3", "V1", "V2")] + [linea("2", "B")]
+    vista = VistaFalsa(filas)
+
+    lineas = alistamiento.cargar_lineas(vista)
+    assert vista.pedidos == [(0, 1), (2, 3), (4, 5)]
+    assert lineas["codigo_vendedor"].tolist() == ["V1", "V2", "V3", "V1"]
+
+
+def test_copia_local_conserva_lineas_de_distinto_vendedor(store):
+    filas = [linea("1", "A", 2, vendedor="V1"), linea("1", "A", 3, vendedor="V2"), linea("2", "B")]
+    assert len(alistamiento.cargar_lineas(VistaFalsa(filas), store=store)) == 3
+
+    sin_red = VistaFalsa([], error=httpx.ConnectError("sin red"))
+    copia = alistamiento.cargar_lineas(sin_red, store=store)
+    assert sorted(zip(copia["numero_orden"], copia["codigo_vendedor"], copia["cantidad"])) == [
+        ("1", "V1", 2), ("1", "V2", 3), ("2", "V1", 1),
+    ]
+    assert alistamiento.plan_waves(copia)["picking"]["cantidad"].sum() == 6
+
+
+def test_sin_red_y_sin_copia_propaga_el_error(store):
+    with pytest.raises(httpx.ConnectError):
+        alistamiento.cargar_lineas(VistaFalsa([], error=httpx.ConnectError("sin red")), store=store)
+
+
+def test_excluye_ordenes_confirmadas_sin_sincronizar(store):
+    filas = [linea("1", "A"), linea("1", "A", vendedor="V2"), linea("1", "C", marketplace="fb"), linea("2", "B")]
+    plan = alistamiento.plan_waves(pd.DataFrame(filas), max_ordenes=1)
+    ola = plan["asignacion"].query("numero_orden == '1' and codigo_vendedor == 'V1' and marketplace == 'ml'")["ola"].item()
+    assert alistamiento.confirmar_ola("cliente", plan["asignacion"], ola, store, "ana") == 1
+
+    enviado = store.pendientes_de(alistamiento.TABLA_ALISTAMIENTO)
+    assert enviado == [{"marketplace": "ml", "codigo_vendedor": "V1", "numero_orden": "1", "ola": ola, "estado": "en_proceso"}]
+    lineas = alistamiento.cargar_lineas(VistaFalsa(filas), store=store)
+    # sólo se oculta la orden confirmada, no las de igual número de otro vendedor o canal
+    assert sorted(zip(lineas["numero_orden"], lineas["marketplace"], lineas["codigo_vendedor"])) == [
+        ("1", "fb", "V1"), ("1", "ml", "V2"), ("2", "ml", "V1"),
+    ]
+
+
+# ── Planificación ---------------------------------------------------------------
+def test_recorrido_en_serpentina():
+    ubicaciones = pd.Series(["A-01-1", "A-05-1", "B-01-1", "B-05-2", "b-05-1", None, "AA-01-1"])
+    clave = alistamiento.clave_recorrido(ubicaciones)
+    orden = ubicaciones.iloc[clave["recorrido"].argsort(kind="stable")].tolist()
+    # pasillo A sube, B baja (05 antes que 01), AA después de B, sin ubicación al final
+    assert orden[:6] == ["A-01-1", "A-05-1", "b-05-1", "B-05-2", "B-01-1", "AA-01-1"]
+    assert pd.isna(orden[6])
+    assert clave["pasillo"].tolist()[:3] == ["A", "A", "B"]
+
+
+def test_cortar_olas_respeta_la_capacidad():
+    olas = alistamiento._cortar_olas(pd.Series([3, 3, 3, 1, 10]).to_numpy(), max_ordenes=3, max_lineas=6)
+    assert olas.tolist() == [1, 1, 2, 2, 3]
+    # una orden más grande que el carro va sola en su ola
+    assert alistamiento._cortar_olas(pd.Series([9, 1]).to_numpy(), 5, 5).tolist() == [1, 2]
+
+
+def test_plan_consolida_por_sku_y_respeta_el_carro():
+    lineas = pd.DataFrame(
+        [linea(f"O{i}", "POPULAR", 1, "A-02-1") for i in range(6)]
+        + [linea("O0", "RARO", 2, "B-09-1"), linea("O5", "OTRO", 1, "A-01-1"), linea("X", "SOLO", 4, None)]
+    )
+    plan = alistamiento.plan_waves(lineas, max_ordenes=4, max_lineas=10)
+    asignacion = plan["asignacion"].set_index("numero_orden")["ola"]
+    picking, resumen = plan["picking"], plan["resumen"]
+
+    assert set(asignacion.index) == {f"O{i}" for i in range(6)} | {"X"}
+    assert (resumen["ordenes"] <= 4).all() and (resumen["lineas"] <= 10).all()
+    assert resumen["unidades"].sum() == lineas["cantidad"].sum()
+    # el SKU compartido se recoge una vez por ola, con las unidades de todas sus órdenes
+    populares = picking[picking["sku"] == "POPULAR"]
+    assert populares["ola"].is_unique and populares["cantidad"].sum() == 6
+    # cada lista sigue el recorrido: secuencia 1..n y la orden sin ubicación al final
+    for _, lista in picking.groupby("ola"):
+        assert lista["secuencia"].tolist() == list(range(1, len(lista) + 1))
+    assert picking.iloc[-1]["ubicacion"] == alistamiento.SIN_UBICACION
+
+
+def test_mismo_numero_de_otro_vendedor_es_otra_orden():
+    lineas = pd.DataFrame([
+        linea("100", "A", 1, "A-01-1", vendedor="V1"),
+        linea("100", "B", 1, "A-02-1", vendedor="V1"),
+        linea("100", "A", 2, "A-01-1", vendedor="V2"),
+        linea("100", "A", 3, "A-01-1", marketplace="fb", vendedor="V1"),
+    ])
+    plan = alistamiento.plan_waves(lineas, max_ordenes=1, max_lineas=10)
+    asignacion = plan["asignacion"]
+
+    assert list(asignacion.columns) == alistamiento.CLAVE_ORDEN + ["ola"]
+    assert len(asignacion) == 3 and asignacion["ola"].nunique() == 3
+    assert plan["resumen"]["ordenes"].tolist() == [1, 1, 1]
+    # cada ola lleva sólo las unidades de su orden
+    por_ola = plan["picking"].groupby("ola")["cantidad"].sum()
+    assert sorted(por_ola.tolist()) == [2, 2, 3]
+
+
+def test_plan_vacio():
+    plan = alistamiento.plan_waves(pd.DataFrame(columns=alistamiento.COLUMNAS_LINEA))
+    assert all(df.empty for df in plan.values())
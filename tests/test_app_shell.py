@@ -0,0 +1,73 @@
+# tests/test_app_shell.py
+"""
+Shell único (components/app_shell.py) sobre una página falsa: el resize
+recalcula a lo sumo cada ``RESIZE_EVERY`` s, siempre con el ancho final, y
+envía sólo el panel central; el drawer muestra las entradas del rol.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from components import app_shell
+
+
+class SesionFalsa(dict):
+    def set(self, clave, valor):
+        self[clave] = valor
+
+    def get_keys(self):
+        return list(self)
+
+
+class PaginaFalsa:
+    def __init__(self, width: int):
+        self.width = width
+        self.session = SesionFalsa()
+        self.on_resized = None
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def run_thread(self, fn, *args):
+        threading.Thread(target=fn, args=args).start()
+
+
+@pytest.fixture
+def shell(monkeypatch):
+    enviados: list[tuple] = []
+    monkeypatch.setattr(app_shell, "mark_dirty", lambda *c: enviados.append(c))
+    page = PaginaFalsa(width=1200)
+    view, pages, refresh_user = app_shell.build_shell(page)
+    body = view.controls[0].controls[1]
+    content_container = body.controls[0]
+    yield page, enviados, content_container.content, body.controls[2], refresh_user
+    page.loop.call_soon_threadsafe(page.loop.stop)
+
+
+def test_resize_en_rafaga(shell):
+    page, enviados, rounded, _, _ = shell
+    for ancho in range(700, 1000, 10):                  # 30 eventos seguidos
+        page.width = ancho
+        page.on_resized(None)
+    assert len(enviados) == 1 and rounded.width == 660
+
+    limite = time.monotonic() + 2
+    while len(enviados) < 2 and time.monotonic() < limite:
+        time.sleep(0.01)
+    time.sleep(app_shell.RESIZE_EVERY)
+    assert len(enviados) == 2 and rounded.width == 990 - 40
+    assert enviados[-1] == (rounded,)                   # drawer cerrado: sólo el panel interior
+
+
+def test_drawer_segun_rol(shell):
+    page, _, _, menu, refresh_user = shell
+    titulos = lambda: {t.title.value for t in menu.content.controls if hasattr(t, "title") and t.visible}
+
+    page.session.set("user_data", {"nombre_usuario": "ana", "rol": "vendedor"})
+    refresh_user()
+    assert "Facturas" not in titulos() and "Métricas" not in titulos() and "Tickets" in titulos()
+
+    page.session.set("user_data", {"nombre_usuario": "luis", "rol": "facturacion"})
+    refresh_user()
+    assert "Facturas" in titulos() and "Métricas" not in titulos()
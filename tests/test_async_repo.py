@@ -0,0 +1,60 @@
+# tests/test_async_repo.py
+"""
+Capa asíncrona (services/async_repo.py): las llamadas bloqueantes no
+detienen el event loop y un cambio de ruta cancela las esperas de la sesión.
+"""
+import asyncio
+import threading
+
+from services.async_repo import cancel_pending, run_blocking, submit_background
+
+
+class SesionFalsa(dict):
+    def set(self, clave, valor):
+        self[clave] = valor
+
+
+class PaginaFalsa:
+    def __init__(self):
+        self.session = SesionFalsa()
+
+
+def test_el_loop_sigue_atendiendo_mientras_espera():
+    page, liberar = PaginaFalsa(), threading.Event()
+
+    async def principal():
+        espera = asyncio.create_task(run_blocking(page, lambda x: liberar.wait(2) and x * 2, 21))
+        for _ in range(5):                              # otros eventos de la sesión
+            await asyncio.sleep(0.01)
+        assert not espera.done()
+        liberar.set()
+        return await espera
+
+    assert asyncio.run(principal()) == 42
+    assert cancel_pending(page) == 0                    # la espera terminada ya no figura
+
+
+def test_cancelar_al_cambiar_de_ruta():
+    page, liberar = PaginaFalsa(), threading.Event()
+
+    async def principal():
+        espera = asyncio.create_task(run_blocking(page, liberar.wait, 5))
+        await asyncio.sleep(0.05)
+        assert cancel_pending(page) == 1
+        try:
+            await espera
+        except asyncio.CancelledError:
+            return "cancelada"
+        finally:
+            liberar.set()
+
+    assert asyncio.run(principal()) == "cancelada"
+    assert cancel_pending(page) == 0
+
+
+def test_submit_background_no_espera():
+    liberar = threading.Event()
+    fut = submit_background(liberar.wait, 5)
+    assert not fut.done()
+    liberar.set()
+    assert fut.result(5) is True
@@ -0,0 +1,86 @@
+# tests/test_cache.py
+"""
+Caché TTL del proceso (services/cache.py): single-flight, expiración, LRU
+y carga por lotes con caché negativa. Sin ``SHARED_CACHE`` (ver
+tests/test_shared_store.py para el segundo nivel entre workers).
+"""
+import threading
+import time
+
+from services import cache as cache_mod
+from services.cache import TTLCache
+
+
+def test_single_flight():
+    cache = TTLCache(ttl=60)
+    cargas, empezar = [], threading.Event()
+
+    def loader():
+        cargas.append(1)
+        empezar.wait(5)
+        return "valor"
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(cache.get_or_load("k", loader)[0])) for _ in range(20)]
+    for h in hilos:
+        h.start()
+    time.sleep(0.05)
+    empezar.set()
+    for h in hilos:
+        h.join(5)
+
+    assert resultados == ["valor"] * 20
+    assert len(cargas) == 1
+    assert (cache.misses, cache.hits) == (1, 19)
+
+
+def test_expira_por_ttl(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(cache_mod.time, "time", lambda: ahora[0])
+    cache = TTLCache(ttl=10)
+    valores = iter(["a", "b"])
+
+    assert cache.get_or_load("k", lambda: next(valores)) == ("a", 1000.0)
+    ahora[0] += 9
+    assert cache.get_or_load("k", lambda: next(valores))[0] == "a"
+    ahora[0] += 2
+    assert cache.get_or_load("k", lambda: next(valores)) == ("b", 1011.0)
+
+
+def test_lru_expulsa_la_menos_usada():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.get_or_load("a", lambda: 1)
+    cache.get_or_load("b", lambda: 2)
+    cache.get_or_load("a", lambda: 0)               # "a" pasa a ser la más reciente
+    cache.get_or_load("c", lambda: 3)
+
+    assert len(cache) == 2 and cache.evictions == 1
+    assert cache.get_or_load("a", lambda: "recargada")[0] == 1
+    assert cache.get_or_load("b", lambda: "recargada")[0] == "recargada"
+
+
+def test_get_many_una_consulta_y_cache_negativa():
+    cache = TTLCache(ttl=60)
+    pedidas = []
+
+    def loader(faltantes):
+        pedidas.append(sorted(faltantes))
+        return {k: k.upper() for k in faltantes if k != "x"}
+
+    assert cache.get_many(["a", "b", "x", "a"], loader) == {"a": "A", "b": "B", "x": None}
+    assert cache.get_many(["a", "x", "c"], loader) == {"a": "A", "x": None, "c": "C"}
+    assert pedidas == [["a", "b", "x"], ["c"]]
+
+
+def test_invalidate():
+    cache = TTLCache(ttl=60)
+    cache.get_or_load("a", lambda: 1)
+    cache.get_or_load("b", lambda: 2)
+
+    cache.invalidate("a")
+    assert cache.get_or_load("a", lambda: 10)[0] == 10
+    assert cache.get_or_load("b", lambda: 20)[0] == 2
+
+    cache.invalidate()
+    assert len(cache) == 0
+    assert cache.hit_rate == 1 / 4
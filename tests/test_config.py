@@ -0,0 +1,40 @@
+# tests/test_config.py
+"""
+Clientes Supabase por sesión (config.py): uno por sesión Flet, con su
+propio estado de auth y todos sobre el mismo pool HTTP.
+"""
+import config
+from auth import tokens
+
+
+class SesionFalsa(dict):
+    def set(self, clave, valor):
+        self[clave] = valor
+
+
+class PaginaFalsa:
+    def __init__(self):
+        self.session = SesionFalsa()
+
+
+def test_un_cliente_por_sesion():
+    a, b = PaginaFalsa(), PaginaFalsa()
+    assert config.get_client(a) is config.get_client(a)
+    assert config.get_client(a) is not config.get_client(b)
+
+
+def test_comparten_el_pool_http():
+    cliente = config.get_client(PaginaFalsa())
+    assert cliente.postgrest.session is config.http_pool
+    assert cliente.auth._http_client is config.http_pool
+
+
+def test_la_sesion_de_auth_no_se_comparte():
+    a, b = config.get_client(PaginaFalsa()), config.get_client(PaginaFalsa())
+    token = "e30." + "eyJzdWIiOiAidTEiLCAiZXhwIjogNDEwMjQ0NDgwMH0" + ".x"     # {"sub": "u1", "exp": 2100-01-01}
+    tokens.install_session(a, tokens._session_from_claims(token, "r", tokens.decode_claims(token)))
+    assert tokens.sesion_de(a).user.id == "u1"
+    assert tokens.sesion_de(b) is None
+    assert a.postgrest.headers["authorization"] == f"Bearer {token}"
+    assert b.postgrest.headers["authorization"] == f"Bearer {config.SUPABASE_ANON_KEY}"
+    assert "authorization" not in config.http_pool.headers            # el token va por cliente, no en el pool
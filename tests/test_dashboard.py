@@ -0,0 +1,56 @@
+# tests/test_dashboard.py
+"""
+Métricas del panel (services/dashboard.py): un RPC de agregados compartido
+por todas las sesiones mediante la caché TTL.
+"""
+import pytest
+
+from services import dashboard
+
+
+class ClienteFalso:
+    def __init__(self, **valores):
+        self.fila = {"ordenes_totales": 10, "tickets_pendientes": None, "instantanea": "7:9:8", **valores}
+        self.llamadas = 0
+
+    def rpc(self, nombre):
+        assert nombre == "dashboard_resumen"
+        self.llamadas += 1
+        return self
+
+    def execute(self):
+        self.data = [self.fila]
+        return self
+
+
+@pytest.fixture(autouse=True)
+def limpio():
+    dashboard.invalidate()
+    yield
+    dashboard.invalidate()
+
+
+def test_una_consulta_para_todas_las_sesiones():
+    client = ClienteFalso()
+    primera = dashboard.get_resumen(client)
+    segunda = dashboard.get_resumen(ClienteFalso(ordenes_totales=99))      # otra sesión, misma caché
+    assert client.llamadas == 1
+    assert primera["valores"] == segunda["valores"]
+    assert primera["valores"]["ordenes_totales"] == 10 and primera["valores"]["tickets_pendientes"] == 0
+    assert set(primera["valores"]) == {k for k, _ in dashboard.METRICAS}  # la instantánea no es una métrica
+    assert segunda["edad_s"] >= 0 and 0 < segunda["hit_rate"] <= 1
+
+
+def test_invalidar_fuerza_la_siguiente_consulta():
+    client = ClienteFalso()
+    dashboard.get_resumen(client)
+    dashboard.invalidate()
+    dashboard.get_resumen(client)
+    assert client.llamadas == 2
+
+
+def test_consultar_no_usa_la_cache():
+    client = ClienteFalso()
+    dashboard.get_resumen(client)
+    r = dashboard.consultar(client)
+    assert client.llamadas == 2 and r["instantanea"] == "7:9:8"
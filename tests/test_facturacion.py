@@ -0,0 +1,228 @@
+# tests/test_facturacion.py
+"""
+Facturación masiva (services/facturacion.py) contra una base falsa: una
+factura por orden (marketplace, vendedor, número), importes exactos y
+re-ejecución de un cierre, cancelación y fallas (ningún XML queda sin su
+registro). El render corre en hilos en lugar del pool de procesos, salvo
+en la prueba que verifica el pool real.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+
+from services import facturacion, referencias
+
+PRECIOS = {"A": "0.10", "B": "19999.99", "C": "0.50"}
+
+
+class BaseFalsa:
+    """``ordenes`` y ``facturas`` en memoria; ``facturas`` respeta el índice único por orden."""
+
+    def __init__(self, ordenes: list[dict]):
+        self.datos = {"ordenes": ordenes, "facturas": []}
+        self.inserts: list[list[dict]] = []
+        self.reservas: list[int] = []
+        self.consecutivo = 1
+        self.fallar_insert_en: int | None = None
+
+    def table(self, nombre):
+        return _Consulta(self, nombre)
+
+    def rpc(self, nombre, params):
+        assert nombre == "reservar_numeros_factura"
+        self.reservas.append(params["cantidad"])
+        primero, self.consecutivo = self.consecutivo, self.consecutivo + params["cantidad"]
+        return _Respuesta(primero)
+
+
+class _Respuesta:
+    def __init__(self, data):
+        self.data = data
+
+    def execute(self):
+        return self
+
+
+class _Consulta:
+    def __init__(self, base: BaseFalsa, nombre: str):
+        self.base, self.nombre = base, nombre
+        self.columnas: list[str] = []
+        self.filtro = None
+        self.filas: list[dict] | None = None
+
+    def select(self, columnas):
+        self.columnas = columnas.split(",")
+        return self
+
+    def in_(self, columna, valores):
+        self.filtro = (columna, set(valores))
+        return self
+
+    def insert(self, filas):
+        self.filas = filas
+        return self
+
+    def execute(self):
+        tabla = self.base.datos[self.nombre]
+        if self.filas is not None:
+            if self.base.fallar_insert_en == len(self.base.inserts):
+                raise RuntimeError("insert rechazado")
+            claves = {facturacion._clave(f) for f in tabla}
+            if any(facturacion._clave(f) in claves for f in self.filas):
+                raise RuntimeError("duplicate key value violates unique constraint \"facturas_orden_key\"")
+            self.base.inserts.append(self.filas)
+            tabla.extend(self.filas)
+            return _Respuesta(self.filas)
+        columna, valores = self.filtro
+        return _Respuesta([{c: f.get(c) for c in self.columnas} for f in tabla if f[columna] in valores])
+
+
+class PoolEnHilos(ThreadPoolExecutor):
+    def __init__(self, max_workers=None, mp_context=None):
+        super().__init__(max_workers=max_workers)
+
+
+def linea(numero, sku, cantidad=1, vendedor="V1", marketplace="ml") -> dict:
+    return {"numero_orden": numero, "sku": sku, "cantidad": cantidad, "codigo_vendedor": vendedor,
+            "marketplace": marketplace, "direccion": f"Calle {vendedor}"}
+
+
+@pytest.fixture(autouse=True)
+def precios(monkeypatch):
+    monkeypatch.setattr(
+        referencias, "get_many",
+        lambda client, tabla, skus: {s: {"sku": s, "descripcion": f"Producto {s}", "precio": PRECIOS[s]} for s in skus},
+    )
+
+
+@pytest.fixture
+def en_hilos(monkeypatch):
+    monkeypatch.setattr(facturacion, "ProcessPoolExecutor", PoolEnHilos)
+
+
+def test_una_factura_por_orden_de_cada_vendedor_y_canal():
+    base = BaseFalsa([
+        linea("100", "A", 2, vendedor="V1"), linea("100", "B", 1, vendedor="V1"),
+        linea("100", "A", 5, vendedor="V2"), linea("100", "C", 1, marketplace="fb"),
+    ])
+    facturas = facturacion.armar_facturas(facturacion.cargar_ordenes(base, ["100"]), range(7, 10), fecha="2025-03-31")
+
+    por_clave = {facturacion._clave(f): f for f in facturas}
+    assert set(por_clave) == {("ml", "V1", "100"), ("ml", "V2", "100"), ("fb", "V1", "100")}
+    assert [f["numero_factura"] for f in facturas] == ["FE00000007", "FE00000008", "FE00000009"]
+    v2 = por_clave[("ml", "V2", "100")]
+    assert [(l["sku"], l["cantidad"]) for l in v2["lineas"]] == [("A", 5)]
+    assert (v2["codigo_vendedor"], v2["direccion"]) == ("V2", "Calle V2")
+
+
+def test_importes_en_decimal_redondeados_al_centavo():
+    base = BaseFalsa([linea("1", "A", 3), linea("2", "C", 1), linea("3", "B", 3)])
+    facturas = {f["numero_orden"]: f for f in facturacion.armar_facturas(facturacion.cargar_ordenes(base, ["1", "2", "3"]), range(1, 4))}
+
+    assert facturas["1"]["subtotal"] == Decimal("0.30")            # con float: 0.30000000000000004
+    # 0.50 × 0.19 = 0.095 → 0.10 (mitad hacia arriba, no el 0.09 del float)
+    assert (facturas["2"]["iva"], facturas["2"]["total"]) == (Decimal("0.10"), Decimal("0.60"))
+    assert facturas["3"]["subtotal"] == Decimal("59999.97")
+    assert facturas["3"]["total"] == facturas["3"]["subtotal"] + facturas["3"]["iva"]
+
+
+def test_registros_con_clave_e_importes_como_texto(tmp_path):
+    base = BaseFalsa([linea("2", "C", 1, vendedor="V9", marketplace="fb")])
+    factura = facturacion.armar_facturas(facturacion.cargar_ordenes(base, ["2"]), [1])[0]
+    registro = facturacion.render_bloque([factura], str(tmp_path), pdf=False)[0]
+
+    assert {k: registro[k] for k in facturacion.CLAVE_ORDEN} == {"marketplace": "fb", "codigo_vendedor": "V9", "numero_orden": "2"}
+    assert (registro["subtotal"], registro["iva"], registro["total"]) == ("0.50", "0.10", "0.60")
+    xml = (tmp_path / registro["archivo_xml"]).read_text()
+    assert "<Canal>fb</Canal>" in xml and "<Total>0.60</Total>" in xml
+
+
+def test_reejecutar_el_cierre_omite_lo_ya_facturado(tmp_path, en_hilos):
+    base = BaseFalsa([linea("1", "A"), linea("2", "B"), linea("2", "B", vendedor="V2")])
+
+    primera = facturacion.facturar_ordenes(base, ["1", "2"], tmp_path / "a", workers=1, pdf=False)
+    assert (primera["success"], primera["done"], primera["omitidas"]) == (True, 3, 0)
+
+    base.datos["ordenes"].append(linea("3", "C"))
+    segunda = facturacion.facturar_ordenes(base, ["1", "2", "3"], tmp_path / "b", workers=1, pdf=False)
+    assert (segunda["success"], segunda["done"], segunda["omitidas"]) == (True, 1, 3)
+    assert base.reservas == [3, 1]                                  # no se reservan números para lo omitido
+    assert len(base.datos["facturas"]) == 4
+
+    tercera = facturacion.facturar_ordenes(base, ["1", "2", "3"], tmp_path / "c", workers=1, pdf=False)
+    assert (tercera["success"], tercera["done"], tercera["omitidas"]) == (False, 0, 4)
+    assert tercera["error"] == "Todas las órdenes ya tienen factura" and base.reservas == [3, 1]
+
+
+def test_numeros_por_tramos(monkeypatch):
+    monkeypatch.setattr(facturacion, "RESERVA_MAX", 4)
+    base = BaseFalsa([])
+    base.consecutivo = 50
+    assert facturacion.reservar_numeros(base, 10) == list(range(50, 60))
+    assert base.reservas == [4, 4, 2]
+
+
+def test_orden_inexistente(tmp_path):
+    r = facturacion.facturar_ordenes(BaseFalsa([]), ["404"], tmp_path)
+    assert (r["success"], r["error"], r["omitidas"]) == (False, "Ninguna de las órdenes existe", 0)
+
+
+def test_pool_de_procesos_real(tmp_path):
+    base = BaseFalsa([linea(str(i), "B", 2) for i in range(5)])
+    r = facturacion.facturar_ordenes(base, [str(i) for i in range(5)], tmp_path, workers=2, chunk_size=2, pdf=False)
+    assert (r["success"], r["done"]) == (True, 5)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"FE{i:08d}.xml" for i in range(1, 6)]
+    assert {f["total"] for f in base.datos["facturas"]} == {"47599.98"}
+
+
+# ── Cancelación y fallas: cada documento en disco tiene su registro ---------
+def documentos(directorio) -> set[str]:
+    return {p.stem for p in directorio.iterdir()}
+
+
+def registradas(base: BaseFalsa) -> set[str]:
+    return {f["numero_factura"] for f in base.datos["facturas"]}
+
+
+def test_cancelar_registra_lo_ya_renderizado(tmp_path, en_hilos):
+    base = BaseFalsa([linea(str(i), "A") for i in range(8)])
+    cancelar = threading.Event()
+    r = facturacion.facturar_ordenes(
+        base, [str(i) for i in range(8)], tmp_path, workers=1, chunk_size=1, batch_size=1, pdf=False,
+        cancel_event=cancelar, on_progress=lambda stats: cancelar.set(),
+    )
+    assert (r["success"], r["error"]) == (False, "Cancelada por el usuario")
+    assert 1 <= r["done"] < 8 and r["done"] == len(base.datos["facturas"])
+    assert documentos(tmp_path) == registradas(base)
+
+
+def test_falla_del_insert_borra_lo_no_registrado(tmp_path, en_hilos):
+    base = BaseFalsa([linea(str(i), "A") for i in range(6)])
+    base.fallar_insert_en = 1
+    r = facturacion.facturar_ordenes(base, [str(i) for i in range(6)], tmp_path, workers=1, batch_size=2, pdf=False)
+    assert (r["success"], r["error"], r["done"]) == (False, "insert rechazado", 2)
+    assert documentos(tmp_path) == registradas(base) and len(registradas(base)) == 2
+
+
+def test_falla_del_render_y_reintento(tmp_path, en_hilos, monkeypatch):
+    base = BaseFalsa([linea(str(i), "A") for i in range(6)])
+    render = facturacion.render_bloque
+
+    def render_que_falla(bloque, out_dir, pdf):
+        if any(f["numero_orden"] == "4" for f in bloque):
+            raise OSError("disco lleno")
+        return render(bloque, out_dir, pdf)
+
+    monkeypatch.setattr(facturacion, "render_bloque", render_que_falla)
+    r = facturacion.facturar_ordenes(base, [str(i) for i in range(6)], tmp_path / "a", workers=1, chunk_size=2, pdf=False)
+    assert (r["success"], r["error"]) == (False, "disco lleno")
+    assert documentos(tmp_path / "a") == registradas(base)
+
+    # al re-ejecutar sólo se emite lo que quedó sin factura
+    monkeypatch.setattr(facturacion, "render_bloque", render)
+    hechas = len(base.datos["facturas"])
+    r = facturacion.facturar_ordenes(base, [str(i) for i in range(6)], tmp_path / "b", workers=1, pdf=False)
+    assert (r["success"], r["done"], r["omitidas"]) == (True, 6 - hechas, hechas)
+    assert {f["numero_orden"] for f in base.datos["facturas"]} == {str(i) for i in range(6)}
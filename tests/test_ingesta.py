@@ -0,0 +1,159 @@
+# tests/test_ingesta.py
+"""
+Ingesta de órdenes contra una tabla falsa: el total estimado para el
+progreso y el exacto al terminar (services/ingesta.py), y la carga de
+varios archivos (services/ingesta_multiple.py): un archivo que falla no
+detiene al resto, la cancelación y un pool de procesos roto.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from services import ingesta_multiple
+from services.ingesta import contar_filas, ingest_file
+from services.ingesta_multiple import CANCELADO, ERROR, LISTO, ingest_files
+from services.staging import HashIndex
+
+
+class OrdenesFalsas:
+    """``client.table("ordenes").upsert(...).execute()`` en memoria."""
+
+    def __init__(self):
+        self.filas: list[dict] = []
+
+    def table(self, nombre):
+        assert nombre == "ordenes"
+        return self
+
+    def upsert(self, registros, on_conflict):
+        self._lote = registros
+        return self
+
+    def execute(self):
+        self.filas.extend(self._lote)
+        return self
+
+
+def csv(tmp_path, nombre: str, texto: str):
+    path = tmp_path / nombre
+    path.write_text(texto, encoding="utf-8")
+    return path
+
+
+def cargar(tmp_path, path, **kw) -> tuple[dict, list[dict]]:
+    progreso: list[dict] = []
+    r = ingest_file(
+        path, OrdenesFalsas(), on_progress=progreso.append, index=HashIndex(tmp_path / "hashes.db"),
+        staging_dir=tmp_path / "staging", contexto={}, **kw,
+    )
+    return r, progreso
+
+
+MULTILINEA = (
+    'numero_orden,sku,cantidad,direccion\n'
+    '1,A1,1,"Calle 1\nApto 2\nTorre 3"\n'
+    '2,B2,2,"Carrera 4\nCasa"\n'
+)
+
+
+def test_estimacion_con_campos_multilinea(tmp_path):
+    assert contar_filas(csv(tmp_path, "o.csv", MULTILINEA)) == 5       # saltos de línea, no filas
+
+
+def test_total_exacto_al_terminar(tmp_path):
+    r, progreso = cargar(tmp_path, csv(tmp_path, "o.csv", MULTILINEA))
+    assert r["success"] and (r["done"], r["total"]) == (2, 2)
+    assert all(p["done"] + p["rejected"] <= p["total"] for p in progreso)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 10])
+def test_progreso_no_pasa_del_total(tmp_path, chunk_size):
+    # sin salto final la estimación queda corta en una fila
+    path = csv(tmp_path, "o.csv", "numero_orden,sku,cantidad\n1,A1,1\n2,B2,1\n3,C3,1")
+    assert contar_filas(path) == 2
+    r, progreso = cargar(tmp_path, path, chunk_size=chunk_size)
+    assert r["success"] and r["total"] == 3
+    assert all(p["done"] + p["rejected"] <= p["total"] for p in progreso)
+
+
+# ── Varios archivos --------------------------------------------------------
+def exportes(tmp_path, n: int, filas: int = 3) -> list:
+    return [
+        csv(tmp_path, f"v{i}.csv", "numero_orden,sku,cantidad\n" + "".join(f"{i}-{j},A{j},1\n" for j in range(filas)))
+        for i in range(n)
+    ]
+
+
+def cargar_varios(tmp_path, paths, client=None, **kw) -> dict:
+    return ingest_files(
+        paths, client or OrdenesFalsas(), index=HashIndex(tmp_path / "hashes.db"),
+        staging_dir=tmp_path / "staging", **kw,
+    )
+
+
+class PoolEnHilos(ThreadPoolExecutor):
+    """Pool de preparación en hilos; ``romper_en`` simula un hijo muerto desde ese envío."""
+
+    romper_en: int | None = None
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None, initargs=()):
+        super().__init__(max_workers=max_workers, initializer=initializer, initargs=initargs)
+        self.envios = 0
+
+    def submit(self, fn, *args, **kwargs):
+        self.envios += 1
+        if self.romper_en is not None and self.envios > self.romper_en:
+            if self.envios > self.romper_en + 1:
+                raise BrokenProcessPool("pool roto")
+            roto = Future()
+            roto.set_exception(BrokenProcessPool("un proceso hijo terminó abruptamente"))
+            return roto
+        return super().submit(fn, *args, **kwargs)
+
+
+@pytest.fixture
+def en_hilos(monkeypatch):
+    monkeypatch.setattr(ingesta_multiple, "contexto_reglas", lambda client: {})
+    monkeypatch.setattr(ingesta_multiple, "_progreso", None)
+    monkeypatch.setattr(ingesta_multiple, "ProcessPoolExecutor", PoolEnHilos)
+    monkeypatch.setattr(PoolEnHilos, "romper_en", None)
+
+
+def test_un_archivo_fallido_no_detiene_al_resto(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingesta_multiple, "contexto_reglas", lambda client: {})
+    paths = exportes(tmp_path, 3)
+    paths.insert(1, csv(tmp_path, "roto.csv", "pedido,articulo\n1,A\n"))       # sin columnas requeridas
+    client = OrdenesFalsas()
+
+    r = cargar_varios(tmp_path, paths, client, workers=2)     # pool de procesos real
+    assert not r["success"]
+    assert [a["estado"] for a in r["archivos"]] == [LISTO, ERROR, LISTO, LISTO]
+    assert "numero_orden" in r["archivos"][1]["error"]
+    assert len(client.filas) == 9 and r["done"] == 9
+
+
+def test_cancelar_deja_el_resto_cancelado(tmp_path, en_hilos):
+    cancelar = threading.Event()
+
+    def progreso(resumen):
+        if any(a["estado"] == LISTO for a in resumen["archivos"]):
+            cancelar.set()
+
+    r = cargar_varios(tmp_path, exportes(tmp_path, 6), workers=1, escritores=1, en_espera=1,
+                      on_progress=progreso, cancel_event=cancelar)
+    estados = [a["estado"] for a in r["archivos"]]
+    assert not r["success"] and set(estados) <= {LISTO, CANCELADO}
+    assert estados[0] == LISTO and estados[-1] == CANCELADO
+
+
+def test_pool_roto_falla_solo_lo_que_faltaba(tmp_path, en_hilos, monkeypatch):
+    monkeypatch.setattr(PoolEnHilos, "romper_en", 1)
+    client = OrdenesFalsas()
+    r = cargar_varios(tmp_path, exportes(tmp_path, 4), client, workers=1, escritores=1, en_espera=0)
+
+    estados = [a["estado"] for a in r["archivos"]]
+    assert estados == [LISTO, ERROR, ERROR, ERROR]
+    assert all("pool" in a["error"] or "abruptamente" in a["error"] for a in r["archivos"][1:])
+    assert len(client.filas) == 3 and not r["success"]
@@ -0,0 +1,52 @@
+# tests/test_instrumentation.py
+"""
+Hook httpx de utils/instrumentation.py: la medición de Supabase se registra
+al cerrarse el cuerpo, sin que el hook lo lea (ni en respuestas en stream).
+"""
+import httpx
+import pytest
+
+from utils import instrumentation
+
+
+@pytest.fixture
+def medido(monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", True)
+    instrumentation.reset()
+
+    def responder(request):
+        cuerpo = b"[" + b",".join(b'{"id": %d}' % i for i in range(3)) + b"]"
+        return httpx.Response(200, headers={"content-range": "0-2/*"}, stream=httpx.ByteStream(cuerpo))
+
+    client = httpx.Client(transport=httpx.MockTransport(responder), base_url="http://supabase")
+    assert instrumentation.instrument_http(client)
+    yield client
+    client.close()
+    instrumentation.reset()
+
+
+def serie() -> list[dict]:
+    return [r for r in instrumentation.snapshot() if r["operacion"] == "supabase"]
+
+
+def test_mide_bytes_y_filas_del_cuerpo_leido(medido):
+    r = medido.get("/rest/v1/tickets", params={"select": "id"})
+    assert len(r.json()) == 3
+    (fila,) = serie()
+    assert fila["etiquetas"] == "operacion=select tabla=tickets"
+    assert (fila["llamadas"], fila["filas"], fila["bytes"]) == (1, 3, len(r.content))
+
+
+def test_stream_sin_leer_no_se_descarga_en_el_hook(medido):
+    with medido.stream("GET", "/rest/v1/ordenes") as r:
+        assert not r.is_stream_consumed and r.num_bytes_downloaded == 0
+        assert serie() == []                            # aún no terminó
+    (fila,) = serie()
+    assert (fila["llamadas"], fila["bytes"]) == (1, 0)
+
+
+def test_apagada_no_instala_hooks(monkeypatch):
+    monkeypatch.setattr(instrumentation, "ENABLED", False)
+    client = httpx.Client()
+    assert not instrumentation.instrument_http(client)
+    assert client.event_hooks == {"request": [], "response": []}
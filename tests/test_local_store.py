@@ -0,0 +1,272 @@
+# tests/test_local_store.py
+"""
+Almacén local de la estación (services/local_store.py) con clientes falsos:
+efecto optimista, envío por propietario, conflictos de las mutaciones
+versionadas, liberación de lo no confirmado y purga de la copia local.
+El hilo de sincronización no se arranca: cada prueba llama a ``flush``.
+"""
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from services import local_store
+from services.local_store import LocalStore
+
+
+class Respuesta:
+    def __init__(self, data):
+        self.data = data
+
+    def execute(self):
+        return self
+
+
+class ClienteFalso:
+    """Registra upserts y llamadas RPC; ``rpc_fn(nombre, filas)`` decide la respuesta."""
+
+    def __init__(self, rpc_fn=None, error: Exception | None = None):
+        self.upserts: list[tuple[str, list, str]] = []
+        self.rpcs: list[tuple[str, list]] = []
+        self.rpc_fn = rpc_fn or (lambda _n, filas: [
+            {"mutacion_id": f["mutacion_id"], "estado": "aplicada",
+             "fila": {**f, "version": (f["version_base"] or 0) + 1}} for f in filas
+        ])
+        self.error = error
+
+    def table(self, tabla):
+        cliente = self
+
+        class Tabla:
+            def upsert(self, filas, on_conflict=None, ignore_duplicates=False):
+                if cliente.error:
+                    raise cliente.error
+                cliente.upserts.append((tabla, filas, on_conflict))
+                return Respuesta(filas)
+        return Tabla()
+
+    def rpc(self, nombre, params):
+        if self.error:
+            raise self.error
+        self.rpcs.append((nombre, params["p_filas"]))
+        return Respuesta(self.rpc_fn(nombre, params["p_filas"]))
+
+
+@pytest.fixture
+def nuevo_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(LocalStore, "_ensure_thread", lambda self: None)
+
+    def crear(nombre="estacion.db", **kw) -> LocalStore:
+        return LocalStore(tmp_path / nombre, flush_interval=3600, **kw)
+    return crear
+
+
+@pytest.fixture
+def store(nuevo_store):
+    return nuevo_store()
+
+
+def escaneo(serial: str, orden: str = "ORD-1") -> dict:
+    return {"numero_orden": orden, "serial": serial}
+
+
+def encolar_escaneos(store, client, propietario, *seriales):
+    return store.encolar(
+        client, "serializacion", [escaneo(s) for s in seriales],
+        clave="numero_orden,serial", grupo="numero_orden", on_conflict="numero_orden,serial",
+        propietario=propietario,
+    )
+
+
+def intentos(store) -> list[tuple]:
+    return store._db.execute("select clave, intentos, reclamado_at from cola order by id").fetchall()
+
+
+# ── Ruta crítica: sólo SQLite -------------------------------------------------
+def test_encolar_exige_propietario(store):
+    with pytest.raises(ValueError):
+        encolar_escaneos(store, ClienteFalso(), "", "S1")
+    assert store.pendientes() == 0
+
+
+def test_efecto_optimista_antes_de_enviar(store):
+    assert encolar_escaneos(store, ClienteFalso(), "ana", "S1", "S2") == 2
+    assert store.pendientes("serializacion") == 2
+    assert sorted(f["serial"] for f in store.leer("serializacion", "ORD-1")) == ["S1", "S2"]
+    assert store.tiene("serializacion", "ORD-1") and not store.tiene("serializacion", "ORD-2")
+
+
+# ── Envío por propietario ----------------------------------------------------
+def test_cada_propietario_envia_con_su_cliente(store):
+    ana, beto = ClienteFalso(), ClienteFalso()
+    encolar_escaneos(store, ana, "ana", "S1", "S2")
+    encolar_escaneos(store, beto, "beto", "S3")
+
+    assert store.flush("ana") == 2
+    assert [f["serial"] for _, filas, _ in ana.upserts for f in filas] == ["S1", "S2"]
+    assert beto.upserts == [] and store.pendientes() == 1
+
+    assert store.flush() == 1
+    assert [f["serial"] for _, filas, _ in beto.upserts for f in filas] == ["S3"]
+    assert store.pendientes() == 0
+    assert all(f.get("serial") for f in store.leer("serializacion"))
+
+
+def test_propietario_sin_sesion_espera_sin_frenar_a_otros(store):
+    ana, beto = ClienteFalso(), ClienteFalso()
+    encolar_escaneos(store, ana, "ana", "S1")
+    store.soltar("ana", enviar=False)
+    encolar_escaneos(store, beto, "beto", "S2")
+
+    assert store.flush() == 1
+    assert ana.upserts == [] and store.pendientes_de("serializacion") == [escaneo("S1")]
+
+    otra_sesion = ClienteFalso()
+    store.registrar("ana", otra_sesion)
+    assert store.flush() == 1
+    assert len(otra_sesion.upserts) == 1 and store.pendientes() == 0
+
+
+def test_soltar_envia_lo_pendiente(store):
+    ana = ClienteFalso()
+    encolar_escaneos(store, ana, "ana", *(f"S{i}" for i in range(5)))
+    store.batch_size = 2
+    store.soltar("ana")
+    assert store.pendientes() == 0 and len(ana.upserts) == 3
+    assert "ana" not in store._clientes
+
+
+def test_soltar_sesion_no_crea_el_almacen(monkeypatch):
+    monkeypatch.setattr(local_store, "_store", None)
+    local_store.soltar_sesion("ana")
+    assert local_store._store is None
+
+
+# ── Errores: lo no confirmado se libera una vez ---------------------------------
+def test_error_de_red_libera_el_lote(store):
+    caido = ClienteFalso(error=httpx.ConnectError("sin red"))
+    encolar_escaneos(store, caido, "ana", "S1", "S2")
+
+    with pytest.raises(httpx.ConnectError) as exc:
+        store.flush()
+    assert local_store.es_error_de_red(exc.value)
+    assert intentos(store) == [("ORD-1|S1", 1, None), ("ORD-1|S2", 1, None)]
+
+    store.registrar("ana", ClienteFalso())
+    assert store.flush() == 2
+
+
+def test_mutacion_sin_respuesta_se_libera_una_sola_vez(store):
+    def responde_la_primera(_n, filas):
+        f = filas[0]
+        return [{"mutacion_id": f["mutacion_id"], "estado": "aplicada", "fila": {**f, "version": 1}}]
+
+    client = ClienteFalso(responde_la_primera)
+    store.encolar(client, "alistamiento", [{"id": 1, "estado": "a"}, {"id": 2, "estado": "b"}],
+                  clave="id", rpc="aplicar_alistamiento", propietario="ana")
+
+    with pytest.raises(RuntimeError, match="sin respuesta"):
+        store.flush()
+    assert intentos(store) == [("2", 1, None)]
+    assert store.enviados == 1
+
+    # el reintento lleva el mismo mutacion_id: la RPC lo reconoce si ya lo aplicó
+    pendiente = client.rpcs[0][1][1]["mutacion_id"]
+    client.rpc_fn = ClienteFalso().rpc_fn
+    assert store.flush() == 1
+    assert client.rpcs[1][1][0]["mutacion_id"] == pendiente
+
+
+# ── Mutaciones versionadas ---------------------------------------------------
+def test_aplicada_actualiza_la_version_local(store):
+    store.guardar("alistamiento", [{"id": 1, "estado": "pendiente", "version": 4}], clave="id")
+    client = ClienteFalso()
+    store.encolar(client, "alistamiento", [{"id": 1, "estado": "alistado"}],
+                  clave="id", rpc="aplicar_alistamiento", propietario="ana")
+    assert store.leer("alistamiento") == [{"id": 1, "estado": "alistado", "version": 4}]
+
+    assert store.flush() == 1
+    (_, enviadas), = client.rpcs
+    assert enviadas[0]["version_base"] == 4
+    fila, = store.leer("alistamiento")
+    assert fila["estado"] == "alistado" and fila["version"] == 5
+
+
+def test_conflicto_gana_el_servidor(store):
+    store.guardar("alistamiento", [{"id": 1, "estado": "pendiente", "version": 4}], clave="id")
+    servidor = {"id": 1, "estado": "anulado", "version": 9}
+    client = ClienteFalso(lambda _n, filas: [
+        {"mutacion_id": f["mutacion_id"], "estado": "conflicto", "fila": servidor} for f in filas
+    ])
+    for estado in ("alistado", "empacado"):
+        store.encolar(client, "alistamiento", [{"id": 1, "estado": estado}],
+                      clave="id", rpc="aplicar_alistamiento", propietario="ana")
+
+    # la segunda mutación (en el lote siguiente) partía de la versión perdida:
+    # se descarta con la primera sin enviarse
+    store.batch_size = 1
+    store.flush()
+    assert store.pendientes() == 0 and len(client.rpcs) == 1
+    assert store.leer("alistamiento") == [servidor]
+    conflicto, = store.conflictos()
+    assert conflicto["local"] == {"id": 1, "estado": "alistado"} and conflicto["servidor"] == servidor
+
+
+def test_conflicto_sin_fila_borra_la_copia(store):
+    client = ClienteFalso(lambda _n, filas: [
+        {"mutacion_id": f["mutacion_id"], "estado": "conflicto", "fila": None} for f in filas
+    ])
+    store.encolar(client, "alistamiento", [{"id": 7, "estado": "alistado"}],
+                  clave="id", rpc="aplicar_alistamiento", propietario="ana")
+    store.flush()
+    assert store.leer("alistamiento") == []
+    assert store.conflictos()[0]["servidor"] is None
+
+
+# ── Copia local -----------------------------------------------------------------
+def test_guardar_no_pisa_filas_con_mutaciones_pendientes(store):
+    encolar_escaneos(store, ClienteFalso(), "ana", "S1")
+    store.guardar(
+        "serializacion",
+        [{**escaneo("S1"), "estado": "servidor"}, {**escaneo("S9"), "estado": "servidor"}],
+        clave="numero_orden,serial", grupo="numero_orden",
+    )
+    filas = {f["serial"]: f for f in store.leer("serializacion", "ORD-1")}
+    assert filas["S1"] == escaneo("S1")
+    assert filas["S9"]["estado"] == "servidor"
+
+
+def test_purgar_conserva_lo_pendiente(store):
+    store.guardar("tickets", [{"id": 1}, {"id": 2}], clave="id")
+    encolar_escaneos(store, ClienteFalso(), "ana", "S1")
+    viejo = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+    store._db.execute("update filas set sync_at = ? where tabla = 'tickets' and clave = '1'", (viejo,))
+
+    store.purgar()
+    assert [f["id"] for f in store.leer("tickets")] == [2]
+    assert store.leer("serializacion") == [escaneo("S1")]
+
+
+# ── Archivo compartido entre procesos ----------------------------------------
+def test_lote_reclamado_no_lo_toma_otro_proceso(nuevo_store):
+    a, b = nuevo_store(), nuevo_store()
+    encolar_escaneos(a, ClienteFalso(), "ana", "S1", "S2")
+
+    assert len(a._reclamar("ana")) == 2
+    assert b._reclamar("ana") == []
+
+
+def test_archivo_anterior_sin_propietario(tmp_path, nuevo_store, caplog):
+    viejo = nuevo_store("viejo.db")
+    viejo._db.execute(
+        "insert into cola (mutacion_id, tabla, modo, destino, clave, datos, creado_at)"
+        " values ('m', 'serializacion', 'upsert', 'serial', 'S0', ?, 'x')",
+        (json.dumps(escaneo("S0")),),
+    )
+    viejo._db.close()
+
+    reabierto = nuevo_store("viejo.db")
+    assert "sin propietario" in caplog.text
+    reabierto.registrar("ana", ClienteFalso())
+    assert reabierto.flush() == 0 and reabierto.pendientes() == 1
@@ -0,0 +1,81 @@
+# tests/test_page_cache.py
+"""
+Caché de contenidos por sesión (components/page_cache.py): un contenido por
+ruta que se alterna con ``visible``, invalidación por tablas de
+``Ruta.datos`` (services/cambios.py) y expulsión por tope de controles.
+Sin página montada: las invalidaciones corren en el hilo que avisa.
+"""
+import flet as ft
+
+from components.page_cache import PageCache
+from services import cambios
+
+
+class Fabricas:
+    """Una fábrica por ruta que cuenta cuántas veces se construyó."""
+
+    def __init__(self, controles: int = 1):
+        self.construidas: list[str] = []
+        self.controles = controles
+
+    def __call__(self, ruta: str):
+        def construir():
+            self.construidas.append(ruta)
+            return ft.Column([ft.Text(ruta) for _ in range(self.controles)])
+        return construir
+
+
+def visibles(cache: PageCache) -> list[str]:
+    return [r for r, e in cache._entries.items() if e.wrapper.visible]
+
+
+def test_cada_ruta_se_construye_una_vez():
+    cache, fabrica = PageCache(ft.Column()), Fabricas()
+    primero = cache.show("/home", fabrica("/home"))
+    cache.show("/tickets", fabrica("/tickets"))
+    assert cache.show("/home", fabrica("/home")) is primero
+
+    assert fabrica.construidas == ["/home", "/tickets"]
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert visibles(cache) == ["/home"] and len(cache.host.controls) == 2
+
+
+def test_cambio_de_datos_reconstruye_la_ruta_en_pantalla():
+    cache, fabrica = PageCache(ft.Column()), Fabricas()
+    cache.show("/alistamiento", fabrica("/alistamiento"))
+    cache.show("/tickets", fabrica("/tickets"))
+
+    cambios.notificar("tickets")                          # /tickets muestra "tickets" y está en pantalla
+    assert fabrica.construidas == ["/alistamiento", "/tickets", "/tickets"]
+    assert visibles(cache) == ["/tickets"]
+
+    cambios.notificar("ordenes")                          # /alistamiento no está en pantalla: sólo se descarta
+    assert "/alistamiento" not in cache._entries
+    assert len(fabrica.construidas) == 3
+    cache.show("/alistamiento", fabrica("/alistamiento"))
+    assert fabrica.construidas[-1] == "/alistamiento"
+
+
+def test_tablas_ajenas_no_invalidan():
+    cache, fabrica = PageCache(ft.Column()), Fabricas()
+    cache.show("/home", fabrica("/home"))
+    cache.show("/tickets", fabrica("/tickets"))
+    cambios.notificar("facturas")
+    assert set(cache._entries) == {"/home", "/tickets"} and len(fabrica.construidas) == 2
+
+
+def test_invalidar_todo_no_reconstruye():
+    cache, fabrica = PageCache(ft.Column()), Fabricas()
+    cache.show("/home", fabrica("/home"))
+    cache.invalidate()
+    assert cache._entries == {} and cache.host.controls == [] and fabrica.construidas == ["/home"]
+
+
+def test_expulsa_la_menos_usada_por_tope_de_controles():
+    fabrica = Fabricas(controles=10)
+    cache = PageCache(ft.Column(), max_controls=25)
+    cache.show("/home", fabrica("/home"))
+    cache.show("/tickets", fabrica("/tickets"))
+    cache.show("/home", fabrica("/home"))
+    cache.show("/upload", fabrica("/upload"))             # 3 × 11 controles > 25: sale /tickets
+    assert list(cache._entries) == ["/home", "/upload"]
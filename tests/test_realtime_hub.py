@@ -0,0 +1,88 @@
+# tests/test_realtime_hub.py
+"""
+Contadores del panel (services/realtime_hub.py): deltas agregados por
+sentencia y siembra sin perder ni contar dos veces los eventos que llegan
+mientras se lee ``dashboard_resumen``.
+"""
+from services import realtime_hub
+from services.realtime_hub import CounterHub, deltas, visible
+
+CEROS = {m: 0 for m in realtime_hub.REGLAS}
+
+
+class ClienteFalso:
+    """``dashboard_resumen`` con la instantánea dada; ``durante`` simula eventos que llegan en la lectura."""
+
+    def __init__(self, valores: dict, instantanea: str, durante=lambda: None):
+        self.fila = {**CEROS, **valores, "instantanea": instantanea}
+        self.durante = durante
+
+    def rpc(self, nombre):
+        assert nombre == "dashboard_resumen"
+        self.durante()
+        return self
+
+    def execute(self):
+        self.data = [self.fila]
+        return self
+
+
+def hub_en_vivo() -> CounterHub:
+    hub = CounterHub()
+    hub.live = True
+    hub._reset()
+    return hub
+
+
+def test_deltas_por_estado():
+    assert deltas("ordenes", {"nueva": 5000, "": 2}) == {"ordenes_totales": 5002}
+    assert deltas("tickets", {"pendiente": -3, "cerrado": 3}) == {"tickets_pendientes": -3}
+    assert deltas("tickets", {"cerrado": 1}) == {}
+    assert deltas("ordenes", {"lista": 10, "nueva": -10}) == {}
+
+
+def test_visible_segun_instantanea():
+    assert visible(99, "100:105:101,103")             # antes de xmin
+    assert visible(102, "100:105:101,103")            # ya confirmada
+    assert not visible(101, "100:105:101,103")        # en curso al leer
+    assert not visible(105, "100:105:")               # posterior
+
+
+def test_siembra_suma_solo_lo_que_la_instantanea_no_vio():
+    hub = hub_en_vivo()
+
+    def durante():
+        hub.apply_change("tickets", {"pendiente": 1}, 90)     # ya contado
+        hub.apply_change("tickets", {"pendiente": 2}, 101)    # en curso al leer
+        hub.apply_change("ordenes", {"nueva": 7}, 120)        # posterior
+
+    assert hub.sembrar(ClienteFalso({"tickets_pendientes": 4, "ordenes_totales": 50}, "100:110:101", durante))
+    assert hub.snapshot()["tickets_pendientes"] == 6
+    assert hub.snapshot()["ordenes_totales"] == 57
+
+
+def test_eventos_sin_siembra_se_descartan():
+    hub = hub_en_vivo()
+    hub.apply_change("ordenes", {"nueva": 3}, 1)              # nadie sembrando: la lectura ya lo incluirá
+    hub.sembrar(ClienteFalso({"ordenes_totales": 10}, "5:5:"))
+    assert hub.snapshot()["ordenes_totales"] == 10
+
+
+def test_reconexion_durante_la_siembra_la_invalida():
+    hub = hub_en_vivo()
+    assert not hub.sembrar(ClienteFalso({"ordenes_totales": 10}, "5:5:", hub._reset))
+    assert not hub.seeded
+    assert hub.sembrar(ClienteFalso({"ordenes_totales": 11}, "6:6:"))
+
+
+def test_fan_out_solo_a_las_metricas_suscritas():
+    hub = hub_en_vivo()
+    hub.sembrar(ClienteFalso({"tickets_pendientes": 1}, "5:5:"))
+    recibidos = []
+    hub.subscribe("s1", ["tickets_pendientes"], lambda m, v: recibidos.append((m, v)))
+    hub.subscribe("s2", ["ordenes_totales"], lambda m, v: False)
+
+    hub.apply_change("tickets", {"pendiente": 2}, 9)
+    hub.apply_change("ordenes", {"nueva": 1}, 10)
+    assert recibidos == [("tickets_pendientes", 3)]
+    assert set(hub._listeners) == {"s1"}                      # s2 ya no muestra el panel
@@ -0,0 +1,165 @@
+# tests/test_reglas.py
+"""
+Motor de reglas (services/reglas.py) y su declaración para órdenes
+(``ingesta.MOTOR_ORDENES``): pasos de normalización, bits de error por fila,
+reglas con contexto y el reporte por regla.
+"""
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from services import ingesta, reglas
+
+
+def texto(*valores) -> pa.Array:
+    return pa.array(valores, pa.string())
+
+
+# ── Pasos de normalización -----------------------------------------------------
+def test_recortar_mayusculas_y_espacios():
+    col = texto("  ab c ", "x   y\tz", "")
+    assert reglas.mayusculas(reglas.recortar(col)).to_pylist() == ["AB C", "X   Y\tZ", ""]
+    assert reglas.colapsar_espacios(reglas.recortar(col)).to_pylist() == ["ab c", "x y z", ""]
+
+
+def test_reemplazos_solo_filas_que_coinciden():
+    paso = reglas.reemplazos({r"(?i)\bcalle\b": "Cl", r"(?i)\bn[o°º]\.?\s*(\d)": r"# \1"})
+    col = texto("Calle 10 No. 5-20", "Cra 7", None)
+    assert paso(col).to_pylist() == ["Cl 10 # 5-20", "Cra 7", None]
+
+
+def test_entero_y_vacio_a_nulo():
+    assert reglas.entero(texto("12", "1.5", "-3", "")).to_pylist() == [12, None, None, None]
+    assert reglas.vacio_a_nulo(texto("a", "")).to_pylist() == ["a", None]
+
+
+def test_fecha_prueba_formatos_en_orden_y_rechaza_imposibles():
+    paso = reglas.fecha("%d/%m/%Y", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S")
+    col = texto("3/2/2025", "2025-02-28", "2025-02-03T10:20:30", "31/02/2025", "mañana", "")
+    assert paso(col).to_pylist() == ["2025-02-03", "2025-02-28", "2025-02-03", None, None, None]
+
+
+# ── Motor ----------------------------------------------------------------------
+ESQUEMA = pa.schema([("codigo", pa.string()), ("cantidad", pa.int64()), ("vendedor", pa.string())])
+
+MOTOR = reglas.Motor(
+    ESQUEMA,
+    normalizaciones=(
+        reglas.Normalizacion("codigo", (reglas.recortar, reglas.mayusculas)),
+        reglas.Normalizacion("cantidad", (reglas.recortar, reglas.entero)),
+        reglas.Normalizacion("vendedor", (reglas.recortar,)),
+    ),
+    reglas=(
+        reglas.requerido("codigo", "Falta código"),                              # bit 0
+        reglas.patron("codigo", r"^[A-Z]{2}\d+$", "Código inválido"),            # bit 1
+        reglas.mayor_que("cantidad", 0, "Cantidad inválida"),                    # bit 2
+        reglas.en_catalogo("vendedor", "vendedores", "Vendedor desconocido"),    # bit 3
+        reglas.interpretable("cantidad", "Cantidad ilegible"),                   # bit 4 (advertencia)
+    ),
+)
+
+
+def crudo(filas: list[tuple]) -> pa.Table:
+    return pa.table({c: texto(*v) for c, v in zip(ESQUEMA.names, zip(*filas))})
+
+
+def test_bits_por_fila_y_mascara_de_bloqueo():
+    compilado = MOTOR.compilar({"vendedores": ["V001"]})
+    tabla, errores = compilado.aplicar(crudo([
+        (" ab12 ", "3", "V001"),        # válida
+        ("", "3", "V001"),              # falta código
+        ("A-1", "0", "V001"),           # formato + cantidad
+        ("AB1", "x", "V999"),           # cantidad ilegible + vendedor desconocido
+        ("AB1", "2", ""),               # vendedor vacío: no se valida contra el catálogo
+    ]))
+
+    assert tabla.schema == ESQUEMA
+    assert tabla.column("codigo").to_pylist()[0] == "AB12"
+    assert errores.dtype == np.uint32
+    assert errores.tolist() == [0, 0b1, 0b110, 0b11100, 0]
+    assert MOTOR.mascara_bloqueo == 0b1111
+    assert MOTOR.describir(0b110) == ["codigo_formato", "cantidad_rango"]
+
+
+def test_regla_con_contexto_se_omite_si_falta():
+    compilado = MOTOR.compilar()
+    assert compilado.n_reglas == len(MOTOR.reglas) - 1
+    _, errores = compilado.aplicar(crudo([("AB1", "1", "V999")]))
+    assert errores.tolist() == [0]
+
+
+def test_firma_depende_de_reglas_activas_y_contexto():
+    a = MOTOR.compilar({"vendedores": ["V001", "V002"]})
+    b = MOTOR.compilar({"vendedores": {"V002", "V001"}})
+    c = MOTOR.compilar({"vendedores": ["V001"]})
+    assert a.firma == b.firma
+    assert len({a.firma, c.firma, MOTOR.compilar().firma}) == 3
+
+
+def test_columna_ausente_se_completa_vacia():
+    tabla = pa.table({"codigo": texto("AB1"), "cantidad": texto("1")})
+    _, errores = MOTOR.compilar({"vendedores": ["V001"]}).aplicar(tabla)
+    assert errores.tolist() == [0]
+
+
+def test_etiquetas_conteo_y_reporte():
+    errores = np.array([0, 0b110, 0b110, 0b1], dtype=np.uint32)
+    assert MOTOR.etiquetas(errores).to_pylist() == [
+        None, "Código inválido; Cantidad inválida", "Código inválido; Cantidad inválida", "Falta código",
+    ]
+    conteo = MOTOR.conteo(errores)
+    assert conteo.tolist() == [1, 2, 2, 0, 0]
+    assert [(r["regla"], r["filas"], r["bloquea"]) for r in MOTOR.reporte(conteo)] == [
+        ("codigo_requerido", 1, True), ("codigo_formato", 2, True), ("cantidad_rango", 2, True),
+    ]
+
+
+def test_maximo_de_reglas():
+    regla = reglas.requerido("codigo")
+    with pytest.raises(ValueError):
+        reglas.Motor(ESQUEMA, (), (regla,) * (reglas.MAX_REGLAS + 1))
+
+
+def test_columnas_crudas_exige_requeridas_y_rellena_nulos():
+    df = pd.DataFrame({"codigo": ["a", None], "cantidad": [1, 2]})
+    tabla = reglas.columnas_crudas(df, ["codigo", "cantidad"])
+    assert tabla.column("codigo").to_pylist() == ["a", ""]
+    assert tabla.column("cantidad").to_pylist() == ["1", "2"]
+    with pytest.raises(ValueError, match="vendedor"):
+        reglas.columnas_crudas(df, ["codigo", "vendedor"])
+
+
+# ── Reglas de órdenes --------------------------------------------------------
+def test_archivo_sin_columnas_opcionales():
+    df = pd.DataFrame({"numero_orden": ["1"], "sku": ["A1"], "cantidad": ["2"]})
+    tabla = ingesta.normalizar_chunk(df, ingesta.MOTOR_ORDENES.compilar())
+    assert tabla.column("errores").to_pylist() == [0]
+    assert tabla.column("fecha_orden").to_pylist() == [None]
+
+
+def test_normalizar_chunk_de_ordenes():
+    df = pd.DataFrame({
+        "Order ID": [" 1001 ", "1002", ""],
+        "SKU": ["ab-1", "??", "X1"],
+        "Cantidad": ["2.0", "1", "3"],
+        "Codigo Vendedor": ["V001", "V404", "V001"],
+        "Fecha Orden": ["3/2/2025", "31/02/2025", ""],
+        "Direccion": ["calle  10 no. 5-20", "", ""],
+    })
+    compilado = ingesta.MOTOR_ORDENES.compilar({"vendedores": ["V001"]})
+    tabla = ingesta.normalizar_chunk(df, compilado)
+
+    assert tabla.schema == ingesta.ESQUEMA_STAGING
+    fila = tabla.slice(0, 1).to_pylist()[0]
+    assert fila == {
+        "numero_orden": "1001", "marketplace": "", "sku": "AB-1", "cantidad": 2,
+        "codigo_vendedor": "V001", "fecha_orden": "2025-02-03", "direccion": "Cl 10 # 5-20", "errores": 0,
+    }
+    errores = tabla.column("errores").to_numpy()
+    assert ingesta.MOTOR_ORDENES.describir(int(errores[1])) == [
+        "sku_formato", "codigo_vendedor_desconocido", "fecha_orden_invalida",
+    ]
+    assert ingesta.MOTOR_ORDENES.describir(int(errores[2])) == ["numero_orden_requerido"]
+    # la fecha ilegible es advertencia: no rechaza la fila por sí sola
+    assert not np.uint32(1 << 5) & ingesta.MASCARA_RECHAZO
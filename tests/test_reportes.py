@@ -0,0 +1,59 @@
+# tests/test_reportes.py
+"""
+Reportes (services/reportes.py): la caché compartida se separa por alcance,
+igual que el filtro de reporte_alcance() en migrations/011.
+"""
+import pytest
+
+from services import reportes
+
+
+class RpcFalsa:
+    def __init__(self, filas):
+        self.filas = filas
+        self.llamadas = []
+
+    def rpc(self, nombre, params=None):
+        self.llamadas.append((nombre, params))
+        return self
+
+    def execute(self):
+        return self
+
+    @property
+    def data(self):
+        return self.filas
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    reportes.invalidate()
+    yield
+    reportes.invalidate()
+
+
+def test_alcance():
+    assert reportes.alcance({"rol": "admin", "codigo_vendedor": "V1"}) == "*"
+    assert reportes.alcance({"rol": "vendedor", "codigo_vendedor": " V1 "}) == "V1"
+    assert reportes.alcance({"rol": "facturacion", "codigo_vendedor": None}) == ""
+    assert reportes.alcance(None) == ""
+
+
+def test_cada_alcance_tiene_su_entrada():
+    admin = RpcFalsa([{"codigo_vendedor": "V1", "lineas": 3}, {"codigo_vendedor": "V2", "lineas": 1}])
+    vendedor = RpcFalsa([{"codigo_vendedor": "V1", "lineas": 3}])
+
+    assert len(reportes.por_vendedor(admin, "*")) == 2
+    assert [f["codigo_vendedor"] for f in reportes.por_vendedor(vendedor, "V1")] == ["V1"]
+    assert len(reportes.por_vendedor(admin, "*")) == 2 and len(admin.llamadas) == 1
+
+
+def test_embudo_por_alcance():
+    client = RpcFalsa([{"etapa": "tickets", "estado": "pendiente", "n": 2}, {"etapa": "tickets", "estado": "cerrado", "n": 5}])
+    tickets, *resto = reportes.embudo(client, "V1")
+    assert (tickets["abiertas"], tickets["total"]) == (2, 7)
+    assert all(e["total"] == 0 for e in resto)
+
+    reportes.embudo(client, "V2")
+    reportes.embudo(client, "V1")
+    assert len(client.llamadas) == 2
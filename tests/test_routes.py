@@ -0,0 +1,43 @@
+# tests/test_routes.py
+"""
+Permisos del registro de rutas (components/routes.py): sesión, roles y
+admin, además de que cada destino apunte a una función existente.
+"""
+import pytest
+
+from components.routes import POR_PATH, RUTAS
+
+VENDEDOR = {"rol": "vendedor"}
+FACTURACION = {"rol": "facturacion"}
+ADMIN = {"rol": "admin"}
+
+
+def test_vistas_publicas_sin_sesion():
+    assert POR_PATH["/"].permitida(None)
+    assert POR_PATH["/register"].permitida(None)
+
+
+@pytest.mark.parametrize("path", ["/home", "/upload", "/tickets", "/alistamiento", "/serializacion", "/trabajos"])
+def test_modulos_comunes_exigen_sesion(path):
+    ruta = POR_PATH[path]
+    assert not ruta.permitida(None) and not ruta.permitida({})
+    assert ruta.permitida(VENDEDOR) and ruta.permitida(FACTURACION) and ruta.permitida(ADMIN)
+
+
+def test_facturas_solo_facturacion_y_admin():
+    ruta = POR_PATH["/facturas"]
+    assert ruta.permitida(FACTURACION) and ruta.permitida(ADMIN)
+    assert not ruta.permitida(VENDEDOR) and not ruta.permitida(None)
+
+
+def test_metricas_solo_admin():
+    ruta = POR_PATH["/metricas"]
+    assert ruta.permitida(ADMIN)
+    assert not ruta.permitida(FACTURACION) and not ruta.permitida(VENDEDOR)
+
+
+def test_paths_unicos_y_destinos_bien_formados():
+    assert len(POR_PATH) == len(RUTAS)
+    for ruta in RUTAS:
+        modulo, funcion = ruta.destino.split(":")
+        assert modulo and funcion.isidentifier()
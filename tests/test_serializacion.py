@@ -0,0 +1,137 @@
+# tests/test_serializacion.py
+"""
+Escaneo de seriales (services/serializacion.py): validación contra el
+índice de la orden, apertura sin red de una orden ya vista y escaneos
+encolados en el almacén local con la sesión de quien escanea.
+"""
+import pytest
+
+from services import serializacion
+from services.local_store import LocalStore
+from services.serializacion import DESCONOCIDO, DUPLICADO, OK, OrdenSeriales
+
+SERIALES = [
+    {"serial": "S1", "sku": "A", "estado": "pendiente"},
+    {"serial": "S2", "sku": "A", "estado": "serializado"},
+    {"serial": "S3", "sku": "B", "estado": "pendiente"},
+]
+
+
+class Respuesta:
+    def __init__(self, data):
+        self.data = data
+
+    def execute(self):
+        return self
+
+
+class ClienteFalso:
+    """``serializacion`` en memoria; con ``sin_red`` toda consulta falla."""
+
+    def __init__(self, filas=SERIALES):
+        self.filas = filas
+        self.consultas = 0
+        self.sin_red = False
+        self.upserts: list[tuple[str, list]] = []
+
+    def table(self, tabla):
+        cliente = self
+
+        class Consulta:
+            def select(self, columnas):
+                return self
+
+            def eq(self, columna, valor):
+                return self
+
+            def upsert(self, filas, on_conflict=None, ignore_duplicates=False):
+                cliente.upserts.append((tabla, filas))
+                return Respuesta(filas)
+
+            def execute(self):
+                if cliente.sin_red:
+                    raise ConnectionError("sin red")
+                cliente.consultas += 1
+                return Respuesta([dict(f) for f in cliente.filas])
+        return Consulta()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(LocalStore, "_ensure_thread", lambda self: None)
+    return LocalStore(tmp_path / "estacion.db", flush_interval=3600)
+
+
+@pytest.fixture
+def refrescos(monkeypatch):
+    """El refresco en segundo plano corre en el acto y queda registrado."""
+    llamadas = []
+
+    def submit(fn, *args):
+        llamadas.append(args[1])
+        fn(*args)
+    monkeypatch.setattr(serializacion, "submit_background", submit)
+    return llamadas
+
+
+def test_validar():
+    orden = OrdenSeriales("ORD-1", {"S1": "A", "S2": "B"})
+    assert orden.validar("S1") == (OK, "A")
+    assert orden.validar("S1") == (DUPLICADO, "A")
+    assert orden.validar("X9") == (DESCONOCIDO, None)
+    assert (orden.total, orden.pendientes) == (2, 1)
+
+
+def test_cargar_sin_store_cuenta_lo_ya_serializado():
+    orden = serializacion.cargar_orden(ClienteFalso(), "ORD-1")
+    assert orden.esperados == {"S1": "A", "S2": "A", "S3": "B"}
+    assert orden.escaneados == {"S2"}
+    assert orden.validar("S2") == (DUPLICADO, "A")
+
+
+def test_orden_ya_vista_se_abre_sin_red(store, refrescos):
+    client = ClienteFalso()
+    serializacion.cargar_orden(client, "ORD-1", store)
+    assert (client.consultas, refrescos) == (1, [])
+
+    client.sin_red = True
+    orden = serializacion.cargar_orden(client, "ORD-1", store)
+    assert orden.esperados == {"S1": "A", "S2": "A", "S3": "B"}
+    assert refrescos == ["ORD-1"]                       # el refresco falla sin tocar la copia
+    assert store.leer(serializacion.TABLA_SERIALES, "ORD-1")
+
+
+def test_refresco_actualiza_la_copia_local(store, refrescos):
+    client = ClienteFalso()
+    serializacion.cargar_orden(client, "ORD-1", store)
+    client.filas = SERIALES + [{"serial": "S4", "sku": "C", "estado": "pendiente"}]
+
+    serializacion.cargar_orden(client, "ORD-1", store)     # usa la copia y la refresca
+    assert client.consultas == 2
+    assert "S4" in serializacion.cargar_orden(client, "ORD-1", store).esperados
+
+
+def test_escaneo_encolado_con_la_sesion_de_quien_escanea(store, refrescos):
+    client, otro = ClienteFalso(), ClienteFalso()
+    serializacion.cargar_orden(client, "ORD-1", store)
+    serializacion.registrar_escaneo(store, client, "ORD-1", "S1", "A", "ana@colibri", propietario="uid-ana")
+
+    assert store.pendientes(serializacion.TABLA_ESCANEOS) == 1
+    # al reabrir la orden el escaneo local cuenta como hecho, aún sin enviar
+    assert serializacion.cargar_orden(client, "ORD-1", store).escaneados == {"S1", "S2"}
+
+    store.registrar("uid-otro", otro)
+    store.flush("uid-otro")
+    assert otro.upserts == [] and store.pendientes() == 1
+
+    store.flush("uid-ana")
+    [(tabla, filas)] = client.upserts
+    assert tabla == serializacion.TABLA_ESCANEOS
+    assert [(f["serial"], f["usuario"]) for f in filas] == [("S1", "ana@colibri")]
+    assert store.pendientes() == 0
+
+
+def test_escaneo_sin_propietario(store):
+    with pytest.raises(ValueError):
+        serializacion.registrar_escaneo(store, ClienteFalso(), "ORD-1", "S1", "A", None, propietario="")
+    assert store.pendientes() == 0
@@ -0,0 +1,123 @@
+# tests/test_session.py
+"""
+Login (auth/session.py) con un cliente falso: una autenticación y una sola
+RPC del perfil, el perfil en caché para los siguientes logins y los
+mensajes de error cuando falla Auth o el perfil.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from auth import session
+from services import referencias
+
+PERFIL = {"auth_uid": "uid-ana", "email": "ana@colibri.co", "nombre_usuario": "ana",
+          "codigo_vendedor": "V1", "rol": "vendedor", "creado_at": "2025-01-01"}
+
+
+class Respuesta:
+    def __init__(self, data):
+        self.data = data
+
+    def execute(self):
+        return self
+
+
+class AuthFalsa:
+    def __init__(self, error: Exception | None = None, sin_sesion: bool = False):
+        self.logins: list[dict] = []
+        self.error, self.sin_sesion = error, sin_sesion
+
+    def sign_in_with_password(self, credenciales):
+        self.logins.append(credenciales)
+        if self.error:
+            raise self.error
+        return SimpleNamespace(
+            user=SimpleNamespace(id="uid-ana"),
+            session=None if self.sin_sesion else SimpleNamespace(access_token="jwt"),
+        )
+
+
+class ClienteFalso:
+    def __init__(self, auth=None, perfil_error: Exception | None = None, version=1):
+        self.auth = auth or AuthFalsa()
+        self.rpcs: list[str] = []
+        self.perfil_error = perfil_error
+        self.version = version
+
+    def rpc(self, nombre, params=None):
+        self.rpcs.append(nombre)
+        if self.perfil_error:
+            raise self.perfil_error
+        return Respuesta(dict(PERFIL))
+
+    def table(self, tabla):
+        assert tabla == "ref_versiones"
+        cliente = self
+
+        class Consulta:
+            def select(self, columnas):
+                return self
+
+            def execute(self):
+                return Respuesta([{"tabla": "usuarios", "version": cliente.version}])
+        return Consulta()
+
+
+@pytest.fixture(autouse=True)
+def cache_vacia(monkeypatch):
+    referencias.invalidate("usuarios")
+    monkeypatch.setattr(referencias, "VERSION_CHECK", 0)
+    monkeypatch.setattr(referencias, "_versiones", {})
+    yield
+    referencias.invalidate("usuarios")
+
+
+def test_login_con_una_rpc_del_perfil():
+    client = ClienteFalso()
+    r = session.sign_in(client, "  Ana@Colibri.CO ", "secreto")
+
+    assert r["success"] and r["session"].access_token == "jwt"
+    assert client.auth.logins == [{"email": "ana@colibri.co", "password": "secreto"}]
+    assert client.rpcs == ["perfil_usuario"]
+    assert r["user"] == {c: PERFIL[c] for c in session.COLUMNAS_PERFIL}
+
+
+def test_el_perfil_queda_en_cache_entre_logins():
+    session.sign_in(ClienteFalso(), "ana@colibri.co", "secreto")
+    otro = ClienteFalso()
+    r = session.sign_in(otro, "ana@colibri.co", "secreto")
+    assert r["success"] and r["user"]["rol"] == "vendedor"
+    assert otro.rpcs == []
+
+
+def test_cambio_de_usuarios_descarta_el_perfil():
+    session.sign_in(ClienteFalso(version=1), "ana@colibri.co", "secreto")
+    cambio = ClienteFalso(version=2)                  # otro sello en ref_versiones
+    session.sign_in(cambio, "ana@colibri.co", "secreto")
+    assert cambio.rpcs == ["perfil_usuario"]
+
+
+def test_invalidar_el_perfil():
+    session.sign_in(ClienteFalso(), "ana@colibri.co", "secreto")
+    session.invalidate_profile("uid-ana")
+    client = ClienteFalso()
+    session.sign_in(client, "ana@colibri.co", "secreto")
+    assert client.rpcs == ["perfil_usuario"]
+
+
+@pytest.mark.parametrize("auth", [AuthFalsa(error=RuntimeError("Invalid login credentials")), AuthFalsa(sin_sesion=True)])
+def test_falla_de_auth(auth):
+    client = ClienteFalso(auth=auth)
+    r = session.sign_in(client, "ana@colibri.co", "mala")
+    assert r == {"success": False, "error": "Credenciales inválidas o e-mail sin confirmar"}
+    assert client.rpcs == []
+
+
+def test_falla_del_perfil_no_queda_en_cache():
+    r = session.sign_in(ClienteFalso(perfil_error=RuntimeError("timeout")), "ana@colibri.co", "secreto")
+    assert r == {"success": False, "error": "No se pudo cargar el perfil del usuario"}
+
+    client = ClienteFalso()
+    assert session.sign_in(client, "ana@colibri.co", "secreto")["success"]
+    assert client.rpcs == ["perfil_usuario"]
@@ -0,0 +1,82 @@
+# tests/test_shared_store.py
+"""
+Almacén compartido entre workers (services/shared_store.py) y el segundo
+nivel de TTLCache. Cada "worker" es un proceso Python aparte sobre el mismo
+archivo SQLite, como con ``uvicorn asgi:app --workers N``.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from services.shared_store import SharedStore
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORKER = """
+import json, sys
+from services.cache import TTLCache
+
+cache = TTLCache(ttl=60, shared="pruebas")
+cargas = []
+
+def loader():
+    cargas.append(1)
+    return {"origen": sys.argv[1]}
+
+accion = sys.argv[2]
+if accion == "invalidar":
+    cache.invalidate("clave")
+    print(json.dumps({}))
+else:
+    valor, _ = cache.get_or_load("clave", loader)
+    print(json.dumps({"valor": valor, "cargas": len(cargas), "compartidos": cache.shared_hits}))
+"""
+
+
+def worker(tmp_path, nombre: str, accion: str = "leer") -> dict:
+    env = {
+        **os.environ,
+        "SHARED_CACHE": "1",
+        "SHARED_STORE": str(tmp_path / "shared.db"),
+        "DATA_DIR": str(tmp_path),
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", WORKER, nombre, accion],
+        cwd=ROOT, env=env, capture_output=True, text=True, timeout=60, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_otro_worker_usa_lo_cargado(tmp_path):
+    a = worker(tmp_path, "a")
+    assert a == {"valor": {"origen": "a"}, "cargas": 1, "compartidos": 0}
+
+    b = worker(tmp_path, "b")
+    assert b == {"valor": {"origen": "a"}, "cargas": 0, "compartidos": 1}
+
+
+def test_invalidar_en_un_worker_obliga_a_recargar_en_otro(tmp_path):
+    worker(tmp_path, "a")
+    worker(tmp_path, "b", "invalidar")
+
+    c = worker(tmp_path, "c")
+    assert c["valor"] == {"origen": "c"} and c["cargas"] == 1
+
+
+def test_claves_compuestas_y_purga(tmp_path):
+    store = SharedStore(tmp_path / "shared.db")
+    store.set_many("ns", {("V001", 3): [1, 2], "simple": None})
+    store.set("ns", "vieja", 1, stored_at=time.time() - 3600)
+
+    encontrados = store.get_many("ns", [("V001", 3), "simple", "falta"])
+    assert {k: v for k, (v, _) in encontrados.items()} == {("V001", 3): [1, 2], "simple": None}
+
+    store.purge(60)
+    assert store.get("ns", "vieja") is None
+    assert store.get("ns", "simple") is not None
+
+    store.delete("ns")
+    assert store.get_many("ns", [("V001", 3), "simple"]) == {}
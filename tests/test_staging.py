@@ -0,0 +1,98 @@
+# tests/test_staging.py
+"""
+Staging columnar y el índice de hashes de las cargas delta
+(services/staging.py): identidad de línea, clasificación nueva / cambiada /
+sin cambios y reutilización del staging de un archivo ya subido.
+"""
+import pyarrow as pa
+import pytest
+
+from services.staging import CAMBIADA, NUEVA, SIN_CAMBIOS, HashIndex, Staging, hash_filas
+
+ESQUEMA = pa.schema([
+    ("numero_orden", pa.string()), ("marketplace", pa.string()), ("sku", pa.string()),
+    ("cantidad", pa.int64()), ("codigo_vendedor", pa.string()),
+])
+
+
+def lineas(*filas) -> pa.Table:
+    return pa.Table.from_pylist(
+        [dict(zip(ESQUEMA.names, f)) for f in filas], schema=ESQUEMA,
+    )
+
+
+def test_clave_incluye_marketplace_y_vendedor():
+    tabla = lineas(
+        ("1001", "ml", "SKU-1", 1, "V001"),
+        ("1001", "ml", "SKU-1", 5, "V001"),         # misma línea, otro contenido
+        ("1001", "falabella", "SKU-1", 1, "V001"),
+        ("1001", "ml", "SKU-1", 1, "V002"),
+    )
+    clave, contenido = hash_filas(tabla, ESQUEMA.names)
+    assert clave[0] == clave[1] and contenido[0] != contenido[1]
+    assert len({clave[0], clave[2], clave[3]}) == 3
+
+
+def test_hash_no_depende_del_bloque():
+    sola = lineas(("1001", "ml", "SKU-1", 2, "V001"))
+    con_nulos = lineas(("1001", "ml", "SKU-1", 2, "V001"), ("1002", "ml", "SKU-2", None, None))
+    assert hash_filas(sola, ESQUEMA.names)[1][0] == hash_filas(con_nulos, ESQUEMA.names)[1][0]
+
+
+def test_indice_clasifica_y_registra(tmp_path):
+    indice = HashIndex(tmp_path / "hashes.db")
+    primera = lineas(("1", "ml", "A", 1, "V1"), ("2", "ml", "B", 1, "V1"))
+    clave, contenido = hash_filas(primera, ESQUEMA.names)
+    assert indice.clasificar(clave, contenido).tolist() == [NUEVA, NUEVA]
+    indice.registrar(clave, contenido)
+
+    segunda = lineas(("1", "ml", "A", 1, "V1"), ("2", "ml", "B", 9, "V1"), ("3", "ml", "C", 1, "V1"))
+    clave, contenido = hash_filas(segunda, ESQUEMA.names)
+    assert indice.clasificar(clave, contenido).tolist() == [SIN_CAMBIOS, CAMBIADA, NUEVA]
+    assert len(indice) == 2
+
+    # otra tabla en el mismo archivo no comparte claves
+    assert HashIndex(tmp_path / "hashes.db", tabla="otra").clasificar(clave, contenido).tolist() == [NUEVA] * 3
+
+    indice.olvidar()
+    assert len(indice) == 0
+
+
+def test_staging_se_reutiliza_en_la_resubida(tmp_path):
+    origen = tmp_path / "exporte.csv"
+    origen.write_text("numero_orden,sku\n1,A\n")
+    bloques = [lineas(("1", "ml", "A", 1, "V1")), lineas(("2", "ml", "B", 2, "V1"))]
+    llamadas = []
+
+    def normalizados():
+        llamadas.append(1)
+        return iter(bloques)
+
+    etapa = Staging(origen, ESQUEMA, directorio=tmp_path / "staging", variante="abc")
+    assert not etapa.reutilizado
+    escritos = list(etapa.lotes(normalizados))
+
+    otra = Staging(origen, ESQUEMA, directorio=tmp_path / "staging", variante="abc")
+    assert otra.reutilizado
+    leidos = list(otra.lotes(normalizados))
+
+    assert llamadas == [1]
+    assert pa.Table.from_batches(leidos).equals(pa.Table.from_batches(escritos))
+    assert pa.Table.from_batches(leidos).schema.names[-2:] == ["clave", "hash"]
+    # otro contexto de reglas → otro staging
+    assert not Staging(origen, ESQUEMA, directorio=tmp_path / "staging", variante="xyz").reutilizado
+
+
+def test_staging_incompleto_no_queda(tmp_path):
+    origen = tmp_path / "exporte.csv"
+    origen.write_text("x")
+
+    def falla():
+        yield lineas(("1", "ml", "A", 1, "V1"))
+        raise RuntimeError("archivo corrupto")
+
+    etapa = Staging(origen, ESQUEMA, directorio=tmp_path / "staging")
+    with pytest.raises(RuntimeError):
+        list(etapa.lotes(falla))
+    assert list((tmp_path / "staging").iterdir()) == []
+    assert not Staging(origen, ESQUEMA, directorio=tmp_path / "staging").reutilizado
@@ -0,0 +1,187 @@
+# tests/test_tickets_repo.py
+"""
+Paginación keyset de tickets (services/tickets_repo.py) contra una tabla
+falsa que interpreta los filtros de PostgREST que arma ``fetch_page``.
+"""
+import re
+from concurrent.futures import Future
+
+import pytest
+
+from services import tickets_repo
+from services.tickets_repo import TicketFiltro, TicketPager, codigos_vendedor, fetch_page
+
+CURSOR = re.compile(r'^created_at\.lt\."(?P<c>[^"]+)",and\(created_at\.eq\."(?P=c)",id\.lt\.(?P<id>\d+)\)$')
+
+
+class TablaFalsa:
+    def __init__(self, filas: list[dict]):
+        self.filas = filas
+        self.consultas = 0
+
+    def table(self, _nombre):
+        self.consultas += 1
+        return _Consulta(self.filas)
+
+
+class _Consulta:
+    def __init__(self, filas):
+        self.filas = list(filas)
+        self.orden: list[tuple[str, bool]] = []
+        self.limite = None
+
+    def select(self, _columnas):
+        return self
+
+    def _donde(self, pred):
+        self.filas = [f for f in self.filas if pred(f)]
+        return self
+
+    def eq(self, c, v):
+        return self._donde(lambda f: f[c] == v)
+
+    def gte(self, c, v):
+        return self._donde(lambda f: f[c] >= v)
+
+    def lt(self, c, v):
+        return self._donde(lambda f: f[c] < v)
+
+    def filter(self, c, op, v):
+        assert (c, op) == ("busqueda", "wfts(spanish)")
+        return self._donde(lambda f: v.lower() in f["asunto"].lower())
+
+    def or_(self, expr):
+        m = CURSOR.match(expr)
+        assert m, expr
+        c, i = m["c"], int(m["id"])
+        return self._donde(lambda f: f["created_at"] < c or (f["created_at"] == c and f["id"] < i))
+
+    def order(self, c, desc=False):
+        self.orden.append((c, desc))
+        return self
+
+    def limit(self, n):
+        self.limite = n
+        return self
+
+    def execute(self):
+        for c, desc in reversed(self.orden):
+            self.filas.sort(key=lambda f: f[c], reverse=desc)
+        self.data = self.filas[:self.limite]
+        return self
+
+
+def tickets(n: int) -> list[dict]:
+    # de a tres por instante: el desempate por id es lo que evita saltos o repetidos
+    return [
+        {
+            "id": i,
+            "created_at": f"2025-03-{1 + i // 3:02d}T10:00:00",
+            "estado": "pendiente" if i % 2 else "cerrado",
+            "codigo_vendedor": f"V{i % 3}",
+            "numero_orden": str(i),
+            "asunto": f"Ticket {i}" + (" devolución" if i % 5 == 0 else ""),
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def recorrer(client, filtro, limit) -> list[list[int]]:
+    paginas, cursor = [], None
+    while True:
+        filas, cursor = fetch_page(client, filtro, cursor, limit)
+        paginas.append([f["id"] for f in filas])
+        if cursor is None:
+            return paginas
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 50])
+def test_recorre_todo_sin_saltos_ni_repetidos(limit):
+    filas = tickets(20)
+    paginas = recorrer(TablaFalsa(filas), TicketFiltro(), limit)
+    ids = [i for p in paginas for i in p]
+    assert ids == sorted((f["id"] for f in filas), key=lambda i: (filas[i - 1]["created_at"], i), reverse=True)
+    assert all(len(p) == limit for p in paginas[:-1]) and paginas[-1]
+
+
+def test_filtros_y_busqueda():
+    filas = tickets(30)
+    filtro = TicketFiltro(estado="pendiente", codigo_vendedor="V1", desde="2025-03-03", hasta="2025-03-08")
+    ids = [i for p in recorrer(TablaFalsa(filas), filtro, 2) for i in p]
+    esperado = [
+        f["id"] for f in reversed(filas)
+        if f["estado"] == "pendiente" and f["codigo_vendedor"] == "V1" and "2025-03-03" <= f["created_at"] < "2025-03-09"
+    ]
+    assert ids == esperado and ids
+
+    texto = [i for p in recorrer(TablaFalsa(filas), TicketFiltro(texto="DEVOLUCIÓN"), 3) for i in p]
+    assert texto == [30, 25, 20, 15, 10, 5]
+
+
+def test_pager_adelante_atras_con_prefetch():
+    tabla = TablaFalsa(tickets(10))
+    pager = TicketPager(tabla, page_size=4)
+
+    assert [f["id"] for f in pager.reset(TicketFiltro())] == [10, 9, 8, 7]
+    assert pager.page_number == 1 and pager.has_next and not pager.has_prev
+    pager._prefetch[2].result(5)
+    consultas = tabla.consultas
+
+    assert [f["id"] for f in pager.next()] == [6, 5, 4, 3]
+    pager._prefetch[2].result(5)
+    assert tabla.consultas == consultas + 1          # la página vino del prefetch; sólo se pidió la siguiente
+    assert [f["id"] for f in pager.next()] == [2, 1]
+    assert not pager.has_next and pager.page_number == 3
+    with pytest.raises(IndexError):
+        pager.next()
+
+    assert [f["id"] for f in pager.prev()] == [6, 5, 4, 3]
+    assert [f["id"] for f in pager.prev()] == [10, 9, 8, 7]
+    assert not pager.has_prev
+
+
+def test_pagina_exacta_no_deja_cursor():
+    filas, cursor = fetch_page(TablaFalsa(tickets(4)), TicketFiltro(), None, 4)
+    assert len(filas) == 4 and cursor is None
+
+
+def test_codigos_vendedor_desde_la_rpc():
+    class Rpc:
+        def rpc(self, nombre):
+            assert nombre == "codigos_vendedor"
+            self.data = [{"codigo_vendedor": "V001"}, {"codigo_vendedor": "V002"}]
+            return self
+
+        def execute(self):
+            return self
+
+    assert codigos_vendedor(Rpc()) == ["V001", "V002"]
+
+
+def test_hasta_incluye_todo_el_ultimo_dia():
+    filas = [
+        {"id": 1, "created_at": "2025-03-08T23:59:59.999999+00:00", "estado": "pendiente"},
+        {"id": 2, "created_at": "2025-03-09T00:00:00+00:00", "estado": "pendiente"},
+    ]
+    filas_, _ = fetch_page(TablaFalsa(filas), TicketFiltro(hasta="2025-03-08"))
+    assert [f["id"] for f in filas_] == [1]
+
+
+def test_pager_no_avanza_si_la_carga_falla(monkeypatch):
+    def prefetch_fallido(*_args):
+        f = Future()
+        f.set_exception(ConnectionError("sin red"))
+        return f
+
+    monkeypatch.setattr(tickets_repo, "submit_background", prefetch_fallido)
+    pager = TicketPager(TablaFalsa(tickets(10)), page_size=4)
+    pager.reset(TicketFiltro())
+
+    with pytest.raises(ConnectionError):
+        pager.next()
+    assert pager.page_number == 1 and pager.has_next and not pager.has_prev
+
+    # el reintento ya no usa el prefetch fallido
+    assert [f["id"] for f in pager.next()] == [6, 5, 4, 3]
+    assert pager.page_number == 2
+    assert [f["id"] for f in pager.prev()] == [10, 9, 8, 7]
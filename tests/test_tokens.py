@@ -0,0 +1,134 @@
+# tests/test_tokens.py
+"""
+Cadena de refresco de auth/tokens.py: la página y sus trabajos comparten el
+refresh token de una misma sesión de Auth, el logout espera al último
+trabajo y la cadena desaparece con sus clientes. Auth es un doble en memoria.
+"""
+import base64
+import gc
+import json
+import time
+
+import pytest
+
+from auth import tokens
+
+
+def jwt_falso(sesion_auth: str, exp: float, sub: str = "u1") -> str:
+    def parte(d):
+        return base64.urlsafe_b64encode(json.dumps(d).encode()).decode().rstrip("=")
+
+    return ".".join([parte({"alg": "none"}), parte({"sub": sub, "exp": int(exp), "session_id": sesion_auth}), "firma"])
+
+
+def sesion(sesion_auth: str = "s1", refresh: str = "r0", exp: float | None = None):
+    exp = exp or time.time() + 3600
+    token = jwt_falso(sesion_auth, exp)
+    return tokens._session_from_claims(token, refresh, tokens.decode_claims(token))
+
+
+class AuthFalsa:
+    def __init__(self, servidor):
+        self.servidor = servidor
+        self._in_memory_session = None
+
+    def _save_session(self, session):
+        self._in_memory_session = session
+
+    def _notify_all_subscribers(self, evento, session):
+        pass
+
+    def refresh_session(self, refresh_token):
+        return self.servidor.rotar(refresh_token)
+
+
+class ServidorAuth:
+    """Cada refresh token sirve una vez, como en Supabase Auth."""
+
+    def __init__(self):
+        self.usados: list[str] = []
+
+    def rotar(self, refresh_token):
+        if refresh_token in self.usados:
+            raise RuntimeError("Invalid Refresh Token: Already Used")
+        self.usados.append(refresh_token)
+        nueva = sesion(refresh=f"r{len(self.usados)}", exp=time.time() + 7200)
+
+        class Respuesta:
+            session = nueva
+        return Respuesta
+
+
+class ClienteFalso:
+    def __init__(self, servidor, session=None):
+        self.auth = AuthFalsa(servidor)
+        if session is not None:
+            tokens.install_session(self, session)
+
+
+@pytest.fixture
+def servidor(monkeypatch):
+    servidor = ServidorAuth()
+    revocados = servidor.revocados = []
+    monkeypatch.setattr(tokens, "create_session_client", lambda: ClienteFalso(servidor))
+    monkeypatch.setattr(tokens, "sign_out", lambda client: revocados.append(client))
+    yield servidor
+    tokens._cadenas.clear()
+
+
+def test_trabajo_adopta_los_tokens_rotados_por_la_pagina(servidor):
+    inicial = sesion()
+    pagina = ClienteFalso(servidor, inicial)
+    tokens.unir(pagina, inicial)
+    trabajo = tokens.cliente_trabajo(pagina)
+
+    rotada = tokens.refrescar(pagina, inicial)
+    # el trabajo todavía tiene r0, ya usado: adopta r1 sin llamar a Auth
+    assert tokens.refrescar(trabajo, tokens.sesion_de(trabajo)) is rotada
+    assert servidor.usados == ["r0"]
+    assert tokens.sesion_de(trabajo).refresh_token == "r1"
+
+
+def test_logout_espera_al_ultimo_trabajo(servidor):
+    inicial = sesion()
+    pagina = ClienteFalso(servidor, inicial)
+    tokens.unir(pagina, inicial)
+    trabajo = tokens.cliente_trabajo(pagina)
+
+    tokens.cerrar_sesion(pagina)
+    assert servidor.revocados == []
+    tokens.soltar(trabajo)
+    assert servidor.revocados == [trabajo]
+    assert "s1" not in tokens._cadenas
+
+
+def test_sesiones_distintas_no_comparten_cadena(servidor):
+    a, b = sesion("s1"), sesion("s2")
+    ca, cb = ClienteFalso(servidor, a), ClienteFalso(servidor, b)
+    tokens.unir(ca, a)
+    tokens.unir(cb, b)
+    tokens.refrescar(ca, a)
+    assert tokens.sesion_de(cb) is b and tokens._cadenas["s2"].session is b
+
+
+def test_la_cadena_desaparece_con_sus_clientes(servidor):
+    inicial = sesion()
+    pagina = ClienteFalso(servidor, inicial)
+    tokens.unir(pagina, inicial)
+    assert "s1" in tokens._cadenas
+
+    del pagina                                   # la sesión Flet se cerró sin logout
+    gc.collect()
+    assert "s1" not in tokens._cadenas
+
+
+def test_cliente_muerto_no_retiene_el_logout(servidor):
+    inicial = sesion()
+    pagina = ClienteFalso(servidor, inicial)
+    tokens.unir(pagina, inicial)
+    trabajo = tokens.cliente_trabajo(pagina)
+    del trabajo                                  # terminó sin soltar (p. ej. un error)
+    gc.collect()
+
+    tokens.cerrar_sesion(pagina)
+    assert servidor.revocados == [pagina]
@@ -0,0 +1,274 @@
+# tests/test_trabajos.py
+"""
+Planificador de trabajos (services/trabajos.py) sin hilos ni Supabase: cada
+prueba reclama y ejecuta a mano (``_reclamar`` / ``_ejecutar``) para
+recorrer la máquina de estados — cola, prioridad, concurrencia por tipo,
+reintentos, cancelación, progreso y vencimiento por falta de latido.
+"""
+import time
+from pathlib import Path
+
+import pytest
+
+from services import trabajos
+from services.trabajos import CANCELADO, CORRIENDO, EN_COLA, ERROR, LISTO, Planificador, TipoTrabajo
+
+
+@pytest.fixture
+def sueltos(monkeypatch):
+    """Clientes soltados; el cliente del trabajo es el mismo de la página."""
+    soltados = []
+    monkeypatch.setattr(trabajos, "_tipos", {})
+    monkeypatch.setattr(trabajos, "cliente_trabajo", lambda client: client)
+    monkeypatch.setattr(trabajos, "renovar", lambda client: None)
+    monkeypatch.setattr(trabajos, "soltar", soltados.append)
+    monkeypatch.setattr(Planificador, "_ensure_threads", lambda self: None)
+    return soltados
+
+
+@pytest.fixture
+def plan(tmp_path, sueltos):
+    return Planificador(tmp_path / "trabajos.db", workers=1)
+
+
+def tipo(nombre: str, funcion=None, **kw) -> TipoTrabajo:
+    return trabajos.registrar(TipoTrabajo(nombre, nombre.title(), funcion or (lambda ctx, p: {"ok": p}), **kw))
+
+
+def sin_red(ctx, params):
+    raise ConnectionError("sin red")
+
+
+def correr(plan: Planificador) -> dict | None:
+    """Un paso de un worker: reclama y ejecuta el próximo trabajo."""
+    trabajo = plan._reclamar()
+    if trabajo is not None:
+        plan._ejecutar(trabajo)
+    return trabajo
+
+
+# ── Cola ----------------------------------------------------------------------
+def test_prioridad_y_antiguedad(plan):
+    tipo("a", concurrencia=5)
+    viejo = plan.enviar("a", {"n": 1}, "cliente")
+    urgente = plan.enviar("a", {"n": 2}, "cliente", prioridad=trabajos.ALTA)
+    nuevo = plan.enviar("a", {"n": 3}, "cliente")
+
+    assert [plan._reclamar()["id"] for _ in range(3)] == [urgente, viejo, nuevo]
+    assert plan._reclamar() is None
+
+
+def test_concurrencia_por_tipo(plan):
+    tipo("ingesta", concurrencia=1)
+    tipo("olas", concurrencia=1)
+    i1 = plan.enviar("ingesta", {}, "cliente")
+    plan.enviar("ingesta", {}, "cliente")
+    o1 = plan.enviar("olas", {}, "cliente")
+
+    assert plan._reclamar()["id"] == i1
+    assert plan._reclamar()["id"] == o1                 # la segunda ingesta espera su cupo
+    assert plan._reclamar() is None
+
+    plan._ejecutar(plan.obtener(i1))
+    assert plan._reclamar()["tipo"] == "ingesta"
+
+
+def test_solo_reclama_los_de_su_proceso(plan):
+    tipo("a")
+    otro = plan.enviar("a", {}, "cliente")
+    plan._execute("update trabajos set proceso = ? where id = ?", (plan._pid + 1, otro))
+    assert plan._reclamar() is None
+
+
+# ── Resultado ---------------------------------------------------------------
+def test_listo_con_resultado_y_cliente_soltado(plan, sueltos):
+    tipo("a")
+    tid = plan.enviar("a", {"x": 1}, "cliente-de-ana", usuario="ana@x.co")
+    correr(plan)
+
+    t = plan.obtener(tid)
+    assert (t["estado"], t["resultado"], t["intentos"]) == (LISTO, {"ok": {"x": 1}}, 1)
+    assert sueltos == ["cliente-de-ana"] and tid not in plan._clientes
+    assert [x["id"] for x in plan.listar("ana@x.co")] == [tid] and plan.listar("beto@x.co") == []
+
+
+def test_success_false_termina_en_error_sin_reintentar(plan):
+    tipo("a", lambda ctx, p: {"success": False, "error": "sin órdenes"})
+    tid = plan.enviar("a", {}, "cliente")
+    correr(plan)
+    t = plan.obtener(tid)
+    assert (t["estado"], t["error"], t["intentos"]) == (ERROR, "sin órdenes", 1)
+
+
+def test_sin_cliente_en_este_proceso(plan):
+    tipo("a")
+    tid = plan.enviar("a", {}, "cliente")
+    plan._clientes.clear()
+    correr(plan)
+    assert plan.obtener(tid)["estado"] == ERROR
+
+
+# ── Reintentos ----------------------------------------------------------------
+def test_error_de_red_reintenta_con_backoff_hasta_el_maximo(plan):
+    llamadas = []
+
+    def falla(ctx, p):
+        llamadas.append(ctx.intento)
+        sin_red(ctx, p)
+
+    tipo("a", falla, max_intentos=3, backoff=0.0)
+    tid = plan.enviar("a", {}, "cliente")
+
+    correr(plan)
+    t = plan.obtener(tid)
+    assert (t["estado"], t["intentos"], t["error"]) == (EN_COLA, 1, "sin red")
+
+    correr(plan)
+    correr(plan)
+    assert llamadas == [1, 2, 3]
+    assert plan.obtener(tid)["estado"] == ERROR
+    assert correr(plan) is None
+
+
+def test_backoff_posterga_el_siguiente_intento(plan):
+    tipo("a", sin_red, backoff=30.0)
+    tid = plan.enviar("a", {}, "cliente")
+    antes = time.time()
+    correr(plan)
+
+    assert plan.obtener(tid)["disponible_at"] >= antes + 30 * 0.8
+    assert plan._reclamar() is None
+
+
+def test_error_no_reintentable(plan):
+    tipo("a", lambda ctx, p: 1 / 0)
+    tid = plan.enviar("a", {}, "cliente")
+    correr(plan)
+    t = plan.obtener(tid)
+    assert (t["estado"], t["intentos"]) == (ERROR, 1) and "division" in t["error"]
+
+
+def test_reintentar_encola_una_copia(plan):
+    tipo("a", lambda ctx, p: 1 / 0)
+    tid = plan.enviar("a", {"x": 1}, "cliente", usuario="ana")
+    correr(plan)
+
+    assert plan.reintentar(tid, "cliente-nuevo") != tid
+    nuevo = plan.listar("ana")[0]
+    assert (nuevo["estado"], nuevo["params"]) == (EN_COLA, {"x": 1})
+    assert plan.reintentar(nuevo["id"], "cliente") is None         # aún no terminó
+
+
+# ── Cancelación ----------------------------------------------------------------
+def test_cancelar_en_cola(plan, sueltos):
+    tipo("a")
+    tid = plan.enviar("a", {}, "cliente")
+    assert plan.cancelar(tid)
+    assert plan.obtener(tid)["estado"] == CANCELADO and sueltos == ["cliente"]
+    assert plan._reclamar() is None
+
+
+def test_cancelar_en_curso(plan):
+    def larga(ctx, p):
+        assert plan.cancelar(ctx.id)                    # p. ej. desde otra sesión
+        assert ctx.cancelado
+        return {"procesadas": 10}
+
+    tipo("a", larga)
+    tid = plan.enviar("a", {}, "cliente")
+    correr(plan)
+    t = plan.obtener(tid)
+    assert (t["estado"], t["resultado"]) == (CANCELADO, {"procesadas": 10})
+
+
+def test_cancelado_no_se_reintenta(plan):
+    def falla(ctx, p):
+        plan.cancelar(ctx.id)
+        sin_red(ctx, p)
+
+    tipo("a", falla, backoff=0.0)
+    tid = plan.enviar("a", {}, "cliente")
+    correr(plan)
+    assert plan.obtener(tid)["estado"] == CANCELADO
+
+
+# ── Progreso y oyentes -------------------------------------------------------
+def test_progreso_se_guarda_y_se_avisa(plan):
+    vistos = []
+
+    def con_progreso(ctx, p):
+        ctx.progreso({"done": 1, "total": 2})
+        assert plan.obtener(ctx.id)["progreso"] == {"done": 1, "total": 2}
+        ctx.progreso({"done": 2, "total": 2})          # antes de GUARDAR_CADA: sólo en memoria
+        return {}
+
+    tipo("a", con_progreso)
+    tid = plan.enviar("a", {}, "cliente")
+    plan.suscribir("sesion", lambda t: vistos.append((t["estado"], t["progreso"])), tid)
+    correr(plan)
+
+    assert (CORRIENDO, {"done": 1, "total": 2}) in vistos
+    assert vistos[-1][0] == LISTO
+    assert plan.obtener(tid)["progreso"] == {"done": 2, "total": 2}
+
+
+def test_oyente_que_devuelve_false_o_falla_se_desuscribe(plan):
+    tipo("a")
+    plan.suscribir("una-vez", lambda t: False)
+    plan.suscribir("rota", lambda t: 1 / 0)
+    plan.enviar("a", {}, "cliente")
+    assert plan._oyentes == {}
+
+
+def test_directorio_propio(plan):
+    tipo("a", lambda ctx, p: {"dir": str(ctx.directorio())})
+    a, b = plan.enviar("a", {}, "cliente"), plan.enviar("a", {}, "cliente")
+    correr(plan)
+    correr(plan)
+    assert {Path(plan.obtener(t)["resultado"]["dir"]).name for t in (a, b)} == {a, b}
+
+
+# ── Procesos caídos ------------------------------------------------------------
+def test_sin_latido_pasa_a_error_y_libera_el_cupo(plan):
+    tipo("a", concurrencia=1)
+    colgado = plan.enviar("a", {}, "cliente")
+    siguiente = plan.enviar("a", {}, "cliente")
+    assert plan._reclamar()["id"] == colgado
+    assert plan._reclamar() is None
+
+    hace_rato = time.time() - trabajos.LEASE - 1
+    plan._execute("update trabajos set latido_at = ?, iniciado_at = ? where id = ?", (hace_rato, hace_rato, colgado))
+    assert plan._reclamar()["id"] == siguiente
+
+    t = plan.obtener(colgado)
+    assert t["estado"] == ERROR and "dejó de responder" in t["error"]
+
+
+def test_latido_reciente_conserva_el_trabajo(plan):
+    tipo("a", concurrencia=1)
+    tid = plan.enviar("a", {}, "cliente")
+    plan._reclamar()
+    plan._execute("update trabajos set iniciado_at = ? where id = ?", (time.time() - trabajos.LEASE - 1, tid))
+    assert plan._reclamar() is None
+    assert plan.obtener(tid)["estado"] == CORRIENDO
+
+
+def test_reinicio_interrumpe_lo_pendiente(tmp_path, plan):
+    tipo("a")
+    en_cola = plan.enviar("a", {}, "cliente")
+    listo = plan.enviar("a", {}, "cliente", prioridad=trabajos.ALTA)
+    correr(plan)
+
+    reiniciado = Planificador(tmp_path / "trabajos.db", workers=1)   # mismo pid: su cliente ya no existe
+    assert reiniciado.obtener(listo)["estado"] == LISTO
+    t = reiniciado.obtener(en_cola)
+    assert t["estado"] == ERROR and "reinició" in t["error"]
+
+
+def test_purgar_terminados_viejos(plan):
+    tipo("a")
+    viejo, pendiente = plan.enviar("a", {}, "cliente", prioridad=trabajos.ALTA), plan.enviar("a", {}, "cliente")
+    correr(plan)
+    plan._execute("update trabajos set terminado_at = 0 where id = ?", (viejo,))
+    plan.purgar()
+    assert plan.obtener(viejo) is None and plan.obtener(pendiente) is not None
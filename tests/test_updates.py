@@ -0,0 +1,89 @@
+# tests/test_updates.py
+"""
+Actualizaciones dirigidas (utils/updates.py): un solo ``page.update`` por
+lote con los controles montados, y el ``Throttler`` del resize del shell
+(a lo sumo una ejecución por intervalo y siempre con la última llamada).
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.updates import Throttler, after_flush, batch_updates, mark_dirty
+
+
+class PaginaFalsa:
+    """``update`` registra cada envío; ``loop`` corre en un hilo propio."""
+
+    def __init__(self):
+        self.envios: list[tuple] = []
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def update(self, *controles):
+        self.envios.append(controles)
+
+    def run_thread(self, fn, *args):
+        threading.Thread(target=fn, args=args).start()
+
+    def cerrar(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class Control:
+    def __init__(self, page):
+        self.page = page
+
+
+@pytest.fixture
+def pagina():
+    p = PaginaFalsa()
+    yield p
+    p.cerrar()
+
+
+def test_lote_envia_una_vez_solo_lo_montado(pagina):
+    a, b, suelto = Control(pagina), Control(pagina), Control(None)
+    orden = []
+    with batch_updates(pagina):
+        mark_dirty(a, suelto)
+        mark_dirty(b, a)
+        after_flush(lambda: orden.append(len(pagina.envios)))
+        with batch_updates(pagina):                      # anidado: lo envía el externo
+            mark_dirty(b)
+        assert pagina.envios == []
+    assert pagina.envios == [(a, b)]
+    assert orden == [1]                                 # after_flush corre después del envío
+
+
+def test_fuera_de_lote_se_envia_de_inmediato(pagina):
+    a = Control(pagina)
+    mark_dirty(a, Control(None))
+    assert pagina.envios == [(a,)]
+
+
+def test_throttler_primera_inmediata_y_la_ultima_al_final(pagina):
+    llamadas, listo = [], threading.Event()
+
+    def relayout(ancho):
+        llamadas.append(ancho)
+        if ancho == 19:
+            listo.set()
+
+    throttle = Throttler(pagina, 0.2, relayout)
+    for ancho in range(20):                             # una ráfaga de resize
+        throttle(ancho)
+    assert llamadas == [0]
+    assert listo.wait(2)
+    time.sleep(0.05)
+    assert llamadas == [0, 19]
+
+
+def test_throttler_fuera_del_intervalo_no_espera(pagina):
+    llamadas = []
+    throttle = Throttler(pagina, 0.05, llamadas.append)
+    throttle(1)
+    time.sleep(0.1)
+    throttle(2)
+    assert llamadas == [1, 2]
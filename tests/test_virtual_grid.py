@@ -0,0 +1,61 @@
+# tests/test_virtual_grid.py
+"""
+Vista previa virtualizada (components/virtual_grid.py): la fuente Arrow
+devuelve sólo la ventana pedida sobre un vector de índices (orden y
+filtros), y la grilla mantiene ``visible_rows`` filas de controles.
+"""
+import pyarrow as pa
+
+from components.virtual_grid import ArrowSource, VirtualGrid
+
+FILAS = [{"orden": str(i), "sku": f"SKU-{i % 7}", "cantidad": i % 5 or None} for i in range(1000)]
+
+
+def test_ventana_sin_materializar():
+    source = ArrowSource.from_records(FILAS)
+    assert len(source) == 1000
+    assert [r["orden"] for r in source.window(995, 2000)] == ["995", "996", "997", "998", "999"]
+    assert source.window(-5, 2) == FILAS[:2] and source.window(10, 10) == []
+
+
+def test_filtros_y_orden_combinados():
+    source = ArrowSource.from_records(FILAS)
+    source.set_filter("sku", "sku-3")
+    assert len(source) == 143 and source.total_rows == 1000
+    source.set_sort("cantidad", descending=True)
+    ventana = source.window(0, 200)
+    assert {r["sku"] for r in ventana} == {"SKU-3"}
+    cantidades = [r["cantidad"] for r in ventana]
+    assert cantidades[0] == 4 and cantidades[-1] is None           # nulos al final
+    source.set_filter("sku", "")
+    assert len(source) == 1000
+
+
+def test_archivo_ipc(tmp_path):
+    path = tmp_path / "preview.arrow"
+    tabla = pa.Table.from_pylist(FILAS)
+    with pa.ipc.new_file(str(path), tabla.schema) as w:
+        w.write_table(tabla)
+    assert ArrowSource.from_ipc_file(path).window(500, 502) == FILAS[500:502]
+
+
+def test_sin_filas_conserva_encabezados():
+    assert ArrowSource.from_records([], ["id", "estado"]).columns == ["id", "estado"]
+
+
+def test_grilla_reutiliza_las_filas_visibles():
+    grid = VirtualGrid(ArrowSource.from_records(FILAS), visible_rows=10, overscan=5)
+    celdas = [cells for _, cells in grid._rows]
+    assert len(grid._rows) == 10
+    assert [c[0].value for c in celdas] == [str(i) for i in range(10)]
+
+    grid.scroll_to(500)
+    assert [c[0].value for c in celdas] == [str(i) for i in range(500, 510)]
+    assert grid._cache_start == 495 and len(grid._cache) == 20       # ventana + overscan
+    assert grid._status.value == "501–510 de 1,000"
+
+    grid.scroll_to(10_000)                                           # tope: última ventana
+    assert celdas[-1][0].value == "999"
+
+    grid.set_filter("orden", "99")
+    assert grid._offset == 0 and grid._status.value.endswith("(filtradas de 1,000)")
@@ -1,12 +1,14 @@
 import flet as ft
 from flet import Colors
 
+from utils.updates import mark_dirty
+
 
 def show_snackbar(page: ft.Page, message: str, status: str = "error"):
     """
     Muestra un SnackBar consistente que:
     1. Usa color según el estado.
-    2. Evita duplicados en page.overlay.
+    2. Reutiliza una sola instancia en page.overlay (sin duplicados).
     3. Puede invocarse desde cualquier punto sin bloquear futuros SnackBars.
     """
     # ─── Paleta de colores ───────────────────────────────────────────────
@@ -18,22 +20,21 @@ def show_snackbar(page: ft.Page, message: str, status: str = "error"):
     }
     txt_color = color_map.get(status, Colors.GREY)
 
-    # ─── Construcción del SnackBar ───────────────────────────────────────
+    # ─── Reutiliza el SnackBar de la página ──────────────────────────────
+    # Sólo viaja el diff del SnackBar (no un page.update() completo); dentro
+    # de ``batch_updates`` se agrupa con el resto de controles del handler.
+    snackbar = getattr(page, "snack_bar", None)
+    if isinstance(snackbar, ft.SnackBar) and snackbar in page.overlay:
+        snackbar.content = ft.Text(message, color=txt_color)
+        snackbar.open = True
+        mark_dirty(snackbar)
+        return
+
+    # ─── Primer uso: se monta en overlay una sola vez ────────────────────
     snackbar = ft.SnackBar(
         content=ft.Text(message, color=txt_color),
         bgcolor=Colors.WHITE,
         duration=3000,
     )
-
-    # ─── Gestión en overlay para compatibilidad total ────────────────────
-    # Elimina un SnackBar previo para no acumular instancias
-    if getattr(page, "snack_bar", None) and page.snack_bar in page.overlay:
-        page.overlay.remove(page.snack_bar)
-
-    # Asigna y agrega uno nuevo
     page.snack_bar = snackbar
-    page.overlay.append(snackbar)
-
-    # ─── Despliegue ───────────────────────────────────────────────────────
-    snackbar.open = True
-    page.update()
+    page.open(snackbar)
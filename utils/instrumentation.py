@@ -0,0 +1,406 @@
+# utils/instrumentation.py
+"""
+Instrumentación del proceso: tiempos por operación y perfilador por muestreo.
+
+Se activa con ``METRICS=1`` al arrancar. Desactivada, ``span()`` devuelve un
+contexto nulo compartido y no se instala ningún hook (ni en httpx ni en
+``page.update``), así que el costo es una comparación por llamada.
+
+Operaciones medidas:
+  • ``route_change``  (main.route_change, etiqueta ``ruta``)
+  • ``page_build``    (construcción del contenido de un módulo, ``ruta``)
+  • ``supabase``      (cada request del pool httpx compartido: ``tabla``,
+                       ``operacion``; además filas y bytes de respuesta)
+  • ``page_update``   (cada ``page.update()``; ``tipo`` completa/parcial)
+
+Salidas:
+  • ``render_prometheus()``: formato de texto de Prometheus (summary con
+    p50/p95/p99 sobre una ventana de muestras + contadores). Se expone en
+    ``/metrics`` con ``asgi_metrics(app)`` (asgi.py) o con ``serve(port)``
+    (``METRICS_PORT`` en main.py). Con varios workers cada scrape lo atiende
+    un proceso: las series llevan la etiqueta ``pid``.
+  • ``snapshot()``: filas para el panel de administración (/metricas).
+  • ``profiler``: perfilador por muestreo de todos los hilos, opcional y
+    encendido a demanda desde el panel.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+ENABLED   = os.getenv("METRICS", "0") == "1"
+VENTANA   = int(os.getenv("METRICS_VENTANA", "2048"))    # muestras por serie para cuantiles
+CUANTILES = (0.5, 0.95, 0.99)
+PREFIJO   = "colibri"
+PID       = str(os.getpid())
+
+_NULL = nullcontext()
+
+
+# ── Series ------------------------------------------------------------------
+class _Serie:
+    __slots__ = ("llamadas", "total", "maximo", "filas", "bytes", "muestras")
+
+    def __init__(self):
+        self.llamadas = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.filas = 0
+        self.bytes = 0
+        self.muestras: deque[float] = deque(maxlen=VENTANA)
+
+    def cuantiles(self) -> dict[float, float]:
+        datos = sorted(self.muestras)
+        if not datos:
+            return {q: 0.0 for q in CUANTILES}
+        return {q: datos[min(int(q * len(datos)), len(datos) - 1)] for q in CUANTILES}
+
+
+_series: dict[tuple[str, tuple], _Serie] = {}
+_lock = threading.Lock()
+
+
+def observe(op: str, segundos: float, filas: int = 0, nbytes: int = 0, **etiquetas: str):
+    """Registra una medición de ``op``. Sin efecto si la instrumentación está apagada."""
+    if not ENABLED:
+        return
+    clave = (op, tuple(sorted(etiquetas.items())))
+    with _lock:
+        serie = _series.get(clave)
+        if serie is None:
+            serie = _series[clave] = _Serie()
+        serie.llamadas += 1
+        serie.total += segundos
+        serie.filas += filas
+        serie.bytes += nbytes
+        serie.muestras.append(segundos)
+        if segundos > serie.maximo:
+            serie.maximo = segundos
+
+
+class _Span:
+    __slots__ = ("op", "etiquetas", "t0")
+
+    def __init__(self, op: str, etiquetas: dict):
+        self.op = op
+        self.etiquetas = etiquetas
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.op, time.perf_counter() - self.t0, **self.etiquetas)
+        return False
+
+
+def span(op: str, **etiquetas: str):
+    """``with span("page_build", ruta="/home"): ...`` mide el bloque."""
+    return _Span(op, etiquetas) if ENABLED else _NULL
+
+
+def reset():
+    with _lock:
+        _series.clear()
+
+
+def snapshot() -> list[dict]:
+    """Filas {operacion, etiquetas, llamadas, p50_ms, p95_ms, p99_ms, max_ms, total_s, filas, bytes}."""
+    with _lock:
+        items = [(op, et, s, s.cuantiles()) for (op, et), s in _series.items()]
+    rows = [
+        {
+            "operacion": op,
+            "etiquetas": " ".join(f"{k}={v}" for k, v in et),
+            "llamadas": s.llamadas,
+            "p50_ms": q[0.5] * 1000,
+            "p95_ms": q[0.95] * 1000,
+            "p99_ms": q[0.99] * 1000,
+            "max_ms": s.maximo * 1000,
+            "total_s": s.total,
+            "filas": s.filas,
+            "bytes": s.bytes,
+        }
+        for op, et, s, q in items
+    ]
+    return sorted(rows, key=lambda r: r["total_s"], reverse=True)
+
+
+# ── Formato Prometheus --------------------------------------------------------
+def _etiquetas(pares) -> str:
+    def esc(v) -> str:
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{k}="{esc(v)}"' for k, v in pares)
+
+
+def render_prometheus() -> str:
+    with _lock:
+        items = [(op, et, s, s.cuantiles()) for (op, et), s in _series.items()]
+    nombre = f"{PREFIJO}_operacion_segundos"
+    lineas = [
+        f"# HELP {nombre} Duración por operación (ventana de {VENTANA} muestras para los cuantiles).",
+        f"# TYPE {nombre} summary",
+    ]
+    for op, et, s, q in items:
+        base = (("op", op), ("pid", PID), *et)
+        for cuantil, valor in q.items():
+            lineas.append(f"{nombre}{{{_etiquetas((*base, ('quantile', cuantil)))}}} {valor:.6f}")
+        lineas.append(f"{nombre}_sum{{{_etiquetas(base)}}} {s.total:.6f}")
+        lineas.append(f"{nombre}_count{{{_etiquetas(base)}}} {s.llamadas}")
+
+    for metrica, attr, ayuda in (
+        ("supabase_filas_total", "filas", "Filas devueltas por Supabase (Content-Range o arreglo JSON)."),
+        ("supabase_bytes_total", "bytes", "Bytes de respuesta de Supabase."),
+    ):
+        lineas += [f"# HELP {PREFIJO}_{metrica} {ayuda}", f"# TYPE {PREFIJO}_{metrica} counter"]
+        for op, et, s, _ in items:
+            if op == "supabase":
+                lineas.append(f"{PREFIJO}_{metrica}{{{_etiquetas((('pid', PID), *et))}}} {getattr(s, attr)}")
+    return "\n".join(lineas) + "\n"
+
+
+# ── Supabase (hooks del pool httpx compartido) -------------------------------
+def _operacion(request) -> tuple[str, str]:
+    """(tabla, operacion) a partir de la URL de PostgREST / Auth / Storage."""
+    partes = urlsplit(str(request.url)).path.strip("/").split("/")
+    servicio = partes[0] if partes else ""
+    if servicio == "rest" and len(partes) >= 3:
+        if partes[2] == "rpc" and len(partes) >= 4:
+            return partes[3], "rpc"
+        metodo = request.method
+        if metodo == "POST":
+            return partes[2], "upsert" if "resolution=" in request.headers.get("prefer", "") else "insert"
+        return partes[2], {"GET": "select", "HEAD": "count", "PATCH": "update", "DELETE": "delete"}.get(metodo, metodo)
+    return "/".join(partes[:3]), servicio or request.method
+
+
+def _filas(response) -> int:
+    """Filas según ``Content-Range`` (PostgREST lo envía en las lecturas; sin él, 0)."""
+    rango = response.headers.get("content-range", "")
+    inicio, _, fin = rango.partition("/")[0].partition("-")
+    if fin:
+        return int(fin) - int(inicio) + 1
+    return 0
+
+
+def instrument_http(client) -> bool:
+    """
+    Mide cada request de ``client`` (httpx.Client). No hace nada si está apagada.
+    La medición se registra al cerrarse el cuerpo (leído por quien hizo el
+    request, no por el hook): tiempo total y ``num_bytes_downloaded``.
+    """
+    if not ENABLED:
+        return False
+
+    import httpx
+
+    class _CuerpoMedido(httpx.SyncByteStream):
+        def __init__(self, response, t0: float):
+            self.response, self.stream, self.t0 = response, response.stream, t0
+            self.medido = False
+
+        def __iter__(self):
+            yield from self.stream
+
+        def close(self):
+            try:
+                self.stream.close()
+            finally:
+                if not self.medido:
+                    self.medido = True
+                    tabla, operacion = _operacion(self.response.request)
+                    observe(
+                        "supabase", time.perf_counter() - self.t0,
+                        filas=_filas(self.response), nbytes=self.response.num_bytes_downloaded,
+                        tabla=tabla, operacion=operacion,
+                    )
+
+    def on_request(request):
+        request.extensions["t0"] = time.perf_counter()
+
+    def on_response(response):
+        t0 = response.request.extensions.get("t0")
+        if t0 is not None:
+            response.stream = _CuerpoMedido(response, t0)
+
+    hooks = client.event_hooks
+    hooks["request"].append(on_request)
+    hooks["response"].append(on_response)
+    client.event_hooks = hooks
+    return True
+
+
+# ── page.update ---------------------------------------------------------------
+def instrument_page(page) -> bool:
+    """Mide cada ``page.update()`` de la sesión (también los ``control.update()``)."""
+    if not ENABLED:
+        return False
+    update = page.update
+
+    def timed_update(*controls):
+        t0 = time.perf_counter()
+        try:
+            update(*controls)
+        finally:
+            observe("page_update", time.perf_counter() - t0, tipo="parcial" if controls else "completa")
+
+    page.update = timed_update
+    return True
+
+
+# ── Exposición /metrics -------------------------------------------------------
+def asgi_metrics(app, path: str = "/metrics"):
+    """Envuelve una app ASGI para responder ``path`` con ``render_prometheus()``."""
+    if not ENABLED:
+        return app
+
+    async def wrapped(scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == path:
+            body = render_prometheus().encode()
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/plain; version=0.0.4; charset=utf-8")],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        await app(scope, receive, send)
+
+    return wrapped
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port: int, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Servidor /metrics en un hilo (entrada de desarrollo, un solo proceso)."""
+    if not ENABLED:
+        return None
+    server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Métricas en http://%s:%s/metrics", host, port)
+    return server
+
+
+# ── Perfilador por muestreo ---------------------------------------------------
+# Esperas que no cuentan como trabajo (hilos ociosos del pool, event loop).
+_OCIOSAS = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+}
+
+
+def _funcion(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    Toma la pila de cada hilo cada ``intervalo`` segundos (``sys._current_frames``)
+    y cuenta muestras propias (función en la cima) y acumuladas (función en
+    la pila). Apagado no cuesta nada; encendido, un hilo más del proceso.
+    """
+
+    def __init__(self, intervalo: float = 0.005, profundidad: int = 48):
+        self.intervalo = intervalo
+        self.profundidad = profundidad
+        self.muestras = 0
+        self.propias: Counter = Counter()
+        self.acumuladas: Counter = Counter()
+        self.pilas: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def activo(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, reiniciar: bool = True):
+        if self.activo:
+            return
+        if reiniciar:
+            self.reset()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        logger.info("Perfilador encendido (cada %.0f ms)", self.intervalo * 1000)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        logger.info("Perfilador apagado (%s muestras)", self.muestras)
+
+    def reset(self):
+        with self._lock:
+            self.muestras = 0
+            self.propias.clear()
+            self.acumuladas.clear()
+            self.pilas.clear()
+
+    def _run(self):
+        propio = threading.get_ident()
+        while not self._stop.wait(self.intervalo):
+            for tid, frame in sys._current_frames().items():
+                if tid == propio:
+                    continue
+                if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _OCIOSAS:
+                    continue
+                pila = []
+                while frame is not None and len(pila) < self.profundidad:
+                    pila.append(_funcion(frame.f_code))
+                    frame = frame.f_back
+                with self._lock:
+                    self.muestras += 1
+                    self.propias[pila[0]] += 1
+                    self.acumuladas.update(set(pila))
+                    self.pilas[";".join(reversed(pila))] += 1
+
+    def report(self, top: int = 25) -> list[dict]:
+        """Funciones con más muestras propias: {funcion, propias, acumuladas, pct_propias, pct_acumuladas}."""
+        with self._lock:
+            total = self.muestras or 1
+            return [
+                {
+                    "funcion": fn,
+                    "propias": n,
+                    "acumuladas": self.acumuladas[fn],
+                    "pct_propias": n / total,
+                    "pct_acumuladas": self.acumuladas[fn] / total,
+                }
+                for fn, n in self.propias.most_common(top)
+            ]
+
+    def folded(self) -> str:
+        """Pilas en formato "folded" (flamegraph.pl / speedscope)."""
+        with self._lock:
+            return "\n".join(f"{pila} {n}" for pila, n in self.pilas.most_common())
+
+
+profiler = SamplingProfiler()
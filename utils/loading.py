@@ -0,0 +1,37 @@
+# utils/loading.py
+from contextlib import contextmanager
+from typing import Optional
+
+import flet as ft
+
+
+@contextmanager
+def busy(*controls: ft.Control, indicator: Optional[ft.Control] = None):
+    """
+    Estado de carga mientras dura una operación:
+    1. Deshabilita ``controls`` (botones, campos) para evitar dobles envíos.
+    2. Muestra ``indicator`` (p. ej. un ProgressRing) si se indica.
+    3. Restaura el estado previo al salir, aunque haya error o cancelación.
+    Sólo se actualizan esos controles, no la página completa.
+    """
+    previous = [c.disabled for c in controls]
+    for c in controls:
+        c.disabled = True
+    if indicator is not None:
+        indicator.visible = True
+    update_if_mounted(*controls, indicator)
+    try:
+        yield
+    finally:
+        for c, was_disabled in zip(controls, previous):
+            c.disabled = was_disabled
+        if indicator is not None:
+            indicator.visible = False
+        update_if_mounted(*controls, indicator)
+
+
+def update_if_mounted(*controls: Optional[ft.Control]):
+    """Actualiza sólo los controles ya montados en la página (ignora el resto)."""
+    for c in controls:
+        if c is not None and c.page is not None:
+            c.update()
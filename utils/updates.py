@@ -0,0 +1,161 @@
+# utils/updates.py
+"""
+Actualizaciones dirigidas de la UI.
+
+  • ``batch_updates(page)`` / ``@batched``: durante un handler, los controles
+    marcados con ``mark_dirty`` se acumulan y al final se envían en un único
+    ``page.update(*controles)``: un mensaje por websocket con el diff de esos
+    controles solamente (no de la página completa). ``after_flush`` difiere
+    llamadas que deben ir después del lote (``scroll_to``).
+  • ``Debouncer``: ejecuta la función cuando los eventos se calman (teclado).
+  • ``Throttler``: como máximo una ejecución por intervalo, con la última
+    llamada garantizada al final de la ráfaga (resize).
+"""
+import asyncio
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+
+import flet as ft
+
+_dirty: ContextVar[Optional[list]] = ContextVar("dirty_controls", default=None)
+_after: ContextVar[Optional[list]] = ContextVar("after_flush", default=None)
+
+
+# ── Lote de controles sucios ---------------------------------------------------
+def flush(page: ft.Page, controls) -> int:
+    """Envía en un solo lote los controles montados. Devuelve cuántos se enviaron."""
+    mounted = [c for c in dict.fromkeys(controls) if c is not None and c.page is not None]
+    if mounted:
+        page.update(*mounted)
+    return len(mounted)
+
+
+def mark_dirty(*controls: Optional[ft.Control]):
+    """
+    Marca controles para actualizar. Dentro de ``batch_updates`` se acumulan;
+    fuera de un lote se envían de inmediato (también en un solo mensaje).
+    """
+    pending = _dirty.get()
+    if pending is not None:
+        pending.extend(c for c in controls if c is not None)
+        return
+    mounted = [c for c in controls if c is not None and c.page is not None]
+    if mounted:
+        mounted[0].page.update(*mounted)
+
+
+def after_flush(fn: Callable[[], Any]):
+    """
+    Ejecuta ``fn`` después de enviar el lote en curso (o de inmediato si no
+    hay lote). Para llamadas que dependen de que el cliente ya tenga el
+    estado nuevo, p. ej. ``scroll_to`` sobre un panel que se acaba de mostrar.
+    """
+    callbacks = _after.get()
+    if callbacks is None:
+        fn()
+    else:
+        callbacks.append(fn)
+
+
+@contextmanager
+def batch_updates(page: ft.Page):
+    if _dirty.get() is not None:              # lote anidado: lo vacía el externo
+        yield
+        return
+    token, after_token = _dirty.set([]), _after.set([])
+    try:
+        yield
+    finally:
+        pending, callbacks = _dirty.get(), _after.get()
+        _dirty.reset(token)
+        _after.reset(after_token)
+        flush(page, pending)
+        for fn in callbacks:
+            fn()
+
+
+def batched(handler: Callable) -> Callable:
+    """Decorador para handlers de eventos (sync o async) que agrupa sus updates."""
+    if asyncio.iscoroutinefunction(handler):
+        @functools.wraps(handler)
+        async def async_wrapper(e, *args, **kwargs):
+            with batch_updates(e.page):
+                return await handler(e, *args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(handler)
+    def wrapper(e, *args, **kwargs):
+        with batch_updates(e.page):
+            return handler(e, *args, **kwargs)
+    return wrapper
+
+
+# ── Debounce / throttle --------------------------------------------------------
+class Debouncer:
+    """Llama ``fn`` ``delay`` segundos después del último evento de la ráfaga."""
+
+    def __init__(self, page: ft.Page, delay: float, fn: Callable[..., Any]):
+        self.page = page
+        self.delay = delay
+        self.fn = fn
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    def __call__(self, *args):
+        self.page.loop.call_soon_threadsafe(self._reschedule, args)
+
+    def _reschedule(self, args: tuple):
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self.page.loop.call_later(self.delay, self._fire, args)
+
+    def _fire(self, args: tuple):
+        self._handle = None
+        # fuera del event loop: fn puede enviar updates (llamadas bloqueantes)
+        self.page.run_thread(self.fn, *args)
+
+
+class Throttler:
+    """``fn`` a lo sumo cada ``interval`` s; la última llamada nunca se pierde."""
+
+    def __init__(self, page: ft.Page, interval: float, fn: Callable[..., Any]):
+        self.page = page
+        self.interval = interval
+        self.fn = fn
+        self._last = 0.0
+        self._trailing: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._last + self.interval - now
+            if wait <= 0:
+                self._last = now
+                run_now = True
+            else:
+                run_now = False
+                scheduled = self._trailing is not None
+                self._trailing = args
+        if run_now:
+            self.fn(*args)
+        elif not scheduled:
+            self.page.loop.call_soon_threadsafe(self.page.loop.call_later, wait, self._fire_trailing)
+
+    def _fire_trailing(self):
+        with self._lock:
+            args, self._trailing = self._trailing, None
+            self._last = time.monotonic()
+        if args is not None:
+            self.page.run_thread(self.fn, *args)
+
+
+def debounce(page: ft.Page, delay: float) -> Callable[[Callable], Debouncer]:
+    return lambda fn: Debouncer(page, delay, fn)
+
+
+def throttle(page: ft.Page, interval: float) -> Callable[[Callable], Throttler]:
+    return lambda fn: Throttler(page, interval, fn)
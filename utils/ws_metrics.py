@@ -0,0 +1,124 @@
+# utils/ws_metrics.py
+"""
+Medición de mensajes y bytes enviados por websocket, por interacción.
+
+Se activa con ``WS_METRICS=1``. ``instrument(page)`` envuelve los envíos de
+la conexión de la sesión y el despacho de eventos: todo lo que se envía
+después de un evento se atribuye a ese evento ("Button.click",
+"page.route_change", "page.resized"...) hasta que llega el siguiente.
+Con handlers en hilos la atribución es aproximada, suficiente para comparar.
+Al desconectarse la sesión se registra un resumen en el log.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+import flet as ft
+from flet.core.protocol import CommandEncoder
+
+logger = logging.getLogger(__name__)
+
+ENABLED   = os.getenv("WS_METRICS", "0") == "1"
+METER_KEY = "ws_meter"
+
+
+def payload_size(obj) -> int:
+    return len(json.dumps(obj, cls=CommandEncoder, separators=(",", ":")).encode())
+
+
+class WsMeter:
+    def __init__(self):
+        self.current = "inicio"
+        self.stats: dict[str, list[int]] = {}       # interacción → [eventos, mensajes, bytes]
+        self._lock = threading.Lock()
+
+    def event(self, label: str):
+        with self._lock:
+            self.current = label
+            self.stats.setdefault(label, [0, 0, 0])[0] += 1
+
+    def sent(self, nbytes: int):
+        with self._lock:
+            row = self.stats.setdefault(self.current, [0, 0, 0])
+            row[1] += 1
+            row[2] += nbytes
+
+    def report(self) -> list[dict]:
+        """Filas {interaccion, eventos, mensajes, bytes, bytes_por_evento} ordenadas por bytes."""
+        with self._lock:
+            rows = [
+                {
+                    "interaccion": label,
+                    "eventos": ev,
+                    "mensajes": msgs,
+                    "bytes": nbytes,
+                    "bytes_por_evento": nbytes / ev if ev else float(nbytes),
+                }
+                for label, (ev, msgs, nbytes) in self.stats.items()
+            ]
+        return sorted(rows, key=lambda r: r["bytes"], reverse=True)
+
+    def log_report(self):
+        for r in self.report():
+            logger.info(
+                "ws %-32s eventos=%-5s mensajes=%-5s bytes=%-9s bytes/evento=%.0f",
+                r["interaccion"], r["eventos"], r["mensajes"], r["bytes"], r["bytes_por_evento"],
+            )
+
+
+def _wrap_connection(conn, meters: dict):
+    """Envuelve una sola vez los envíos de la conexión (puede tener varias sesiones)."""
+    if getattr(conn, "_ws_meters", None) is not None:
+        return
+    conn._ws_meters = meters
+    send_command, send_commands = conn.send_command, conn.send_commands
+
+    def metered_command(session_id, command):
+        meter = meters.get(session_id)
+        if meter is not None:
+            meter.sent(payload_size(command))
+        return send_command(session_id, command)
+
+    def metered_commands(session_id, commands):
+        meter = meters.get(session_id)
+        if meter is not None:
+            meter.sent(payload_size(commands))
+        return send_commands(session_id, commands)
+
+    conn.send_command = metered_command
+    conn.send_commands = metered_commands
+
+
+_meters: dict[str, WsMeter] = {}
+
+
+def instrument(page: ft.Page, force: bool = False) -> Optional[WsMeter]:
+    """Activa la medición para la sesión de ``page`` (si ENABLED o ``force``)."""
+    if not (ENABLED or force) or page.connection is None:
+        return None
+    meter = WsMeter()
+    _meters[page.session_id] = meter
+    page.session.set(METER_KEY, meter)
+    _wrap_connection(page.connection, _meters)
+
+    dispatch = page.on_event_async
+
+    async def metered_dispatch(e):
+        if e.target == "page":
+            meter.event(f"page.{e.name}")
+        else:
+            control = page.get_control(e.target)
+            meter.event(f"{type(control).__name__ if control else e.target}.{e.name}")
+        if e.target == "page" and e.name == "disconnect":
+            meter.log_report()
+            _meters.pop(page.session_id, None)
+        await dispatch(e)
+
+    page.on_event_async = metered_dispatch
+    return meter
+
+
+def get_meter(page: ft.Page) -> Optional[WsMeter]:
+    return page.session.get(METER_KEY)